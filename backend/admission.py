@@ -0,0 +1,278 @@
+"""Admission control and per-user fair scheduling for LLM calls.
+
+``AdmissionController`` sits in front of the completion calls. Each user has
+a token bucket (``user_rate`` calls per second, ``user_burst`` at once); a
+call over its bucket is rejected straight away. Admitted calls take one of
+``max_in_flight`` global slots, or wait for one in a bounded queue that is
+served round-robin across users, so one user's burst waits behind everybody
+else's next call instead of in front of it. A call that cannot get a slot
+before ``max_wait_seconds`` -- or, judging by recent slot hold times, would
+not -- is rejected with a retry hint instead of being left to time out.
+A call answered without the model (a completion cache hit) refunds its slot
+and bucket token through ``Ticket.refund``.
+
+Slots are shared by threads (Flask) and event loops (asgi.py): ``admit``
+blocks the calling thread, ``admit_async`` awaits.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable
+
+from metrics import LLM_ADMISSION_REJECTED, LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT
+
+# Smoothing for the running average of how long a slot is held.
+HOLD_TIME_ALPHA = 0.2
+# Idle users' buckets refill to full and carry no state; drop them past this size.
+MAX_TRACKED_BUCKETS = 10_000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"LLM call rejected ({reason}); retry after {retry_after:.1f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """``Retry-After`` value: whole seconds, at least one."""
+        return str(max(math.ceil(self.retry_after), 1))
+
+
+@dataclass(eq=False)
+class _Waiter:
+    user_id: str
+    cost: int
+    enqueued_at: float
+    wake: Callable[[], None]
+    granted: bool = False
+    granted_at: float = 0.0
+    # Bucket tokens charged for it, which a refund gives back.
+    tokens: int = 0
+
+
+class Ticket:
+    """A granted admission. Release it (or leave its ``with`` block) once the
+    LLM call or stream is finished; releasing twice is harmless."""
+
+    def __init__(self, controller: "AdmissionController", waiter: _Waiter):
+        self._controller = controller
+        self._waiter = waiter
+        self._released = False
+        self.waited = waiter.granted_at - waiter.enqueued_at
+
+    def release(self) -> None:
+        self._controller._release(self)
+
+    def refund(self, cost: int = 1) -> None:
+        """Give back ``cost`` of the slots, and the bucket tokens they took,
+        for calls that were answered without the model."""
+        self._controller._refund(self, cost)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_queue: int = 128,
+        max_wait_seconds: float = 10.0,
+        user_rate: float = 20 / 60,
+        user_burst: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queued = 0
+        self._queue: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._hold_seconds: float | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    # -- token buckets --------------------------------------------------------
+    def _bucket_level(self, user_id: str, now: float) -> float:
+        tokens, updated = self._buckets.get(user_id, (self.user_burst, now))
+        return min(self.user_burst, tokens + (now - updated) * self.user_rate)
+
+    def _take_tokens(self, user_id: str, cost: int, now: float) -> int:
+        """Charge ``cost`` tokens and return how many were taken; rejects if
+        the bucket hasn't refilled enough."""
+        if self.user_rate <= 0:
+            return 0
+        cost = min(cost, self.user_burst)
+        tokens = self._bucket_level(user_id, now)
+        if tokens < cost:
+            raise self._reject("rate_limited", (cost - tokens) / self.user_rate)
+        self._buckets[user_id] = (tokens - cost, now)
+        if len(self._buckets) > MAX_TRACKED_BUCKETS:
+            self._buckets = {
+                key: value for key, value in self._buckets.items() if self._bucket_level(key, now) < self.user_burst
+            }
+        return cost
+
+    def _return_tokens(self, user_id: str, tokens: int, now: float) -> None:
+        if tokens:
+            self._buckets[user_id] = (min(self.user_burst, self._bucket_level(user_id, now) + tokens), now)
+
+    # -- slots and queue ------------------------------------------------------
+    def _estimated_wait(self, cost: int) -> float | None:
+        """Expected wait for a new arrival, from the average slot hold time."""
+        if self._hold_seconds is None:
+            return None
+        ahead = sum(waiter.cost for waiters in self._queue.values() for waiter in waiters)
+        backlog = self._in_flight + ahead + cost - self.max_in_flight
+        return max(backlog, 0) / self.max_in_flight * self._hold_seconds
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        LLM_ADMISSION_REJECTED.labels(reason).inc()
+        return AdmissionRejected(reason, retry_after)
+
+    def _enter(self, user_id: str, cost: int, wake: Callable[[], None]) -> _Waiter:
+        cost = max(1, min(cost, self.max_in_flight))
+        with self._lock:
+            now = self._clock()
+            waiter = _Waiter(user_id, cost, enqueued_at=now, wake=wake)
+            if not self._queue and self._in_flight + cost <= self.max_in_flight:
+                waiter.tokens = self._take_tokens(user_id, cost, now)
+                self._grant(waiter, now)
+                return waiter
+
+            estimate = self._estimated_wait(cost)
+            if self._queued >= self.max_queue:
+                raise self._reject("queue_full", estimate or self.max_wait_seconds)
+            if estimate is not None and estimate > self.max_wait_seconds:
+                raise self._reject("deadline", estimate)
+            waiter.tokens = self._take_tokens(user_id, cost, now)
+            self._queue.setdefault(user_id, deque()).append(waiter)
+            self._queued += 1
+            LLM_QUEUE_DEPTH.set(self._queued)
+            return waiter
+
+    def _grant(self, waiter: _Waiter, now: float) -> None:
+        self._in_flight += waiter.cost
+        waiter.granted = True
+        waiter.granted_at = now
+        LLM_IN_FLIGHT.set(self._in_flight)
+        LLM_QUEUE_WAIT.observe(now - waiter.enqueued_at)
+
+    def _grant_waiters(self, now: float) -> None:
+        """Hand free slots to queued calls, one user at a time in turn."""
+        while self._queue:
+            user_id, waiters = next(iter(self._queue.items()))
+            waiter = waiters[0]
+            if self._in_flight + waiter.cost > self.max_in_flight:
+                break
+            waiters.popleft()
+            if waiters:
+                self._queue.move_to_end(user_id)
+            else:
+                del self._queue[user_id]
+            self._queued -= 1
+            self._grant(waiter, now)
+            waiter.wake()
+        LLM_QUEUE_DEPTH.set(self._queued)
+
+    def _withdraw(self, waiter: _Waiter) -> bool:
+        """Take a waiter that gave up out of the queue; True if it was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiters = self._queue[waiter.user_id]
+            waiters.remove(waiter)
+            if not waiters:
+                del self._queue[waiter.user_id]
+            self._queued -= 1
+            LLM_QUEUE_DEPTH.set(self._queued)
+            # A cheaper call behind a withdrawn one may fit now.
+            self._grant_waiters(self._clock())
+            return False
+
+    def _release(self, ticket: Ticket) -> None:
+        with self._lock:
+            if ticket._released:
+                return
+            ticket._released = True
+            now = self._clock()
+            held = now - ticket._waiter.granted_at
+            self._hold_seconds = held if self._hold_seconds is None else (
+                HOLD_TIME_ALPHA * held + (1 - HOLD_TIME_ALPHA) * self._hold_seconds
+            )
+            self._in_flight -= ticket._waiter.cost
+            LLM_IN_FLIGHT.set(self._in_flight)
+            self._grant_waiters(now)
+
+    def _refund(self, ticket: Ticket, cost: int) -> None:
+        with self._lock:
+            if ticket._released:
+                return
+            waiter = ticket._waiter
+            cost = min(max(cost, 0), waiter.cost)
+            tokens = min(cost, waiter.tokens)
+            waiter.cost -= cost
+            waiter.tokens -= tokens
+            # Slots given back unused say nothing about how long calls hold
+            # one, so a fully refunded ticket skips the hold-time average.
+            ticket._released = not waiter.cost
+            now = self._clock()
+            self._return_tokens(waiter.user_id, tokens, now)
+            self._in_flight -= cost
+            LLM_IN_FLIGHT.set(self._in_flight)
+            self._grant_waiters(now)
+
+    def _timed_out(self, waiter: _Waiter) -> AdmissionRejected:
+        return self._reject("deadline", self._estimated_wait(waiter.cost) or self.max_wait_seconds)
+
+    # -- public API -----------------------------------------------------------
+    def admit(self, user_id: str, cost: int = 1) -> Ticket:
+        """Block until ``cost`` slots are granted; raises AdmissionRejected."""
+        granted = threading.Event()
+        waiter = self._enter(user_id, cost, granted.set)
+        if not waiter.granted:
+            granted.wait(self.max_wait_seconds)
+            if not self._withdraw(waiter):
+                raise self._timed_out(waiter)
+        return Ticket(self, waiter)
+
+    async def admit_async(self, user_id: str, cost: int = 1) -> Ticket:
+        """``admit`` for event loops; a cancelled wait gives its place (or slot) back."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enter(user_id, cost, wake)
+        if not waiter.granted:
+            try:
+                await asyncio.wait_for(granted, self.max_wait_seconds)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                if self._withdraw(waiter):
+                    Ticket(self, waiter).release()
+                raise
+            if not self._withdraw(waiter):
+                raise self._timed_out(waiter)
+        return Ticket(self, waiter)
@@ -0,0 +1,102 @@
+"""In-process cache of the agent catalog.
+
+The ``agents`` table holds a handful of rows that change only when someone
+edits personas by hand, so each worker keeps an immutable snapshot and only
+reloads it when the TTL lapses or ``invalidate()`` bumps the version.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
+
+PUBLIC_FIELDS = ("id", "name", "role_description", "color_hex")
+
+# A chat naming an unknown agent may mean a row was just added; allow an early
+# reload for it, but not more often than this.
+MISS_RELOAD_INTERVAL_SECONDS = 5.0
+
+
+@dataclass(frozen=True, slots=True)
+class Agent:
+    id: str
+    name: str
+    role_description: str
+    color_hex: str
+    system_prompt: str
+
+    def public(self) -> dict[str, str]:
+        return {field: getattr(self, field) for field in PUBLIC_FIELDS}
+
+
+@dataclass(frozen=True, slots=True)
+class AgentCatalog:
+    agents: Mapping[str, Agent]
+    public: tuple[dict[str, str], ...]
+    etag: str
+    version: int
+    loaded_at: float
+
+
+class AgentRegistry:
+    def __init__(self, loader: Callable[[], list[dict[str, Any]]], ttl_seconds: float = 300.0):
+        self._loader = loader
+        self.ttl_seconds = ttl_seconds
+        self._version = 0
+        self._catalog: AgentCatalog | None = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, catalog: AgentCatalog | None) -> bool:
+        return (
+            catalog is not None
+            and catalog.version == self._version
+            and time.monotonic() - catalog.loaded_at < self.ttl_seconds
+        )
+
+    def _load(self) -> AgentCatalog:
+        rows = sorted(self._loader(), key=lambda row: str(row["id"]))
+        agents = {
+            str(row["id"]): Agent(
+                id=str(row["id"]),
+                name=row["name"],
+                role_description=row["role_description"],
+                color_hex=row["color_hex"],
+                system_prompt=row["system_prompt"],
+            )
+            for row in rows
+        }
+        public = tuple(agent.public() for agent in agents.values())
+        digest = hashlib.sha256(json.dumps(public, sort_keys=True).encode()).hexdigest()
+        return AgentCatalog(
+            agents=MappingProxyType(agents),
+            public=public,
+            etag=digest[:32],
+            version=self._version,
+            loaded_at=time.monotonic(),
+        )
+
+    def catalog(self) -> AgentCatalog:
+        catalog = self._catalog
+        if self._is_fresh(catalog):
+            return catalog
+
+        with self._lock:
+            if not self._is_fresh(self._catalog):
+                self._catalog = self._load()
+            return self._catalog
+
+    def get(self, agent_id: str) -> Agent | None:
+        catalog = self.catalog()
+        agent = catalog.agents.get(agent_id)
+        if agent is None and time.monotonic() - catalog.loaded_at >= MISS_RELOAD_INTERVAL_SECONDS:
+            self.invalidate()
+            agent = self.catalog().agents.get(agent_id)
+        return agent
+
+    def invalidate(self) -> None:
+        """Bump the catalog version so the next lookup reloads from the database."""
+        with self._lock:
+            self._version += 1
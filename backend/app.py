@@ -1,31 +1,57 @@
+import base64
+import binascii
+import contextvars
+import hmac
+import json
 import logging
+import logging.config
 import os
+import queue
+import threading
 import time
-import traceback
-from datetime import datetime, timezone
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Mapping
 
+import jwt
 from dotenv import load_dotenv
-from flask import Flask, g, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-from openai import OpenAI
-from supabase import Client, create_client
 
-# ---------------------------------------------------------------------------
-# Logging
-# ---------------------------------------------------------------------------
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="[%(asctime)s] %(levelname)-8s %(name)s  %(message)s",
-    datefmt="%H:%M:%S",
+from admission import AdmissionController, AdmissionRejected, Ticket
+from agent_registry import Agent, AgentRegistry
+from archive import ArchiveError, archive_header, message_record, ndjson, read_records, session_record
+from auth_tokens import LocalTokenVerifier, TokenCache, TokenVerificationUnavailable, unverified_expiry
+from completion_cache import CachedStream, CachingStream, CompletionCache, completion_key
+from context_window import ContextWindow, build_context, token_counter
+from events import EventHub
+from metrics import (
+    EVENT_STREAMS,
+    EVENT_SYNCS,
+    exposition,
+    record_llm_usage,
+    record_stage,
+    span,
+    start_request,
 )
-log = logging.getLogger("boardroom")
+from model_routing import DeadlineExceeded, ModelRouter, RoutedStream, parse_routes
+from process_local import ProcessLocal
+from search import SEARCH_QUERY_MAX_CHARS, snippet_segments
+from single_flight import SingleFlight
+from structured_logging import RequestSampler, json_queue_handler, parse_sample_rates
+from session_summaries import SessionSummary, SummaryRefresher, needs_refresh, summary_prompt
+from session_titles import DEFAULT_TITLE, clean_title, title_prompt
+from write_behind import Journal, WriteBehindQueue
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
+    from supabase import AsyncClient, Client
 
-# Quieten noisy third-party loggers
-logging.getLogger("httpx").setLevel(logging.WARNING)
-logging.getLogger("httpcore").setLevel(logging.WARNING)
-logging.getLogger("hpack").setLevel(logging.WARNING)
+log = logging.getLogger("boardroom")
 
 # ---------------------------------------------------------------------------
 # Environment
@@ -39,38 +65,357 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY", "")
 OPENROUTER_KEY = os.environ.get("OPENROUTER_API_KEY", "")
 OPENROUTER_BASE = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_MODEL = os.environ.get("OPENROUTER_MODEL", "openai/gpt-4o-mini")
+SUMMARY_MODEL = os.environ.get("SUMMARY_MODEL", OPENROUTER_MODEL)
+
+# Local access-token verification. With neither a JWT secret nor a JWKS URL
+# configured, every token is checked remotely via supabase.auth.get_user().
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.environ.get("SUPABASE_JWKS_URL", "")
+AUTH_REMOTE_FALLBACK = os.environ.get("AUTH_REMOTE_FALLBACK", "false").lower() == "true"
+AUTH_CACHE_SIZE = int(os.environ.get("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get("AUTH_CACHE_TTL_SECONDS", "300"))
+
+# Run each chat turn through the chat_begin_turn/chat_finish_turn RPCs in
+# supabase/schema.sql (two round trips) instead of six PostgREST requests.
+CHAT_USE_RPC = os.environ.get("CHAT_USE_RPC", "true").lower() == "true"
+
+# The LLM context is packed newest-first into a token budget from up to
+# CHAT_HISTORY_LIMIT recent messages (see context_window.py).
+CHAT_HISTORY_LIMIT = int(os.environ.get("CHAT_HISTORY_LIMIT", "50"))
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_MESSAGE_MAX_TOKENS = int(os.environ.get("CONTEXT_MESSAGE_MAX_TOKENS", "1500"))
+
+# Rolling session summaries (see session_summaries.py): once SUMMARY_REFRESH_EVERY
+# messages beyond the newest SUMMARY_KEEP_RECENT are unsummarized, a background
+# job folds them into the session's summary.
+SESSION_SUMMARIES = os.environ.get("SESSION_SUMMARIES", "true").lower() == "true"
+SUMMARY_REFRESH_EVERY = int(os.environ.get("SUMMARY_REFRESH_EVERY", "20"))
+SUMMARY_KEEP_RECENT = int(os.environ.get("SUMMARY_KEEP_RECENT", "10"))
+SUMMARY_MAX_TOKENS = int(os.environ.get("SUMMARY_MAX_TOKENS", "400"))
+SUMMARY_BATCH_LIMIT = int(os.environ.get("SUMMARY_BATCH_LIMIT", "200"))
+SUMMARY_WORKERS = int(os.environ.get("SUMMARY_WORKERS", "2"))
+
+# Generated session titles (see session_titles.py): after a session's first
+# exchange a background job names it with TITLE_MODEL.
+SESSION_TITLES = os.environ.get("SESSION_TITLES", "true").lower() == "true"
+TITLE_MODEL = os.environ.get("TITLE_MODEL", SUMMARY_MODEL)
+TITLE_MAX_TOKENS = int(os.environ.get("TITLE_MAX_TOKENS", "24"))
+# A title job re-checks the title, so scheduling one while a session holds at
+# most this many unsummarized messages also covers a failed first reply.
+TITLE_WITHIN_MESSAGES = 3
+
+# Roundtable turns fan one message out to several agents; completions run on a
+# shared bounded pool so a burst of roundtables can't spawn unbounded threads.
+ROUNDTABLE_MAX_AGENTS = int(os.environ.get("ROUNDTABLE_MAX_AGENTS", "8"))
+ROUNDTABLE_WORKERS = int(os.environ.get("ROUNDTABLE_WORKERS", "16"))
+
+# Admission control for LLM calls (see admission.py): at most LLM_MAX_IN_FLIGHT
+# completions per worker, up to LLM_QUEUE_MAX more waiting at most
+# LLM_QUEUE_TIMEOUT_SECONDS, and a per-user token bucket. Set
+# LLM_USER_RATE_PER_MINUTE to 0 to turn the per-user limit off.
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "32"))
+LLM_QUEUE_MAX = int(os.environ.get("LLM_QUEUE_MAX", "128"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+LLM_USER_RATE_PER_MINUTE = float(os.environ.get("LLM_USER_RATE_PER_MINUTE", "20"))
+LLM_USER_BURST = int(os.environ.get("LLM_USER_BURST", "10"))
+
+# Model routing (see model_routing.py): OPENROUTER_MODEL first, then the
+# comma-separated LLM_FALLBACK_MODELS (``model`` or ``model@provider``). A
+# route with no first token after LLM_HEDGE_AFTER_SECONDS is hedged to the
+# next one; a call with none after LLM_DEADLINE_SECONDS fails with 504.
+LLM_FALLBACK_MODELS = os.environ.get("LLM_FALLBACK_MODELS", "")
+LLM_HEDGE_AFTER_SECONDS = float(os.environ.get("LLM_HEDGE_AFTER_SECONDS", "4"))
+LLM_DEADLINE_SECONDS = float(os.environ.get("LLM_DEADLINE_SECONDS", "120"))
+
+# Completion cache (see completion_cache.py), opt-in per agent:
+# COMPLETION_CACHE_AGENTS lists the agent ids whose byte-identical prompts
+# reuse a stored reply, or "*" for every agent. COMPLETION_CACHE_PATH adds a
+# SQLite tier shared by workers and kept across restarts.
+COMPLETION_CACHE_AGENTS = {a.strip() for a in os.environ.get("COMPLETION_CACHE_AGENTS", "").split(",") if a.strip()}
+COMPLETION_CACHE_SIZE = int(os.environ.get("COMPLETION_CACHE_SIZE", "1024"))
+COMPLETION_CACHE_TTL_SECONDS = float(os.environ.get("COMPLETION_CACHE_TTL_SECONDS", "86400"))
+COMPLETION_CACHE_PATH = os.environ.get("COMPLETION_CACHE_PATH", "")
+COMPLETION_CACHE_DISK_MAX_ENTRIES = int(os.environ.get("COMPLETION_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# Write-behind persistence (see write_behind.py): with CHAT_WRITE_BEHIND_DIR
+# set, assistant replies and session touches are journaled there and applied
+# in batches of up to CHAT_WRITE_BEHIND_BATCH, at most
+# CHAT_WRITE_BEHIND_INTERVAL_MS after they were queued, off the response path.
+# A batch failing CHAT_WRITE_BEHIND_MAX_ATTEMPTS times is dead-lettered.
+# Reads only wait for writes queued in their own process, so serve.py runs a
+# single worker while write-behind is on.
+CHAT_WRITE_BEHIND_DIR = os.environ.get("CHAT_WRITE_BEHIND_DIR", "")
+CHAT_WRITE_BEHIND_BATCH = int(os.environ.get("CHAT_WRITE_BEHIND_BATCH", "100"))
+CHAT_WRITE_BEHIND_INTERVAL_MS = float(os.environ.get("CHAT_WRITE_BEHIND_INTERVAL_MS", "50"))
+CHAT_WRITE_BEHIND_FSYNC = os.environ.get("CHAT_WRITE_BEHIND_FSYNC", "true").lower() == "true"
+CHAT_WRITE_BEHIND_MAX_ATTEMPTS = int(os.environ.get("CHAT_WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+
+# Concurrent identical reads (session list, transcript pages) by one user share
+# one query, and its result is reused for READ_COALESCE_WINDOW_MS after it
+# finished (see single_flight.py). Writes to a session invalidate it at once
+# in their own worker; other workers may serve a result up to the window old.
+READ_COALESCE_WINDOW_MS = float(os.environ.get("READ_COALESCE_WINDOW_MS", "100"))
+
+MESSAGES_PAGE_DEFAULT_LIMIT = 50
+MESSAGES_PAGE_MAX_LIMIT = 200
+SESSIONS_PAGE_DEFAULT_LIMIT = 50
+SESSIONS_PAGE_MAX_LIMIT = 200
+SEARCH_PAGE_DEFAULT_LIMIT = 20
+SEARCH_PAGE_MAX_LIMIT = 50
+
+# Session archives (archive.py) are read from the database in pages of
+# ARCHIVE_EXPORT_PAGE_ROWS and written back in multi-row inserts of up to
+# ARCHIVE_IMPORT_BATCH_ROWS.
+ARCHIVE_EXPORT_PAGE_ROWS = int(os.environ.get("ARCHIVE_EXPORT_PAGE_ROWS", "500"))
+ARCHIVE_IMPORT_BATCH_ROWS = int(os.environ.get("ARCHIVE_IMPORT_BATCH_ROWS", "500"))
+
+# Live events (see events.py), on unless LIVE_EVENTS=false: each user's last
+# EVENTS_BUFFER_SIZE events are kept for resuming streams, for at most
+# EVENTS_MAX_USERS users. Events don't cross processes, so serve.py runs a
+# single worker while they are on (see single_worker_features).
+# Open streams get a keep-alive comment every EVENTS_HEARTBEAT_SECONDS and are
+# closed after EVENTS_STREAM_MAX_SECONDS, so clients reconnect (resuming from
+# their cursor) with a fresh token check.
+LIVE_EVENTS = os.environ.get("LIVE_EVENTS", "true").lower() == "true"
+EVENTS_BUFFER_SIZE = int(os.environ.get("EVENTS_BUFFER_SIZE", "256"))
+EVENTS_MAX_USERS = int(os.environ.get("EVENTS_MAX_USERS", "10000"))
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_STREAM_MAX_SECONDS = float(os.environ.get("EVENTS_STREAM_MAX_SECONDS", "300"))
+
+AGENT_CATALOG_TTL_SECONDS = float(os.environ.get("AGENT_CATALOG_TTL_SECONDS", "300"))
+
+# /metrics is open unless METRICS_TOKEN is set; then scrapers must send it as a Bearer token.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# LOG_FORMAT=json writes one JSON object per line from a background thread
+# (see structured_logging.py). Below WARNING, only the LOG_SAMPLE_RATES share
+# of requests to each route (``route=rate,...``, ``*`` for the rest) is
+# logged, but a request slower than LOG_SLOW_REQUEST_MS always logs its line.
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_SAMPLE_RATES = parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+LOG_SLOW_REQUEST_MS = float(os.environ.get("LOG_SLOW_REQUEST_MS", "1000"))
+
+
+def single_worker_features(config: Mapping[str, Any]) -> list[str]:
+    """The features enabled in an app's ``config`` that keep state in one
+    process's memory, and so are only correct when every request reaches the
+    same worker."""
+    features = []
+    if config["LIVE_EVENTS"]:
+        features.append("live events (LIVE_EVENTS)")
+    if config["CHAT_WRITE_BEHIND_DIR"]:
+        features.append("write-behind (CHAT_WRITE_BEHIND_DIR)")
+    return features
 
-log.info("SUPABASE_URL  : %s", SUPABASE_URL or "[NOT SET]")
-log.info("SUPABASE_KEY  : %s", ("SET (" + SUPABASE_KEY[:12] + "...)") if SUPABASE_KEY else "[NOT SET]")
-log.info("OPENROUTER_KEY: %s", ("SET (" + OPENROUTER_KEY[:12] + "...)") if OPENROUTER_KEY else "[NOT SET]")
-log.info("MODEL         : %s", OPENROUTER_MODEL)
 
-if SUPABASE_KEY.startswith("sb_publishable_"):
-    log.warning(
-        "SUPABASE_KEY appears to be publishable/anon; backend DB access may fail with 401/403 due to RLS."
-    )
-elif SUPABASE_KEY and not SUPABASE_KEY.startswith("sb_secret_"):
-    log.warning("SUPABASE_KEY has an unexpected format. Expected sb_secret_... for backend use.")
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+def logging_config() -> dict[str, Any]:
+    """dictConfig for the API and the server running it (see serve.py)."""
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "default": {
+                "format": "[%(asctime)s] %(levelname)-8s %(name)s  %(message)s",
+                "datefmt": "%H:%M:%S",
+            },
+        },
+        "filters": {
+            "sampled": {"()": RequestSampler, "rates": LOG_SAMPLE_RATES, "slow_ms": LOG_SLOW_REQUEST_MS},
+        },
+        "handlers": {
+            "stderr": (
+                {"()": json_queue_handler, "filters": ["sampled"]}
+                if LOG_FORMAT == "json"
+                else {"class": "logging.StreamHandler", "formatter": "default", "filters": ["sampled"]}
+            ),
+        },
+        "root": {"level": LOG_LEVEL, "handlers": ["stderr"]},
+        "loggers": {
+            # Quieten noisy third-party loggers
+            "httpx": {"level": "WARNING"},
+            "httpcore": {"level": "WARNING"},
+            "hpack": {"level": "WARNING"},
+            # Requests are logged by the app (_log_request and the chat routes).
+            "uvicorn.access": {"level": "WARNING"},
+        },
+    }
+
+
+def configure_logging() -> None:
+    """Set up logging for a server process; importing the app leaves it alone."""
+    logging.config.dictConfig(logging_config())
+
+
+def _log_config(config: Mapping[str, Any]) -> None:
+    supabase_key, openrouter_key = config["SUPABASE_KEY"], config["OPENROUTER_KEY"]
+    log.info("SUPABASE_URL  : %s", config["SUPABASE_URL"] or "[NOT SET]")
+    log.info("SUPABASE_KEY  : %s", ("SET (" + supabase_key[:12] + "...)") if supabase_key else "[NOT SET]")
+    log.info("OPENROUTER_KEY: %s", ("SET (" + openrouter_key[:12] + "...)") if openrouter_key else "[NOT SET]")
+    log.info("MODEL         : %s  fallbacks=%s", config["OPENROUTER_MODEL"], config["LLM_FALLBACK_MODELS"] or "none")
+    log.info("AUTH          : %s  remote_fallback=%s",
+             "local" if (config["SUPABASE_JWT_SECRET"] or config["SUPABASE_JWKS_URL"]) else "remote",
+             config["AUTH_REMOTE_FALLBACK"])
+
+    if supabase_key.startswith("sb_publishable_"):
+        log.warning(
+            "SUPABASE_KEY appears to be publishable/anon; backend DB access may fail with 401/403 due to RLS."
+        )
+    elif supabase_key and not supabase_key.startswith("sb_secret_"):
+        log.warning("SUPABASE_KEY has an unexpected format. Expected sb_secret_... for backend use.")
+
 
 # ---------------------------------------------------------------------------
-# Flask app
+# Routes
 # ---------------------------------------------------------------------------
-app = Flask(__name__)
-# Allow all origins in development; tighten this for production
-CORS(app)
+# Every route lives on this blueprint; create_app() (at the end of the module)
+# builds the Flask app around it.
+api = Blueprint("boardroom", __name__)
 
 # ---------------------------------------------------------------------------
-# Clients
+# Services
 # ---------------------------------------------------------------------------
-try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Clients are created in each worker process on first use (see
+# process_local.py). The SDKs themselves are imported then too: together they
+# take over a second to import.
+def _create_supabase(config: Mapping[str, Any]) -> "Client":
+    from supabase import create_client
+
+    client = create_client(config["SUPABASE_URL"], config["SUPABASE_KEY"])
     log.info("Supabase client initialised OK")
-except Exception:
-    log.exception("FATAL: failed to initialise Supabase client")
-    raise
+    return client
+
+
+def _create_openai(config: Mapping[str, Any]) -> "OpenAI":
+    from openai import OpenAI
+
+    client = OpenAI(api_key=config["OPENROUTER_KEY"], base_url=config["OPENROUTER_BASE"])
+    log.info("OpenRouter client initialised OK  base_url=%s", config["OPENROUTER_BASE"])
+    return client
+
+
+def _open_completion_cache(config: Mapping[str, Any]) -> CompletionCache:
+    return CompletionCache(
+        max_entries=config["COMPLETION_CACHE_SIZE"],
+        ttl_seconds=config["COMPLETION_CACHE_TTL_SECONDS"],
+        path=config["COMPLETION_CACHE_PATH"] or None,
+        max_disk_entries=config["COMPLETION_CACHE_DISK_MAX_ENTRIES"],
+    )
+
+
+def _open_write_behind(flask_app: Flask) -> WriteBehindQueue:
+    # Each process claims (and replays) its own journal file.
+    config = flask_app.config
+    queue = WriteBehindQueue(
+        Journal(config["CHAT_WRITE_BEHIND_DIR"], fsync=config["CHAT_WRITE_BEHIND_FSYNC"]),
+        _in_app_context(flask_app, _apply_chat_writes),
+        batch_size=config["CHAT_WRITE_BEHIND_BATCH"],
+        flush_interval=config["CHAT_WRITE_BEHIND_INTERVAL_MS"] / 1000,
+        max_attempts=config["CHAT_WRITE_BEHIND_MAX_ATTEMPTS"],
+    )
+    log.info("Write-behind journal: %s", queue.journal.path)
+    return queue
+
+
+def _in_app_context(flask_app: Flask, job: Callable[..., Any]) -> Callable[..., Any]:
+    """``job`` for a thread of the app's own, run in the app's context."""
+
+    def run(*args: Any) -> Any:
+        with flask_app.app_context():
+            return job(*args)
+
+    return run
+
+
+class Services:
+    """What one app's requests share: clients, caches, pools and background
+    jobs, built from its config by ``create_app``.
+
+    Routes and helpers reach them through ``services()``, so two apps (tests
+    with different settings, say) share none of them.
+    """
+
+    def __init__(self, flask_app: Flask):
+        config = flask_app.config
+        self.supabase: "ProcessLocal[Client]" = ProcessLocal(partial(_create_supabase, config), "Supabase client")
+        self.openai_client: "ProcessLocal[OpenAI]" = ProcessLocal(
+            partial(_create_openai, config), "OpenRouter client"
+        )
+        # The async serving mode's pooled clients, opened by its lifespan handler (see asgi.py).
+        self.async_supabase: "AsyncClient | None" = None
+        self.async_openai_client: "AsyncOpenAI | None" = None
+
+        self.llm_router = ModelRouter(
+            parse_routes(config["OPENROUTER_MODEL"], config["LLM_FALLBACK_MODELS"]),
+            hedge_after_seconds=config["LLM_HEDGE_AFTER_SECONDS"],
+            deadline_seconds=config["LLM_DEADLINE_SECONDS"],
+            # Room for every admitted call waiting on its first token, plus a hedge each.
+            max_workers=config["LLM_MAX_IN_FLIGHT"] * 2,
+        )
+        self.llm_admission = AdmissionController(
+            max_in_flight=config["LLM_MAX_IN_FLIGHT"],
+            max_queue=config["LLM_QUEUE_MAX"],
+            max_wait_seconds=config["LLM_QUEUE_TIMEOUT_SECONDS"],
+            user_rate=config["LLM_USER_RATE_PER_MINUTE"] / 60,
+            user_burst=config["LLM_USER_BURST"],
+        )
+        self.completion_cache: ProcessLocal[CompletionCache] = ProcessLocal(
+            # Its SQLite connection, if any, is opened per process.
+            partial(_open_completion_cache, config),
+            "completion cache",
+            close=CompletionCache.close,
+        )
+        self.write_behind: ProcessLocal[WriteBehindQueue] | None = None
+        if config["CHAT_WRITE_BEHIND_DIR"]:
+            self.write_behind = ProcessLocal(
+                partial(_open_write_behind, flask_app), "write-behind queue", close=WriteBehindQueue.close
+            )
+
+        self.agent_registry = AgentRegistry(
+            _in_app_context(flask_app, _load_agents), ttl_seconds=config["AGENT_CATALOG_TTL_SECONDS"]
+        )
+        self.read_flights = SingleFlight(reuse_seconds=config["READ_COALESCE_WINDOW_MS"] / 1000)
+        self.event_hub = EventHub(buffer_size=config["EVENTS_BUFFER_SIZE"], max_users=config["EVENTS_MAX_USERS"])
+        self.token_verifier = LocalTokenVerifier(
+            jwt_secret=config["SUPABASE_JWT_SECRET"], jwks_url=config["SUPABASE_JWKS_URL"]
+        )
+        self.token_cache = TokenCache(max_size=config["AUTH_CACHE_SIZE"], ttl_seconds=config["AUTH_CACHE_TTL_SECONDS"])
+
+        self.roundtable_pool = ThreadPoolExecutor(
+            max_workers=config["ROUNDTABLE_WORKERS"], thread_name_prefix="roundtable"
+        )
+        self.summary_refresher = SummaryRefresher(
+            _in_app_context(flask_app, _refresh_session_summary), max_workers=config["SUMMARY_WORKERS"]
+        )
+        self.title_refresher = SummaryRefresher(
+            _in_app_context(flask_app, _generate_session_title), max_workers=1, name="title"
+        )
+
+    def shutdown(self) -> None:
+        """Wait for queued background jobs and journaled writes, then stop their threads."""
+        self.summary_refresher.shutdown()
+        self.title_refresher.shutdown()
+        self.roundtable_pool.shutdown(wait=True)
+        if self.write_behind is not None:
+            self.write_behind.close()
 
-openai_client = OpenAI(api_key=OPENROUTER_KEY, base_url=OPENROUTER_BASE)
-log.info("OpenRouter client initialised OK  base_url=%s", OPENROUTER_BASE)
+
+def services() -> Services:
+    """The services of the app handling the current request or job."""
+    return current_app.extensions["boardroom"]
+
+
+def _load_agents() -> list[dict[str, Any]]:
+    result = (
+        services().supabase.table("agents")
+        .select("id, name, role_description, color_hex, system_prompt")
+        .execute()
+    )
+    log.debug("Agent catalog loaded  rows=%d", len(result.data))
+    return result.data
 
 
 # ---------------------------------------------------------------------------
@@ -100,18 +445,49 @@ def _normalize_user(raw_user: Any) -> dict[str, str] | None:
     return {"id": str(user_id), "email": str(email or "")}
 
 
+def _verify_token_remotely(token: str) -> dict[str, str] | None:
+    auth_response = services().supabase.auth.get_user(token)
+    raw_user = getattr(auth_response, "user", None)
+    if raw_user is None and isinstance(auth_response, dict):
+        raw_user = auth_response.get("user")
+    return _normalize_user(raw_user)
+
+
+def _verify_token(token: str) -> dict[str, str] | None:
+    token_cache = services().token_cache
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
+    token_verifier = services().token_verifier
+    if token_verifier.enabled:
+        try:
+            user, exp = token_verifier.verify(token)
+            token_cache.put(token, user, token_exp=exp)
+            return user
+        except jwt.InvalidTokenError as exc:
+            log.info("Rejected access token: %s", exc)
+            return None
+        except TokenVerificationUnavailable as exc:
+            if not current_app.config["AUTH_REMOTE_FALLBACK"]:
+                log.warning("Local token verification unavailable: %s", exc)
+                return None
+            log.info("Local token verification unavailable (%s); falling back to remote", exc)
+
+    user = _verify_token_remotely(token)
+    if user:
+        token_cache.put(token, user, token_exp=unverified_expiry(token))
+    return user
+
+
 def _require_user() -> tuple[dict[str, str] | None, tuple[Any, int] | None]:
     token = _token_from_auth_header()
     if not token:
         return None, (jsonify({"error": "Missing Bearer token"}), 401)
 
     try:
-        auth_response = supabase.auth.get_user(token)
-        raw_user = getattr(auth_response, "user", None)
-        if raw_user is None and isinstance(auth_response, dict):
-            raw_user = auth_response.get("user")
-
-        user = _normalize_user(raw_user)
+        with span("auth"):
+            user = _verify_token(token)
         if not user:
             return None, (jsonify({"error": "Invalid auth token"}), 401)
 
@@ -121,22 +497,32 @@ def _require_user() -> tuple[dict[str, str] | None, tuple[Any, int] | None]:
         return None, (jsonify({"error": "Invalid auth token"}), 401)
 
 
+def _reads_changed(user_id: str, session_id: str | None = None) -> None:
+    """Stop coalesced reads from serving the user's session list, or a session's
+    messages, as they were before a write."""
+    read_flights = services().read_flights
+    read_flights.invalidate(("sessions", user_id))
+    if session_id is not None:
+        read_flights.invalidate(("messages", session_id))
+
+
 def _session_owned_by_user(session_id: str, user_id: str) -> bool:
-    result = (
-        supabase.table("sessions")
-        .select("id")
-        .eq("id", session_id)
-        .eq("user_id", user_id)
-        .limit(1)
-        .execute()
-    )
+    with span("db_ownership"):
+        result = (
+            services().supabase.table("sessions")
+            .select("id")
+            .eq("id", session_id)
+            .eq("user_id", user_id)
+            .limit(1)
+            .execute()
+        )
     return bool(result.data)
 
 
 # ---------------------------------------------------------------------------
 # Auth routes
 # ---------------------------------------------------------------------------
-@app.route("/api/auth/signup", methods=["POST"])
+@api.route("/api/auth/signup", methods=["POST"])
 def signup():
     body = request.get_json(force=True)
     email: str = (body.get("email") or "").strip().lower()
@@ -146,7 +532,8 @@ def signup():
         return jsonify({"error": "email and password are required"}), 400
 
     try:
-        result = supabase.auth.sign_up({"email": email, "password": password})
+        with span("auth_provider"):
+            result = services().supabase.auth.sign_up({"email": email, "password": password})
         user = _normalize_user(getattr(result, "user", None))
         session = getattr(result, "session", None)
         access_token = getattr(session, "access_token", None) if session else None
@@ -164,7 +551,7 @@ def signup():
         return jsonify({"error": "Signup failed"}), 400
 
 
-@app.route("/api/auth/login", methods=["POST"])
+@api.route("/api/auth/login", methods=["POST"])
 def login():
     body = request.get_json(force=True)
     email: str = (body.get("email") or "").strip().lower()
@@ -174,7 +561,8 @@ def login():
         return jsonify({"error": "email and password are required"}), 400
 
     try:
-        result = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        with span("auth_provider"):
+            result = services().supabase.auth.sign_in_with_password({"email": email, "password": password})
         user = _normalize_user(getattr(result, "user", None))
         session = getattr(result, "session", None)
         access_token = getattr(session, "access_token", None) if session else None
@@ -188,7 +576,7 @@ def login():
         return jsonify({"error": "Invalid credentials"}), 401
 
 
-@app.route("/api/auth/me", methods=["GET"])
+@api.route("/api/auth/me", methods=["GET"])
 def me():
     user, auth_error = _require_user()
     if auth_error:
@@ -196,68 +584,171 @@ def me():
     return jsonify({"user": user}), 200
 
 # ---------------------------------------------------------------------------
-# Request lifecycle logging
+# Request lifecycle logging and metrics
 # ---------------------------------------------------------------------------
-@app.before_request
+@api.before_app_request
 def _start_timer():
-    g.t0 = time.perf_counter()
+    # Label by route pattern, not path, to keep metric cardinality bounded.
+    g.timer = start_request(request.url_rule.rule if request.url_rule else "unmatched")
 
 
-@app.after_request
+@api.after_app_request
 def _log_request(response):
-    elapsed_ms = (time.perf_counter() - g.t0) * 1000
-    log.info(
-        "%s %s  ->  %d  (%.1f ms)",
-        request.method,
-        request.path,
-        response.status_code,
-        elapsed_ms,
-    )
+    timer = g.timer
+    elapsed_ms = (time.perf_counter() - timer.started) * 1000
+    level = logging.WARNING if response.status_code >= 500 else logging.INFO
+    if log.isEnabledFor(level):
+        log.log(
+            level,
+            "%s %s  ->  %d  (%.1f ms)",
+            request.method,
+            request.path,
+            response.status_code,
+            elapsed_ms,
+            # Fields for JSON logs; duration_ms also lets slow requests past sampling.
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(elapsed_ms, 1),
+            },
+        )
+    # For streamed bodies this covers the stages before the first byte; the
+    # request histogram is observed once the body has been sent.
+    response.headers["Server-Timing"] = timer.server_timing()
+    if response.is_streamed:
+        method, status = request.method, response.status_code
+        response.call_on_close(lambda: timer.finish(method, status))
+    else:
+        timer.finish(request.method, response.status_code)
     return response
 
 
-@app.errorhandler(Exception)
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint."""
+    metrics_token = current_app.config["METRICS_TOKEN"]
+    if metrics_token and not hmac.compare_digest(_token_from_auth_header() or "", metrics_token):
+        return jsonify({"error": "Invalid metrics token"}), 401
+    body, content_type = exposition()
+    return Response(body, content_type=content_type)
+
+
+@api.app_errorhandler(Exception)
 def _handle_unhandled(exc):
-    log.error("Unhandled exception on %s %s\n%s", request.method, request.path, traceback.format_exc())
+    log.error("Unhandled exception on %s %s", request.method, request.path, exc_info=exc)
     return jsonify({"error": "Internal server error", "detail": str(exc)}), 500
 
 
+# ---------------------------------------------------------------------------
+# Keyset pagination
+# ---------------------------------------------------------------------------
+def _encode_cursor(row: dict[str, Any], column: str = "created_at") -> str:
+    raw = json.dumps([row[column], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of _encode_cursor; raises ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if not isinstance(sort_value, str) or not isinstance(row_id, str):
+        raise ValueError("invalid cursor")
+    # Both end up quoted inside a PostgREST filter, so only a timestamp and a
+    # row id get through.
+    datetime.fromisoformat(sort_value)
+    uuid.UUID(row_id)
+    return sort_value, row_id
+
+
+def _keyset_filter(op: str, key: tuple[str, str], column: str = "created_at") -> str:
+    """PostgREST ``or`` filter for rows strictly before (``lt``) or after (``gt``) a cursor key."""
+    sort_value, row_id = key
+    return f'{column}.{op}."{sort_value}",and({column}.eq."{sort_value}",id.{op}."{row_id}")'
+
+
+def _page_limit(default: int = MESSAGES_PAGE_DEFAULT_LIMIT, maximum: int = MESSAGES_PAGE_MAX_LIMIT) -> int:
+    raw = request.args.get("limit", "")
+    if not raw:
+        return default
+    limit = int(raw)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, maximum)
+
+
 # ---------------------------------------------------------------------------
 # Sessions
 # ---------------------------------------------------------------------------
-@app.route("/api/sessions", methods=["GET"])
+SESSION_COLUMNS = ("id", "title", "updated_at", "message_count", "last_message_preview", "last_agent_id")
+
+
+def _session_row(row: dict[str, Any]) -> dict[str, Any]:
+    return {key: row.get(key) for key in SESSION_COLUMNS}
+
+
+@api.route("/api/sessions", methods=["GET"])
 def get_sessions():
+    """Keyset pagination over (updated_at, id), most recently active first.
+
+    Each page carries ``next_before``, the cursor of the page after it, or
+    ``null`` once the oldest session is included. Responses carry an ETag so
+    a client holding an unchanged page revalidates it with a bodyless 304.
+    """
     user, auth_error = _require_user()
     if auth_error:
         return auth_error
 
     try:
-        result = (
-            supabase.table("sessions")
-            .select("id, title, updated_at")
-            .eq("user_id", user["id"])
-            .order("updated_at", desc=True)
-            .execute()
-        )
-        log.debug("GET /api/sessions  rows=%d", len(result.data))
-        return jsonify(result.data), 200
+        limit = _page_limit(SESSIONS_PAGE_DEFAULT_LIMIT, SESSIONS_PAGE_MAX_LIMIT)
+        before = request.args.get("before")
+        before_key = _decode_cursor(before) if before else None
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    def load() -> tuple[list[dict[str, Any]], str | None]:
+        query = services().supabase.table("sessions").select(", ".join(SESSION_COLUMNS)).eq("user_id", user["id"])
+        if before_key:
+            query = query.or_(_keyset_filter("lt", before_key, column="updated_at"))
+        # One extra row tells whether another page exists.
+        rows = query.order("updated_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data
+        page = rows[:limit]
+        return page, _encode_cursor(page[-1], column="updated_at") if len(rows) > limit else None
+
+    try:
+        with span("db_sessions"):
+            rows, next_before = services().read_flights.do(
+                ("sessions", user["id"]), (limit, before), load, resource="sessions"
+            )
+        log.debug("GET /api/sessions  rows=%d  more=%s", len(rows), next_before is not None)
+        response = jsonify({"sessions": rows, "next_before": next_before})
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception:
         log.exception("Error fetching sessions")
         return jsonify({"error": "Failed to fetch sessions"}), 500
 
 
-@app.route("/api/sessions", methods=["POST"])
+@api.route("/api/sessions", methods=["POST"])
 def create_session():
     user, auth_error = _require_user()
     if auth_error:
         return auth_error
 
     try:
-        result = (
-            supabase.table("sessions")
-            .insert({"title": "New Session", "user_id": user["id"]})
-            .execute()
-        )
+        with span("db_create_session"):
+            result = (
+                services().supabase.table("sessions")
+                .insert({"title": DEFAULT_TITLE, "user_id": user["id"]})
+                .execute()
+            )
+        _reads_changed(user["id"])
+        services().event_hub.publish(user["id"], "session_created", {"session": _session_row(result.data[0])})
         log.debug("POST /api/sessions  id=%s", result.data[0].get("id"))
         return jsonify(result.data[0]), 201
     except Exception:
@@ -268,155 +759,1308 @@ def create_session():
 # ---------------------------------------------------------------------------
 # Messages
 # ---------------------------------------------------------------------------
-@app.route("/api/sessions/<session_id>/messages", methods=["GET"])
+MESSAGE_COLUMNS = ("id", "role", "content", "agent_id", "created_at")
+
+
+def _message_row(row: dict[str, Any]) -> dict[str, Any]:
+    return {key: row.get(key) for key in MESSAGE_COLUMNS}
+
+
+@api.route("/api/sessions/<session_id>/messages", methods=["GET"])
 def get_messages(session_id: str):
+    """Keyset pagination over (created_at, id).
+
+    Without a cursor, returns the newest page. ``before`` walks back through
+    older pages; ``after`` returns only rows newer than a cursor the client
+    already holds (delta sync). Pages are always in chronological order and
+    carry ``next_before`` (``null`` once the start of the session is reached)
+    and ``next_after`` (the cursor of the newest row seen so far). Responses
+    carry an ETag so an unchanged page revalidates with a bodyless 304.
+    """
     user, auth_error = _require_user()
     if auth_error:
         return auth_error
 
     try:
+        limit = _page_limit()
+        before = request.args.get("before")
+        after = request.args.get("after")
+        if before and after:
+            raise ValueError("before and after are mutually exclusive")
+        before_key = _decode_cursor(before) if before else None
+        after_key = _decode_cursor(after) if after else None
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    def load() -> tuple[list[dict[str, Any]], str | None] | None:
         if not _session_owned_by_user(session_id=session_id, user_id=user["id"]):
-            return jsonify({"error": "Session not found"}), 404
+            return None
+        _await_session_writes(session_id)
 
-        result = (
-            supabase.table("messages")
-            .select("id, role, content, agent_id, created_at")
+        query = (
+            services().supabase.table("messages")
+            .select(", ".join(MESSAGE_COLUMNS))
             .eq("session_id", session_id)
-            .order("created_at", desc=False)
-            .execute()
         )
-        log.debug("GET messages  session=%s  rows=%d", session_id, len(result.data))
-        return jsonify(result.data), 200
+        if after_key:
+            query = query.or_(_keyset_filter("gt", after_key))
+            with span("db_messages"):
+                rows = (
+                    query.order("created_at", desc=False)
+                    .order("id", desc=False)
+                    .limit(limit)
+                    .execute()
+                ).data
+            return rows, None
+
+        if before_key:
+            query = query.or_(_keyset_filter("lt", before_key))
+        # Fetch one extra row to learn whether an older page exists.
+        with span("db_messages"):
+            result = (
+                query.order("created_at", desc=True)
+                .order("id", desc=True)
+                .limit(limit + 1)
+                .execute()
+            )
+        rows = result.data[:limit]
+        rows.reverse()
+        return rows, _encode_cursor(rows[0]) if len(result.data) > limit else None
+
+    try:
+        page = services().read_flights.do(
+            ("messages", session_id), (user["id"], limit, before, after), load, resource="messages"
+        )
+        if page is None:
+            return jsonify({"error": "Session not found"}), 404
+        rows, next_before = page
+
+        next_after = _encode_cursor(rows[-1]) if rows else after
+        log.debug("GET messages  session=%s  rows=%d  delta=%s", session_id, len(rows), bool(after_key))
+        response = jsonify({"messages": rows, "next_before": next_before, "next_after": next_after})
+        response.add_etag()
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception:
         log.exception("Error fetching messages for session %s", session_id)
         return jsonify({"error": "Failed to fetch messages"}), 500
 
 
 # ---------------------------------------------------------------------------
-# Agents
+# Search
 # ---------------------------------------------------------------------------
-@app.route("/api/agents", methods=["GET"])
-def get_agents():
+SEARCH_RESULT_COLUMNS = ("id", "session_id", "session_title", "agent_id", "role", "created_at")
+
+
+@api.route("/api/search", methods=["GET"])
+def search_messages():
+    """Ranked full-text search over the caller's messages (see search.py).
+
+    ``q`` takes web-search syntax: quoted phrases, ``or`` and ``-word``.
+    Results come best match first, newest first among equals, each with a
+    ``snippet`` of ``{"text", "match"}`` segments. ``offset`` pages through
+    them; each page carries ``next_offset``, or ``null`` on the last one.
+    """
     user, auth_error = _require_user()
     if auth_error:
         return auth_error
 
+    query = request.args.get("q", "").strip()
+    if not query or len(query) > SEARCH_QUERY_MAX_CHARS:
+        return jsonify({"error": f"q must be 1 to {SEARCH_QUERY_MAX_CHARS} characters"}), 400
     try:
-        result = (
-            supabase.table("agents")
-            .select("id, name, role_description, color_hex")
-            .execute()
-        )
-        log.debug("GET /api/agents  rows=%d", len(result.data))
-        return jsonify(result.data), 200
+        limit = _page_limit(SEARCH_PAGE_DEFAULT_LIMIT, SEARCH_PAGE_MAX_LIMIT)
+        offset = int(request.args.get("offset") or 0)
+        if offset < 0:
+            raise ValueError("offset must not be negative")
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    try:
+        with span("db_search"):
+            rows = services().supabase.rpc("search_messages", {
+                "p_user_id": user["id"],
+                "p_query": query,
+                # One extra row tells whether another page exists.
+                "p_limit": limit + 1,
+                "p_offset": offset,
+            }).execute().data or []
+        results = [
+            {**{key: row.get(key) for key in SEARCH_RESULT_COLUMNS}, "snippet": snippet_segments(row["headline"])}
+            for row in rows[:limit]
+        ]
+        log.debug("GET /api/search  results=%d  offset=%d", len(results), offset)
+        return jsonify({"results": results, "next_offset": offset + limit if len(rows) > limit else None}), 200
     except Exception:
-        log.exception("Error fetching agents")
-        return jsonify({"error": "Failed to fetch agents"}), 500
+        log.exception("Error searching messages")
+        return jsonify({"error": "Search failed"}), 500
 
 
 # ---------------------------------------------------------------------------
-# Chat
+# Archives: streaming NDJSON export and import of a user's sessions
 # ---------------------------------------------------------------------------
-@app.route("/api/chat", methods=["POST"])
-def chat():
+NDJSON_HEADERS = {"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+
+
+def _export_archive(user_id: str, session_id: str | None) -> Iterator[str]:
+    """Archive lines for the user's sessions (or one of them), oldest first,
+    read one page at a time."""
+    supabase = services().supabase
+    page_rows = current_app.config["ARCHIVE_EXPORT_PAGE_ROWS"]
+    yield ndjson(archive_header())
+    exported_sessions = exported_messages = 0
+    session_key: tuple[str, str] | None = None
+    while True:
+        query = supabase.table("sessions").select("id, title, created_at, updated_at").eq("user_id", user_id)
+        if session_id:
+            query = query.eq("id", session_id)
+        if session_key:
+            query = query.or_(_keyset_filter("gt", session_key))
+        with span("db_export_sessions"):
+            sessions = query.order("created_at").order("id").limit(page_rows).execute().data
+
+        for session in sessions:
+            yield ndjson(session_record(session))
+            exported_sessions += 1
+            _await_session_writes(session["id"])
+            message_key: tuple[str, str] | None = None
+            while True:
+                query = supabase.table("messages").select("*").eq("session_id", session["id"])
+                if message_key:
+                    query = query.or_(_keyset_filter("gt", message_key))
+                with span("db_export_messages"):
+                    rows = query.order("created_at").order("id").limit(page_rows).execute().data
+                for row in rows:
+                    yield ndjson(message_record(row))
+                exported_messages += len(rows)
+                if len(rows) < page_rows:
+                    break
+                message_key = (rows[-1]["created_at"], rows[-1]["id"])
+
+        if len(sessions) < page_rows:
+            break
+        session_key = (sessions[-1]["created_at"], sessions[-1]["id"])
+
+    log.info("Exported archive  user=%s  sessions=%d  messages=%d", user_id, exported_sessions, exported_messages)
+    yield ndjson({"type": "end", "sessions": exported_sessions, "messages": exported_messages})
+
+
+@api.route("/api/sessions/export", methods=["GET"])
+def export_sessions():
+    """The caller's sessions, or just ``session_id``, as an NDJSON archive.
+
+    The body is streamed as it is read; a failure midway ends it with an
+    ``{"type": "error"}`` line instead of the ``end`` trailer.
+    """
     user, auth_error = _require_user()
     if auth_error:
         return auth_error
 
-    body = request.get_json(force=True)
-    session_id: str = body.get("session_id", "")
-    agent_id: str = body.get("agent_id", "")
-    user_message: str = body.get("message", "")
+    session_id = request.args.get("session_id")
+    try:
+        if session_id and not _session_owned_by_user(session_id=session_id, user_id=user["id"]):
+            return jsonify({"error": "Session not found"}), 404
+    except Exception:
+        log.exception("Error checking session %s for export", session_id)
+        return jsonify({"error": "Export failed"}), 500
+
+    def generate() -> Iterator[str]:
+        try:
+            yield from _export_archive(user["id"], session_id)
+        except Exception:
+            log.exception("Error while exporting sessions  user=%s", user["id"])
+            yield ndjson({"type": "error", "error": "Export failed"})
+
+    filename = f"boardroom-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={**NDJSON_HEADERS, "Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
-    if not session_id or not agent_id or not user_message.strip():
-        return jsonify({"error": "session_id, agent_id, and message are required"}), 400
 
-    log.info("CHAT  session=%s  agent=%s  msg_len=%d", session_id, agent_id, len(user_message))
+class _ArchiveImport:
+    """Buffers archive records into multi-row inserts under fresh ids, so an
+    archive can be imported next to (or back into) the sessions it came from."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.session_ids: dict[str, str] = {}
+        self.sessions: list[dict[str, Any]] = []
+        self.messages: list[dict[str, Any]] = []
+        self.imported_sessions = 0
+        self.imported_messages = 0
+        self._known_agents: dict[str, bool] = {}
+
+    def _agent_id(self, agent_id: str | None) -> str | None:
+        # Replies by agents this database doesn't have keep their content.
+        if agent_id is None:
+            return None
+        if agent_id not in self._known_agents:
+            self._known_agents[agent_id] = services().agent_registry.get(agent_id) is not None
+        return agent_id if self._known_agents[agent_id] else None
+
+    def add(self, record: dict[str, Any]) -> None:
+        if record["type"] == "session":
+            session_id = self.session_ids[record["id"]] = str(uuid.uuid4())
+            self.sessions.append({
+                "id": session_id,
+                "user_id": self.user_id,
+                "title": (record.get("title") or DEFAULT_TITLE)[:255],
+                "created_at": record["created_at"],
+                "updated_at": record.get("updated_at") or record["created_at"],
+            })
+        else:
+            self.messages.append({
+                "id": str(uuid.uuid4()),
+                "session_id": self.session_ids[record["session_id"]],
+                "agent_id": self._agent_id(record.get("agent_id")),
+                "role": record["role"],
+                "content": record["content"],
+                "created_at": record["created_at"],
+            })
+
+    @property
+    def full(self) -> bool:
+        return len(self.sessions) + len(self.messages) >= current_app.config["ARCHIVE_IMPORT_BATCH_ROWS"]
+
+    def flush(self) -> None:
+        # Sessions first: the buffered messages may belong to them.
+        if self.sessions:
+            with span("db_import_sessions"):
+                services().supabase.table("sessions").insert(self.sessions).execute()
+            self.imported_sessions += len(self.sessions)
+            self.sessions = []
+            _reads_changed(self.user_id)
+            services().event_hub.publish(self.user_id, "sessions_changed", {})
+        if self.messages:
+            with span("db_import_messages"):
+                services().supabase.table("messages").insert(self.messages).execute()
+            self.imported_messages += len(self.messages)
+            self.messages = []
+
+    def progress(self, kind: str, **extra: Any) -> str:
+        return ndjson({"type": kind, "sessions": self.imported_sessions, "messages": self.imported_messages, **extra})
+
+
+@api.route("/api/sessions/import", methods=["POST"])
+def import_sessions():
+    """Import an NDJSON archive (as written by /api/sessions/export) into new
+    sessions of the caller.
+
+    The request body is read a line at a time and written in batches. The
+    response streams NDJSON as it goes: ``progress`` after each batch, then
+    ``done``, or ``error`` (with the offending ``line``, if any) once a bad
+    line or a failed insert stops the import. Batches written before an
+    error stay imported.
+    """
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+
+    def generate() -> Iterator[str]:
+        archive = _ArchiveImport(user["id"])
+        try:
+            try:
+                for _, record in read_records(request.stream):
+                    archive.add(record)
+                    if archive.full:
+                        archive.flush()
+                        yield archive.progress("progress")
+            except ArchiveError as exc:
+                # Everything before the bad line is imported.
+                archive.flush()
+                yield archive.progress("error", error=exc.message, line=exc.line)
+                return
+            archive.flush()
+            log.info("Imported archive  user=%s  sessions=%d  messages=%d",
+                     user["id"], archive.imported_sessions, archive.imported_messages)
+            yield archive.progress("done")
+        except Exception:
+            log.exception("Error while importing sessions  user=%s", user["id"])
+            yield archive.progress("error", error="Import failed")
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers=NDJSON_HEADERS)
+
+
+# ---------------------------------------------------------------------------
+# Live events
+# ---------------------------------------------------------------------------
+EVENTS_KEEP_ALIVE = ": keep-alive\n\n"
 
-    try:
-        if not _session_owned_by_user(session_id=session_id, user_id=user["id"]):
-            return jsonify({"error": "Session not found"}), 404
 
-        # 1. Persist user message
-        supabase.table("messages").insert({
+def _publish_messages(user_id: str, session_id: str, rows: list[dict[str, Any]]) -> None:
+    event_hub = services().event_hub
+    for row in rows:
+        message = _message_row(row)
+        event_hub.publish(user_id, "message_inserted", {
             "session_id": session_id,
-            "agent_id": None,
-            "role": "user",
-            "content": user_message,
-        }).execute()
-        log.debug("User message persisted")
+            "message": message,
+            "next_after": _encode_cursor(message),
+        })
+
+
+def _event_frames(user_id: str, cursor: str | None) -> tuple[str, str]:
+    """SSE frames of the user's events after ``cursor``, and the cursor after
+    them. A cursor that can't be resumed gets a ``sync`` event instead."""
+    event_hub = services().event_hub
+    events = event_hub.since(user_id, cursor)
+    if events is None:
+        EVENT_SYNCS.inc()
+        current = event_hub.cursor()
+        return _sse("sync", {}, event_id=current), current
+    if not events:
+        return "", cursor
+    return "".join(_sse(event.kind, event.data, event_id=event.id) for event in events), events[-1].id
+
+
+def _event_stream_cursor(headers: Any, args: Any) -> str | None:
+    return headers.get("Last-Event-ID") or args.get("after")
+
+
+@api.route("/api/events", methods=["GET"])
+def stream_events():
+    """The caller's change events as Server-Sent Events (see events.py).
+
+    Resume with the last event id seen, as ``Last-Event-ID`` or ``?after=``.
+    The first frame is either the events missed since then or ``sync``,
+    which means "catch up with delta reads". Each frame carries its cursor as
+    the SSE ``id``. The stream ends after ``EVENTS_STREAM_MAX_SECONDS``.
+    """
+    config = current_app.config
+    if not config["LIVE_EVENTS"]:
+        return jsonify({"error": "Live events are off"}), 404
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+    cursor = _event_stream_cursor(request.headers, request.args)
+    heartbeat_seconds = config["EVENTS_HEARTBEAT_SECONDS"]
+
+    def generate() -> Iterator[str]:
+        wake = threading.Event()
+        unsubscribe = services().event_hub.subscribe(user["id"], wake.set)
+        EVENT_STREAMS.inc()
+        position = cursor
+        deadline = time.monotonic() + config["EVENTS_STREAM_MAX_SECONDS"]
+        try:
+            while True:
+                wake.clear()
+                frames, position = _event_frames(user["id"], position)
+                if frames:
+                    yield frames
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if not wake.wait(min(heartbeat_seconds, remaining)):
+                    yield EVENTS_KEEP_ALIVE
+        finally:
+            unsubscribe()
+            EVENT_STREAMS.dec()
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+# ---------------------------------------------------------------------------
+# Agents
+# ---------------------------------------------------------------------------
+@api.route("/api/agents", methods=["GET"])
+def get_agents():
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+
+    try:
+        with span("agents"):
+            catalog = services().agent_registry.catalog()
+        log.debug("GET /api/agents  rows=%d  version=%d", len(catalog.public), catalog.version)
+        response = jsonify(list(catalog.public))
+        response.set_etag(catalog.etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    except Exception:
+        log.exception("Error fetching agents")
+        return jsonify({"error": "Failed to fetch agents"}), 500
+
 
-        # 2. Fetch agent system prompt
-        agent_result = (
-            supabase.table("agents")
-            .select("system_prompt, name")
-            .eq("id", agent_id)
+# ---------------------------------------------------------------------------
+# Session summaries
+# ---------------------------------------------------------------------------
+# Token usage of summary refreshes is counted under this pseudo-agent.
+SUMMARY_USAGE_AGENT = "session_summary"
+
+
+def _load_session_summary(session_id: str) -> SessionSummary | None:
+    with span("db_summary"):
+        result = (
+            services().supabase.table("session_summaries")
+            .select("summary, covered_until, covered_message_id")
+            .eq("session_id", session_id)
             .limit(1)
             .execute()
         )
-        if not agent_result.data:
-            log.warning("Agent not found: %s", agent_id)
-            return jsonify({"error": "Agent not found"}), 404
+    return SessionSummary.from_row(result.data[0] if result.data else None)
+
+
+def _refresh_session_summary(session_id: str) -> None:
+    """Fold unsummarized messages, except the newest SUMMARY_KEEP_RECENT, into the summary."""
+    config, supabase = current_app.config, services().supabase
+    _await_session_writes(session_id)
+    current = _load_session_summary(session_id)
+    query = supabase.table("messages").select(", ".join(MESSAGE_COLUMNS)).eq("session_id", session_id)
+    if current:
+        query = query.or_(_keyset_filter("gt", current.cursor))
+    with span("db_summary_batch"):
+        rows = query.order("created_at").order("id").limit(config["SUMMARY_BATCH_LIMIT"]).execute().data
+
+    to_fold = rows[: max(len(rows) - config["SUMMARY_KEEP_RECENT"], 0)]
+    if not to_fold:
+        return
+
+    model = config["SUMMARY_MODEL"]
+    speakers = {agent_id: agent.name for agent_id, agent in services().agent_registry.catalog().agents.items()}
+    with span("summary_llm"):
+        completion = services().openai_client.chat.completions.create(
+            model=model,
+            messages=summary_prompt(
+                current.summary if current else "",
+                to_fold,
+                speakers,
+                counter=token_counter(model),
+                max_message_tokens=config["CONTEXT_MESSAGE_MAX_TOKENS"],
+            ),
+            max_tokens=config["SUMMARY_MAX_TOKENS"],
+        )
+    record_llm_usage(SUMMARY_USAGE_AGENT, model, completion.usage)
+    summary = (completion.choices[0].message.content or "").strip()
+    if not summary:
+        log.warning("Empty session summary returned  session=%s", session_id)
+        return
+
+    # Last write wins if two workers race on one session; either result covers
+    # a prefix of the session, so the cursor stays consistent with its text.
+    last = to_fold[-1]
+    with span("db_summary_save"):
+        supabase.table("session_summaries").upsert({
+            "session_id": session_id,
+            "summary": summary,
+            "covered_until": last["created_at"],
+            "covered_message_id": last["id"],
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }, on_conflict="session_id").execute()
+    log.info("Session summary refreshed  session=%s  folded=%d  tokens=%s",
+             session_id, len(to_fold), getattr(completion.usage, "total_tokens", "?"))
 
-        agent_name: str = agent_result.data[0]["name"]
-        system_prompt: str = agent_result.data[0]["system_prompt"]
-        log.debug("Using agent: %s", agent_name)
 
-        # 3. Fetch last 8 messages for context
-        history_result = (
+
+# ---------------------------------------------------------------------------
+# Session titles
+# ---------------------------------------------------------------------------
+TITLE_USAGE_AGENT = "session_title"
+
+
+def _generate_session_title(session_id: str) -> None:
+    """Name a session still called DEFAULT_TITLE after its opening messages."""
+    config, supabase = current_app.config, services().supabase
+    _await_session_writes(session_id)
+    with span("db_title"):
+        session = supabase.table("sessions").select("title, user_id").eq("id", session_id).limit(1).execute().data
+        if not session or session[0]["title"] != DEFAULT_TITLE:
+            return
+        opening = (
             supabase.table("messages")
-            .select("role, content")
+            .select(", ".join(MESSAGE_COLUMNS))
             .eq("session_id", session_id)
-            .order("created_at", desc=True)
-            .limit(8)
+            .order("created_at")
+            .order("id")
+            .limit(TITLE_WITHIN_MESSAGES + 1)
             .execute()
+        ).data
+    if not any(msg["role"] == "assistant" for msg in opening):
+        return
+
+    model = config["TITLE_MODEL"]
+    speakers = {agent_id: agent.name for agent_id, agent in services().agent_registry.catalog().agents.items()}
+    with span("title_llm"):
+        completion = services().openai_client.chat.completions.create(
+            model=model,
+            messages=title_prompt(
+                opening, speakers, counter=token_counter(model), max_message_tokens=config["CONTEXT_MESSAGE_MAX_TOKENS"]
+            ),
+            max_tokens=config["TITLE_MAX_TOKENS"],
         )
-        history = list(reversed(history_result.data))
-        log.debug("Context window: %d messages", len(history))
-
-        # 4. Build LLM messages
-        llm_messages = [{"role": "system", "content": system_prompt}]
-        for msg in history:
-            llm_messages.append({"role": msg["role"], "content": msg["content"]})
-
-        # 5. Call OpenRouter
-        log.info("Calling OpenRouter  model=%s  messages=%d", OPENROUTER_MODEL, len(llm_messages))
-        completion = openai_client.chat.completions.create(
-            model=OPENROUTER_MODEL,
-            messages=llm_messages,
+    record_llm_usage(TITLE_USAGE_AGENT, model, completion.usage)
+    title = clean_title(completion.choices[0].message.content or "")
+    if not title:
+        log.warning("Empty session title returned  session=%s", session_id)
+        return
+
+    # Only replace the default, in case the session was renamed meanwhile.
+    with span("db_title_save"):
+        supabase.table("sessions").update({"title": title}).eq("id", session_id).eq("title", DEFAULT_TITLE).execute()
+    _reads_changed(session[0]["user_id"])
+    services().event_hub.publish(
+        session[0]["user_id"], "session_updated", {"session": {"id": session_id, "title": title}}
+    )
+    log.info("Session titled  session=%s  title=%r", session_id, title)
+
+
+
+# ---------------------------------------------------------------------------
+# Chat
+#
+# The pipeline below is shared with the async serving mode in asgi.py, so it
+# signals failures with ChatError rather than Flask responses.
+# ---------------------------------------------------------------------------
+class ChatError(Exception):
+    def __init__(self, status: int, message: str, headers: dict[str, str] | None = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class ChatTurn:
+    agent: Agent
+    user_message: dict[str, Any]
+    context: ContextWindow
+    # Messages after the session summary's cursor (capped at CHAT_HISTORY_LIMIT).
+    unsummarized: int = 0
+
+    @property
+    def llm_messages(self) -> list[dict[str, str]]:
+        return self.context.messages
+
+
+def _admission_error(exc: AdmissionRejected) -> ChatError:
+    log.warning("LLM call rejected  reason=%s  retry_after=%.1fs", exc.reason, exc.retry_after)
+    return ChatError(429, "Too many requests; please retry shortly", {"Retry-After": exc.retry_after_header})
+
+
+def _admit_llm_call(user: dict[str, str], cost: int = 1) -> Ticket:
+    """Wait for ``cost`` LLM slots; the caller releases the ticket when done."""
+    try:
+        ticket = services().llm_admission.admit(user["id"], cost)
+    except AdmissionRejected as exc:
+        raise _admission_error(exc) from exc
+    record_stage("llm_queue", ticket.waited)
+    return ticket
+
+
+def _deadline_error(exc: DeadlineExceeded) -> ChatError:
+    log.warning("LLM call timed out: %s", exc)
+    return ChatError(504, "The model did not respond in time")
+
+
+def _llm_request(turn: ChatTurn) -> dict[str, Any]:
+    log.info("Calling OpenRouter  routes=%s  messages=%d", services().llm_router.describe(), len(turn.llm_messages))
+    return {"messages": turn.llm_messages, "stream_options": {"include_usage": True}}
+
+
+def _completion_cache_key(turn: ChatTurn) -> str | None:
+    """Cache key for the turn's LLM input, or None if its agent doesn't opt in."""
+    agents = current_app.config["COMPLETION_CACHE_AGENTS"]
+    if "*" not in agents and turn.agent.id not in agents:
+        return None
+    return completion_key(services().llm_router.primary.label, turn.llm_messages)
+
+
+def _open_llm_stream(turn: ChatTurn, ticket: Ticket) -> RoutedStream | CachedStream | CachingStream:
+    """Stream the turn's completion: a cached reply, or the first model route to answer.
+
+    A cached reply refunds the turn's share of ``ticket``, as it never calls the model.
+    """
+    # Resolved here: the proxy's own ``get`` would shadow the cache's.
+    completion_cache = services().completion_cache.get()
+    cache_key = _completion_cache_key(turn)
+    if cache_key is not None:
+        with span("completion_cache"):
+            cached = completion_cache.get(cache_key)
+        if cached is not None:
+            log.info("Completion cache hit  agent=%s  len=%d", turn.agent.id, len(cached.content))
+            ticket.refund()
+            return CachedStream(cached)
+    try:
+        stream = services().llm_router.open_stream(services().openai_client, **_llm_request(turn))
+    except DeadlineExceeded as exc:
+        raise _deadline_error(exc) from exc
+    if cache_key is None:
+        return stream
+    return CachingStream(stream, lambda completion: completion_cache.put(cache_key, completion))
+
+
+def _chat_request_fields(body: dict[str, Any]) -> tuple[str, str, str]:
+    session_id: str = body.get("session_id", "")
+    agent_id: str = body.get("agent_id", "")
+    user_message: str = body.get("message", "")
+    if not session_id or not agent_id or not user_message.strip():
+        raise ChatError(400, "session_id, agent_id, and message are required")
+    return session_id, agent_id, user_message
+
+
+def _resolve_agent(agent_id: str) -> Agent:
+    with span("agent"):
+        agent = services().agent_registry.get(agent_id)
+    if agent is None:
+        log.warning("Agent not found: %s", agent_id)
+        raise ChatError(404, "Agent not found")
+    log.debug("Using agent: %s", agent.name)
+    return agent
+
+
+def _build_chat_turn(
+    agent: Agent,
+    saved_user_message: dict[str, Any],
+    history: list[dict[str, str]],
+    summary: SessionSummary | None = None,
+) -> ChatTurn:
+    config = current_app.config
+    with span("context"):
+        context = build_context(
+            agent.system_prompt,
+            history,
+            counter=token_counter(config["OPENROUTER_MODEL"]),
+            budget=config["CONTEXT_TOKEN_BUDGET"],
+            max_message_tokens=config["CONTEXT_MESSAGE_MAX_TOKENS"],
+            summary=summary.summary if summary else None,
         )
-        assistant_content: str = completion.choices[0].message.content
-        log.info("OpenRouter response  tokens=%s  len=%d",
-                 getattr(completion.usage, "total_tokens", "?"), len(assistant_content))
+    log.info("Context window: %d/%d messages  tokens=%d/%d  truncated=%d  summary=%s",
+             context.history_messages, len(history), context.tokens, context.budget,
+             context.truncated_messages, context.summarized)
+    return ChatTurn(
+        agent=agent,
+        user_message=_message_row(saved_user_message),
+        context=context,
+        unsummarized=len(history),
+    )
 
-        # 6. Persist assistant message
+
+def _begin_turn_rpc_params(user: dict[str, str], session_id: str, user_message: str) -> dict[str, Any]:
+    return {
+        "p_user_id": user["id"],
+        "p_session_id": session_id,
+        "p_content": user_message,
+        "p_history_limit": current_app.config["CHAT_HISTORY_LIMIT"],
+        "p_with_summary": current_app.config["SESSION_SUMMARIES"],
+    }
+
+
+def _parse_begin_turn_rpc(
+    turn: dict[str, Any] | None,
+) -> tuple[dict[str, Any], list[dict[str, str]], SessionSummary | None]:
+    turn = turn or {}
+    status = turn.get("status")
+    if status == "session_not_found":
+        raise ChatError(404, "Session not found")
+    if status != "ok":
+        raise RuntimeError(f"chat_begin_turn returned unexpected status: {status!r}")
+
+    log.debug("User message persisted  id=%s", turn["user_message"].get("id"))
+    return turn["user_message"], turn["history"], SessionSummary.from_row(turn.get("summary"))
+
+
+def _finish_turn_rpc_params(
+    user: dict[str, str], session_id: str, agent_id: str, assistant_content: str
+) -> dict[str, Any]:
+    return {
+        "p_user_id": user["id"],
+        "p_session_id": session_id,
+        "p_agent_id": agent_id,
+        "p_content": assistant_content,
+    }
+
+
+def _begin_chat_turn(user: dict[str, str], session_id: str, agent_id: str, user_message: str) -> ChatTurn:
+    """Persist the user turn and build the LLM message list for it."""
+    agent = _resolve_agent(agent_id)
+    return _build_chat_turn(agent, *_persist_user_turn(user, session_id, user_message))
+
+
+def _persist_user_turn(
+    user: dict[str, str], session_id: str, user_message: str
+) -> tuple[dict[str, Any], list[dict[str, str]], SessionSummary | None]:
+    """Insert the user message; return it with the session's summary and recent history."""
+    _await_session_writes(session_id)
+    try:
+        if current_app.config["CHAT_USE_RPC"]:
+            with span("db_begin_turn"):
+                result = services().supabase.rpc(
+                    "chat_begin_turn", _begin_turn_rpc_params(user, session_id, user_message)
+                ).execute()
+            persisted = _parse_begin_turn_rpc(result.data)
+        else:
+            persisted = _begin_chat_turn_tables(user, session_id, user_message)
+    finally:
+        _reads_changed(user["id"], session_id)
+    _publish_messages(user["id"], session_id, [persisted[0]])
+    return persisted
+
+
+def _begin_chat_turn_tables(
+    user: dict[str, str], session_id: str, user_message: str
+) -> tuple[dict[str, Any], list[dict[str, str]], SessionSummary | None]:
+    if not _session_owned_by_user(session_id=session_id, user_id=user["id"]):
+        raise ChatError(404, "Session not found")
+    config, supabase = current_app.config, services().supabase
+
+    # 1. Persist user message
+    with span("db_insert_user"):
         insert_result = supabase.table("messages").insert({
+            "session_id": session_id,
+            "agent_id": None,
+            "role": "user",
+            "content": user_message,
+        }).execute()
+    log.debug("User message persisted  id=%s", insert_result.data[0].get("id"))
+
+    # 2. Fetch the session summary and the last messages it doesn't cover
+    summary = _load_session_summary(session_id) if config["SESSION_SUMMARIES"] else None
+    history_query = supabase.table("messages").select("role, content").eq("session_id", session_id)
+    if summary:
+        history_query = history_query.or_(_keyset_filter("gt", summary.cursor))
+    with span("db_history"):
+        history_result = (
+            history_query.order("created_at", desc=True)
+            .order("id", desc=True)
+            .limit(config["CHAT_HISTORY_LIMIT"])
+            .execute()
+        )
+    return insert_result.data[0], list(reversed(history_result.data)), summary
+
+
+def _finish_chat_turn(
+    user: dict[str, str], session_id: str, agent_id: str, assistant_content: str, not_before: str | None = None
+) -> dict[str, Any]:
+    """Persist the assistant reply and bump the session's updated_at.
+
+    ``not_before`` is the user message's created_at; write-behind rows are
+    timestamped here, so they are kept after it whatever the clock skew.
+    """
+    with span("db_finish_turn"):
+        try:
+            if services().write_behind is not None:
+                saved_message = _journal_replies(user, session_id, [(agent_id, assistant_content)], not_before)[0]
+            elif current_app.config["CHAT_USE_RPC"]:
+                saved_message = services().supabase.rpc(
+                    "chat_finish_turn", _finish_turn_rpc_params(user, session_id, agent_id, assistant_content)
+                ).execute().data
+                log.debug("Assistant message persisted  id=%s", saved_message.get("id"))
+            else:
+                saved_message = _finish_chat_turn_tables(user, session_id, agent_id, assistant_content)
+        finally:
+            _reads_changed(user["id"], session_id)
+    _publish_messages(user["id"], session_id, [saved_message])
+    return saved_message
+
+
+def _finish_chat_turn_tables(
+    user: dict[str, str], session_id: str, agent_id: str, assistant_content: str
+) -> dict[str, Any]:
+    supabase = services().supabase
+    insert_result = supabase.table("messages").insert({
+        "session_id": session_id,
+        "agent_id": agent_id,
+        "role": "assistant",
+        "content": assistant_content,
+    }).execute()
+    log.debug("Assistant message persisted  id=%s", insert_result.data[0].get("id"))
+
+    now_utc = datetime.now(timezone.utc).isoformat()
+    supabase.table("sessions").update({"updated_at": now_utc}).eq("id", session_id).eq("user_id", user["id"]).execute()
+    return insert_result.data[0]
+
+
+def _journal_replies(
+    user: dict[str, str], session_id: str, replies: list[tuple[str, str]], not_before: str | None = None
+) -> list[dict[str, Any]]:
+    """Journal assistant replies for write-behind; returns the rows they will be stored as."""
+    now = datetime.now(timezone.utc)
+    if not_before:
+        now = max(now, datetime.fromisoformat(not_before) + timedelta(microseconds=1))
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
             "session_id": session_id,
             "agent_id": agent_id,
             "role": "assistant",
-            "content": assistant_content,
+            "content": content,
+            "created_at": (now + timedelta(microseconds=index)).isoformat(),
+        }
+        for index, (agent_id, content) in enumerate(replies)
+    ]
+    services().write_behind.submit({
+        "session_id": session_id,
+        "user_id": user["id"],
+        "messages": rows,
+        "updated_at": rows[-1]["created_at"],
+    })
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Assistant replies journaled  ids=%s", [row["id"] for row in rows])
+    return rows
+
+
+def _apply_chat_writes(writes: list[dict[str, Any]]) -> None:
+    """Apply a batch of journaled writes: one bulk insert, then the session touches.
+
+    Rows carry their ids, so a replayed batch inserts nothing twice.
+    """
+    messages = [row for write in writes for row in write["messages"]]
+    touches: dict[tuple[str, str], str] = {}
+    for write in writes:
+        key = (write["session_id"], write["user_id"])
+        touches[key] = max(touches.get(key, ""), write["updated_at"])
+
+    supabase = services().supabase
+    if current_app.config["CHAT_USE_RPC"]:
+        supabase.rpc("chat_apply_writes", {
+            "p_messages": messages,
+            "p_sessions": [
+                {"id": session_id, "user_id": user_id, "updated_at": updated_at}
+                for (session_id, user_id), updated_at in touches.items()
+            ],
         }).execute()
-        log.debug("Assistant message persisted  id=%s", insert_result.data[0].get("id"))
+    else:
+        supabase.table("messages").upsert(messages, on_conflict="id", ignore_duplicates=True).execute()
+        for (session_id, user_id), updated_at in touches.items():
+            supabase.table("sessions").update({"updated_at": updated_at}).eq("id", session_id).eq(
+                "user_id", user_id
+            ).execute()
+    for session_id, user_id in touches:
+        _reads_changed(user_id, session_id)
+    log.debug("Write-behind batch applied  writes=%d  messages=%d", len(writes), len(messages))
+
+
+def _await_session_writes(session_id: str) -> None:
+    """Let the session's journaled writes land before reading its messages."""
+    write_behind = services().write_behind
+    if write_behind is not None:
+        write_behind.barrier(session_id)
+
+
+def _after_chat_turn(session_id: str, turn: ChatTurn, replies: int = 1) -> None:
+    """Queue a title for a new session, and a summary refresh once enough
+    unsummarized history has built up."""
+    config = current_app.config
+    if config["SESSION_TITLES"] and turn.unsummarized <= TITLE_WITHIN_MESSAGES and not turn.context.summarized:
+        if services().title_refresher.schedule(session_id):
+            log.debug("Session title queued  session=%s", session_id)
+    # Count the assistant replies persisted after the history was read.
+    if config["SESSION_SUMMARIES"] and needs_refresh(
+        turn.unsummarized + replies, config["SUMMARY_KEEP_RECENT"], config["SUMMARY_REFRESH_EVERY"]
+    ):
+        if services().summary_refresher.schedule(session_id):
+            log.debug("Session summary refresh queued  session=%s", session_id)
+
+
+def _chat_result(turn: ChatTurn, saved_message: dict[str, Any], routing: dict[str, Any]) -> dict[str, Any]:
+    """Persisted rows for both sides of the turn, so clients can reconcile
+    optimistic messages without refetching the transcript."""
+    assistant_row = _message_row(saved_message)
+    return {
+        "message": assistant_row,
+        "user_message": turn.user_message,
+        "next_after": _encode_cursor(assistant_row),
+        "context": turn.context.metadata(),
+        "routing": routing,
+    }
+
+
+def _stream_chunk_text(chunk: Any) -> str | None:
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
 
-        # 7. Touch session updated_at
-        now_utc = datetime.now(timezone.utc).isoformat()
-        supabase.table("sessions").update({"updated_at": now_utc}).eq("id", session_id).eq("user_id", user["id"]).execute()
+def _sse(event: str, data: dict[str, Any], event_id: str | None = None) -> str:
+    prefix = f"id: {event_id}\n" if event_id else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
 
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+@api.route("/api/chat", methods=["POST"])
+def chat():
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_id, user_message = _chat_request_fields(request.get_json(force=True))
+        log.info("CHAT  session=%s  agent=%s  msg_len=%d", session_id, agent_id, len(user_message))
+
+        # Admit before persisting anything, so a 429 leaves no unanswered turn behind.
+        with _admit_llm_call(user) as ticket:
+            turn = _begin_chat_turn(user, session_id, agent_id, user_message)
+
+            # Call OpenRouter; streamed even here, so a slow route can be hedged on its first token
+            with span("llm"), _open_llm_stream(turn, ticket) as stream:
+                parts: list[str] = []
+                usage = None
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None) or usage
+                    parts.append(_stream_chunk_text(chunk) or "")
+        assistant_content = "".join(parts)
+        log.info("OpenRouter response  model=%s  tokens=%s  len=%d",
+                 stream.route.label, getattr(usage, "total_tokens", "?"), len(assistant_content))
+        record_llm_usage(agent_id, stream.route.model, usage)
+
+        # Persist assistant message and touch session
+        saved_message = _finish_chat_turn(
+            user, session_id, agent_id, assistant_content, not_before=turn.user_message.get("created_at")
+        )
+        _after_chat_turn(session_id, turn)
+
+    except ChatError as exc:
+        return jsonify({"error": exc.message}), exc.status, exc.headers
     except Exception:
         log.exception("Error in /api/chat")
         return jsonify({"error": "Chat request failed"}), 500
 
-    saved_message = insert_result.data[0]
-    return jsonify({
-        "message": {
-            "id": saved_message["id"],
-            "role": "assistant",
-            "content": assistant_content,
+    return jsonify(_chat_result(turn, saved_message, stream.metadata())), 200
+
+
+@api.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """Same contract as /api/chat, but forwards model deltas as Server-Sent Events.
+
+    Events: ``delta`` ({"content"}) per model chunk, then ``done`` (the same
+    body /api/chat returns) once the assembled reply is persisted, or
+    ``error`` ({"error"}) if the stream fails midway. Failures before the
+    first byte keep their usual JSON status codes.
+    """
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_id, user_message = _chat_request_fields(request.get_json(force=True))
+        log.info("CHAT STREAM  session=%s  agent=%s  msg_len=%d", session_id, agent_id, len(user_message))
+
+        # The slot is held until the model stream ends; see generate().
+        ticket = _admit_llm_call(user)
+        try:
+            turn = _begin_chat_turn(user, session_id, agent_id, user_message)
+
+            llm_started = time.perf_counter()
+            stream = _open_llm_stream(turn, ticket)
+        except BaseException:
+            ticket.release()
+            raise
+    except ChatError as exc:
+        return jsonify({"error": exc.message}), exc.status, exc.headers
+    except Exception:
+        log.exception("Error in /api/chat/stream")
+        return jsonify({"error": "Chat request failed"}), 500
+
+    def generate():
+        parts: list[str] = []
+        usage = None
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                delta = _stream_chunk_text(chunk)
+                if delta:
+                    if not parts:
+                        record_stage("llm_ttft", time.perf_counter() - llm_started)
+                    parts.append(delta)
+                    yield _sse("delta", {"content": delta})
+
+            ticket.release()
+            record_stage("llm", time.perf_counter() - llm_started)
+            assistant_content = "".join(parts)
+            log.info("OpenRouter stream finished  model=%s  tokens=%s  len=%d",
+                     stream.route.label, getattr(usage, "total_tokens", "?"), len(assistant_content))
+            record_llm_usage(agent_id, stream.route.model, usage)
+            saved_message = _finish_chat_turn(
+                user, session_id, agent_id, assistant_content, not_before=turn.user_message.get("created_at")
+            )
+            _after_chat_turn(session_id, turn)
+            yield _sse("done", _chat_result(turn, saved_message, stream.metadata()))
+        except GeneratorExit:
+            # Client went away; stop pulling tokens and don't persist a partial reply.
+            log.info("Client disconnected from chat stream  session=%s  chars=%d",
+                     session_id, sum(len(p) for p in parts))
+            raise
+        except Exception:
+            log.exception("Error while streaming /api/chat/stream")
+            yield _sse("error", {"error": "Chat request failed"})
+        finally:
+            stream.close()
+            ticket.release()
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+    # A body that is closed without ever being iterated skips generate()'s finally.
+    response.call_on_close(ticket.release)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Roundtable: one user message, answered by several agents concurrently
+# ---------------------------------------------------------------------------
+def _roundtable_request_fields(body: dict[str, Any]) -> tuple[str, list[str], str]:
+    session_id: str = body.get("session_id", "")
+    agent_ids = body.get("agent_ids")
+    user_message: str = body.get("message", "")
+    if (
+        not session_id
+        or not user_message.strip()
+        or not isinstance(agent_ids, list)
+        or not agent_ids
+        or not all(isinstance(agent_id, str) and agent_id for agent_id in agent_ids)
+    ):
+        raise ChatError(400, "session_id, agent_ids, and message are required")
+
+    agent_ids = list(dict.fromkeys(agent_ids))
+    max_agents = current_app.config["ROUNDTABLE_MAX_AGENTS"]
+    if len(agent_ids) > max_agents:
+        raise ChatError(400, f"A roundtable takes at most {max_agents} agents")
+    return session_id, agent_ids, user_message
+
+
+def _begin_roundtable(
+    user: dict[str, str], session_id: str, agent_ids: list[str], user_message: str
+) -> list[ChatTurn]:
+    """One user-message insert and history fetch, then one context per agent."""
+    agents = [_resolve_agent(agent_id) for agent_id in agent_ids]
+    saved_user_message, history, summary = _persist_user_turn(user, session_id, user_message)
+    return [_build_chat_turn(agent, saved_user_message, history, summary) for agent in agents]
+
+
+def _finish_roundtable_rpc_params(
+    user: dict[str, str], session_id: str, replies: list[tuple[str, str]]
+) -> dict[str, Any]:
+    return {
+        "p_user_id": user["id"],
+        "p_session_id": session_id,
+        "p_replies": [{"agent_id": agent_id, "content": content} for agent_id, content in replies],
+    }
+
+
+def _finish_roundtable(
+    user: dict[str, str], session_id: str, replies: list[tuple[str, str]], not_before: str | None = None
+) -> list[dict[str, Any]]:
+    """Persist every (agent_id, content) reply, in order, with one insert."""
+    if not replies:
+        return []
+    with span("db_finish_roundtable"):
+        try:
+            if services().write_behind is not None:
+                saved_messages = _journal_replies(user, session_id, replies, not_before)
+            elif current_app.config["CHAT_USE_RPC"]:
+                saved_messages = services().supabase.rpc(
+                    "chat_finish_roundtable", _finish_roundtable_rpc_params(user, session_id, replies)
+                ).execute().data
+            else:
+                saved_messages = _finish_roundtable_tables(user, session_id, replies)
+        finally:
+            _reads_changed(user["id"], session_id)
+    _publish_messages(user["id"], session_id, saved_messages)
+    return saved_messages
+
+
+def _finish_roundtable_tables(
+    user: dict[str, str], session_id: str, replies: list[tuple[str, str]]
+) -> list[dict[str, Any]]:
+    # Rows of one insert would share a timestamp; spread them by a microsecond
+    # so (created_at, id) keeps the order the replies finished in.
+    supabase = services().supabase
+    now_utc = datetime.now(timezone.utc)
+    insert_result = supabase.table("messages").insert([
+        {
+            "session_id": session_id,
             "agent_id": agent_id,
+            "role": "assistant",
+            "content": content,
+            "created_at": (now_utc + timedelta(microseconds=index)).isoformat(),
         }
-    }), 200
+        for index, (agent_id, content) in enumerate(replies)
+    ]).execute()
+
+    supabase.table("sessions").update({"updated_at": now_utc.isoformat()}).eq("id", session_id).eq(
+        "user_id", user["id"]
+    ).execute()
+    return insert_result.data
+
+
+def _roundtable_result(
+    turns: list[ChatTurn], saved_messages: list[dict[str, Any]], routing: dict[str, dict[str, Any]]
+) -> dict[str, Any]:
+    rows = [_message_row(message) for message in saved_messages]
+    user_row = turns[0].user_message
+    return {
+        "user_message": user_row,
+        "messages": rows,
+        "next_after": _encode_cursor(rows[-1] if rows else user_row),
+        "context": {turn.agent.id: turn.context.metadata() for turn in turns},
+        "routing": routing,
+    }
+
+
+def _roundtable_worker(turn: ChatTurn, ticket: Ticket, events: queue.Queue, cancelled: threading.Event) -> None:
+    """Stream one agent's completion into ``events`` as (agent_id, kind, payload).
+
+    A finished agent's payload is (reply, routing metadata).
+    """
+    agent_id = turn.agent.id
+    stream = None
+    try:
+        llm_started = time.perf_counter()
+        stream = _open_llm_stream(turn, ticket)
+        parts: list[str] = []
+        usage = None
+        for chunk in stream:
+            if cancelled.is_set():
+                return
+            usage = getattr(chunk, "usage", None) or usage
+            delta = _stream_chunk_text(chunk)
+            if delta:
+                if not parts:
+                    record_stage("llm_ttft", time.perf_counter() - llm_started)
+                parts.append(delta)
+                events.put((agent_id, "delta", delta))
+        record_stage("llm", time.perf_counter() - llm_started)
+        record_llm_usage(agent_id, stream.route.model, usage)
+        events.put((agent_id, "done", ("".join(parts), stream.metadata())))
+    except Exception:
+        log.exception("Roundtable agent failed  agent=%s", agent_id)
+        events.put((agent_id, "error", None))
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+@api.route("/api/chat/roundtable", methods=["POST"])
+def chat_roundtable():
+    """Send one message to several agents at once and stream their replies as SSE.
+
+    Body: ``session_id``, ``agent_ids`` and ``message``. Events: ``delta``
+    ({"agent_id", "content"}) interleaved across agents as tokens arrive,
+    ``agent_done`` / ``agent_error`` ({"agent_id"}) as each agent finishes,
+    then ``done`` with the persisted user message and replies once all of
+    them are stored with a single insert. Agents that fail are left out.
+    """
+    user, auth_error = _require_user()
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_ids, user_message = _roundtable_request_fields(request.get_json(force=True))
+        log.info("ROUNDTABLE  session=%s  agents=%d  msg_len=%d", session_id, len(agent_ids), len(user_message))
+        # One slot per agent, held until every agent's stream has ended.
+        ticket = _admit_llm_call(user, cost=len(agent_ids))
+        try:
+            turns = _begin_roundtable(user, session_id, agent_ids, user_message)
+        except BaseException:
+            ticket.release()
+            raise
+    except ChatError as exc:
+        return jsonify({"error": exc.message}), exc.status, exc.headers
+    except Exception:
+        log.exception("Error in /api/chat/roundtable")
+        return jsonify({"error": "Chat request failed"}), 500
+
+    def generate():
+        events: queue.Queue = queue.Queue()
+        cancelled = threading.Event()
+        for turn in turns:
+            # A copied context keeps the workers' spans on this request's timer
+            # and their services on this request's app.
+            services().roundtable_pool.submit(
+                contextvars.copy_context().run, _roundtable_worker, turn, ticket, events, cancelled
+            )
+
+        replies: dict[str, str] = {}
+        routing: dict[str, dict[str, Any]] = {}
+        remaining = len(turns)
+        try:
+            while remaining:
+                agent_id, kind, payload = events.get()
+                if kind == "delta":
+                    yield _sse("delta", {"agent_id": agent_id, "content": payload})
+                    continue
+                remaining -= 1
+                if kind == "done":
+                    replies[agent_id], routing[agent_id] = payload
+                    yield _sse("agent_done", {"agent_id": agent_id, "model": routing[agent_id]["model"]})
+                else:
+                    yield _sse("agent_error", {"agent_id": agent_id, "error": "Agent reply failed"})
+            ticket.release()
+
+            # Persist in the order the replies finished, as the client saw them.
+            saved_messages = _finish_roundtable(
+                user, session_id, list(replies.items()), not_before=turns[0].user_message.get("created_at")
+            )
+            log.info("Roundtable finished  session=%s  replies=%d/%d", session_id, len(saved_messages), len(turns))
+            _after_chat_turn(session_id, turns[0], replies=len(saved_messages))
+            yield _sse("done", _roundtable_result(turns, saved_messages, routing))
+        except GeneratorExit:
+            log.info("Client disconnected from roundtable  session=%s  finished=%d", session_id, len(replies))
+            raise
+        except Exception:
+            log.exception("Error while streaming /api/chat/roundtable")
+            yield _sse("error", {"error": "Chat request failed"})
+        finally:
+            cancelled.set()
+            ticket.release()
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+    response.call_on_close(ticket.release)
+    return response
+
+
+# ---------------------------------------------------------------------------
+# App factory
+# ---------------------------------------------------------------------------
+def create_app(config: Mapping[str, Any] | None = None) -> Flask:
+    """Build a Flask app around the routes' blueprint, with its own services.
+
+    Its settings are this module's, read from the environment at import;
+    ``config`` overrides any of them by name, e.g.
+    ``create_app({"LLM_MAX_IN_FLIGHT": 4})``. Nothing here talks to the
+    network: clients are created by the first request that needs them, or up
+    front by ``warm_up``.
+    """
+    flask_app = Flask(__name__)
+    flask_app.config.from_object(__name__)
+    if config:
+        unknown = set(config) - set(flask_app.config)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        flask_app.config.update(config)
+    # Allow all origins in development; tighten this for production
+    CORS(flask_app)
+    flask_app.register_blueprint(api)
+    flask_app.extensions["boardroom"] = Services(flask_app)
+    return flask_app
+
+
+def warm_up(flask_app: Flask) -> None:
+    """Create this process's clients for ``flask_app`` and load the tokenizer,
+    so a fresh worker's first request doesn't pay for them. Raises if a client
+    can't be created, failing the worker's startup rather than its requests."""
+    _log_config(flask_app.config)
+    app_services: Services = flask_app.extensions["boardroom"]
+    for client in (app_services.supabase, app_services.openai_client, app_services.completion_cache,
+                   app_services.write_behind):
+        # Stand-ins set by tests and benchmarks are already there.
+        if isinstance(client, ProcessLocal):
+            try:
+                client.get()
+            except Exception:
+                log.exception("FATAL: failed to initialise %s", client.name)
+                raise
+    token_counter(flask_app.config["OPENROUTER_MODEL"])
+
+
+# The app configured from the environment, as served by serve.py and asgi.py.
+app = create_app()
 
 
 if __name__ == "__main__":
+    # Development server; serve.py is the production entry point.
+    configure_logging()
     log.info("Starting Boardroom API on port 5000")
-    app.run(debug=True, port=5000)
+    app.run(debug=os.environ.get("FLASK_DEBUG", "") == "1", port=5000)
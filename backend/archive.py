@@ -0,0 +1,142 @@
+"""NDJSON archives of a user's sessions, for backup and migration.
+
+An archive is one JSON object per line::
+
+    {"type": "archive", "version": 1, "exported_at": "..."}
+    {"type": "session", "id": ..., "title": ..., "created_at": ..., "updated_at": ...}
+    {"type": "message", "session_id": ..., "id": ..., "role": ..., "agent_id": ..., "content": ..., "created_at": ...}
+    ...
+    {"type": "end", "sessions": 12, "messages": 3400}
+
+Every session line precedes its messages, which come oldest first. The
+``end`` trailer is only written once the export completed, so a truncated
+download is detectable. Export writes an archive a page of rows at a time
+and import reads it a line at a time, so neither holds more than a page (or
+an insert batch) in memory, however large the archive.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import IO, Any, Iterator
+
+ARCHIVE_VERSION = 1
+
+# Longest accepted archive line, in bytes.
+MAX_LINE_BYTES = 1 << 20
+
+ROLES = ("user", "assistant")
+
+
+class ArchiveError(ValueError):
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+def ndjson(record: dict[str, Any]) -> str:
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def archive_header() -> dict[str, Any]:
+    return {"type": "archive", "version": ARCHIVE_VERSION, "exported_at": datetime.now(timezone.utc).isoformat()}
+
+
+def session_record(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "session",
+        "id": row["id"],
+        "title": row.get("title"),
+        "created_at": row.get("created_at"),
+        "updated_at": row.get("updated_at"),
+    }
+
+
+def message_record(row: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "type": "message",
+        "session_id": row["session_id"],
+        "id": row["id"],
+        "role": row["role"],
+        "agent_id": row.get("agent_id"),
+        "content": row["content"],
+        "created_at": row["created_at"],
+    }
+
+
+def read_lines(stream: IO[bytes], max_bytes: int = MAX_LINE_BYTES) -> Iterator[tuple[int, bytes]]:
+    """Non-blank lines of ``stream`` with their 1-based numbers, read one at a time."""
+    number = 0
+    while line := stream.readline(max_bytes + 1):
+        number += 1
+        if len(line) > max_bytes and not line.endswith(b"\n"):
+            raise ArchiveError(number, f"longer than {max_bytes} bytes")
+        if line.strip():
+            yield number, line
+
+
+def _timestamp(record: dict[str, Any], key: str, line: int, required: bool = True) -> str | None:
+    value = record.get(key)
+    if value is None and not required:
+        return None
+    try:
+        datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ArchiveError(line, f"{key} must be an ISO 8601 timestamp") from None
+    return value
+
+
+def _text(record: dict[str, Any], key: str, line: int) -> str:
+    value = record.get(key)
+    if not isinstance(value, str) or not value:
+        raise ArchiveError(line, f"{key} must be a non-empty string")
+    return value
+
+
+def read_records(stream: IO[bytes], max_bytes: int = MAX_LINE_BYTES) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Validated ``session`` and ``message`` records of the archive in ``stream``,
+    with their line numbers; raises ``ArchiveError`` at the first bad line."""
+    seen_header = False
+    sessions: set[str] = set()
+    for number, line in read_lines(stream, max_bytes):
+        try:
+            record = json.loads(line)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ArchiveError(number, "not valid JSON") from None
+        if not isinstance(record, dict):
+            raise ArchiveError(number, "not a JSON object")
+
+        kind = record.get("type")
+        if not seen_header:
+            if kind != "archive":
+                raise ArchiveError(number, "an archive starts with its archive line")
+            if record.get("version") != ARCHIVE_VERSION:
+                raise ArchiveError(number, f"unsupported archive version {record.get('version')!r}")
+            seen_header = True
+        elif kind == "session":
+            session_id = _text(record, "id", number)
+            if session_id in sessions:
+                raise ArchiveError(number, f"session {session_id} appears twice")
+            sessions.add(session_id)
+            title = record.get("title")
+            if title is not None and not isinstance(title, str):
+                raise ArchiveError(number, "title must be a string")
+            _timestamp(record, "created_at", number)
+            _timestamp(record, "updated_at", number, required=False)
+            yield number, record
+        elif kind == "message":
+            if record.get("session_id") not in sessions:
+                raise ArchiveError(number, "message before its session")
+            if record.get("role") not in ROLES:
+                raise ArchiveError(number, f"role must be one of {', '.join(ROLES)}")
+            if not isinstance(record.get("content"), str):
+                raise ArchiveError(number, "content must be a string")
+            agent_id = record.get("agent_id")
+            if agent_id is not None and not isinstance(agent_id, str):
+                raise ArchiveError(number, "agent_id must be a string or null")
+            _timestamp(record, "created_at", number)
+            yield number, record
+        elif kind != "end":
+            raise ArchiveError(number, f"unknown record type {kind!r}")
+    if not seen_header:
+        raise ArchiveError(0, "empty archive")
@@ -0,0 +1,583 @@
+"""Async (ASGI) serving mode for the Boardroom API.
+
+    python serve.py                    # production (see serve.py)
+    uvicorn asgi:application --port 5000
+
+The chat endpoints hold a request open for the whole LLM completion, so they
+are served natively on the event loop: AsyncOpenAI and the async Supabase
+client each share one pooled, keep-alive HTTP client per worker, and a single
+worker can hold hundreds of completions in flight. Every other route is the
+unchanged Flask view from app.py, mounted through a2wsgi on a bounded thread
+pool, so both serving modes expose the same API and share the chat pipeline.
+
+``create_application`` wraps one Flask app; every ASGI call runs in that
+app's context, so the shared helpers find its config and services (the async
+clients included) through ``current_app`` as they do under Flask.
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import anyio
+import httpx
+from a2wsgi import WSGIMiddleware
+from flask import Flask, current_app
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.routing import Mount, Route
+from supabase import AsyncClientOptions, acreate_client
+
+import app as boardroom
+import metrics
+from admission import AdmissionRejected, Ticket
+from app import ChatError, ChatTurn
+from completion_cache import AsyncCachedStream, AsyncCachingStream, CachedCompletion
+from model_routing import AsyncRoutedStream, DeadlineExceeded
+from session_summaries import SessionSummary
+
+log = logging.getLogger("boardroom.asgi")
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get("HTTP_POOL_MAX_CONNECTIONS", "500"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get("HTTP_POOL_MAX_KEEPALIVE", "100"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+LLM_TIMEOUT_SECONDS = float(os.environ.get("LLM_TIMEOUT_SECONDS", "600"))
+WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "20"))
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+@contextlib.asynccontextmanager
+async def lifespan(application: Starlette) -> AsyncIterator[None]:
+    """Open this worker's pooled async clients onto the Flask app's services."""
+    flask_app: Flask = application.state.flask_app
+    config, services = flask_app.config, flask_app.extensions["boardroom"]
+
+    supabase_http = httpx.AsyncClient(limits=_pool_limits(), timeout=httpx.Timeout(30.0), http2=True)
+    openai_http = DefaultAsyncHttpxClient(
+        limits=_pool_limits(), timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0)
+    )
+    services.async_supabase = await acreate_client(
+        config["SUPABASE_URL"],
+        config["SUPABASE_KEY"],
+        options=AsyncClientOptions(httpx_client=supabase_http),
+    )
+    services.async_openai_client = AsyncOpenAI(
+        api_key=config["OPENROUTER_KEY"],
+        base_url=config["OPENROUTER_BASE"],
+        http_client=openai_http,
+    )
+    # The mounted Flask routes' clients and the tokenizer, off the event loop.
+    await anyio.to_thread.run_sync(boardroom.warm_up, flask_app)
+    log.info("Async clients initialised  max_connections=%d  keepalive=%d",
+             HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE)
+    try:
+        yield
+    finally:
+        await services.async_openai_client.close()
+        await supabase_http.aclose()
+
+
+class _FlaskAppContext:
+    """Runs every ASGI call (lifespan included) in a Flask app's context."""
+
+    def __init__(self, app: ASGIApp, flask_app: Flask):
+        self.app = app
+        self.flask_app = flask_app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Tasks and worker threads started inside inherit the context.
+        with self.flask_app.app_context():
+            await self.app(scope, receive, send)
+
+
+# ---------------------------------------------------------------------------
+# Request helpers
+# ---------------------------------------------------------------------------
+def _error(status: int, message: str, headers: dict[str, str] | None = None) -> JSONResponse:
+    return JSONResponse({"error": message}, status_code=status, headers=headers)
+
+
+async def _require_user(request: Request) -> tuple[dict[str, str] | None, Response | None]:
+    auth_header = request.headers.get("Authorization", "")
+    token = auth_header.split(" ", 1)[1].strip() if auth_header.startswith("Bearer ") else ""
+    if not token:
+        return None, _error(401, "Missing Bearer token")
+
+    try:
+        # Usually a cache hit or a local JWT check; only the remote fallback does I/O.
+        with metrics.span("auth"):
+            user = await anyio.to_thread.run_sync(boardroom._verify_token, token)
+    except Exception:
+        log.exception("Token validation failed")
+        user = None
+    if not user:
+        return None, _error(401, "Invalid auth token")
+    return user, None
+
+
+async def _json_body(request: Request) -> dict[str, Any]:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise ChatError(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise ChatError(400, "Request body must be a JSON object")
+    return body
+
+
+async def _chat_fields(request: Request) -> tuple[str, str, str]:
+    return boardroom._chat_request_fields(await _json_body(request))
+
+
+async def _admit_llm_call(user: dict[str, str], cost: int = 1) -> Ticket:
+    try:
+        ticket = await boardroom.services().llm_admission.admit_async(user["id"], cost)
+    except AdmissionRejected as exc:
+        raise boardroom._admission_error(exc) from exc
+    metrics.record_stage("llm_queue", ticket.waited)
+    return ticket
+
+
+async def _completion_cache_call(method: Callable[..., Any], *args: Any) -> Any:
+    """Cache calls that may touch the SQLite tier run off the event loop."""
+    if boardroom.services().completion_cache.on_disk:
+        return await anyio.to_thread.run_sync(method, *args)
+    return method(*args)
+
+
+async def _open_llm_stream(
+    turn: ChatTurn, ticket: Ticket
+) -> AsyncRoutedStream | AsyncCachedStream | AsyncCachingStream:
+    services = boardroom.services()
+    # Resolved here: the proxy's own ``get`` would shadow the cache's.
+    cache = services.completion_cache.get()
+    cache_key = boardroom._completion_cache_key(turn)
+    if cache_key is not None:
+        with metrics.span("completion_cache"):
+            cached = await _completion_cache_call(cache.get, cache_key)
+        if cached is not None:
+            log.info("Completion cache hit  agent=%s  len=%d", turn.agent.id, len(cached.content))
+            ticket.refund()
+            return AsyncCachedStream(cached)
+    try:
+        stream = await services.llm_router.open_stream_async(
+            services.async_openai_client, **boardroom._llm_request(turn)
+        )
+    except DeadlineExceeded as exc:
+        raise boardroom._deadline_error(exc) from exc
+    if cache_key is None:
+        return stream
+
+    async def store(completion: CachedCompletion) -> None:
+        await _completion_cache_call(cache.put, cache_key, completion)
+
+    return AsyncCachingStream(stream, store)
+
+
+class _ClosingResponse:
+    """Runs callbacks once a response has been sent or abandoned.
+
+    Unlike a background task, the callbacks also run when the client
+    disconnects mid-stream.
+    """
+
+    def __init__(self, response: Response, *callbacks: Callable[[], None]):
+        self.response = response
+        self.callbacks = list(callbacks)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            for callback in self.callbacks:
+                callback()
+
+
+# ---------------------------------------------------------------------------
+# Async chat pipeline (same steps as app._begin_chat_turn/_finish_chat_turn)
+# ---------------------------------------------------------------------------
+async def _begin_chat_turn(
+    user: dict[str, str], session_id: str, agent_id: str, user_message: str
+) -> ChatTurn:
+    agent = await anyio.to_thread.run_sync(boardroom._resolve_agent, agent_id)
+    return boardroom._build_chat_turn(agent, *await _persist_user_turn(user, session_id, user_message))
+
+
+async def _persist_user_turn(
+    user: dict[str, str], session_id: str, user_message: str
+) -> tuple[dict[str, Any], list[dict[str, str]], SessionSummary | None]:
+    services = boardroom.services()
+    write_behind = services.write_behind
+    if write_behind is not None and write_behind.has_pending(session_id):
+        await anyio.to_thread.run_sync(write_behind.barrier, session_id)
+    try:
+        if current_app.config["CHAT_USE_RPC"]:
+            params = boardroom._begin_turn_rpc_params(user, session_id, user_message)
+            with metrics.span("db_begin_turn"):
+                result = await services.async_supabase.rpc("chat_begin_turn", params).execute()
+            persisted = boardroom._parse_begin_turn_rpc(result.data)
+        else:
+            persisted = await anyio.to_thread.run_sync(
+                boardroom._begin_chat_turn_tables, user, session_id, user_message
+            )
+    finally:
+        boardroom._reads_changed(user["id"], session_id)
+    boardroom._publish_messages(user["id"], session_id, [persisted[0]])
+    return persisted
+
+
+async def _finish_chat_turn(
+    user: dict[str, str], session_id: str, agent_id: str, assistant_content: str, not_before: str | None = None
+) -> dict[str, Any]:
+    services = boardroom.services()
+    with metrics.span("db_finish_turn"):
+        try:
+            if services.write_behind is not None:
+                # A journal append; off the loop for its fsync.
+                rows = await anyio.to_thread.run_sync(
+                    boardroom._journal_replies, user, session_id, [(agent_id, assistant_content)], not_before
+                )
+                saved_message = rows[0]
+            elif current_app.config["CHAT_USE_RPC"]:
+                params = boardroom._finish_turn_rpc_params(user, session_id, agent_id, assistant_content)
+                result = await services.async_supabase.rpc("chat_finish_turn", params).execute()
+                log.debug("Assistant message persisted  id=%s", result.data.get("id"))
+                saved_message = result.data
+            else:
+                saved_message = await anyio.to_thread.run_sync(
+                    boardroom._finish_chat_turn_tables, user, session_id, agent_id, assistant_content
+                )
+        finally:
+            boardroom._reads_changed(user["id"], session_id)
+    boardroom._publish_messages(user["id"], session_id, [saved_message])
+    return saved_message
+
+
+async def _begin_roundtable(
+    user: dict[str, str], session_id: str, agent_ids: list[str], user_message: str
+) -> list[ChatTurn]:
+    agents = await anyio.to_thread.run_sync(lambda: [boardroom._resolve_agent(agent_id) for agent_id in agent_ids])
+    saved_user_message, history, summary = await _persist_user_turn(user, session_id, user_message)
+    return [boardroom._build_chat_turn(agent, saved_user_message, history, summary) for agent in agents]
+
+
+async def _finish_roundtable(
+    user: dict[str, str], session_id: str, replies: list[tuple[str, str]], not_before: str | None = None
+) -> list[dict[str, Any]]:
+    if not replies:
+        return []
+    services = boardroom.services()
+    with metrics.span("db_finish_roundtable"):
+        try:
+            if services.write_behind is not None:
+                saved_messages = await anyio.to_thread.run_sync(
+                    boardroom._journal_replies, user, session_id, replies, not_before
+                )
+            elif current_app.config["CHAT_USE_RPC"]:
+                params = boardroom._finish_roundtable_rpc_params(user, session_id, replies)
+                result = await services.async_supabase.rpc("chat_finish_roundtable", params).execute()
+                saved_messages = result.data
+            else:
+                saved_messages = await anyio.to_thread.run_sync(
+                    boardroom._finish_roundtable_tables, user, session_id, replies
+                )
+        finally:
+            boardroom._reads_changed(user["id"], session_id)
+    boardroom._publish_messages(user["id"], session_id, saved_messages)
+    return saved_messages
+
+
+async def _roundtable_agent(turn: ChatTurn, ticket: Ticket, events: asyncio.Queue) -> None:
+    """Async counterpart of app._roundtable_worker."""
+    agent_id = turn.agent.id
+    stream = None
+    try:
+        llm_started = time.perf_counter()
+        stream = await _open_llm_stream(turn, ticket)
+        parts: list[str] = []
+        usage = None
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            delta = boardroom._stream_chunk_text(chunk)
+            if delta:
+                if not parts:
+                    metrics.record_stage("llm_ttft", time.perf_counter() - llm_started)
+                parts.append(delta)
+                events.put_nowait((agent_id, "delta", delta))
+        metrics.record_stage("llm", time.perf_counter() - llm_started)
+        metrics.record_llm_usage(agent_id, stream.route.model, usage)
+        events.put_nowait((agent_id, "done", ("".join(parts), stream.metadata())))
+    except Exception:
+        log.exception("Roundtable agent failed  agent=%s", agent_id)
+        events.put_nowait((agent_id, "error", None))
+    finally:
+        if stream is not None:
+            with anyio.CancelScope(shield=True):
+                await stream.close()
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+def _timed_route(path: str, endpoint: Callable[[Request], Awaitable[Response | _ClosingResponse]]) -> Route:
+    """A POST route with the request timing app.py's Flask hooks give mounted routes."""
+
+    async def timed(request: Request) -> _ClosingResponse:
+        timer = metrics.start_request(path)
+        result = await endpoint(request)
+        closing = result if isinstance(result, _ClosingResponse) else _ClosingResponse(result)
+        # Streams carry the stages before the first byte; the request histogram
+        # is observed once the body has been sent.
+        closing.response.headers["Server-Timing"] = timer.server_timing()
+        closing.callbacks.append(lambda: timer.finish(request.method, closing.response.status_code))
+        return closing
+
+    return Route(path, timed, methods=["POST"])
+
+
+async def chat(request: Request) -> Response:
+    user, auth_error = await _require_user(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_id, user_message = await _chat_fields(request)
+        log.info("CHAT  session=%s  agent=%s  msg_len=%d", session_id, agent_id, len(user_message))
+
+        with await _admit_llm_call(user) as ticket:
+            turn = await _begin_chat_turn(user, session_id, agent_id, user_message)
+
+            with metrics.span("llm"):
+                async with await _open_llm_stream(turn, ticket) as stream:
+                    parts: list[str] = []
+                    usage = None
+                    async for chunk in stream:
+                        usage = getattr(chunk, "usage", None) or usage
+                        parts.append(boardroom._stream_chunk_text(chunk) or "")
+        assistant_content = "".join(parts)
+        log.info("OpenRouter response  model=%s  tokens=%s  len=%d",
+                 stream.route.label, getattr(usage, "total_tokens", "?"), len(assistant_content))
+        metrics.record_llm_usage(agent_id, stream.route.model, usage)
+
+        saved_message = await _finish_chat_turn(
+            user, session_id, agent_id, assistant_content, not_before=turn.user_message.get("created_at")
+        )
+        boardroom._after_chat_turn(session_id, turn)
+    except ChatError as exc:
+        return _error(exc.status, exc.message, exc.headers)
+    except Exception:
+        log.exception("Error in /api/chat")
+        return _error(500, "Chat request failed")
+
+    return JSONResponse(boardroom._chat_result(turn, saved_message, stream.metadata()))
+
+
+async def chat_stream(request: Request) -> Response | _ClosingResponse:
+    user, auth_error = await _require_user(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_id, user_message = await _chat_fields(request)
+        log.info("CHAT STREAM  session=%s  agent=%s  msg_len=%d", session_id, agent_id, len(user_message))
+
+        ticket = await _admit_llm_call(user)
+        try:
+            turn = await _begin_chat_turn(user, session_id, agent_id, user_message)
+
+            llm_started = time.perf_counter()
+            stream = await _open_llm_stream(turn, ticket)
+        except BaseException:
+            ticket.release()
+            raise
+    except ChatError as exc:
+        return _error(exc.status, exc.message, exc.headers)
+    except Exception:
+        log.exception("Error in /api/chat/stream")
+        return _error(500, "Chat request failed")
+
+    async def generate() -> AsyncIterator[str]:
+        parts: list[str] = []
+        usage = None
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                delta = boardroom._stream_chunk_text(chunk)
+                if delta:
+                    if not parts:
+                        metrics.record_stage("llm_ttft", time.perf_counter() - llm_started)
+                    parts.append(delta)
+                    yield boardroom._sse("delta", {"content": delta})
+
+            ticket.release()
+            metrics.record_stage("llm", time.perf_counter() - llm_started)
+            assistant_content = "".join(parts)
+            log.info("OpenRouter stream finished  model=%s  tokens=%s  len=%d",
+                     stream.route.label, getattr(usage, "total_tokens", "?"), len(assistant_content))
+            metrics.record_llm_usage(agent_id, stream.route.model, usage)
+            saved_message = await _finish_chat_turn(
+                user, session_id, agent_id, assistant_content, not_before=turn.user_message.get("created_at")
+            )
+            boardroom._after_chat_turn(session_id, turn)
+            yield boardroom._sse("done", boardroom._chat_result(turn, saved_message, stream.metadata()))
+        except (GeneratorExit, anyio.get_cancelled_exc_class()):
+            # Client went away; stop pulling tokens and don't persist a partial reply.
+            log.info("Client disconnected from chat stream  session=%s  chars=%d",
+                     session_id, sum(len(p) for p in parts))
+            raise
+        except Exception:
+            log.exception("Error while streaming /api/chat/stream")
+            yield boardroom._sse("error", {"error": "Chat request failed"})
+        finally:
+            with anyio.CancelScope(shield=True):
+                await stream.close()
+            ticket.release()
+
+    response = StreamingResponse(generate(), media_type="text/event-stream", headers=boardroom.SSE_HEADERS)
+    return _ClosingResponse(response, ticket.release)
+
+
+async def chat_roundtable(request: Request) -> Response | _ClosingResponse:
+    user, auth_error = await _require_user(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        session_id, agent_ids, user_message = boardroom._roundtable_request_fields(await _json_body(request))
+        log.info("ROUNDTABLE  session=%s  agents=%d  msg_len=%d", session_id, len(agent_ids), len(user_message))
+        ticket = await _admit_llm_call(user, cost=len(agent_ids))
+        try:
+            turns = await _begin_roundtable(user, session_id, agent_ids, user_message)
+        except BaseException:
+            ticket.release()
+            raise
+    except ChatError as exc:
+        return _error(exc.status, exc.message, exc.headers)
+    except Exception:
+        log.exception("Error in /api/chat/roundtable")
+        return _error(500, "Chat request failed")
+
+    async def generate() -> AsyncIterator[str]:
+        # Plain tasks rather than a task group: a generator must not yield from
+        # inside a task group's cancel scope.
+        events: asyncio.Queue = asyncio.Queue()
+        tasks = [asyncio.create_task(_roundtable_agent(turn, ticket, events)) for turn in turns]
+        replies: dict[str, str] = {}
+        routing: dict[str, dict[str, Any]] = {}
+        remaining = len(turns)
+        try:
+            while remaining:
+                agent_id, kind, payload = await events.get()
+                if kind == "delta":
+                    yield boardroom._sse("delta", {"agent_id": agent_id, "content": payload})
+                    continue
+                remaining -= 1
+                if kind == "done":
+                    replies[agent_id], routing[agent_id] = payload
+                    yield boardroom._sse("agent_done", {"agent_id": agent_id, "model": routing[agent_id]["model"]})
+                else:
+                    yield boardroom._sse("agent_error", {"agent_id": agent_id, "error": "Agent reply failed"})
+            ticket.release()
+
+            saved_messages = await _finish_roundtable(
+                user, session_id, list(replies.items()), not_before=turns[0].user_message.get("created_at")
+            )
+            log.info("Roundtable finished  session=%s  replies=%d/%d", session_id, len(saved_messages), len(turns))
+            boardroom._after_chat_turn(session_id, turns[0], replies=len(saved_messages))
+            yield boardroom._sse("done", boardroom._roundtable_result(turns, saved_messages, routing))
+        except (GeneratorExit, anyio.get_cancelled_exc_class()):
+            log.info("Client disconnected from roundtable  session=%s  finished=%d", session_id, len(replies))
+            raise
+        except Exception:
+            log.exception("Error while streaming /api/chat/roundtable")
+            yield boardroom._sse("error", {"error": "Chat request failed"})
+        finally:
+            for task in tasks:
+                task.cancel()
+            with anyio.CancelScope(shield=True):
+                await asyncio.gather(*tasks, return_exceptions=True)
+            ticket.release()
+
+    response = StreamingResponse(generate(), media_type="text/event-stream", headers=boardroom.SSE_HEADERS)
+    return _ClosingResponse(response, ticket.release)
+
+
+async def stream_events(request: Request) -> Response:
+    """app.stream_events on the event loop, so an open stream costs no thread."""
+    config = current_app.config
+    if not config["LIVE_EVENTS"]:
+        return _error(404, "Live events are off")
+    user, auth_error = await _require_user(request)
+    if auth_error:
+        return auth_error
+    cursor = boardroom._event_stream_cursor(request.headers, request.query_params)
+    loop = asyncio.get_running_loop()
+
+    async def generate() -> AsyncIterator[str]:
+        wake = asyncio.Event()
+        # Events are published from worker threads as well as from the loop.
+        unsubscribe = boardroom.services().event_hub.subscribe(
+            user["id"], lambda: loop.call_soon_threadsafe(wake.set)
+        )
+        metrics.EVENT_STREAMS.inc()
+        position = cursor
+        deadline = loop.time() + config["EVENTS_STREAM_MAX_SECONDS"]
+        try:
+            while True:
+                wake.clear()
+                frames, position = boardroom._event_frames(user["id"], position)
+                if frames:
+                    yield frames
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(wake.wait(), min(config["EVENTS_HEARTBEAT_SECONDS"], remaining))
+                except asyncio.TimeoutError:
+                    yield boardroom.EVENTS_KEEP_ALIVE
+        finally:
+            unsubscribe()
+            metrics.EVENT_STREAMS.dec()
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=boardroom.SSE_HEADERS)
+
+
+def create_application(flask_app: Flask) -> Starlette:
+    """The ASGI app around ``flask_app``: the chat and event routes served
+    natively, every other route by the mounted Flask app."""
+    application = Starlette(
+        routes=[
+            _timed_route("/api/chat", chat),
+            _timed_route("/api/chat/stream", chat_stream),
+            _timed_route("/api/chat/roundtable", chat_roundtable),
+            Route("/api/events", stream_events, methods=["GET"]),
+            Mount("/", app=WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+        ],
+        middleware=[
+            Middleware(_FlaskAppContext, flask_app=flask_app),
+            # Mirrors CORS(app) on the Flask side; headers are set, not appended,
+            # so mounted Flask responses don't end up with duplicates.
+            Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+        ],
+        lifespan=lifespan,
+    )
+    application.state.flask_app = flask_app
+    return application
+
+
+application = create_application(boardroom.app)
@@ -0,0 +1,142 @@
+"""Local verification and caching of Supabase access tokens.
+
+Supabase access tokens are JWTs signed either with the project's shared JWT
+secret (HS256) or with an asymmetric key published at the project's JWKS
+endpoint. Verifying them in-process avoids a round trip to the auth server on
+every request; ``TokenCache`` then skips even the signature check for tokens
+seen recently.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import jwt
+
+SUPABASE_AUDIENCE = "authenticated"
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256", "EdDSA"]
+
+
+class TokenVerificationUnavailable(Exception):
+    """Local verification could not reach a verdict (e.g. JWKS unreachable, unknown key)."""
+
+
+class TokenCache:
+    """Bounded LRU of validated tokens whose entries expire with the token.
+
+    Keys are SHA-256 digests so raw bearer tokens are never held in memory
+    longer than the request that carried them.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> dict[str, str] | None:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, token: str, user: dict[str, str], token_exp: float | None = None) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        if expires_at <= time.time() or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LocalTokenVerifier:
+    """Verify Supabase JWTs with the shared secret and/or the project's JWKS."""
+
+    def __init__(
+        self,
+        jwt_secret: str = "",
+        jwks_url: str = "",
+        audience: str = SUPABASE_AUDIENCE,
+        leeway_seconds: float = 10.0,
+    ):
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.leeway_seconds = leeway_seconds
+        self._jwks_client = jwt.PyJWKClient(jwks_url, cache_keys=True) if jwks_url else None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.jwt_secret or self._jwks_client)
+
+    def _signing_key(self, token: str) -> tuple[Any, list[str]]:
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg", "")
+
+        if alg == "HS256":
+            if not self.jwt_secret:
+                raise TokenVerificationUnavailable("HS256 token but no JWT secret configured")
+            return self.jwt_secret, ["HS256"]
+
+        if alg in ASYMMETRIC_ALGORITHMS:
+            if self._jwks_client is None:
+                raise TokenVerificationUnavailable(f"{alg} token but no JWKS URL configured")
+            try:
+                return self._jwks_client.get_signing_key_from_jwt(token).key, [alg]
+            except jwt.PyJWKClientError as exc:
+                raise TokenVerificationUnavailable(str(exc)) from exc
+
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {alg or '[none]'}")
+
+    def verify(self, token: str) -> tuple[dict[str, str], float]:
+        """Return ``(user, exp)`` for a valid token.
+
+        Raises ``jwt.InvalidTokenError`` for tokens that are definitely invalid
+        and ``TokenVerificationUnavailable`` when no local verdict is possible.
+        """
+        key, algorithms = self._signing_key(token)
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            leeway=self.leeway_seconds,
+            options={"require": ["exp", "sub"]},
+        )
+        user = {"id": str(claims["sub"]), "email": str(claims.get("email") or "")}
+        return user, float(claims["exp"])
+
+
+def unverified_expiry(token: str) -> float | None:
+    """Best-effort ``exp`` claim of a token, for bounding cache lifetimes."""
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        return None
+    return float(exp) if exp is not None else None
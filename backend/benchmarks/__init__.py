@@ -0,0 +1 @@
+"""Load benchmarks for the Boardroom API against local stand-ins; see benchmarks/run.py."""
@@ -0,0 +1,72 @@
+"""Compare two benchmark reports produced by benchmarks/run.py.
+
+    python -m benchmarks.compare base.json head.json --threshold 0.10
+
+Prints p50/p99 latency and throughput per concurrency level and endpoint and
+exits non-zero if any endpoint's p99 grew, or its throughput dropped, by more
+than ``--threshold`` (a fraction).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+
+def _change(base: float, head: float) -> float:
+    return (head - base) / base if base else 0.0
+
+
+def compare(base: dict[str, Any], head: dict[str, Any], threshold: float) -> tuple[list[str], list[str]]:
+    """Return (table lines, regression descriptions)."""
+    lines = [f"{'conc':>5}  {'endpoint':<18}{'p50 ms':>18}{'p99 ms':>22}{'req/s':>20}"]
+    regressions = []
+    base_levels = {result["concurrency"]: result for result in base["results"]}
+
+    for result in head["results"]:
+        level = result["concurrency"]
+        base_result = base_levels.get(level)
+        if base_result is None:
+            continue
+        for name, stats in sorted(result["endpoints"].items()):
+            before = base_result["endpoints"].get(name)
+            if before is None:
+                continue
+            p99_change = _change(before["p99_ms"], stats["p99_ms"])
+            rps_change = _change(before["rps"], stats["rps"])
+            lines.append(
+                f"{level:>5}  {name:<18}"
+                f"{before['p50_ms']:>8.1f} → {stats['p50_ms']:<7.1f}"
+                f"{before['p99_ms']:>8.1f} → {stats['p99_ms']:<7.1f}{p99_change:>+6.0%}"
+                f"{before['rps']:>8.1f} → {stats['rps']:<6.1f}{rps_change:>+5.0%}"
+            )
+            if p99_change > threshold:
+                regressions.append(f"{name} @ {level}: p99 {before['p99_ms']} → {stats['p99_ms']} ms")
+            # Time-to-first-token samples are a subset of chat_stream; only latency matters there.
+            if "." not in name and rps_change < -threshold:
+                regressions.append(f"{name} @ {level}: {before['rps']} → {stats['rps']} req/s")
+    return lines, regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    base = json.loads(args.base.read_text())
+    head = json.loads(args.head.read_text())
+    lines, regressions = compare(base, head, args.threshold)
+    print(f"base {base['meta']['git']['commit'] or '?'}  →  head {head['meta']['git']['commit'] or '?'}")
+    print("\n".join(lines))
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        print("\n".join(f"  {line}" for line in regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Supabase stand-ins that add PostgREST-like latency to the in-memory test fake.
+
+Every ``execute()`` (and every auth call) sleeps for ``base ± jitter``
+milliseconds before running against ``tests.fakes.FakeSupabase``. The sleep
+happens outside the fake's lock, so concurrent requests overlap on latency the
+way they would against a real PostgREST while the in-memory store stays
+consistent.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from tests.fakes import FakeSupabase
+
+BENCH_PASSWORD = "bench-password"
+AGENTS = [
+    ("agent-architect", "Senior Architect", "System design", "#3B82F6", "You are a Senior Systems Architect."),
+    ("agent-pm", "Product Manager", "Vision and prioritization", "#8B5CF6", "You are a Product Manager."),
+    ("agent-security", "Security Auditor", "Vulnerability assessment", "#EF4444", "You are a strict Security Auditor."),
+]
+
+
+def bench_email(index: int) -> str:
+    return f"bench-{index}@example.com"
+
+
+@dataclass(frozen=True)
+class Latency:
+    base_ms: float = 8.0
+    jitter_ms: float = 2.0
+
+    def seconds(self) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.base_ms + jitter, 0.0) / 1000
+
+
+class _LatentCall:
+    """Proxies a query/RPC builder; chaining is free, ``execute()`` pays the latency."""
+
+    def __init__(self, target: Any, backend: "LatentSupabase"):
+        self._target = target
+        self._backend = backend
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name == "execute":
+            def execute() -> Any:
+                time.sleep(self._backend.latency.seconds())
+                with self._backend.lock:
+                    return attr()
+            return execute
+        return lambda *args, **kwargs: _LatentCall(attr(*args, **kwargs), self._backend)
+
+
+class _LatentAuth:
+    def __init__(self, backend: "LatentSupabase"):
+        self._backend = backend
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._backend.fake.auth, name)
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            time.sleep(self._backend.latency.seconds())
+            with self._backend.lock:
+                return attr(*args, **kwargs)
+        return call
+
+
+class LatentSupabase:
+    def __init__(self, fake: FakeSupabase, latency: Latency):
+        self.fake = fake
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.auth = _LatentAuth(self)
+
+    def table(self, table_name: str) -> _LatentCall:
+        return _LatentCall(self.fake.table(table_name), self)
+
+    def rpc(self, name: str, params: dict[str, Any]) -> _LatentCall:
+        return _LatentCall(self.fake.rpc(name, params), self)
+
+
+class _AsyncLatentCall:
+    def __init__(self, target: Any, backend: LatentSupabase):
+        self._target = target
+        self._backend = backend
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if name == "execute":
+            async def execute() -> Any:
+                await asyncio.sleep(self._backend.latency.seconds())
+                with self._backend.lock:
+                    return attr()
+            return execute
+        return lambda *args, **kwargs: _AsyncLatentCall(attr(*args, **kwargs), self._backend)
+
+
+class AsyncLatentSupabase:
+    """Async facade sharing the sync backend's store, lock and latency model."""
+
+    def __init__(self, backend: LatentSupabase):
+        self._backend = backend
+
+    def table(self, table_name: str) -> _AsyncLatentCall:
+        return _AsyncLatentCall(self._backend.fake.table(table_name), self._backend)
+
+    def rpc(self, name: str, params: dict[str, Any]) -> _AsyncLatentCall:
+        return _AsyncLatentCall(self._backend.fake.rpc(name, params), self._backend)
+
+
+def seeded_fake(users: int, sessions_per_user: int, messages_per_session: int) -> FakeSupabase:
+    """A fake with the bench agents, ``users`` accounts and pre-filled transcripts."""
+    fake = FakeSupabase()
+    fake.db["agents"] = [
+        {"id": agent_id, "name": name, "role_description": role, "color_hex": color, "system_prompt": prompt}
+        for agent_id, name, role, color, prompt in AGENTS
+    ]
+
+    for index in range(users):
+        user, _ = fake.auth.seed_user(bench_email(index), BENCH_PASSWORD)
+        for session_index in range(sessions_per_user):
+            session_id = f"session-{index}-{session_index}"
+            fake.db["sessions"].append({
+                "id": session_id,
+                "user_id": user["id"],
+                "title": f"Bench session {session_index}",
+                "created_at": "2025-01-01T00:00:00Z",
+                "updated_at": f"2025-01-01T00:{session_index:02d}:00Z",
+            })
+            for message_index in range(messages_per_session):
+                is_user = message_index % 2 == 0
+                fake.db["messages"].append({
+                    "id": f"message-{index}-{session_index}-{message_index:05d}",
+                    "session_id": session_id,
+                    "agent_id": None if is_user else AGENTS[message_index % len(AGENTS)][0],
+                    "role": "user" if is_user else "assistant",
+                    "content": ("What are the trade-offs here? " if is_user else "Consider the following. ") * 8,
+                    "created_at": f"2025-01-01T{message_index // 3600:02d}:{message_index // 60 % 60:02d}:"
+                                  f"{message_index % 60:02d}Z",
+                })
+    fake.sessions_apply_message_inserts(fake.db["messages"])
+    return fake
@@ -0,0 +1,190 @@
+"""OpenAI-compatible chat completions stub with configurable latency.
+
+    python -m benchmarks.llm_stub --port 8901 --ttft-ms 250 --token-ms 15 --tokens 60
+
+Serves ``POST .../chat/completions`` in both plain and streaming (SSE) form.
+Every reply is ``--tokens`` words long; the first arrives after ``--ttft-ms``
+and each further one ``--token-ms`` later, so a plain completion takes
+``ttft + (tokens - 1) * token`` milliseconds. Responses use HTTP/1.1 with
+keep-alive so client connection pooling behaves as it would upstream.
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+WORDS = ("the", "board", "should", "weigh", "latency", "against", "cost", "and", "risk", "before", "shipping")
+
+
+@dataclass
+class StubConfig:
+    ttft_ms: float = 250.0
+    token_ms: float = 15.0
+    tokens: int = 60
+
+
+def _reply_tokens(count: int) -> list[str]:
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+def _usage(body: dict[str, Any], completion_tokens: int) -> dict[str, int]:
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in body.get("messages", []))
+    prompt_tokens = prompt_chars // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "LLMStubServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"No route for {self.path}"}})
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "Invalid JSON"}})
+            return
+
+        self.server.requests += 1
+        try:
+            if body.get("stream"):
+                self._stream(body)
+            else:
+                self._complete(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up mid-reply (e.g. a disconnected SSE stream).
+            self.close_connection = True
+
+    def _complete(self, body: dict[str, Any]) -> None:
+        config = self.server.config
+        tokens = _reply_tokens(config.tokens)
+        time.sleep((config.ttft_ms + config.token_ms * max(len(tokens) - 1, 0)) / 1000)
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(body, len(tokens)),
+        })
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _write_event(self, payload: dict[str, Any] | str) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self._write_chunk(f"data: {data}\n\n".encode())
+
+    def _stream(self, body: dict[str, Any]) -> None:
+        config = self.server.config
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "stub")
+
+        def chunk(delta: dict[str, str], finish_reason: str | None = None) -> dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        tokens = _reply_tokens(config.tokens)
+        time.sleep(config.ttft_ms / 1000)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(config.token_ms / 1000)
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            self._write_event(chunk(delta))
+        self._write_event(chunk({}, "stop"))
+
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._write_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [],
+                "usage": _usage(body, len(tokens)),
+            })
+        self._write_event("[DONE]")
+        self._write_chunk(b"")
+
+
+class LLMStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: StubConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="llm-stub", daemon=True)
+        thread.start()
+        return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--ttft-ms", type=float, default=StubConfig.ttft_ms)
+    parser.add_argument("--token-ms", type=float, default=StubConfig.token_ms)
+    parser.add_argument("--tokens", type=int, default=StubConfig.tokens)
+    args = parser.parse_args()
+
+    config = StubConfig(ttft_ms=args.ttft_ms, token_ms=args.token_ms, tokens=args.tokens)
+    server = LLMStubServer((args.host, args.port), config)
+    print(f"LLM stub listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""Reproducible load benchmark for the Boardroom API.
+
+    cd backend
+    python -m benchmarks.run --mode asgi --concurrency 8,32 --duration 15 --output bench.json
+
+Starts the LLM stub (benchmarks/llm_stub.py) and the API wired to a seeded,
+latency-injecting Supabase fake (benchmarks/server.py) as subprocesses, then
+drives a weighted mix of traffic from ``--concurrency`` virtual users per
+level. Each virtual user logs in, lists its sessions and loads the agent
+roster once, then loops over the mix until the level's time is up. Samples
+taken during ``--warmup`` are discarded.
+
+The JSON report holds, per concurrency level and endpoint, the request
+count, errors, throughput and p50/p95/p99 latency; for streamed chat the
+time to first token is reported as ``chat_stream.ttft``. Compare two reports
+with ``python -m benchmarks.compare``.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+
+from benchmarks.fake_backends import BENCH_PASSWORD, bench_email
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_MIX = "sessions=3,history=4,chat=1,chat_stream=2,login=0.5"
+OPERATIONS = ("login", "sessions", "history", "search", "chat", "chat_stream")
+# Match the seeded transcripts (benchmarks/fake_backends.py).
+SEARCH_QUERIES = ("trade-offs", "consider following", '"trade-offs here"', "trade-offs -consider")
+
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list[float], errors: int, duration_s: float) -> dict[str, Any]:
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)  # noqa: E731
+    return {
+        "count": len(values),
+        "errors": errors,
+        "rps": round(len(values) / duration_s, 2) if duration_s else 0.0,
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else 0.0,
+    }
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix: dict[str, float] = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r}; expected one of {', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("the traffic mix needs at least one positive weight")
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+@dataclass
+class Recorder:
+    measure_from: float
+    measure_until: float
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def record(self, name: str, started: float, elapsed: float, ok: bool) -> None:
+        if not self.measure_from <= started < self.measure_until:
+            return
+        if ok:
+            self.latencies[name].append(elapsed)
+        else:
+            self.errors[name] += 1
+
+
+class VirtualUser:
+    def __init__(self, index: int, client: httpx.AsyncClient, recorder: Recorder, users: int, seed: int):
+        self.email = bench_email(index % users)
+        self.client = client
+        self.recorder = recorder
+        self.rng = random.Random(seed + index)
+        self.headers: dict[str, str] = {}
+        self.session_ids: list[str] = []
+        self.agent_ids: list[str] = []
+
+    async def _timed(self, name: str, method: str, url: str, **kwargs: Any) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(name, started, time.perf_counter() - started, ok=False)
+            return None
+        self.recorder.record(name, started, time.perf_counter() - started, ok=response.status_code < 400)
+        return response
+
+    async def login(self) -> None:
+        response = await self._timed(
+            "login", "POST", "/api/auth/login", json={"email": self.email, "password": BENCH_PASSWORD}
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def sessions(self) -> None:
+        response = await self._timed("sessions", "GET", "/api/sessions")
+        if response is not None and response.status_code == 200:
+            self.session_ids = [session["id"] for session in response.json()["sessions"]] or self.session_ids
+
+    async def agents(self) -> None:
+        response = await self._timed("agents", "GET", "/api/agents")
+        if response is not None and response.status_code == 200:
+            self.agent_ids = [agent["id"] for agent in response.json()]
+
+    async def history(self) -> None:
+        if self.session_ids:
+            await self._timed("history", "GET", f"/api/sessions/{self.rng.choice(self.session_ids)}/messages")
+
+    async def search(self) -> None:
+        await self._timed("search", "GET", "/api/search", params={"q": self.rng.choice(SEARCH_QUERIES)})
+
+    def _chat_body(self) -> dict[str, str]:
+        return {
+            "session_id": self.rng.choice(self.session_ids),
+            "agent_id": self.rng.choice(self.agent_ids),
+            "message": "Which risks should we address before launch?",
+        }
+
+    async def chat(self) -> None:
+        if self.session_ids and self.agent_ids:
+            await self._timed("chat", "POST", "/api/chat", json=self._chat_body())
+
+    async def chat_stream(self) -> None:
+        if not (self.session_ids and self.agent_ids):
+            return
+        started = time.perf_counter()
+        first_token: float | None = None
+        ok = False
+        try:
+            async with self.client.stream(
+                "POST", "/api/chat/stream", headers=self.headers, json=self._chat_body()
+            ) as response:
+                async for line in response.aiter_lines():
+                    if first_token is None and line == "event: delta":
+                        first_token = time.perf_counter() - started
+                    elif line == "event: done":
+                        ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        self.recorder.record("chat_stream", started, time.perf_counter() - started, ok)
+        if first_token is not None:
+            self.recorder.record("chat_stream.ttft", started, first_token, ok)
+
+    async def run(self, mix: dict[str, float], deadline: float) -> None:
+        await self.login()
+        await self.sessions()
+        await self.agents()
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+
+async def run_level(
+    base_url: str, concurrency: int, mix: dict[str, float], duration: float, warmup: float, users: int, seed: int
+) -> dict[str, Any]:
+    start = time.perf_counter()
+    recorder = Recorder(measure_from=start + warmup, measure_until=start + warmup + duration)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=httpx.Timeout(120.0)) as client:
+        virtual_users = [VirtualUser(i, client, recorder, users, seed) for i in range(concurrency)]
+        await asyncio.gather(*(vu.run(mix, recorder.measure_until) for vu in virtual_users))
+
+    names = sorted(set(recorder.latencies) | set(recorder.errors))
+    endpoints = {name: summarize(recorder.latencies[name], recorder.errors[name], duration) for name in names}
+    totals = [latency for name, values in recorder.latencies.items() if "." not in name for latency in values]
+    total_errors = sum(count for name, count in recorder.errors.items() if "." not in name)
+    return {
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "endpoints": endpoints,
+        "total": summarize(totals, total_errors, duration),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Processes
+# ---------------------------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"nothing listening on port {port} after {timeout:.0f}s")
+
+
+@contextmanager
+def spawn(module: str, args: list[str], port: int) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen([sys.executable, "-m", module, "--port", str(port), *args], cwd=BACKEND_DIR)
+    try:
+        wait_for_port(port, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def git_revision() -> dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--concurrency", default="4,16", help="comma-separated virtual-user counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="discarded seconds before each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--users", type=int, default=16, help="distinct seeded accounts")
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--history-messages", type=int, default=40, help="seeded messages per session")
+    parser.add_argument("--db-latency-ms", type=float, default=8.0)
+    parser.add_argument("--db-jitter-ms", type=float, default=2.0)
+    parser.add_argument("--ttft-ms", type=float, default=250.0)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--tokens", type=int, default=60)
+    parser.add_argument("--tables", action="store_true", help="use the table path instead of the chat RPCs")
+    parser.add_argument("--no-summaries", action="store_true")
+    parser.add_argument("--llm-max-in-flight", type=int, default=32, help="global LLM admission cap")
+    parser.add_argument("--user-rate-per-minute", type=float, default=0.0, help="per-user LLM rate limit (0 = off)")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    llm_port, api_port = free_port(), free_port()
+
+    stub_args = ["--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms), "--tokens", str(args.tokens)]
+    server_args = [
+        "--mode", args.mode,
+        "--llm-url", f"http://127.0.0.1:{llm_port}/v1",
+        "--users", str(args.users),
+        "--sessions-per-user", str(args.sessions_per_user),
+        "--history-messages", str(args.history_messages),
+        "--db-latency-ms", str(args.db_latency_ms),
+        "--db-jitter-ms", str(args.db_jitter_ms),
+        "--llm-max-in-flight", str(args.llm_max_in_flight),
+        "--user-rate-per-minute", str(args.user_rate_per_minute),
+    ]
+    server_args += ["--tables"] if args.tables else []
+    server_args += ["--no-summaries"] if args.no_summaries else []
+
+    results = []
+    with ExitStack() as stack:
+        stack.enter_context(spawn("benchmarks.llm_stub", stub_args, llm_port))
+        stack.enter_context(spawn("benchmarks.server", server_args, api_port))
+        for level in levels:
+            print(f"[bench] {args.mode}  concurrency={level}  duration={args.duration:.0f}s", file=sys.stderr)
+            result = asyncio.run(run_level(
+                f"http://127.0.0.1:{api_port}", level, mix, args.duration, args.warmup, args.users, args.seed
+            ))
+            total = result["total"]
+            print(f"[bench]   {total['rps']} req/s  p50={total['p50_ms']}ms  p99={total['p99_ms']}ms  "
+                  f"errors={total['errors']}", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mix": mix,
+            "config": {key: value for key, value in vars(args).items() if key not in {"output", "mix"}},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Boardroom API wired to the benchmark stand-ins.
+
+    python -m benchmarks.server --mode asgi --port 8900 --llm-url http://127.0.0.1:8901/v1
+
+Both serving modes run the real app with its real OpenAI client pointed at
+the LLM stub; only the Supabase client is swapped for a seeded, latency-
+injecting fake. Tokens are checked through the (fake) auth server and then
+cached, as with the default configuration.
+"""
+
+import argparse
+import contextlib
+import logging
+import os
+from typing import AsyncIterator
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "sb_secret_bench")
+os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+from flask import Flask  # noqa: E402
+
+import app as boardroom  # noqa: E402
+from benchmarks.fake_backends import AsyncLatentSupabase, Latency, LatentSupabase, seeded_fake  # noqa: E402
+
+
+def configure(args: argparse.Namespace) -> tuple[Flask, LatentSupabase]:
+    flask_app = boardroom.create_app({
+        "OPENROUTER_BASE": args.llm_url,
+        "OPENROUTER_KEY": "bench",
+        # Tokens go to the (fake) auth server, as with the default configuration.
+        "SUPABASE_JWT_SECRET": "",
+        "SUPABASE_JWKS_URL": "",
+        "SESSION_SUMMARIES": not args.no_summaries,
+        "CHAT_USE_RPC": not args.tables,
+        # Virtual users chat far faster than people; keep the global cap, drop the per-user buckets.
+        "LLM_MAX_IN_FLIGHT": args.llm_max_in_flight,
+        "LLM_USER_RATE_PER_MINUTE": args.user_rate_per_minute,
+    })
+    backend = LatentSupabase(
+        seeded_fake(args.users, args.sessions_per_user, args.history_messages),
+        Latency(args.db_latency_ms, args.db_jitter_ms),
+    )
+    flask_app.extensions["boardroom"].supabase = backend
+    # Per-request logs would skew latency.
+    boardroom.configure_logging()
+    logging.getLogger().setLevel(args.log_level.upper())
+    logging.getLogger("boardroom").setLevel(args.log_level.upper())
+    return flask_app, backend
+
+
+def serve_wsgi(args: argparse.Namespace, flask_app: Flask) -> None:
+    from werkzeug.serving import run_simple
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    run_simple(args.host, args.port, flask_app, threaded=True)
+
+
+def serve_asgi(args: argparse.Namespace, flask_app: Flask, backend: LatentSupabase) -> None:
+    import uvicorn
+
+    import asgi
+
+    application = asgi.create_application(flask_app)
+    original_lifespan = application.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(application) -> AsyncIterator[None]:
+        # Keep the real pooled OpenAI client; swap in the fake database.
+        async with original_lifespan(application):
+            flask_app.extensions["boardroom"].async_supabase = AsyncLatentSupabase(backend)
+            yield
+
+    application.router.lifespan_context = lifespan
+    uvicorn.run(application, host=args.host, port=args.port, log_level="warning")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], default="wsgi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8901/v1")
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--sessions-per-user", type=int, default=2)
+    parser.add_argument("--history-messages", type=int, default=40)
+    parser.add_argument("--db-latency-ms", type=float, default=8.0)
+    parser.add_argument("--db-jitter-ms", type=float, default=2.0)
+    parser.add_argument("--tables", action="store_true", help="use the table path instead of the chat RPCs")
+    parser.add_argument("--no-summaries", action="store_true")
+    parser.add_argument("--llm-max-in-flight", type=int, default=int(os.environ.get("LLM_MAX_IN_FLIGHT", "32")))
+    parser.add_argument("--user-rate-per-minute", type=float, default=0.0, help="per-user LLM rate limit (0 = off)")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    flask_app, backend = configure(args)
+    if args.mode == "asgi":
+        serve_asgi(args, flask_app, backend)
+    else:
+        serve_wsgi(args, flask_app)
+
+
+if __name__ == "__main__":
+    main()
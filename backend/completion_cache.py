@@ -0,0 +1,348 @@
+"""Cache of completed replies for byte-identical LLM inputs.
+
+Users re-ask the same canned questions of the same agent in fresh sessions,
+so the model input -- system prompt, context and message -- repeats exactly.
+``CompletionCache`` keys a finished reply by a SHA-256 digest of the model
+and that input and serves it again without an LLM call. Entries live in a
+bounded in-memory LRU and, when a path is given, in a SQLite file shared by
+worker processes and kept across restarts; both tiers expire entries after
+``ttl_seconds`` and evict the least recently used past their size bound.
+The disk tier is best effort: a locked or full database is logged and counts
+as a miss, or a store that didn't happen, never as a failed reply.
+
+A hit is replayed as a ``CachedStream`` and a miss is wrapped in a
+``CachingStream``, which stores the reply once it has been read to the end,
+so the chat routes treat both like any other model stream.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator
+
+from metrics import COMPLETION_CACHE_EVICTIONS, COMPLETION_CACHE_LOOKUPS
+from model_routing import ModelRoute
+
+log = logging.getLogger("boardroom")
+
+# Disk hits' recency updates are written this many at a time (or with the next put).
+TOUCH_BATCH_SIZE = 32
+
+# completion_rows keeps the row count, so a put only evicts when over the bound.
+_SCHEMA = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS completions (
+    key        TEXT PRIMARY KEY,
+    content    TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    used_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_used_at ON completions (used_at);
+CREATE INDEX IF NOT EXISTS completions_created_at ON completions (created_at);
+CREATE TABLE IF NOT EXISTS completion_rows (id INTEGER PRIMARY KEY CHECK (id = 1), n INTEGER NOT NULL);
+INSERT OR IGNORE INTO completion_rows (id, n) SELECT 1, COUNT(*) FROM completions;
+CREATE TRIGGER IF NOT EXISTS completions_counted_insert AFTER INSERT ON completions
+BEGIN UPDATE completion_rows SET n = n + 1 WHERE id = 1; END;
+CREATE TRIGGER IF NOT EXISTS completions_counted_delete AFTER DELETE ON completions
+BEGIN UPDATE completion_rows SET n = n - 1 WHERE id = 1; END;
+COMMIT;
+"""
+
+
+def completion_key(model: str, messages: list[dict[str, str]]) -> str:
+    """Digest of the model and the exact message list sent to it."""
+    payload = json.dumps({"model": model, "messages": messages}, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedCompletion:
+    content: str
+    # Route label of the model that produced the reply.
+    model: str
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400.0,
+        path: str | None = None,
+        max_disk_entries: int = 100_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, CachedCompletion]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        # Disk hits' used_at, not yet written.
+        self._touched: dict[str, float] = {}
+        if path:
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            # WAL lets several workers read while one writes.
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    @property
+    def on_disk(self) -> bool:
+        return self._db is not None
+
+    # -- memory tier ----------------------------------------------------------
+    def _memory_get(self, key: str, now: float) -> CachedCompletion | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, completion = entry
+            if created_at + self.ttl_seconds <= now:
+                del self._entries[key]
+                COMPLETION_CACHE_EVICTIONS.labels("memory", "expired").inc()
+                return None
+            self._entries.move_to_end(key)
+            return completion
+
+    def _memory_put(self, key: str, completion: CachedCompletion, created_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (created_at, completion)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                COMPLETION_CACHE_EVICTIONS.labels("memory", "size").inc()
+
+    # -- disk tier ------------------------------------------------------------
+    def _disk_get(self, key: str, now: float) -> tuple[float, CachedCompletion] | None:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT content, model, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, model, created_at = row
+            if created_at + self.ttl_seconds <= now:
+                self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+                COMPLETION_CACHE_EVICTIONS.labels("disk", "expired").inc()
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                try:
+                    self._write_touches()
+                except sqlite3.Error:
+                    log.warning("Completion cache recency updates dropped", exc_info=True)
+        return created_at, CachedCompletion(content, model)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """One write transaction; the connection otherwise autocommits each statement."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._db
+            self._db.execute("COMMIT")
+        except BaseException:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            raise
+
+    def _write_touches(self) -> None:
+        """Write pending recency updates in one transaction; the caller holds _db_lock."""
+        if not self._touched:
+            return
+        touched = [(used_at, key) for key, used_at in self._touched.items()]
+        self._touched.clear()
+        with self._transaction():
+            self._db.executemany("UPDATE completions SET used_at = MAX(used_at, ?) WHERE key = ?", touched)
+
+    def _disk_put(self, key: str, completion: CachedCompletion, now: float) -> None:
+        with self._db_lock:
+            self._write_touches()
+            with self._transaction():
+                self._db.execute(
+                    "INSERT INTO completions (key, content, model, created_at, used_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET content = excluded.content, model = excluded.model, "
+                    "created_at = excluded.created_at, used_at = excluded.used_at",
+                    (key, completion.content, completion.model, now, now),
+                )
+                expired = self._db.execute(
+                    "DELETE FROM completions WHERE created_at <= ?", (now - self.ttl_seconds,)
+                ).rowcount
+                (rows,) = self._db.execute("SELECT n FROM completion_rows WHERE id = 1").fetchone()
+                evicted = 0
+                if rows > self.max_disk_entries:
+                    evicted = self._db.execute(
+                        "DELETE FROM completions WHERE key IN (SELECT key FROM completions ORDER BY used_at LIMIT ?)",
+                        (rows - self.max_disk_entries,),
+                    ).rowcount
+        if expired:
+            COMPLETION_CACHE_EVICTIONS.labels("disk", "expired").inc(expired)
+        if evicted:
+            COMPLETION_CACHE_EVICTIONS.labels("disk", "size").inc(evicted)
+
+    # -- public API -----------------------------------------------------------
+    def get(self, key: str) -> CachedCompletion | None:
+        """The stored reply for ``key``, promoting disk hits to memory."""
+        now = self._clock()
+        completion = self._memory_get(key, now)
+        if completion is not None:
+            COMPLETION_CACHE_LOOKUPS.labels("memory_hit").inc()
+            return completion
+        if self._db is not None:
+            try:
+                stored = self._disk_get(key, now)
+            except sqlite3.Error:
+                log.warning("Completion cache read failed; treating it as a miss", exc_info=True)
+                stored = None
+            if stored is not None:
+                created_at, completion = stored
+                self._memory_put(key, completion, created_at)
+                COMPLETION_CACHE_LOOKUPS.labels("disk_hit").inc()
+                return completion
+        COMPLETION_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    def put(self, key: str, completion: CachedCompletion) -> None:
+        now = self._clock()
+        self._memory_put(key, completion, now)
+        if self._db is not None:
+            try:
+                self._disk_put(key, completion, now)
+            except sqlite3.Error:
+                log.warning("Completion cache write failed; reply not stored on disk", exc_info=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._touched.clear()
+                self._db.execute("DELETE FROM completions")
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                try:
+                    self._write_touches()
+                except sqlite3.Error:
+                    log.warning("Completion cache recency updates lost on close", exc_info=True)
+                self._db.close()
+                self._db = None
+
+
+# ---------------------------------------------------------------------------
+# Streams: replay a hit, or store a miss once it has been read to the end
+# ---------------------------------------------------------------------------
+def _chunk_text(chunk: Any) -> str:
+    return (chunk.choices[0].delta.content or "") if chunk.choices else ""
+
+
+class CachedStream:
+    """A stored reply, replayed as a single-chunk model stream."""
+
+    def __init__(self, completion: CachedCompletion):
+        self.completion = completion
+        self.route = ModelRoute.parse(completion.model)
+
+    def metadata(self) -> dict[str, Any]:
+        return {"model": self.route.label, "attempts": 0, "hedged": False, "ttft_ms": 0.0, "cached": True}
+
+    def _chunks(self) -> list[Any]:
+        delta = SimpleNamespace(content=self.completion.content)
+        return [SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._chunks())
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "CachedStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+
+class AsyncCachedStream(CachedStream):
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        for chunk in self._chunks():
+            yield chunk
+
+    async def close(self) -> None:  # type: ignore[override]
+        pass
+
+    async def __aenter__(self) -> "AsyncCachedStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        pass
+
+
+class CachingStream:
+    """Passes a routed stream through and hands its reply to ``store`` once
+    fully read; replies cut short (errors, disconnects) are not stored."""
+
+    def __init__(self, stream: Any, store: Callable[[CachedCompletion], None]):
+        self._stream = stream
+        self._store = store
+        self.route = stream.route
+
+    def metadata(self) -> dict[str, Any]:
+        return self._stream.metadata()
+
+    def __iter__(self) -> Iterator[Any]:
+        parts: list[str] = []
+        for chunk in self._stream:
+            parts.append(_chunk_text(chunk))
+            yield chunk
+        if any(parts):
+            # The reply has been sent; failing to cache it must not fail the turn.
+            try:
+                self._store(CachedCompletion("".join(parts), self.route.label))
+            except Exception:
+                log.exception("Could not store a completion")
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def __enter__(self) -> "CachingStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class AsyncCachingStream(CachingStream):
+    def __init__(self, stream: Any, store: Callable[[CachedCompletion], Awaitable[None]]):
+        super().__init__(stream, store)  # type: ignore[arg-type]
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        parts: list[str] = []
+        async for chunk in self._stream:
+            parts.append(_chunk_text(chunk))
+            yield chunk
+        if any(parts):
+            try:
+                await self._store(CachedCompletion("".join(parts), self.route.label))
+            except Exception:
+                log.exception("Could not store a completion")
+
+    async def close(self) -> None:  # type: ignore[override]
+        await self._stream.close()
+
+    async def __aenter__(self) -> "AsyncCachingStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
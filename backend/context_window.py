@@ -0,0 +1,162 @@
+"""Token-budgeted context window for chat turns.
+
+Rather than a fixed number of history messages, each turn packs as much recent
+history as fits a token budget. Tokens are counted locally with tiktoken using
+the encoding of the configured model; when tiktoken or its encoding files are
+unavailable (e.g. an offline host) a characters-per-token estimate is used.
+"""
+
+import logging
+import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+log = logging.getLogger("boardroom")
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - exercised only without the optional dependency
+    tiktoken = None
+
+FALLBACK_ENCODING = "o200k_base"
+CHARS_PER_TOKEN = 4
+# Role and separator tokens added by the chat format around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = "\n[…truncated]"
+SUMMARY_PREAMBLE = "Summary of the earlier discussion in this session:\n"
+
+
+class TokenCounter:
+    """Counts and truncates text with a tiktoken encoding, or estimates without one."""
+
+    def __init__(self, encoding: Any = None):
+        self.encoding = encoding
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def message_tokens(self, message: dict[str, str]) -> int:
+        return MESSAGE_OVERHEAD_TOKENS + self.count(message["content"])
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` to at most ``max_tokens`` tokens, marker included."""
+        if self.count(text) <= max_tokens:
+            return text
+        keep = max(max_tokens - self.count(TRUNCATION_MARKER), 0)
+        if self.encoding is None:
+            head = text[: keep * CHARS_PER_TOKEN]
+        else:
+            head = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:keep])
+        return head + TRUNCATION_MARKER
+
+
+def _model_name(model: str) -> str:
+    # OpenRouter ids carry a provider prefix ("openai/gpt-4o-mini").
+    return model.rsplit("/", 1)[-1]
+
+
+@lru_cache(maxsize=8)
+def token_counter(model: str) -> TokenCounter:
+    """Counter for ``model``; loaded once per process since encodings are large."""
+    if tiktoken is None:
+        log.warning("tiktoken not installed; estimating context tokens at %d chars/token", CHARS_PER_TOKEN)
+        return TokenCounter()
+
+    try:
+        encoding = tiktoken.encoding_for_model(_model_name(model))
+    except KeyError:
+        # Non-OpenAI models have no registered encoding; o200k is a close enough proxy.
+        encoding = None
+    except Exception:
+        log.warning("Could not load tokenizer for %s; estimating context tokens", model, exc_info=True)
+        return TokenCounter()
+
+    if encoding is None:
+        try:
+            encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+        except Exception:
+            log.warning("Could not load %s tokenizer; estimating context tokens", FALLBACK_ENCODING, exc_info=True)
+            return TokenCounter()
+
+    log.info("Context tokenizer: %s (model=%s)", encoding.name, model)
+    return TokenCounter(encoding)
+
+
+@dataclass(frozen=True, slots=True)
+class ContextWindow:
+    messages: list[dict[str, str]]
+    tokens: int
+    budget: int
+    history_messages: int
+    truncated_messages: int
+    summarized: bool = False
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "messages": self.history_messages,
+            "tokens": self.tokens,
+            "budget": self.budget,
+            "summary": self.summarized,
+        }
+
+
+def build_context(
+    system_prompt: str,
+    history: list[dict[str, str]],
+    counter: TokenCounter,
+    budget: int,
+    max_message_tokens: int,
+    summary: str | None = None,
+) -> ContextWindow:
+    """Pack the system prompt plus as much of ``history`` (oldest first) as fits.
+
+    The system prompt, the session summary if any (which covers everything
+    before ``history``) and the newest message (the user turn being answered) are
+    always included; the newest message is only truncated if it alone would
+    overflow the budget. Older messages are capped at ``max_message_tokens``
+    each and added newest-first until the next one no longer fits.
+    """
+    preamble = [{"role": "system", "content": system_prompt}]
+    if summary:
+        preamble.append({"role": "system", "content": SUMMARY_PREAMBLE + summary})
+    used = sum(counter.message_tokens(msg) for msg in preamble)
+    truncated = 0
+    packed: list[dict[str, str]] = []
+
+    if history:
+        latest = {"role": history[-1]["role"], "content": history[-1]["content"]}
+        room = max(budget - used - MESSAGE_OVERHEAD_TOKENS, max_message_tokens)
+        content = counter.truncate(latest["content"], room)
+        if content != latest["content"]:
+            latest["content"] = content
+            truncated += 1
+        packed.append(latest)
+        used += counter.message_tokens(latest)
+
+    for msg in reversed(history[:-1]):
+        content = counter.truncate(msg["content"], max_message_tokens)
+        candidate = {"role": msg["role"], "content": content}
+        cost = counter.message_tokens(candidate)
+        if used + cost > budget:
+            break
+        if content != msg["content"]:
+            truncated += 1
+        packed.append(candidate)
+        used += cost
+
+    packed.reverse()
+    return ContextWindow(
+        messages=[*preamble, *packed],
+        tokens=used,
+        budget=budget,
+        history_messages=len(packed),
+        truncated_messages=truncated,
+        summarized=bool(summary),
+    )
@@ -0,0 +1,129 @@
+"""Per-user change events for live updates across tabs and devices.
+
+Writes publish events (``message_inserted``, ``session_created``,
+``session_updated``, ``sessions_changed``) to the writing user's stream, and
+``GET /api/events`` pushes them to every open connection of that user as
+Server-Sent Events. Each event id is a cursor, ``<epoch>-<seq>``: ``epoch``
+names this worker's hub and ``seq`` counts its events. A reconnecting client
+sends the last id it saw and is replayed what it missed from a bounded
+per-user buffer.
+
+Events live in the memory of the worker that published them. A cursor from
+another worker or a restarted one, or one older than the buffer reaches
+back, can't be resumed; ``since`` returns ``None`` and the stream tells the
+client to ``sync``, i.e. catch up through the delta reads (``after=`` on
+messages, a conditional session list) rather than refetch everything.
+
+Nor does a stream see events published by another worker, so serve.py runs
+a single worker while live events are on (``LIVE_EVENTS``). Several workers
+would need the events and their cursors in a log they all share, e.g. Postgres
+LISTEN/NOTIFY or Supabase Realtime.
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from metrics import EVENTS_PUBLISHED
+
+log = logging.getLogger("boardroom")
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    seq: int
+    kind: str
+    data: dict[str, Any]
+
+
+class _UserEvents:
+    __slots__ = ("events", "dropped_through", "subscribers")
+
+    def __init__(self, buffer_size: int, dropped_through: int):
+        self.events: deque[Event] = deque(maxlen=buffer_size)
+        # Events up to this seq may have been dropped from the buffer.
+        self.dropped_through = dropped_through
+        self.subscribers: set[Callable[[], None]] = set()
+
+
+class EventHub:
+    def __init__(self, buffer_size: int = 256, max_users: int = 10000, epoch: str | None = None):
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self.epoch = epoch or uuid.uuid4().hex[:12]
+        self._seq = 0
+        # Cursors below this may have lost events with an evicted user buffer.
+        self._floor = 0
+        self._users: OrderedDict[str, _UserEvents] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cursor(self) -> str:
+        """The id of the newest event published so far, by anyone."""
+        with self._lock:
+            return f"{self.epoch}-{self._seq}"
+
+    def _user(self, user_id: str) -> _UserEvents:
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _UserEvents(self.buffer_size, self._floor)
+            # Users with open streams are never evicted, so this may briefly overshoot.
+            idle = [uid for uid, u in self._users.items() if not u.subscribers and uid != user_id]
+            for uid in idle[: max(len(self._users) - self.max_users, 0)]:
+                evicted = self._users.pop(uid)
+                if evicted.events:
+                    self._floor = max(self._floor, evicted.events[-1].seq)
+        self._users.move_to_end(user_id)
+        return user
+
+    def publish(self, user_id: str, kind: str, data: dict[str, Any]) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(f"{self.epoch}-{self._seq}", self._seq, kind, data)
+            user = self._user(user_id)
+            if len(user.events) == user.events.maxlen:
+                user.dropped_through = user.events[0].seq
+            user.events.append(event)
+            subscribers = list(user.subscribers)
+        EVENTS_PUBLISHED.labels(kind).inc()
+        for wake in subscribers:
+            try:
+                wake()
+            except Exception:
+                # A stream whose event loop is gone; it unsubscribes as it closes.
+                log.warning("Event stream wake-up failed  user=%s", user_id, exc_info=True)
+        return event
+
+    def since(self, user_id: str, cursor: str | None) -> list[Event] | None:
+        """The user's events after ``cursor``, oldest first, or ``None`` when
+        some of them may be lost (see the module docstring)."""
+        epoch, _, seq = (cursor or "").rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        after = int(seq)
+        with self._lock:
+            if after > self._seq:
+                return None
+            user = self._users.get(user_id)
+            if user is None:
+                return [] if after >= self._floor else None
+            if after < user.dropped_through:
+                return None
+            return [event for event in user.events if event.seq > after]
+
+    def subscribe(self, user_id: str, wake: Callable[[], None]) -> Callable[[], None]:
+        """Call ``wake`` (from the publishing thread) whenever the user gets an
+        event; returns the function that unsubscribes it."""
+        with self._lock:
+            self._user(user_id).subscribers.add(wake)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                user = self._users.get(user_id)
+                if user is not None:
+                    user.subscribers.discard(wake)
+
+        return unsubscribe
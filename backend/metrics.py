@@ -0,0 +1,242 @@
+"""Per-stage request timing and Prometheus metrics.
+
+A request's time is split into named stages (``auth``, ``db_history``,
+``llm`` ...) with ``span()``. Each stage is observed in a histogram labelled
+by route and stage, and added up per request for the ``Server-Timing``
+response header. The current request's ``RequestTimer`` lives in a context
+variable, so the shared chat pipeline records spans the same way under Flask
+threads, asyncio tasks and worker threads started with a copied context.
+Spans outside any request (background summary refreshes) are labelled with
+the route ``background``.
+
+Under several worker processes, set ``PROMETHEUS_MULTIPROC_DIR`` to a shared,
+empty directory so ``/metrics`` aggregates all of them.
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+BACKGROUND_ROUTE = "background"
+
+# Sub-millisecond cache hits up to multi-minute completions.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+registry = CollectorRegistry()
+
+REQUEST_DURATION = Histogram(
+    "boardroom_request_duration_seconds",
+    "Wall time of HTTP requests, until the last byte of the body.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+STAGE_DURATION = Histogram(
+    "boardroom_stage_duration_seconds",
+    "Time spent in each named stage of a request.",
+    ["route", "stage"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+LLM_TOKENS = Counter(
+    "boardroom_llm_tokens",
+    "LLM tokens reported by completion usage, by agent, model and kind (prompt, completion, total).",
+    ["agent", "model", "kind"],
+    registry=registry,
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "boardroom_llm_in_flight",
+    "LLM admission slots currently held.",
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "boardroom_llm_queue_depth",
+    "LLM calls waiting for an admission slot.",
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+LLM_QUEUE_WAIT = Histogram(
+    "boardroom_llm_queue_wait_seconds",
+    "Time admitted LLM calls waited for a slot.",
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+LLM_ADMISSION_REJECTED = Counter(
+    "boardroom_llm_admission_rejected",
+    "LLM calls turned away with 429, by reason (rate_limited, queue_full, deadline).",
+    ["reason"],
+    registry=registry,
+)
+
+LLM_ATTEMPTS = Counter(
+    "boardroom_llm_attempts",
+    "Completion requests per model route, by outcome (served, cancelled, failed, deadline).",
+    ["model", "outcome"],
+    registry=registry,
+)
+LLM_HEDGES = Counter(
+    "boardroom_llm_hedges",
+    "Hedged requests sent to a route because earlier ones had no first token yet.",
+    ["model"],
+    registry=registry,
+)
+LLM_TTFT = Histogram(
+    "boardroom_llm_ttft_seconds",
+    "Time to first token of the request that served each completion, by model route.",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+    registry=registry,
+)
+
+COMPLETION_CACHE_LOOKUPS = Counter(
+    "boardroom_completion_cache_lookups",
+    "Completion cache lookups, by result (memory_hit, disk_hit, miss).",
+    ["result"],
+    registry=registry,
+)
+COMPLETION_CACHE_EVICTIONS = Counter(
+    "boardroom_completion_cache_evictions",
+    "Completion cache entries dropped, by tier (memory, disk) and reason (expired, size).",
+    ["tier", "reason"],
+    registry=registry,
+)
+
+WRITE_BEHIND_PENDING = Gauge(
+    "boardroom_write_behind_pending",
+    "Journaled chat writes not yet applied to the database.",
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+WRITE_BEHIND_FLUSHES = Counter(
+    "boardroom_write_behind_flushes",
+    "Write-behind batches, by outcome (applied, failed, dead_lettered).",
+    ["outcome"],
+    registry=registry,
+)
+
+READS_COALESCED = Counter(
+    "boardroom_reads_coalesced",
+    "Read requests by resource and how they were served (leader, shared, reused).",
+    ["resource", "outcome"],
+    registry=registry,
+)
+
+EVENT_STREAMS = Gauge(
+    "boardroom_event_streams",
+    "Open /api/events streams.",
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+EVENTS_PUBLISHED = Counter(
+    "boardroom_events_published",
+    "Change events published to users' event streams, by kind.",
+    ["kind"],
+    registry=registry,
+)
+EVENT_SYNCS = Counter(
+    "boardroom_event_syncs",
+    "sync events sent to event streams whose cursor could not be resumed.",
+    registry=registry,
+)
+
+_SERVER_TIMING_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class RequestTimer:
+    """Stage durations of one request."""
+
+    def __init__(self, route: str):
+        self.route = route
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        STAGE_DURATION.labels(self.route, stage).observe(seconds)
+        # Concurrent spans of one stage (e.g. roundtable agents) add up.
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started)
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` value for the stages so far, plus ``total``."""
+        with self._lock:
+            stages = list(self.stages.items())
+        stages.append(("total", time.perf_counter() - self.started))
+        return ", ".join(f"{_SERVER_TIMING_NAME.sub('_', name)};dur={seconds * 1000:.1f}" for name, seconds in stages)
+
+    def finish(self, method: str, status: int) -> None:
+        """Observe the request's total duration; later calls are ignored."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+        REQUEST_DURATION.labels(method, self.route, str(status)).observe(time.perf_counter() - self.started)
+
+
+_current_timer: ContextVar[RequestTimer | None] = ContextVar("boardroom_request_timer", default=None)
+
+
+def start_request(route: str) -> RequestTimer:
+    """Begin timing a request to ``route`` (a route pattern, not the raw path)."""
+    timer = RequestTimer(route)
+    _current_timer.set(timer)
+    return timer
+
+
+def current_request() -> RequestTimer | None:
+    return _current_timer.get()
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(stage, seconds)
+    else:
+        STAGE_DURATION.labels(BACKGROUND_ROUTE, stage).observe(seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as ``stage`` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def record_llm_usage(agent: str, model: str, usage: Any) -> None:
+    """Count the tokens in an OpenAI ``usage`` object; a missing one is skipped."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion", "total"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if tokens:
+            LLM_TOKENS.labels(agent, model, kind).inc(tokens)
+
+
+def exposition() -> tuple[bytes, str]:
+    """Prometheus text exposition of every metric, and its content type."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        aggregate = CollectorRegistry()
+        multiprocess.MultiProcessCollector(aggregate)
+        return generate_latest(aggregate), CONTENT_TYPE_LATEST
+    return generate_latest(registry), CONTENT_TYPE_LATEST
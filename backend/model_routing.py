@@ -0,0 +1,411 @@
+"""Model routing with hedged requests and a per-call deadline.
+
+``ModelRouter`` opens a streamed completion on its first route. If no
+content token has arrived ``hedge_after_seconds`` later, the same request is
+also sent to the next route, and so on down the list; a route that fails
+outright is replaced by the next one straight away. Whichever request
+produces a token first serves the reply and every other one is closed. A call
+with no token after ``deadline_seconds`` fails with ``DeadlineExceeded``.
+
+A route is a model id, optionally pinned to one OpenRouter provider as
+``model@provider``. Each attempt's time to first token and outcome (served,
+cancelled, failed, deadline) is exported per route, so the hedge threshold
+can be tuned from real traffic.
+
+Flask threads call ``open_stream``, which waits for the race on a small
+thread pool; event loops (asgi.py) call ``open_stream_async``. A single
+route runs the same way, only never hedged, so the deadline holds for it
+too. The deadline is also each request's HTTP timeout, and a call whose
+routes all failed that way fails with ``DeadlineExceeded`` as well.
+"""
+
+import asyncio
+import contextvars
+import logging
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterator, NoReturn
+
+from metrics import LLM_ATTEMPTS, LLM_HEDGES, LLM_TTFT
+
+log = logging.getLogger("boardroom")
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    provider: str | None = None
+
+    @classmethod
+    def parse(cls, spec: str) -> "ModelRoute":
+        model, _, provider = spec.strip().partition("@")
+        if not model:
+            raise ValueError(f"Invalid model route: {spec!r}")
+        return cls(model, provider or None)
+
+    @property
+    def label(self) -> str:
+        return f"{self.model}@{self.provider}" if self.provider else self.model
+
+    def request_options(self) -> dict[str, Any]:
+        options: dict[str, Any] = {"model": self.model}
+        if self.provider:
+            options["extra_body"] = {"provider": {"order": [self.provider], "allow_fallbacks": False}}
+        return options
+
+
+def parse_routes(primary: str, fallbacks: str = "") -> list[ModelRoute]:
+    """The primary route, then the comma-separated fallbacks, without repeats."""
+    specs = [primary, *fallbacks.split(",")]
+    routes = [ModelRoute.parse(spec) for spec in specs if spec.strip()]
+    return list(dict.fromkeys(routes))
+
+
+def _has_content(chunk: Any) -> bool:
+    return bool(chunk.choices) and bool(chunk.choices[0].delta.content)
+
+
+def _is_timeout(error: BaseException) -> bool:
+    """Whether ``error`` is an HTTP timeout. The SDKs are only looked at if
+    already imported; an error of theirs means they are."""
+    timeouts: list[type[BaseException]] = [TimeoutError]
+    for module, name in (("openai", "APITimeoutError"), ("httpx", "TimeoutException")):
+        if module in sys.modules:
+            timeouts.append(getattr(sys.modules[module], name))
+    return isinstance(error, tuple(timeouts))
+
+
+# ---------------------------------------------------------------------------
+# Attempts: one route's request, up to its first content token
+# ---------------------------------------------------------------------------
+class _Attempt:
+    def __init__(self, route: ModelRoute, clock: Callable[[], float]):
+        self.route = route
+        self.started = clock()
+        self.ttft = 0.0
+        self.stream: Any = None
+        self.iterator: Any = None
+        # Chunks read up to and including the first with content.
+        self.buffered: list[Any] = []
+        self._clock = clock
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def run(self, create: Callable[..., Any], request: dict[str, Any]) -> None:
+        stream = create(**request, **self.route.request_options())
+        with self._lock:
+            cancelled = self._cancelled
+            self.stream = stream
+        if cancelled:
+            stream.close()
+            return
+        self.iterator = iter(stream)
+        for chunk in self.iterator:
+            self.buffered.append(chunk)
+            if _has_content(chunk):
+                break
+        self.ttft = self._clock() - self.started
+
+    def cancel(self) -> None:
+        """Close the stream from another thread, or as soon as it opens."""
+        with self._lock:
+            self._cancelled = True
+            stream = self.stream
+        if stream is not None:
+            stream.close()
+
+    async def run_async(self, create: Callable[..., Any], request: dict[str, Any]) -> None:
+        try:
+            self.stream = await create(**request, **self.route.request_options())
+            self.iterator = self.stream.__aiter__()
+            while True:
+                try:
+                    chunk = await self.iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                self.buffered.append(chunk)
+                if _has_content(chunk):
+                    break
+            self.ttft = self._clock() - self.started
+        except BaseException:
+            # Losers are cancelled mid-request; don't leave their connection open.
+            await self.aclose()
+            raise
+
+    async def aclose(self) -> None:
+        if self.stream is not None:
+            await self.stream.close()
+
+
+def _record_outcome(attempt: _Attempt, outcome: str) -> None:
+    LLM_ATTEMPTS.labels(attempt.route.label, outcome).inc()
+
+
+# ---------------------------------------------------------------------------
+# The winning stream
+# ---------------------------------------------------------------------------
+class RoutedStream:
+    """The served attempt's chunks, from the first one, plus how it was routed."""
+
+    def __init__(self, attempt: _Attempt, attempts: int, hedged: bool):
+        self.route = attempt.route
+        self.attempts = attempts
+        self.hedged = hedged
+        self.ttft = attempt.ttft
+        self._attempt = attempt
+
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "model": self.route.label,
+            "attempts": self.attempts,
+            "hedged": self.hedged,
+            "ttft_ms": round(self.ttft * 1000, 1),
+            "cached": False,
+        }
+
+    def __iter__(self) -> Iterator[Any]:
+        yield from self._attempt.buffered
+        yield from self._attempt.iterator
+
+    def close(self) -> None:
+        self._attempt.stream.close()
+
+    def __enter__(self) -> "RoutedStream":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class AsyncRoutedStream(RoutedStream):
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        for chunk in self._attempt.buffered:
+            yield chunk
+        while True:
+            try:
+                chunk = await self._attempt.iterator.__anext__()
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+    async def close(self) -> None:  # type: ignore[override]
+        await self._attempt.aclose()
+
+    async def __aenter__(self) -> "AsyncRoutedStream":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+
+# ---------------------------------------------------------------------------
+# Router
+# ---------------------------------------------------------------------------
+# Strong references to background closes of late losers (asyncio keeps weak ones).
+_closing: set[asyncio.Task] = set()
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        routes: list[ModelRoute],
+        hedge_after_seconds: float = 4.0,
+        deadline_seconds: float = 120.0,
+        max_workers: int = 32,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if not routes:
+            raise ValueError("ModelRouter needs at least one route")
+        self.routes = routes
+        self.hedge_after_seconds = hedge_after_seconds
+        self.deadline_seconds = deadline_seconds
+        self.max_workers = max_workers
+        self._clock = clock
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def primary(self) -> ModelRoute:
+        return self.routes[0]
+
+    def describe(self) -> str:
+        return " -> ".join(route.label for route in self.routes)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-route")
+            return self._executor
+
+    def _request(self, request: dict[str, Any]) -> dict[str, Any]:
+        return {**request, "stream": True, "timeout": self.deadline_seconds}
+
+    def _served(self, winner: _Attempt, attempts: list[_Attempt], hedges: int) -> None:
+        _record_outcome(winner, "served")
+        LLM_TTFT.labels(winner.route.label).observe(winner.ttft)
+        if len(attempts) > 1:
+            log.info("LLM call served by %s  attempts=%d  hedges=%d  ttft=%.2fs",
+                     winner.route.label, len(attempts), hedges, winner.ttft)
+
+    def _failed(self, attempt: _Attempt, error: BaseException) -> None:
+        _record_outcome(attempt, "failed")
+        log.warning("LLM route failed  route=%s  error=%s", attempt.route.label, error)
+
+    def _hedge(self, attempts: list[_Attempt]) -> ModelRoute:
+        route = self.routes[len(attempts)]
+        LLM_HEDGES.labels(route.label).inc()
+        log.info("No first token after %.1fs; hedging to %s", self._clock() - attempts[0].started, route.label)
+        return route
+
+    def _deadline(self, live: list[_Attempt]) -> DeadlineExceeded:
+        for attempt in live:
+            _record_outcome(attempt, "deadline")
+        return DeadlineExceeded(
+            f"No first token within {self.deadline_seconds:.0f}s from {', '.join(a.route.label for a in live)}"
+        )
+
+    def _all_failed(self, error: BaseException) -> NoReturn:
+        """Raise for a call whose routes all failed, the last with ``error``."""
+        if _is_timeout(error):
+            raise DeadlineExceeded(f"No first token within {self.deadline_seconds:.0f}s: {error}") from error
+        raise error
+
+    def _wait_seconds(self, now: float, deadline: float, next_hedge: float, can_hedge: bool) -> float:
+        return max((min(deadline, next_hedge) if can_hedge else deadline) - now, 0.0)
+
+    def open_stream(self, client: Any, **request: Any) -> RoutedStream:
+        """Stream a completion from the first route to produce a token."""
+        create = client.chat.completions.create
+        request = self._request(request)
+        events: queue.Queue = queue.Queue()
+        attempts: list[_Attempt] = []
+        settled: set[_Attempt] = set()
+        winner: _Attempt | None = None
+        hedges = 0
+        error: BaseException | None = None
+
+        def run(attempt: _Attempt) -> None:
+            try:
+                attempt.run(create, request)
+                events.put((attempt, None))
+            except Exception as exc:
+                events.put((attempt, exc))
+
+        def launch(route: ModelRoute) -> None:
+            attempt = _Attempt(route, self._clock)
+            attempts.append(attempt)
+            self._pool().submit(contextvars.copy_context().run, run, attempt)
+
+        started = self._clock()
+        deadline = started + self.deadline_seconds
+        next_hedge = started + self.hedge_after_seconds
+        launch(self.primary)
+        try:
+            while True:
+                now = self._clock()
+                can_hedge = len(attempts) < len(self.routes)
+                if now >= deadline:
+                    raise self._deadline([a for a in attempts if a not in settled])
+                try:
+                    attempt, error = events.get(timeout=self._wait_seconds(now, deadline, next_hedge, can_hedge))
+                except queue.Empty:
+                    if can_hedge and self._clock() >= next_hedge:
+                        launch(self._hedge(attempts))
+                        hedges += 1
+                        next_hedge = self._clock() + self.hedge_after_seconds
+                    continue
+
+                settled.add(attempt)
+                if error is None:
+                    winner = attempt
+                    self._served(winner, attempts, hedges)
+                    return RoutedStream(winner, attempts=len(attempts), hedged=hedges > 0)
+                self._failed(attempt, error)
+                if can_hedge:
+                    launch(self.routes[len(attempts)])
+                    next_hedge = self._clock() + self.hedge_after_seconds
+                elif len(settled) == len(attempts):
+                    self._all_failed(error)
+        finally:
+            for attempt in attempts:
+                if attempt is winner:
+                    continue
+                if winner is not None and attempt not in settled:
+                    _record_outcome(attempt, "cancelled")
+                attempt.cancel()
+
+    async def open_stream_async(self, client: Any, **request: Any) -> AsyncRoutedStream:
+        """``open_stream`` for event loops; losing requests are cancelled."""
+        create = client.chat.completions.create
+        request = self._request(request)
+        tasks: dict[asyncio.Task, _Attempt] = {}
+        pending: set[asyncio.Task] = set()
+        winner: _Attempt | None = None
+        hedges = 0
+        error: BaseException | None = None
+
+        def launch(route: ModelRoute) -> None:
+            attempt = _Attempt(route, self._clock)
+            task = asyncio.create_task(attempt.run_async(create, request))
+            tasks[task] = attempt
+            pending.add(task)
+
+        started = self._clock()
+        deadline = started + self.deadline_seconds
+        next_hedge = started + self.hedge_after_seconds
+        launch(self.primary)
+        try:
+            while True:
+                now = self._clock()
+                can_hedge = len(tasks) < len(self.routes)
+                if now >= deadline:
+                    raise self._deadline([tasks[task] for task in pending])
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._wait_seconds(now, deadline, next_hedge, can_hedge),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    if can_hedge and self._clock() >= next_hedge:
+                        launch(self._hedge(list(tasks.values())))
+                        hedges += 1
+                        next_hedge = self._clock() + self.hedge_after_seconds
+                    continue
+
+                pending.difference_update(done)
+                for task in done:
+                    if task.exception() is None:
+                        winner = winner or tasks[task]
+                    else:
+                        error = task.exception()
+                        self._failed(tasks[task], error)
+                if winner is not None:
+                    self._served(winner, list(tasks.values()), hedges)
+                    return AsyncRoutedStream(winner, attempts=len(tasks), hedged=hedges > 0)
+                if can_hedge:
+                    launch(self.routes[len(tasks)])
+                    next_hedge = self._clock() + self.hedge_after_seconds
+                elif not pending:
+                    self._all_failed(error)
+        finally:
+            for task, attempt in tasks.items():
+                if attempt is winner:
+                    continue
+                if not task.done():
+                    if winner is not None:
+                        _record_outcome(attempt, "cancelled")
+                    task.cancel()
+                elif not task.cancelled() and task.exception() is None:
+                    # Finished in the same tick as the winner.
+                    _record_outcome(attempt, "cancelled")
+                    closing = asyncio.ensure_future(attempt.aclose())
+                    _closing.add(closing)
+                    closing.add_done_callback(_closing.discard)
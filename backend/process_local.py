@@ -0,0 +1,94 @@
+"""Lazily created, per-process singletons for clients that must not cross a fork.
+
+The Supabase and OpenAI clients hold connection pools, the completion cache a
+SQLite connection and the write-behind queue a locked journal file and a
+thread. None of them survives ``fork()``: a preforking server that imports the
+app in its master would hand every worker the same sockets and file locks.
+``ProcessLocal`` builds its object on first use and forgets it in a forked
+child, which builds its own. Importing the app therefore creates nothing, and
+tests and tools only pay for the clients they touch.
+
+A ``ProcessLocal`` forwards attribute access to its object, so an app's
+services (``app.Services``) can hold one where they would hold the client
+itself -- except for the proxy's own names (``get``, ``close``, ``peek``,
+``name``), which callers resolve with ``get()`` first.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Callable, Generic, TypeVar
+
+log = logging.getLogger("boardroom")
+
+T = TypeVar("T")
+
+_instances: "weakref.WeakSet[ProcessLocal[Any]]" = weakref.WeakSet()
+
+
+class ProcessLocal(Generic[T]):
+    def __init__(self, factory: Callable[[], T], name: str, close: Callable[[T], None] | None = None):
+        self.name = name
+        self._factory = factory
+        self._close = close
+        self._value: T | None = None
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+    def get(self) -> T:
+        """The object for this process, created on the first call."""
+        value = self._value
+        if value is None:
+            with self._lock:
+                value = self._value
+                if value is None:
+                    # A factory that raises leaves nothing behind; the next call retries.
+                    value = self._value = self._factory()
+                    log.debug("Created %s  pid=%d", self.name, os.getpid())
+        return value
+
+    def peek(self) -> T | None:
+        """The object if this process created it already, without creating it."""
+        return self._value
+
+    def close(self) -> None:
+        with self._lock:
+            value, self._value = self._value, None
+        if value is not None and self._close is not None:
+            self._close(value)
+
+    def _forget(self) -> None:
+        # The parent's object (and its lock, possibly held by a thread that
+        # didn't survive the fork) belong to the parent.
+        self._lock = threading.Lock()
+        self._value = None
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only reached for names the proxy itself lacks; its own are missing
+        # only mid-construction (or unpickling), and must not recurse.
+        if attr.startswith("__") or attr in ("_value", "_factory", "_close", "_lock", "name"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        state = "created" if self._value is not None else "not created"
+        return f"<ProcessLocal {self.name} ({state})>"
+
+
+def _after_fork_in_child() -> None:
+    for instance in list(_instances):
+        instance._forget()
+
+
+def _close_all() -> None:
+    for instance in list(_instances):
+        try:
+            instance.close()
+        except Exception:
+            log.warning("Closing %s failed", instance.name, exc_info=True)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+atexit.register(_close_all)
@@ -0,0 +1,186 @@
+"""Full-text search over a user's transcripts.
+
+``GET /api/search`` calls the ``search_messages`` RPC in supabase/schema.sql:
+a ``websearch_to_tsquery`` match against the GIN-indexed ``content_tsv``
+column of messages, ranked with ``ts_rank`` and highlighted with
+``ts_headline``. Headlines mark matches with ``HIGHLIGHT_START`` and
+``HIGHLIGHT_STOP`` (control characters, so no markup from message content is
+ever rendered); ``snippet_segments`` turns one into plain text segments.
+
+``InvertedIndex`` implements the same RPC in memory for the Supabase fake
+used by the tests and benchmarks. It approximates the ``english`` text
+search configuration: lowercased words, a few stop words, crude suffix
+stemming, and phrases matched as plain conjunctions.
+"""
+
+import heapq
+import math
+import re
+from typing import Any, Iterable
+
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+# Longest accepted query, in characters.
+SEARCH_QUERY_MAX_CHARS = 256
+
+# ts_headline options; the in-memory index cuts a single fragment of MaxWords.
+HEADLINE_MAX_WORDS = 24
+
+
+def snippet_segments(headline: str) -> list[dict[str, Any]]:
+    """``headline`` as ``[{"text", "match"}]`` segments, in order, without markers."""
+    segments: list[dict[str, Any]] = []
+    match = False
+    for part in re.split(f"([{HIGHLIGHT_START}{HIGHLIGHT_STOP}])", headline):
+        if part in (HIGHLIGHT_START, HIGHLIGHT_STOP):
+            match = part == HIGHLIGHT_START
+        elif part:
+            if segments and segments[-1]["match"] == match:
+                segments[-1]["text"] += part
+            else:
+                segments.append({"text": part, "match": match})
+    return segments
+
+
+# ---------------------------------------------------------------------------
+# In-memory index
+# ---------------------------------------------------------------------------
+_WORD = re.compile(r"\w+")
+_QUERY_TOKEN = re.compile(r'"[^"]*"?|\S+')
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have i if in into is it its no not of on or our so such "
+    "that the their then there these they this to was we were will with you your".split()
+)
+_SUFFIXES = ("ing", "ed", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    # "cache", "caches", "cached" and "caching" all become "cach".
+    return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+
+def _lexemes(text: str) -> Iterable[tuple[re.Match[str], str]]:
+    for match in _WORD.finditer(text):
+        word = match.group().lower()
+        if word not in STOP_WORDS:
+            yield match, _stem(word)
+
+
+def parse_query(query: str) -> tuple[list[set[str]], set[str]]:
+    """``query`` in web-search syntax as (clauses, excluded): a message matches
+    when it has a lexeme from every clause and none from ``excluded``."""
+    clauses: list[set[str]] = []
+    excluded: set[str] = set()
+    join_next = False
+    for token in _QUERY_TOKEN.findall(query):
+        if token.lower() == "or" and clauses:
+            join_next = True
+            continue
+        negated = token.startswith("-")
+        stems = [stem for _, stem in _lexemes(token)]
+        if not stems:
+            continue
+        if negated:
+            excluded.update(stems)
+        elif join_next:
+            # "a or b c": b joins a's clause; the rest of a phrase stands alone.
+            clauses[-1].add(stems[0])
+            clauses.extend({stem} for stem in stems[1:])
+        else:
+            clauses.extend({stem} for stem in stems)
+        join_next = False
+    return clauses, excluded
+
+
+class InvertedIndex:
+    """Postings from stemmed lexeme to ``{message_id: occurrences}``."""
+
+    def __init__(self):
+        self._postings: dict[str, dict[str, int]] = {}
+        self._messages: dict[str, dict[str, Any]] = {}
+        self._lengths: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def add(self, message: dict[str, Any]) -> None:
+        """Index ``message`` (a messages row); rows already indexed are skipped."""
+        if message["id"] in self._messages:
+            return
+        self._messages[message["id"]] = message
+        stems = [stem for _, stem in _lexemes(message["content"])]
+        self._lengths[message["id"]] = len(stems)
+        for stem in stems:
+            postings = self._postings.setdefault(stem, {})
+            postings[message["id"]] = postings.get(message["id"], 0) + 1
+
+    def _matching(self, clauses: list[set[str]], excluded: set[str]) -> set[str]:
+        if not clauses:
+            return set()
+        candidates = [
+            set().union(*(self._postings.get(stem, {}) for stem in clause)) for clause in clauses
+        ]
+        candidates.sort(key=len)
+        matched = candidates[0].intersection(*candidates[1:])
+        for stem in excluded:
+            matched.difference_update(self._postings.get(stem, {}))
+        return matched
+
+    def _rank(self, message_id: str, postings: list[dict[str, int]]) -> float:
+        # ts_rank with normalization 1: hits over 1 + log(document length).
+        hits = sum(posting.get(message_id, 0) for posting in postings)
+        return hits / (1 + math.log(max(self._lengths[message_id], 1)))
+
+    @staticmethod
+    def headline(content: str, stems: set[str]) -> str:
+        """A window of ``content`` around the first match, matches wrapped in markers."""
+        words = list(_WORD.finditer(content))
+        if not words:
+            return content
+        hits = {match.start() for match, stem in _lexemes(content) if stem in stems}
+        first = next((i for i, word in enumerate(words) if word.start() in hits), 0)
+        start = max(0, min(first - 3, len(words) - HEADLINE_MAX_WORDS))
+        window = words[start : start + HEADLINE_MAX_WORDS]
+        pieces = []
+        cursor = window[0].start()
+        for word in window:
+            pieces.append(content[cursor : word.start()])
+            text = word.group()
+            pieces.append(f"{HIGHLIGHT_START}{text}{HIGHLIGHT_STOP}" if word.start() in hits else text)
+            cursor = word.end()
+        return "".join(pieces)
+
+    def search(
+        self, query: str, session_ids: set[str], limit: int, offset: int = 0
+    ) -> list[dict[str, Any]]:
+        """Messages in ``session_ids`` matching ``query``, best first, as
+        ``search_messages`` rows (without ``session_title``)."""
+        clauses, excluded = parse_query(query)
+        stems = set().union(*clauses) if clauses else set()
+        postings = [self._postings[stem] for stem in stems if stem in self._postings]
+        scored = (
+            (self._rank(message_id, postings), self._messages[message_id])
+            for message_id in self._matching(clauses, excluded)
+            if self._messages[message_id].get("session_id") in session_ids
+        )
+        # Every match is ranked, but only the rows up to the page end are sorted.
+        page = heapq.nlargest(
+            offset + limit, scored, key=lambda item: (item[0], item[1]["created_at"], item[1]["id"])
+        )
+        return [
+            {
+                "id": message["id"],
+                "session_id": message["session_id"],
+                "agent_id": message.get("agent_id"),
+                "role": message["role"],
+                "created_at": message["created_at"],
+                "rank": rank,
+                "headline": self.headline(message["content"], stems),
+            }
+            for rank, message in page[offset:]
+        ]
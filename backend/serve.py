@@ -0,0 +1,67 @@
+"""Production entry point for the Boardroom API.
+
+    python serve.py
+
+Runs the ASGI app (asgi.py) under uvicorn with ``WEB_CONCURRENCY`` worker
+processes -- or with one, whatever ``WEB_CONCURRENCY`` says, while a feature
+that keeps state in a worker's memory is on (``app.single_worker_features``):
+live events are only delivered and resumed within the worker that published
+them, and a write-behind barrier only waits for its own worker's queue.
+Scaling out with those on needs a channel shared by the workers (Postgres
+LISTEN/NOTIFY, Supabase Realtime) that nothing here provides yet.
+
+Each worker imports the app, creates its own clients and loads the tokenizer
+in the lifespan handler (``app.warm_up``), and only then accepts connections,
+so no request waits on a cold worker and a worker that can't reach its
+configuration fails at startup. Logging is configured in every worker from
+``app.logging_config()``.
+"""
+
+import logging
+import os
+
+import uvicorn
+
+from app import app, configure_logging, logging_config, single_worker_features
+
+log = logging.getLogger("boardroom")
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "5000"))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Proxies whose X-Forwarded-For / X-Forwarded-Proto headers are trusted.
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+# Idle keep-alive connections are closed after this long; keep it above the
+# load balancer's idle timeout so it never reuses a connection being closed.
+KEEP_ALIVE_SECONDS = int(os.environ.get("KEEP_ALIVE_SECONDS", "75"))
+# On shutdown, open requests (chat streams included) get this long to finish.
+GRACEFUL_TIMEOUT_SECONDS = int(os.environ.get("GRACEFUL_TIMEOUT_SECONDS", "30"))
+
+
+def worker_count() -> int:
+    features = single_worker_features(app.config)
+    if WEB_CONCURRENCY > 1 and features:
+        log.warning("Running 1 worker instead of WEB_CONCURRENCY=%d: %s keep per-worker state",
+                    WEB_CONCURRENCY, ", ".join(features))
+        return 1
+    return WEB_CONCURRENCY
+
+
+def main() -> None:
+    configure_logging()
+    uvicorn.run(
+        "asgi:application",
+        host=HOST,
+        port=PORT,
+        workers=worker_count(),
+        log_config=logging_config(),
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS,
+        lifespan="on",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Rolling per-session summaries of older chat history.
+
+A session summary folds every message up to a ``(created_at, id)`` cursor into
+a short text. Chat turns send the summary plus the raw messages after that
+cursor, so a new message never makes a summary wrong: it only lengthens the raw
+tail until the next refresh folds the older part of it in. Refreshes run on a
+small background thread pool, off the request path.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping
+
+from context_window import TokenCounter
+
+log = logging.getLogger("boardroom")
+
+SUMMARY_INSTRUCTIONS = (
+    "You maintain the running summary of a boardroom discussion between a user and "
+    "a panel of expert agents. Merge the new transcript excerpt into the existing "
+    "summary. Keep decisions, open questions, constraints, numbers and who argued "
+    "what; drop pleasantries and repetition. Reply with the updated summary only, "
+    "as compact prose or bullets."
+)
+
+
+@dataclass(frozen=True, slots=True)
+class SessionSummary:
+    summary: str
+    covered_until: str
+    covered_message_id: str
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any] | None) -> "SessionSummary | None":
+        if not row or not row.get("summary"):
+            return None
+        return cls(
+            summary=row["summary"],
+            covered_until=row["covered_until"],
+            covered_message_id=row["covered_message_id"],
+        )
+
+    @property
+    def cursor(self) -> tuple[str, str]:
+        return self.covered_until, self.covered_message_id
+
+
+def needs_refresh(unsummarized: int, keep_recent: int, refresh_every: int) -> bool:
+    """True once at least ``refresh_every`` messages beyond the kept tail are unsummarized."""
+    return unsummarized - keep_recent >= refresh_every
+
+
+def summary_prompt(
+    previous: str,
+    messages: list[dict[str, Any]],
+    speakers: Mapping[str, str],
+    counter: TokenCounter,
+    max_message_tokens: int,
+) -> list[dict[str, str]]:
+    """LLM messages asking to fold ``messages`` (oldest first) into ``previous``."""
+    lines = []
+    for msg in messages:
+        if msg["role"] == "user":
+            speaker = "User"
+        else:
+            speaker = speakers.get(msg.get("agent_id") or "", "Assistant")
+        lines.append(f"{speaker}: {counter.truncate(msg['content'], max_message_tokens)}")
+
+    return [
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+        {
+            "role": "user",
+            "content": f"Existing summary:\n{previous or '(none yet)'}\n\nNew transcript:\n" + "\n\n".join(lines),
+        },
+    ]
+
+
+class SummaryRefresher:
+    """Runs ``refresh(session_id)`` in the background, at most once per session at a time.
+
+    ``name`` labels its threads and failure logs; session titles use one too.
+    """
+
+    def __init__(self, refresh: Callable[[str], None], max_workers: int = 2, name: str = "summary"):
+        self._refresh = refresh
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._in_flight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, session_id: str) -> bool:
+        """Queue a refresh; returns False if one is already queued or running."""
+        with self._lock:
+            if session_id in self._in_flight:
+                return False
+            self._in_flight[session_id] = self._executor.submit(self._run, session_id)
+            return True
+
+    def _run(self, session_id: str) -> None:
+        try:
+            self._refresh(session_id)
+        except Exception:
+            log.exception("Session %s refresh failed  session=%s", self.name, session_id)
+        finally:
+            with self._lock:
+                self._in_flight.pop(session_id, None)
+
+    def wait(self, timeout: float | None = None) -> None:
+        """Block until the currently queued refreshes have finished."""
+        with self._lock:
+            pending = list(self._in_flight.values())
+        wait(pending, timeout=timeout)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,54 @@
+"""Generated session titles.
+
+Sessions start out as ``DEFAULT_TITLE``. After the first exchange a
+background job asks the model for a short title from the opening messages
+and stores it, unless the title has changed in the meantime, so the session
+list never waits on it.
+"""
+
+import re
+from typing import Any, Mapping
+
+from context_window import TokenCounter
+
+DEFAULT_TITLE = "New Session"
+
+# Longest stored title, in characters (sessions.title is VARCHAR(255)).
+TITLE_MAX_CHARS = 80
+
+TITLE_INSTRUCTIONS = (
+    "Write a title for this boardroom discussion between a user and a panel of "
+    "expert agents: at most eight words naming its subject, in title case, "
+    "without quotes or a trailing period. Reply with the title only."
+)
+
+_QUOTES = "\"'`“”‘’*#"
+
+
+def title_prompt(
+    messages: list[dict[str, Any]],
+    speakers: Mapping[str, str],
+    counter: TokenCounter,
+    max_message_tokens: int,
+) -> list[dict[str, str]]:
+    """LLM messages asking for a title for the opening ``messages`` (oldest first)."""
+    lines = []
+    for msg in messages:
+        speaker = "User" if msg["role"] == "user" else speakers.get(msg.get("agent_id") or "", "Assistant")
+        lines.append(f"{speaker}: {counter.truncate(msg['content'], max_message_tokens)}")
+    return [
+        {"role": "system", "content": TITLE_INSTRUCTIONS},
+        {"role": "user", "content": "\n\n".join(lines)},
+    ]
+
+
+def clean_title(raw: str) -> str:
+    """The model's reply as a one-line title, or "" if nothing usable is left."""
+    lines = [line for line in raw.strip().splitlines() if line.strip()]
+    if not lines:
+        return ""
+    title = re.sub(r"^title\s*:\s*", "", lines[0].strip(), flags=re.IGNORECASE)
+    title = " ".join(title.strip(_QUOTES + " ").split()).rstrip(".").strip(_QUOTES + " ")
+    if len(title) > TITLE_MAX_CHARS:
+        title = title[: TITLE_MAX_CHARS - 1].rsplit(" ", 1)[0].rstrip(",;:-") + "…"
+    return title
@@ -0,0 +1,83 @@
+"""Coalescing of concurrent identical reads.
+
+Several tabs, or a hook mounted twice under React StrictMode, fire bursts of
+the same ``GET`` for the same user. ``SingleFlight.do`` runs one upstream
+query per key at a time: callers arriving while it runs wait for it and
+share its result (or its exception), and callers arriving within
+``reuse_seconds`` after it finished get the same result without a query.
+
+Keys are ``(scope, detail)`` pairs. A write calls ``invalidate(scope)`` so
+that readers after it never see a result computed before it; the reuse
+window only ever spans reads that raced each other anyway. Flights and
+invalidation are per process: a write handled by one worker doesn't drop
+another worker's results, which may then be served for up to
+``reuse_seconds`` after the write. Results are shared between callers and
+must be treated as read-only.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from metrics import READS_COALESCED
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "finished_at")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.finished_at = 0.0
+
+
+class SingleFlight:
+    def __init__(self, reuse_seconds: float = 0.1, clock: Callable[[], float] = time.monotonic):
+        self.reuse_seconds = reuse_seconds
+        self._clock = clock
+        self._flights: dict[tuple[Hashable, Hashable], _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _reusable(self, flight: _Flight, now: float) -> bool:
+        return not flight.done.is_set() or now - flight.finished_at < self.reuse_seconds
+
+    def do(self, scope: Hashable, detail: Hashable, fn: Callable[[], Any], resource: str = "read") -> Any:
+        """``fn()``, or the result of an identical call in flight or just finished."""
+        key = (scope, detail)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or not self._reusable(flight, self._clock())
+            if leader:
+                now = self._clock()
+                for expired in [k for k, f in self._flights.items() if not self._reusable(f, now)]:
+                    del self._flights[expired]
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            READS_COALESCED.labels(resource, "shared" if not flight.done.is_set() else "reused").inc()
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        READS_COALESCED.labels(resource, "leader").inc()
+        try:
+            flight.result = fn()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                flight.finished_at = self._clock()
+                # Callers already waiting share a failure; later ones query again.
+                if flight.error is not None and self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def invalidate(self, scope: Hashable) -> None:
+        """Forget every call under ``scope``, finished or still running, so the next caller queries afresh."""
+        with self._lock:
+            for key in [key for key in self._flights if key[0] == scope]:
+                del self._flights[key]
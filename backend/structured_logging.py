@@ -0,0 +1,177 @@
+"""Structured, sampled logging off the request path.
+
+``QueueingHandler`` is what request threads and tasks log into: once a record
+has passed the level check and the sampler, the handler merges its message
+arguments and puts it on a queue. A ``QueueListener`` thread does everything
+else: formatting (one JSON object per line with ``JsonFormatter``, including
+tracebacks) and the write to stderr. A record below the logger's level is
+never created, let alone formatted.
+
+``RequestSampler`` keeps the chatty part of busy routes down. Records below
+WARNING logged while serving a request are kept for a fraction of the
+requests to each route (``parse_sample_rates``), decided once per request so
+a kept request keeps all its lines. Warnings and errors are always kept, as
+is any record carrying a ``duration_ms`` at or over the slow threshold (the
+request log line of a slow request), and so is everything logged outside a
+request (startup, background jobs).
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import weakref
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable
+
+from metrics import RequestTimer, current_request
+
+# Rate for routes missing from the rates, unless they set one under this key.
+DEFAULT_ROUTE = "*"
+
+# LogRecord attributes every record has; anything else came in through `extra`.
+_STANDARD_ATTRIBUTES = frozenset(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse ``route=rate,...`` (e.g. ``/api/sessions=0.1,*=0.5``) into rates.
+
+    Routes are Flask route patterns as labelled in the metrics, and ``*``
+    covers every other route; a rate is the fraction of requests kept.
+    """
+    rates: dict[str, float] = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        route, sep, rate = item.rpartition("=")
+        try:
+            value = float(rate)
+        except ValueError:
+            value = -1.0
+        if not sep or not route.strip() or not 0.0 <= value <= 1.0:
+            raise ValueError(f"invalid log sample rate {item.strip()!r}; expected route=<0..1>")
+        rates[route.strip()] = value
+    return rates
+
+
+class RequestSampler(logging.Filter):
+    def __init__(
+        self,
+        rates: dict[str, float] | None = None,
+        slow_ms: float = 1000.0,
+        draw: Callable[[], float] = random.random,
+    ):
+        super().__init__()
+        self.rates = rates or {}
+        self.slow_ms = slow_ms
+        self._draw = draw
+        self._decisions: "weakref.WeakKeyDictionary[RequestTimer, bool]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _keep_request(self, timer: RequestTimer) -> bool:
+        rate = self.rates.get(timer.route, self.rates.get(DEFAULT_ROUTE, 1.0))
+        if rate >= 1.0:
+            return True
+        with self._lock:
+            keep = self._decisions.get(timer)
+            if keep is None:
+                keep = self._decisions[timer] = self._draw() < rate
+        return keep
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        timer = current_request()
+        if timer is None:
+            return True
+        # The listener thread formats the record without this request's context.
+        if not hasattr(record, "route"):
+            record.route = timer.route
+        if record.levelno >= logging.WARNING:
+            return True
+        if getattr(record, "duration_ms", 0.0) >= self.slow_ms:
+            return True
+        return self._keep_request(timer)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with its ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+_handlers: "weakref.WeakSet[QueueingHandler]" = weakref.WeakSet()
+
+
+class QueueingHandler(QueueHandler):
+    """Queues records for ``target``, which a listener thread feeds.
+
+    Closing the handler (``logging.shutdown`` at exit does) drains the queue.
+    A forked child gets a new queue and listener; the parent's thread is gone.
+    """
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._start()
+        _handlers.add(self)
+
+    def _start(self) -> None:
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        self._listening = True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the message arguments are resolved here, as they may change once
+        # the caller moves on; the traceback is formatted by the listener.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self) -> None:
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+
+def _after_fork_in_child() -> None:
+    for handler in list(_handlers):
+        if handler._listening:
+            handler.queue = queue.SimpleQueue()
+            handler._start()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def json_queue_handler() -> QueueingHandler:
+    """dictConfig factory: JSON lines to stderr, written off-thread."""
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter())
+    return QueueingHandler(output)
@@ -1,8 +1,9 @@
 import os
 import sys
-from types import SimpleNamespace
+import time
 from pathlib import Path
 
+import jwt
 import pytest
 
 os.environ.setdefault("SUPABASE_URL", "http://localhost")
@@ -12,179 +13,40 @@ os.environ.setdefault("OPENROUTER_API_KEY", "test-key")
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 import app as app_module
+from fakes import FakeAsyncOpenAIClient, FakeAsyncSupabase, FakeOpenAIClient, FakeSupabase
 
+JWT_SECRET = "test-jwt-secret-with-enough-bytes-for-hs256"
 
-class FakeResult:
-    def __init__(self, data):
-        self.data = data
-
-
-class FakeAuth:
-    def __init__(self):
-        self._users_by_email = {}
-        self._tokens = {}
-        self._counter = 0
-
-    def _new_user(self, email: str, password: str):
-        self._counter += 1
-        user = {"id": f"user-{self._counter}", "email": email, "password": password}
-        self._users_by_email[email] = user
-        return user
-
-    def seed_user(self, email: str = "user@example.com", password: str = "pass123"):
-        user = self._users_by_email.get(email) or self._new_user(email, password)
-        token = f"token-{user['id']}"
-        self._tokens[token] = user
-        return user, token
-
-    def sign_up(self, payload):
-        email = payload["email"].strip().lower()
-        password = payload["password"]
-        if email in self._users_by_email:
-            raise Exception("already exists")
-        user = self._new_user(email, password)
-        token = f"token-{user['id']}"
-        self._tokens[token] = user
-        return SimpleNamespace(
-            user=SimpleNamespace(id=user["id"], email=user["email"]),
-            session=SimpleNamespace(access_token=token),
-        )
-
-    def sign_in_with_password(self, payload):
-        email = payload["email"].strip().lower()
-        password = payload["password"]
-        user = self._users_by_email.get(email)
-        if not user or user["password"] != password:
-            raise Exception("invalid credentials")
-        token = f"token-{user['id']}"
-        self._tokens[token] = user
-        return SimpleNamespace(
-            user=SimpleNamespace(id=user["id"], email=user["email"]),
-            session=SimpleNamespace(access_token=token),
-        )
-
-    def get_user(self, token):
-        user = self._tokens.get(token)
-        if not user:
-            raise Exception("invalid token")
-        return SimpleNamespace(user=SimpleNamespace(id=user["id"], email=user["email"]))
-
-
-class FakeQuery:
-    def __init__(self, supabase, table_name):
-        self.supabase = supabase
-        self.table_name = table_name
-        self._op = "select"
-        self._columns = "*"
-        self._filters = []
-        self._order = None
-        self._limit = None
-        self._payload = None
-
-    def select(self, columns):
-        self._op = "select"
-        self._columns = columns
-        return self
-
-    def eq(self, field, value):
-        self._filters.append((field, value))
-        return self
-
-    def order(self, field, desc=False):
-        self._order = (field, desc)
-        return self
-
-    def limit(self, value):
-        self._limit = value
-        return self
-
-    def insert(self, payload):
-        self._op = "insert"
-        self._payload = payload
-        return self
-
-    def update(self, payload):
-        self._op = "update"
-        self._payload = payload
-        return self
-
-    def _matches(self, row):
-        for field, value in self._filters:
-            if row.get(field) != value:
-                return False
-        return True
-
-    def _project(self, rows):
-        if self._columns == "*":
-            return [dict(row) for row in rows]
-        keys = [key.strip() for key in self._columns.split(",")]
-        return [{key: row.get(key) for key in keys} for row in rows]
-
-    def execute(self):
-        rows = self.supabase.db[self.table_name]
-
-        if self._op == "insert":
-            payload_rows = self._payload if isinstance(self._payload, list) else [self._payload]
-            inserted = []
-            for payload in payload_rows:
-                row = dict(payload)
-                row.setdefault("id", f"{self.table_name}-{len(rows) + 1}")
-                if self.table_name == "sessions":
-                    row.setdefault("created_at", "2026-01-01T00:00:00Z")
-                    row.setdefault("updated_at", "2026-01-01T00:00:00Z")
-                if self.table_name == "messages":
-                    row.setdefault("created_at", "2026-01-01T00:00:00Z")
-                rows.append(row)
-                inserted.append(dict(row))
-            return FakeResult(inserted)
-
-        if self._op == "update":
-            updated = []
-            for row in rows:
-                if self._matches(row):
-                    row.update(self._payload)
-                    updated.append(dict(row))
-            return FakeResult(updated)
-
-        selected = [row for row in rows if self._matches(row)]
-        if self._order:
-            key, desc = self._order
-            selected = sorted(selected, key=lambda x: x.get(key), reverse=desc)
-        if self._limit is not None:
-            selected = selected[: self._limit]
-        return FakeResult(self._project(selected))
-
-
-class FakeSupabase:
-    def __init__(self):
-        self.auth = FakeAuth()
-        self.db = {
-            "agents": [
-                {
-                    "id": "agent-1",
-                    "name": "Senior Architect",
-                    "role_description": "System design",
-                    "system_prompt": "You are an architect",
-                    "color_hex": "#3B82F6",
-                }
-            ],
-            "sessions": [],
-            "messages": [],
-        }
-
-    def table(self, table_name):
-        return FakeQuery(self, table_name)
-
-
-class FakeOpenAIClient:
-    def __init__(self):
-        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
-
-    def _create(self, **kwargs):
-        return SimpleNamespace(
-            choices=[SimpleNamespace(message=SimpleNamespace(content="Generated response"))],
-            usage=SimpleNamespace(total_tokens=42),
-        )
+
+class ASGIResponse:
+    """The subset of Flask's test response API the tests rely on."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.mimetype = response.headers.get("content-type", "").split(";")[0]
+
+    def get_json(self):
+        return self._response.json()
+
+    def get_data(self, as_text=False):
+        return self._response.text if as_text else self._response.content
+
+
+class ASGITestClient:
+    """Flask-test-client-shaped wrapper so one suite exercises both serving modes."""
+
+    def __init__(self, application):
+        from starlette.testclient import TestClient
+
+        self._client = TestClient(application)
+
+    def get(self, path, headers=None):
+        return ASGIResponse(self._client.get(path, headers=headers))
+
+    def post(self, path, json=None, headers=None, data=None):
+        return ASGIResponse(self._client.post(path, json=json, content=data, headers=headers))
 
 
 @pytest.fixture
@@ -193,15 +55,66 @@ def fake_supabase():
 
 
 @pytest.fixture
-def client(monkeypatch, fake_supabase):
-    monkeypatch.setattr(app_module, "supabase", fake_supabase)
-    monkeypatch.setattr(app_module, "openai_client", FakeOpenAIClient())
-    app_module.app.config["TESTING"] = True
-    with app_module.app.test_client() as test_client:
-        yield test_client
+def fake_openai():
+    return FakeOpenAIClient()
+
+
+@pytest.fixture(params=["wsgi", "asgi"])
+def serving_mode(request):
+    return request.param
+
+
+@pytest.fixture
+def flask_app(fake_supabase, fake_openai):
+    flask_app = app_module.create_app({
+        "TESTING": True,
+        "SUPABASE_JWT_SECRET": "",
+        "SUPABASE_JWKS_URL": "",
+        # Title jobs make their own LLM calls; tests that want them turn them on.
+        "SESSION_TITLES": False,
+        # Tests edit the fake database between requests; share only reads that overlap.
+        "READ_COALESCE_WINDOW_MS": 0,
+        "COMPLETION_CACHE_PATH": "",
+        "CHAT_WRITE_BEHIND_DIR": "",
+        "SUMMARY_WORKERS": 1,
+    })
+    services = flask_app.extensions["boardroom"]
+    services.supabase = fake_supabase
+    services.openai_client = fake_openai
+    yield flask_app
+    # Background summary and title jobs must not outlive the fake clients.
+    services.shutdown()
+
+
+@pytest.fixture
+def services(flask_app):
+    return flask_app.extensions["boardroom"]
+
+
+@pytest.fixture
+def client(flask_app, services, fake_supabase, fake_openai, serving_mode):
+    if serving_mode == "asgi":
+        import asgi
+
+        services.async_supabase = FakeAsyncSupabase(fake_supabase)
+        services.async_openai_client = FakeAsyncOpenAIClient(fake_openai)
+        yield ASGITestClient(asgi.create_application(flask_app))
+    else:
+        with flask_app.test_client() as test_client:
+            yield test_client
 
 
 @pytest.fixture
 def auth_header(fake_supabase):
     _, token = fake_supabase.auth.seed_user()
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_token():
+    def _make_token(sub="user-1", email="user@example.com", exp_in=3600, secret=JWT_SECRET, **claims):
+        payload = {"sub": sub, "email": email, "aud": "authenticated", "exp": int(time.time()) + exp_in}
+        payload.update(claims)
+        return jwt.encode(payload, secret, algorithm="HS256")
+
+    return _make_token
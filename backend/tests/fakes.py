@@ -0,0 +1,469 @@
+"""In-memory stand-ins for the Supabase and OpenAI clients.
+
+Shared by the test fixtures in conftest.py and the benchmark harness in
+benchmarks/, which wraps them with injected latency.
+"""
+
+import uuid
+from types import SimpleNamespace
+
+from search import InvertedIndex
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeAuth:
+    def __init__(self):
+        self._users_by_email = {}
+        self._tokens = {}
+        self._counter = 0
+
+    def _new_user(self, email: str, password: str):
+        self._counter += 1
+        user = {"id": f"user-{self._counter}", "email": email, "password": password}
+        self._users_by_email[email] = user
+        return user
+
+    def seed_user(self, email: str = "user@example.com", password: str = "pass123"):
+        user = self._users_by_email.get(email) or self._new_user(email, password)
+        token = f"token-{user['id']}"
+        self._tokens[token] = user
+        return user, token
+
+    def sign_up(self, payload):
+        email = payload["email"].strip().lower()
+        password = payload["password"]
+        if email in self._users_by_email:
+            raise Exception("already exists")
+        user = self._new_user(email, password)
+        token = f"token-{user['id']}"
+        self._tokens[token] = user
+        return SimpleNamespace(
+            user=SimpleNamespace(id=user["id"], email=user["email"]),
+            session=SimpleNamespace(access_token=token),
+        )
+
+    def sign_in_with_password(self, payload):
+        email = payload["email"].strip().lower()
+        password = payload["password"]
+        user = self._users_by_email.get(email)
+        if not user or user["password"] != password:
+            raise Exception("invalid credentials")
+        token = f"token-{user['id']}"
+        self._tokens[token] = user
+        return SimpleNamespace(
+            user=SimpleNamespace(id=user["id"], email=user["email"]),
+            session=SimpleNamespace(access_token=token),
+        )
+
+    def get_user(self, token):
+        user = self._tokens.get(token)
+        if not user:
+            raise Exception("invalid token")
+        return SimpleNamespace(user=SimpleNamespace(id=user["id"], email=user["email"]))
+
+
+_FILTER_OPS = {
+    "eq": lambda a, b: a == b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+}
+
+
+def _split_top_level(text):
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+
+def _parse_logic_tree(text):
+    """Parse the subset of PostgREST's or=(...) syntax the backend emits."""
+    terms = []
+    for part in _split_top_level(text):
+        if part.startswith("and(") and part.endswith(")"):
+            terms.append(("and", _parse_logic_tree(part[4:-1])))
+        else:
+            field, op, value = part.split(".", 2)
+            terms.append((op, field, value.strip('"')))
+    return terms
+
+
+def _eval_term(term, row):
+    if term[0] == "and":
+        return all(_eval_term(t, row) for t in term[1])
+    op, field, value = term
+    current = row.get(field)
+    return current is not None and _FILTER_OPS[op](str(current), value)
+
+
+def _eval_or(terms, row):
+    return any(_eval_term(term, row) for term in terms)
+
+
+class FakeQuery:
+    def __init__(self, supabase, table_name):
+        self.supabase = supabase
+        self.table_name = table_name
+        self._op = "select"
+        self._columns = "*"
+        self._filters = []
+        self._or_groups = []
+        self._orders = []
+        self._limit = None
+        self._payload = None
+
+    def select(self, columns):
+        self._op = "select"
+        self._columns = columns
+        return self
+
+    def eq(self, field, value):
+        self._filters.append((field, value))
+        return self
+
+    def or_(self, filters):
+        self._or_groups.append(_parse_logic_tree(filters))
+        return self
+
+    def order(self, field, desc=False):
+        self._orders.append((field, desc))
+        return self
+
+    def limit(self, value):
+        self._limit = value
+        return self
+
+    def insert(self, payload):
+        self._op = "insert"
+        self._payload = payload
+        return self
+
+    def update(self, payload):
+        self._op = "update"
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict="id", ignore_duplicates=False):
+        self._op = "upsert"
+        self._payload = payload
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def _matches(self, row):
+        for field, value in self._filters:
+            if row.get(field) != value:
+                return False
+        return all(_eval_or(group, row) for group in self._or_groups)
+
+    def _project(self, rows):
+        if self._columns == "*":
+            return [dict(row) for row in rows]
+        keys = [key.strip() for key in self._columns.split(",")]
+        return [{key: row.get(key) for key in keys} for row in rows]
+
+    def execute(self):
+        rows = self.supabase.db[self.table_name]
+
+        if self._op == "insert":
+            payload_rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            inserted = []
+            for payload in payload_rows:
+                row = dict(payload)
+                # Sequential UUIDs, so ids sort in insertion order like the tests expect.
+                row.setdefault("id", str(uuid.UUID(int=len(rows) + 1)))
+                if self.table_name == "sessions":
+                    row.setdefault("created_at", "2026-01-01T00:00:00Z")
+                    row.setdefault("updated_at", "2026-01-01T00:00:00Z")
+                    row.setdefault("title", "New Session")
+                    row.setdefault("message_count", 0)
+                    row.setdefault("last_message_preview", None)
+                    row.setdefault("last_agent_id", None)
+                if self.table_name == "messages":
+                    row.setdefault("created_at", "2026-01-01T00:00:00Z")
+                rows.append(row)
+                inserted.append(dict(row))
+            if self.table_name == "messages":
+                self.supabase.sessions_apply_message_inserts(inserted)
+            return FakeResult(inserted)
+
+        if self._op == "upsert":
+            key = self._on_conflict
+            payload_rows = self._payload if isinstance(self._payload, list) else [self._payload]
+            upserted = []
+            for payload in payload_rows:
+                existing = next((row for row in rows if row.get(key) == payload[key]), None)
+                if existing is None:
+                    existing = dict(payload)
+                    rows.append(existing)
+                elif self._ignore_duplicates:
+                    continue
+                else:
+                    existing.update(payload)
+                upserted.append(dict(existing))
+            if self.table_name == "messages":
+                self.supabase.sessions_apply_message_inserts(upserted)
+            return FakeResult(upserted)
+
+        if self._op == "update":
+            updated = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self._payload)
+                    updated.append(dict(row))
+            return FakeResult(updated)
+
+        selected = [row for row in rows if self._matches(row)]
+        # Stable sorts applied from the least to the most significant key.
+        for key, desc in reversed(self._orders):
+            # Rows without the key sort below the rest; the real columns are never NULL.
+            selected = sorted(selected, key=lambda x: (x.get(key) is not None, x.get(key) or ""), reverse=desc)
+        if self._limit is not None:
+            selected = selected[: self._limit]
+        return FakeResult(self._project(selected))
+
+
+class FakeRPC:
+    def __init__(self, supabase, name, params):
+        self.supabase = supabase
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.supabase.rpc_calls.append(self.name)
+        handler = getattr(self.supabase, f"_rpc_{self.name}")
+        return FakeResult(handler(**self.params))
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.auth = FakeAuth()
+        self.rpc_calls = []
+        self.db = {
+            "agents": [
+                {
+                    "id": "agent-1",
+                    "name": "Senior Architect",
+                    "role_description": "System design",
+                    "system_prompt": "You are an architect",
+                    "color_hex": "#3B82F6",
+                }
+            ],
+            "sessions": [],
+            "messages": [],
+            "session_summaries": [],
+        }
+        self.search_index = InvertedIndex()
+
+    def table(self, table_name):
+        return FakeQuery(self, table_name)
+
+    def rpc(self, name, params):
+        return FakeRPC(self, name, params)
+
+    def sessions_apply_message_inserts(self, rows):
+        """Stand-in for the messages insert trigger in supabase/schema.sql."""
+        for session in self.db["sessions"]:
+            added = [row for row in rows if row.get("session_id") == session["id"]]
+            if not added:
+                continue
+            latest = max(added, key=lambda row: (row["created_at"], row["id"]))
+            session["message_count"] = session.get("message_count", 0) + len(added)
+            session["last_message_preview"] = " ".join(latest["content"].split())[:160]
+            session["last_agent_id"] = latest.get("agent_id")
+
+    # Python stand-ins for the plpgsql functions in supabase/schema.sql.
+    def _rpc_chat_begin_turn(self, p_user_id, p_session_id, p_content, p_history_limit=50, p_with_summary=True):
+        owned = any(
+            s["id"] == p_session_id and s["user_id"] == p_user_id for s in self.db["sessions"]
+        )
+        if not owned:
+            return {"status": "session_not_found"}
+
+        user_message = FakeQuery(self, "messages").insert({
+            "session_id": p_session_id,
+            "agent_id": None,
+            "role": "user",
+            "content": p_content,
+        }).execute().data[0]
+
+        summary = None
+        if p_with_summary:
+            summary = next(
+                (dict(row) for row in self.db["session_summaries"] if row["session_id"] == p_session_id), None
+            )
+        covered = (summary["covered_until"], summary["covered_message_id"]) if summary else None
+        session_messages = sorted(
+            (
+                m for m in self.db["messages"]
+                if m["session_id"] == p_session_id and (covered is None or (m["created_at"], m["id"]) > covered)
+            ),
+            key=lambda m: (m["created_at"], m["id"]),
+        )
+        history = [
+            {"role": m["role"], "content": m["content"]} for m in session_messages[-p_history_limit:]
+        ]
+        return {
+            "status": "ok",
+            "user_message": user_message,
+            "history": history,
+            "summary": summary,
+        }
+
+    def _require_owned_session(self, p_user_id, p_session_id):
+        if not any(s["id"] == p_session_id and s["user_id"] == p_user_id for s in self.db["sessions"]):
+            raise Exception(f"session {p_session_id} not found")
+
+    def _rpc_chat_finish_turn(self, p_user_id, p_session_id, p_agent_id, p_content):
+        self._require_owned_session(p_user_id, p_session_id)
+        message = FakeQuery(self, "messages").insert({
+            "session_id": p_session_id,
+            "agent_id": p_agent_id,
+            "role": "assistant",
+            "content": p_content,
+        }).execute().data[0]
+        FakeQuery(self, "sessions").update({"updated_at": message["created_at"]}).eq(
+            "id", p_session_id
+        ).eq("user_id", p_user_id).execute()
+        return message
+
+    def _rpc_chat_finish_roundtable(self, p_user_id, p_session_id, p_replies):
+        self._require_owned_session(p_user_id, p_session_id)
+        messages = FakeQuery(self, "messages").insert([
+            {
+                "session_id": p_session_id,
+                "agent_id": reply["agent_id"],
+                "role": "assistant",
+                "content": reply["content"],
+                "created_at": f"2026-01-01T00:00:01.{index:06d}Z",
+            }
+            for index, reply in enumerate(p_replies)
+        ]).execute().data
+        FakeQuery(self, "sessions").update({"updated_at": messages[-1]["created_at"]}).eq(
+            "id", p_session_id
+        ).eq("user_id", p_user_id).execute()
+        return messages
+
+    def _rpc_chat_apply_writes(self, p_messages, p_sessions):
+        live = {session["id"] for session in self.db["sessions"]}
+        FakeQuery(self, "messages").upsert(
+            [row for row in p_messages if row["session_id"] in live], on_conflict="id", ignore_duplicates=True
+        ).execute()
+        for touch in p_sessions:
+            for session in self.db["sessions"]:
+                if session["id"] == touch["id"] and session["user_id"] == touch["user_id"]:
+                    session["updated_at"] = max(session["updated_at"], touch["updated_at"])
+        return None
+
+    def _rpc_search_messages(self, p_user_id, p_query, p_limit=20, p_offset=0):
+        # Rows may be seeded straight into db["messages"], which only ever grows;
+        # add() skips the ids already indexed.
+        if len(self.search_index) != len(self.db["messages"]):
+            for message in self.db["messages"]:
+                self.search_index.add(message)
+        titles = {s["id"]: s.get("title") for s in self.db["sessions"] if s["user_id"] == p_user_id}
+        rows = self.search_index.search(p_query, set(titles), p_limit, p_offset)
+        return [{**row, "session_title": titles[row["session_id"]]} for row in rows]
+
+
+FAKE_USAGE = SimpleNamespace(prompt_tokens=30, completion_tokens=12, total_tokens=42)
+
+
+class FakeStream:
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.closed = False
+
+    def __iter__(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))],
+                usage=None,
+            )
+        yield SimpleNamespace(choices=[], usage=FAKE_USAGE)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeOpenAIClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.streams = []
+
+    def _create(self, **kwargs):
+        if kwargs.get("stream"):
+            stream = FakeStream(["Generated", " ", "response"])
+            self.streams.append(stream)
+            return stream
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Generated response"))],
+            usage=FAKE_USAGE,
+        )
+
+
+class FakeAsyncQuery:
+    """Async facade over a fake query: chaining stays sync, execute() is awaited."""
+
+    def __init__(self, query):
+        self._query = query
+
+    def __getattr__(self, name):
+        attr = getattr(self._query, name)
+        if name == "execute":
+            async def execute():
+                return attr()
+            return execute
+        return lambda *args, **kwargs: FakeAsyncQuery(attr(*args, **kwargs))
+
+
+class FakeAsyncSupabase:
+    def __init__(self, supabase):
+        self._supabase = supabase
+
+    def table(self, table_name):
+        return FakeAsyncQuery(self._supabase.table(table_name))
+
+    def rpc(self, name, params):
+        return FakeAsyncQuery(self._supabase.rpc(name, params))
+
+
+class FakeAsyncStream:
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        for chunk in self._stream:
+            yield chunk
+
+    async def close(self):
+        self._stream.close()
+
+
+class FakeAsyncOpenAIClient:
+    """Delegates to the sync fake so tests can patch and inspect one client."""
+
+    def __init__(self, sync_client):
+        self._sync_client = sync_client
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        result = self._sync_client.chat.completions.create(**kwargs)
+        return FakeAsyncStream(result) if kwargs.get("stream") else result
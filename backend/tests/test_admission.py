@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.001)
+
+
+def test_grants_immediately_while_slots_are_free():
+    controller = AdmissionController(max_in_flight=2, user_rate=0)
+    first = controller.admit("alice")
+    second = controller.admit("bob")
+    assert controller.in_flight == 2
+    assert first.waited == 0
+
+    first.release()
+    first.release()
+    assert controller.in_flight == 1
+    with second:
+        pass
+    assert controller.in_flight == 0
+
+
+def test_token_bucket_limits_each_user():
+    clock = FakeClock()
+    controller = AdmissionController(user_rate=1.0, user_burst=2, clock=clock)
+    controller.admit("alice").release()
+    controller.admit("alice").release()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("alice")
+    assert rejected.value.reason == "rate_limited"
+    assert rejected.value.retry_after == pytest.approx(1.0)
+    assert rejected.value.retry_after_header == "1"
+
+    # Other users have their own bucket, and alice's refills over time.
+    controller.admit("bob").release()
+    clock.now += 1.0
+    controller.admit("alice").release()
+
+
+def test_cost_is_charged_against_slots_and_bucket():
+    controller = AdmissionController(max_in_flight=4, user_rate=1.0, user_burst=3, clock=FakeClock())
+    ticket = controller.admit("alice", cost=3)
+    assert controller.in_flight == 3
+    ticket.release()
+    with pytest.raises(AdmissionRejected, match="rate_limited"):
+        controller.admit("alice")
+
+    # Larger requests are capped at what the controller can ever grant.
+    controller = AdmissionController(max_in_flight=2, user_rate=0)
+    with controller.admit("alice", cost=8):
+        assert controller.in_flight == 2
+
+
+def test_refund_returns_slots_and_tokens():
+    controller = AdmissionController(max_in_flight=3, user_rate=1.0, user_burst=3, clock=FakeClock())
+    ticket = controller.admit("alice", cost=3)
+    ticket.refund()
+    assert controller.in_flight == 2
+    # The refunded token can be spent again; the slot is free for anyone.
+    controller.admit("alice").release()
+
+    ticket.refund(cost=5)
+    assert controller.in_flight == 0
+    ticket.release()
+    ticket.refund()
+    assert controller.in_flight == 0
+    with controller.admit("alice", cost=2):
+        pass
+    with pytest.raises(AdmissionRejected, match="rate_limited"):
+        controller.admit("alice")
+
+
+def test_full_queue_rejects_new_arrivals():
+    controller = AdmissionController(max_in_flight=1, max_queue=0, max_wait_seconds=3.0, user_rate=0)
+    with controller.admit("alice"):
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("bob")
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after == 3.0
+
+
+def test_waiter_is_rejected_at_its_deadline():
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=0.05, user_rate=0)
+    with controller.admit("alice"):
+        with pytest.raises(AdmissionRejected, match="deadline"):
+            controller.admit("bob")
+        assert controller.queued == 0
+
+
+def test_rejects_up_front_when_the_expected_wait_exceeds_the_deadline():
+    clock = FakeClock()
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=2.0, user_rate=0, clock=clock)
+    ticket = controller.admit("alice")
+    clock.now += 5.0
+    ticket.release()
+
+    with controller.admit("alice"):
+        started = time.monotonic()
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.admit("bob")
+    assert rejected.value.reason == "deadline"
+    assert rejected.value.retry_after == pytest.approx(5.0)
+    assert time.monotonic() - started < 1.0
+
+
+def test_queued_calls_are_served_round_robin_across_users():
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=5.0, user_rate=0)
+    holder = controller.admit("holder")
+    order = []
+
+    def call(user_id, label):
+        with controller.admit(user_id):
+            order.append(label)
+
+    threads = []
+    for user_id, label in [("spammer", "s1"), ("spammer", "s2"), ("spammer", "s3"), ("polite", "p1")]:
+        thread = threading.Thread(target=call, args=(user_id, label))
+        thread.start()
+        threads.append(thread)
+        wait_until(lambda: controller.queued == len(threads))
+
+    holder.release()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["s1", "p1", "s2", "s3"]
+    assert controller.in_flight == 0
+
+
+def test_async_waiters_are_woken_by_releases():
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=5.0, user_rate=0)
+
+    async def scenario():
+        holder = await controller.admit_async("alice")
+        waiting = asyncio.create_task(controller.admit_async("bob"))
+        while controller.queued == 0:
+            await asyncio.sleep(0)
+        # Released from another thread, as a Flask request would.
+        await asyncio.to_thread(holder.release)
+        ticket = await waiting
+        assert ticket.waited >= 0
+        ticket.release()
+
+    asyncio.run(scenario())
+    assert controller.in_flight == 0
+
+
+def test_cancelled_async_waiter_gives_up_its_place():
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=5.0, user_rate=0)
+
+    async def scenario():
+        holder = await controller.admit_async("alice")
+        waiting = asyncio.create_task(controller.admit_async("bob"))
+        while controller.queued == 0:
+            await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert controller.queued == 0
+        holder.release()
+
+    asyncio.run(scenario())
+    assert controller.in_flight == 0
+
+
+def test_async_waiter_is_rejected_at_its_deadline():
+    controller = AdmissionController(max_in_flight=1, max_wait_seconds=0.05, user_rate=0)
+
+    async def scenario():
+        async with asyncio.timeout(2):
+            with await controller.admit_async("alice"):
+                with pytest.raises(AdmissionRejected, match="deadline"):
+                    await controller.admit_async("bob")
+
+    asyncio.run(scenario())
+    assert controller.queued == 0
+    assert controller.in_flight == 0
@@ -0,0 +1,87 @@
+import dataclasses
+
+import pytest
+
+import agent_registry
+from agent_registry import AgentRegistry
+
+ROWS = [
+    {
+        "id": "agent-2",
+        "name": "Product Manager",
+        "role_description": "Vision",
+        "color_hex": "#8B5CF6",
+        "system_prompt": "You are a PM",
+    },
+    {
+        "id": "agent-1",
+        "name": "Senior Architect",
+        "role_description": "System design",
+        "color_hex": "#3B82F6",
+        "system_prompt": "You are an architect",
+    },
+]
+
+
+class CountingLoader:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [dict(row) for row in self.rows]
+
+
+def test_catalog_is_loaded_once_and_immutable():
+    loader = CountingLoader(ROWS)
+    registry = AgentRegistry(loader)
+
+    catalog = registry.catalog()
+    assert registry.catalog() is catalog
+    assert loader.calls == 1
+    assert [agent["id"] for agent in catalog.public] == ["agent-1", "agent-2"]
+    assert registry.get("agent-2").system_prompt == "You are a PM"
+
+    with pytest.raises(TypeError):
+        catalog.agents["agent-3"] = catalog.agents["agent-1"]
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        catalog.agents["agent-1"].name = "x"
+
+
+def test_ttl_expiry_reloads():
+    loader = CountingLoader(ROWS)
+    registry = AgentRegistry(loader, ttl_seconds=0)
+
+    registry.catalog()
+    registry.catalog()
+    assert loader.calls == 2
+
+
+def test_invalidate_bumps_version_and_etag():
+    loader = CountingLoader(ROWS)
+    registry = AgentRegistry(loader)
+    before = registry.catalog()
+
+    loader.rows = [dict(ROWS[0], color_hex="#000000")]
+    registry.invalidate()
+    after = registry.catalog()
+
+    assert loader.calls == 2
+    assert after.version == before.version + 1
+    assert after.etag != before.etag
+    assert registry.get("agent-1") is None
+
+
+def test_unknown_agent_triggers_rate_limited_reload(monkeypatch):
+    loader = CountingLoader(ROWS)
+    registry = AgentRegistry(loader)
+    registry.catalog()
+
+    assert registry.get("agent-3") is None
+    assert loader.calls == 1
+
+    monkeypatch.setattr(agent_registry, "MISS_RELOAD_INTERVAL_SECONDS", 0)
+    loader.rows = ROWS + [dict(ROWS[0], id="agent-3")]
+    assert registry.get("agent-3").id == "agent-3"
+    assert loader.calls == 2
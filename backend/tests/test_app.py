@@ -1,4 +1,23 @@
+import base64
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
 import app as app_module
+import metrics
+from context_window import SUMMARY_PREAMBLE
+from conftest import JWT_SECRET
+from fakes import FakeOpenAIClient
+from model_routing import DeadlineExceeded, ModelRoute, ModelRouter
+from process_local import ProcessLocal
 
 
 def test_signup_requires_fields(client):
@@ -63,8 +82,25 @@ def test_get_sessions_filtered_by_user(client, fake_supabase, auth_header):
     data = response.get_json()
 
     assert response.status_code == 200
-    assert len(data) == 1
-    assert data[0]["id"] == "s1"
+    assert len(data["sessions"]) == 1
+    assert data["sessions"][0]["id"] == "s1"
+    assert data["next_before"] is None
+
+
+def test_get_sessions_etag(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2026-01-02"}]
+
+    first = client.get("/api/sessions", headers=auth_header)
+    etag = first.headers["ETag"]
+    assert "private" in first.headers["Cache-Control"]
+
+    unchanged = client.get("/api/sessions", headers={**auth_header, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    fake_supabase.db["sessions"][0]["title"] = "Renamed"
+    changed = client.get("/api/sessions", headers={**auth_header, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.get_json()["sessions"][0]["title"] == "Renamed"
 
 
 def test_get_messages_404_if_not_owner(client, fake_supabase, auth_header):
@@ -81,7 +117,86 @@ def test_get_messages_success(client, fake_supabase, auth_header):
 
     response = client.get("/api/sessions/s1/messages", headers=auth_header)
     assert response.status_code == 200
-    assert response.get_json()[0]["id"] == "m1"
+    assert response.get_json()["messages"][0]["id"] == "m1"
+    assert response.get_json()["next_before"] is None
+
+
+def row_id(n):
+    """A UUID row id; they sort in ``n`` order."""
+    return str(uuid.UUID(int=n))
+
+
+def test_get_messages_keyset_pagination(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    # Two messages share a timestamp so the id tie-breaker is exercised.
+    fake_supabase.db["messages"] = [
+        {"id": row_id(i), "session_id": "s1", "role": "user", "content": str(i), "agent_id": None,
+         "created_at": f"2026-01-01T00:00:{min(i, 3):02d}Z"}
+        for i in range(6)
+    ]
+
+    pages = []
+    url = "/api/sessions/s1/messages?limit=2"
+    while url:
+        payload = client.get(url, headers=auth_header).get_json()
+        pages.append([m["id"] for m in payload["messages"]])
+        cursor = payload["next_before"]
+        url = f"/api/sessions/s1/messages?limit=2&before={cursor}" if cursor else None
+
+    assert pages == [[row_id(4), row_id(5)], [row_id(2), row_id(3)], [row_id(0), row_id(1)]]
+
+
+def test_get_messages_delta_and_etag(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    fake_supabase.db["messages"] = [
+        {"id": row_id(1), "session_id": "s1", "role": "user", "content": "hi", "agent_id": None,
+         "created_at": "2026-01-01T00:00:01Z"},
+    ]
+
+    first = client.get("/api/sessions/s1/messages", headers=auth_header)
+    cursor = first.get_json()["next_after"]
+    etag = first.headers["ETag"]
+
+    unchanged = client.get("/api/sessions/s1/messages", headers={**auth_header, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    empty_delta = client.get(f"/api/sessions/s1/messages?after={cursor}", headers=auth_header).get_json()
+    assert empty_delta["messages"] == []
+    assert empty_delta["next_after"] == cursor
+
+    fake_supabase.db["messages"].append(
+        {"id": row_id(2), "session_id": "s1", "role": "assistant", "content": "hello", "agent_id": "agent-1",
+         "created_at": "2026-01-01T00:00:02Z"}
+    )
+    delta = client.get(f"/api/sessions/s1/messages?after={cursor}", headers=auth_header).get_json()
+    assert [m["id"] for m in delta["messages"]] == [row_id(2)]
+    assert delta["next_after"] != cursor
+
+    changed = client.get("/api/sessions/s1/messages", headers={**auth_header, "If-None-Match": etag})
+    assert changed.status_code == 200
+
+
+def cursor_for(sort_value, row):
+    raw = json.dumps([sort_value, row]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "limit=0",
+        "limit=abc",
+        "before=not-a-cursor",
+        "before=x&after=y",
+        # Well-formed cursors whose values would break out of the quoted filter.
+        "before=" + cursor_for('2026-01-01T00:00:00Z",id.neq."x', row_id(1)),
+        "after=" + cursor_for("2026-01-01T00:00:00Z", 'x",user_id.neq."y'),
+    ],
+)
+def test_get_messages_rejects_bad_pagination(client, fake_supabase, auth_header, query):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    response = client.get(f"/api/sessions/s1/messages?{query}", headers=auth_header)
+    assert response.status_code == 400
 
 
 def test_get_agents_success(client, auth_header):
@@ -90,6 +205,28 @@ def test_get_agents_success(client, auth_header):
     assert response.get_json()[0]["name"] == "Senior Architect"
 
 
+def test_get_agents_etag_and_cached_catalog(client, monkeypatch, fake_supabase, auth_header, services):
+    loads = []
+    original_table = fake_supabase.table
+    monkeypatch.setattr(fake_supabase, "table", lambda name: loads.append(name) or original_table(name))
+
+    first = client.get("/api/agents", headers=auth_header)
+    assert first.status_code == 200
+    assert "system_prompt" not in first.get_json()[0]
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/agents", headers={**auth_header, "If-None-Match": etag})
+    assert second.status_code == 304
+    assert loads == ["agents"]
+
+    fake_supabase.db["agents"][0]["name"] = "Principal Architect"
+    services.agent_registry.invalidate()
+    third = client.get("/api/agents", headers={**auth_header, "If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.get_json()[0]["name"] == "Principal Architect"
+    assert third.headers["ETag"] != etag
+
+
 def test_chat_requires_required_payload(client, auth_header):
     response = client.post("/api/chat", json={}, headers=auth_header)
     assert response.status_code == 400
@@ -117,7 +254,9 @@ def test_chat_404_when_agent_missing(client, fake_supabase, auth_header):
     assert response.status_code == 404
 
 
-def test_chat_success_persists_messages(client, fake_supabase, auth_header):
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_chat_success_persists_messages(client, fake_supabase, auth_header, use_rpc, flask_app):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
     fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
 
     response = client.post(
@@ -130,11 +269,369 @@ def test_chat_success_persists_messages(client, fake_supabase, auth_header):
     assert response.status_code == 200
     assert payload["message"]["role"] == "assistant"
     assert payload["message"]["content"] == "Generated response"
+    assert payload["user_message"]["role"] == "user"
+    assert payload["user_message"]["content"] == "hello"
+    assert payload["user_message"]["id"] == fake_supabase.db["messages"][0]["id"]
+    assert payload["message"]["id"] == fake_supabase.db["messages"][1]["id"]
+
+    delta = client.get(f"/api/sessions/s1/messages?after={payload['next_after']}", headers=auth_header)
+    assert delta.get_json()["messages"] == []
 
     # one user message + one assistant message persisted
     assert len(fake_supabase.db["messages"]) == 2
 
 
+def test_chat_reply_is_not_written_to_a_session_that_changed_hands(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, flask_app
+):
+    flask_app.config["CHAT_USE_RPC"] = True
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    original_create = fake_openai._create
+
+    def create(**kwargs):
+        # The session stops being this user's while the model is answering.
+        fake_supabase.db["sessions"][0]["user_id"] = "user-2"
+        return original_create(**kwargs)
+
+    monkeypatch.setattr(fake_openai.chat.completions, "create", create)
+    response = client.post(
+        "/api/chat", headers=auth_header, json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"}
+    )
+
+    assert response.status_code == 500
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user"]
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_chat_stream_forwards_deltas_and_persists(client, fake_supabase, fake_openai, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post(
+        "/api/chat/stream",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = _sse_events(response.get_data(as_text=True))
+    assert [name for name, _ in events] == ["delta", "delta", "delta", "done"]
+    assert "".join(data["content"] for name, data in events if name == "delta") == "Generated response"
+    assert events[-1][1]["message"]["content"] == "Generated response"
+    assert events[-1][1]["user_message"]["content"] == "hello"
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user", "assistant"]
+    assert fake_openai.streams[0].closed
+
+
+def test_chat_stream_404_when_session_not_owned(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "other-user"}]
+    response = client.post(
+        "/api/chat/stream",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("serving_mode", ["wsgi"])
+def test_chat_stream_client_disconnect_skips_persist(client, fake_supabase, fake_openai, auth_header):
+    # The ASGI counterpart lives in test_asgi.py; Starlette's TestClient buffers bodies.
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post(
+        "/api/chat/stream",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+        buffered=False,
+    )
+    first = next(iter(response.response))
+    assert b"event: delta" in first
+    response.close()
+
+    assert fake_openai.streams[0].closed
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user"]
+
+
+def test_chat_rpc_path_uses_two_round_trips(client, monkeypatch, fake_supabase, fake_openai, auth_header, services):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+    fake_supabase.db["messages"] = [
+        {"id": f"m{i}", "session_id": "s1", "role": "user", "content": f"old {i}", "created_at": f"2025-12-{i + 10}"}
+        for i in range(10)
+    ]
+    services.agent_registry.catalog()
+    table_calls = []
+    original_table = fake_supabase.table
+    monkeypatch.setattr(fake_supabase, "table", lambda name: table_calls.append(name) or original_table(name))
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+
+    response = client.post(
+        "/api/chat",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+
+    assert response.status_code == 200
+    assert fake_supabase.rpc_calls == ["chat_begin_turn", "chat_finish_turn"]
+    assert table_calls == []
+    llm_messages = sent[0]["messages"]
+    assert llm_messages[0] == {"role": "system", "content": "You are an architect"}
+    # Ten old messages plus the new turn all fit the default token budget.
+    assert len(llm_messages) == 1 + 11
+    assert llm_messages[-1] == {"role": "user", "content": "hello"}
+    assert fake_supabase.db["sessions"][0]["updated_at"] != "2025-12-31"
+
+
+def test_chat_context_is_packed_into_token_budget(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, flask_app
+):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    fake_supabase.db["messages"] = [
+        {"id": "m0", "session_id": "s1", "role": "user", "content": "short", "created_at": "2025-12-10"},
+        {"id": "m1", "session_id": "s1", "role": "assistant", "content": "paste " * 2000, "created_at": "2025-12-11"},
+    ]
+    flask_app.config["CONTEXT_TOKEN_BUDGET"] = 400
+    flask_app.config["CONTEXT_MESSAGE_MAX_TOKENS"] = 100
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+
+    response = client.post(
+        "/api/chat",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+
+    assert response.status_code == 200
+    context = response.get_json()["context"]
+    assert context["messages"] == 3
+    assert context["budget"] == 400
+    assert 0 < context["tokens"] <= 400
+    llm_messages = sent[0]["messages"]
+    assert [m["content"] for m in llm_messages[1::2]] == ["short", "hello"]
+    assert llm_messages[2]["content"].endswith("[…truncated]")
+
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_long_session_is_summarized_in_background(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, use_rpc, services, flask_app
+):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
+    flask_app.config["SUMMARY_REFRESH_EVERY"] = 20
+    flask_app.config["SUMMARY_KEEP_RECENT"] = 10
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    fake_supabase.db["messages"] = [
+        {
+            "id": f"m{i:02d}",
+            "session_id": "s1",
+            "role": "user" if i % 2 == 0 else "assistant",
+            "agent_id": None if i % 2 == 0 else "agent-1",
+            "content": f"old {i:02d}",
+            "created_at": f"2025-12-01T00:00:{i:02d}Z",
+        }
+        for i in range(30)
+    ]
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+    body = {"session_id": "s1", "agent_id": "agent-1", "message": "hello"}
+
+    first = client.post("/api/chat", headers=auth_header, json=body)
+    services.summary_refresher.wait(timeout=5)
+
+    assert first.get_json()["context"]["summary"] is False
+    # 30 seeded + 2 new messages; all but the newest 10 are folded in.
+    summary_request = sent[1]
+    assert summary_request["max_tokens"] == app_module.SUMMARY_MAX_TOKENS
+    transcript = summary_request["messages"][1]["content"]
+    assert "User: old 00" in transcript and "Senior Architect: old 21" in transcript
+    assert "old 22" not in transcript
+    assert fake_supabase.db["session_summaries"] == [
+        {
+            "session_id": "s1",
+            "summary": "Generated response",
+            "covered_until": "2025-12-01T00:00:21Z",
+            "covered_message_id": "m21",
+            "updated_at": fake_supabase.db["session_summaries"][0]["updated_at"],
+        }
+    ]
+
+    second = client.post("/api/chat", headers=auth_header, json=body)
+    services.summary_refresher.wait(timeout=5)
+
+    assert second.get_json()["context"]["summary"] is True
+    llm_messages = sent[2]["messages"]
+    assert llm_messages[1] == {"role": "system", "content": SUMMARY_PREAMBLE + "Generated response"}
+    assert [m["content"] for m in llm_messages[2:5]] == ["old 22", "old 23", "old 24"]
+    assert llm_messages[-1] == {"role": "user", "content": "hello"}
+    # 12 unsummarized messages now; below the refresh threshold.
+    assert len(sent) == 3
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_summaries_disabled_sends_plain_history(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, use_rpc, flask_app
+):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
+    flask_app.config["SESSION_SUMMARIES"] = False
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    fake_supabase.db["messages"] = [
+        {"id": "m0", "session_id": "s1", "role": "user", "content": "old", "created_at": "2025-12-01"}
+    ]
+    fake_supabase.db["session_summaries"] = [
+        {"session_id": "s1", "summary": "stale", "covered_until": "2025-12-01", "covered_message_id": "m0"}
+    ]
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+
+    response = client.post(
+        "/api/chat",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+
+    assert response.get_json()["context"]["summary"] is False
+    assert [m["content"] for m in sent[0]["messages"][1:]] == ["old", "hello"]
+
+
+def _add_second_agent(fake_supabase):
+    fake_supabase.db["agents"].append({
+        "id": "agent-2",
+        "name": "Product Manager",
+        "role_description": "Vision",
+        "system_prompt": "You are a PM",
+        "color_hex": "#8B5CF6",
+    })
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+def test_roundtable_fans_out_and_persists_in_one_insert(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, use_rpc, flask_app
+):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
+    _add_second_agent(fake_supabase)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+    inserts = []
+    original_table = fake_supabase.table
+    monkeypatch.setattr(
+        fake_supabase,
+        "table",
+        lambda name: (inserts.append(name) if name == "messages" else None) or original_table(name),
+    )
+
+    response = client.post(
+        "/api/chat/roundtable",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_ids": ["agent-1", "agent-2", "agent-1"], "message": "hello"},
+    )
+
+    assert response.status_code == 200
+    events = _sse_events(response.get_data(as_text=True))
+    names = [name for name, _ in events]
+    assert names.count("delta") == 6 and names.count("agent_done") == 2 and names[-1] == "done"
+    assert {data["agent_id"] for name, data in events if name == "delta"} == {"agent-1", "agent-2"}
+    assert sorted(kwargs["messages"][0]["content"] for kwargs in sent) == ["You are a PM", "You are an architect"]
+
+    done = events[-1][1]
+    finished_order = [data["agent_id"] for name, data in events if name == "agent_done"]
+    assert [m["agent_id"] for m in done["messages"]] == finished_order
+    assert all(m["content"] == "Generated response" for m in done["messages"])
+    assert done["user_message"]["content"] == "hello"
+    assert set(done["context"]) == {"agent-1", "agent-2"}
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user", "assistant", "assistant"]
+    assert fake_supabase.db["sessions"][0]["updated_at"] != "2025-12-31"
+    if use_rpc:
+        assert fake_supabase.rpc_calls == ["chat_begin_turn", "chat_finish_roundtable"]
+    else:
+        # One history fetch after the user insert, then one bulk insert.
+        assert inserts == ["messages", "messages", "messages"]
+
+    delta = client.get(f"/api/sessions/s1/messages?after={done['next_after']}", headers=auth_header)
+    assert delta.get_json()["messages"] == []
+
+
+def test_roundtable_skips_failed_agents(client, monkeypatch, fake_supabase, fake_openai, auth_header):
+    _add_second_agent(fake_supabase)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    original_create = fake_openai._create
+
+    def create(**kwargs):
+        if kwargs["messages"][0]["content"] == "You are a PM":
+            raise RuntimeError("provider down")
+        return original_create(**kwargs)
+
+    monkeypatch.setattr(fake_openai.chat.completions, "create", create)
+
+    response = client.post(
+        "/api/chat/roundtable",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_ids": ["agent-1", "agent-2"], "message": "hello"},
+    )
+
+    events = _sse_events(response.get_data(as_text=True))
+    assert ("agent_error", {"agent_id": "agent-2", "error": "Agent reply failed"}) in events
+    assert [m["agent_id"] for m in events[-1][1]["messages"]] == ["agent-1"]
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user", "assistant"]
+
+
+@pytest.mark.parametrize("serving_mode", ["wsgi"])
+def test_roundtable_client_disconnect_skips_persist(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post(
+        "/api/chat/roundtable",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_ids": ["agent-1"], "message": "hello"},
+        buffered=False,
+    )
+    first = next(iter(response.response))
+    assert b"event: delta" in first
+    response.close()
+
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user"]
+
+
+@pytest.mark.parametrize(
+    "body, status",
+    [
+        ({"session_id": "s1", "message": "hello"}, 400),
+        ({"session_id": "s1", "agent_ids": "agent-1", "message": "hello"}, 400),
+        ({"session_id": "s1", "agent_ids": [f"a{i}" for i in range(9)], "message": "hello"}, 400),
+        ({"session_id": "s1", "agent_ids": ["agent-1", "missing"], "message": "hello"}, 404),
+        ({"session_id": "s2", "agent_ids": ["agent-1"], "message": "hello"}, 404),
+    ],
+)
+def test_roundtable_rejects_bad_requests(client, fake_supabase, auth_header, body, status):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post("/api/chat/roundtable", headers=auth_header, json=body)
+
+    assert response.status_code == status
+    assert fake_supabase.db["messages"] == []
+
 def test_normalize_user_supports_dict_and_object():
     from types import SimpleNamespace
 
@@ -143,3 +640,894 @@ def test_normalize_user_supports_dict_and_object():
 
     assert user_from_dict == {"id": "u1", "email": "d@example.com"}
     assert user_from_obj == {"id": "u2", "email": "o@example.com"}
+
+
+def test_local_jwt_verification_skips_remote_auth(client, monkeypatch, fake_supabase, make_token, services):
+    monkeypatch.setattr(services, "token_verifier", app_module.LocalTokenVerifier(jwt_secret=JWT_SECRET))
+
+    def remote_get_user(token):
+        raise AssertionError("remote auth should not be called")
+
+    monkeypatch.setattr(fake_supabase.auth, "get_user", remote_get_user)
+
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {make_token(sub='u-9')}"})
+    assert response.status_code == 200
+    assert response.get_json()["user"]["id"] == "u-9"
+
+    expired = client.get("/api/auth/me", headers={"Authorization": f"Bearer {make_token(exp_in=-60)}"})
+    assert expired.status_code == 401
+
+
+def test_remote_fallback_only_when_configured(client, monkeypatch, fake_supabase, auth_header, flask_app, services):
+    monkeypatch.setattr(
+        services, "token_verifier", app_module.LocalTokenVerifier(jwks_url="http://localhost/jwks.json")
+    )
+
+    def jwks_unreachable(self, token):
+        raise app_module.TokenVerificationUnavailable("jwks down")
+
+    monkeypatch.setattr(app_module.LocalTokenVerifier, "verify", jwks_unreachable)
+
+    flask_app.config["AUTH_REMOTE_FALLBACK"] = False
+    assert client.get("/api/auth/me", headers=auth_header).status_code == 401
+
+    flask_app.config["AUTH_REMOTE_FALLBACK"] = True
+    assert client.get("/api/auth/me", headers=auth_header).status_code == 200
+
+
+def test_validated_tokens_are_cached(client, monkeypatch, fake_supabase, auth_header):
+    calls = []
+    original = fake_supabase.auth.get_user
+
+    def counting_get_user(token):
+        calls.append(token)
+        return original(token)
+
+    monkeypatch.setattr(fake_supabase.auth, "get_user", counting_get_user)
+
+    client.get("/api/auth/me", headers=auth_header)
+    client.get("/api/sessions", headers=auth_header)
+    assert len(calls) == 1
+
+
+def _metric(name, **labels):
+    return metrics.registry.get_sample_value(name, labels) or 0.0
+
+
+def _server_timing_stages(response):
+    return [entry.split(";", 1)[0] for entry in response.headers["Server-Timing"].split(", ")]
+
+
+def test_chat_reports_stage_timings_and_token_usage(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    route = {"route": "/api/chat"}
+    llm_before = _metric("boardroom_stage_duration_seconds_count", stage="llm", **route)
+    requests_before = _metric("boardroom_request_duration_seconds_count", method="POST", status="200", **route)
+    tokens_before = _metric("boardroom_llm_tokens_total", agent="agent-1", model=app_module.OPENROUTER_MODEL,
+                            kind="prompt")
+
+    response = client.post(
+        "/api/chat",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+
+    assert response.status_code == 200
+    assert _server_timing_stages(response) == [
+        "auth", "llm_queue", "agent", "db_begin_turn", "context", "llm", "db_finish_turn", "total"
+    ]
+    assert _metric("boardroom_stage_duration_seconds_count", stage="llm", **route) == llm_before + 1
+    assert _metric("boardroom_request_duration_seconds_count", method="POST", status="200", **route) == (
+        requests_before + 1
+    )
+    assert _metric("boardroom_llm_tokens_total", agent="agent-1", model=app_module.OPENROUTER_MODEL,
+                   kind="prompt") == tokens_before + 30
+
+
+def test_chat_stream_times_first_token_and_whole_request(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    route = {"route": "/api/chat/stream"}
+    ttft_before = _metric("boardroom_stage_duration_seconds_count", stage="llm_ttft", **route)
+    requests_before = _metric("boardroom_request_duration_seconds_count", method="POST", status="200", **route)
+    tokens_before = _metric("boardroom_llm_tokens_total", agent="agent-1", model=app_module.OPENROUTER_MODEL,
+                            kind="completion")
+
+    response = client.post(
+        "/api/chat/stream",
+        headers=auth_header,
+        json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"},
+    )
+    response.get_data()
+
+    # Headers go out before the LLM stage, so only the earlier stages are listed.
+    assert _server_timing_stages(response) == ["auth", "llm_queue", "agent", "db_begin_turn", "context", "total"]
+    assert _metric("boardroom_stage_duration_seconds_count", stage="llm_ttft", **route) == ttft_before + 1
+    assert _metric("boardroom_llm_tokens_total", agent="agent-1", model=app_module.OPENROUTER_MODEL,
+                   kind="completion") == tokens_before + 12
+    if isinstance(response, app_module.Response):
+        response.close()
+    assert _metric("boardroom_request_duration_seconds_count", method="POST", status="200", **route) == (
+        requests_before + 1
+    )
+
+
+def test_mounted_routes_are_labelled_by_route_pattern(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    route = {"route": "/api/sessions/<session_id>/messages"}
+    before = _metric("boardroom_stage_duration_seconds_count", stage="db_messages", **route)
+
+    response = client.get("/api/sessions/s1/messages", headers=auth_header)
+
+    assert response.status_code == 200
+    assert _server_timing_stages(response) == ["auth", "db_ownership", "db_messages", "total"]
+    assert _metric("boardroom_stage_duration_seconds_count", stage="db_messages", **route) == before + 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text(client, auth_header, flask_app):
+    client.get("/api/sessions", headers=auth_header)
+
+    response = client.get("/metrics")
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert 'boardroom_stage_duration_seconds_count{route="/api/sessions",stage="db_sessions"}' in body
+    assert "# TYPE boardroom_llm_tokens_total counter" in body
+
+    flask_app.config["METRICS_TOKEN"] = "scrape-secret"
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"}).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_chat_over_the_rate_limit_is_rejected_before_persisting(
+    client, monkeypatch, fake_supabase, auth_header, path, services
+):
+    monkeypatch.setattr(services, "llm_admission", app_module.AdmissionController(user_rate=1 / 60, user_burst=1))
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    body = {"session_id": "s1", "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    assert client.post(path, headers=auth_header, json=body).status_code == 200
+    rejected = client.post(path, headers=auth_header, json=body)
+
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "60"
+    assert rejected.get_json()["error"] == "Too many requests; please retry shortly"
+    assert [m["content"] for m in fake_supabase.db["messages"] if m["role"] == "user"] == ["hello"]
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_llm_slots_are_released_after_each_call(client, fake_supabase, auth_header, path, services):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    body = {"session_id": "s1", "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    response = client.post(path, headers=auth_header, json=body)
+    response.get_data()
+    missing = client.post(path, headers=auth_header, json={**body, "session_id": "missing"})
+
+    assert response.status_code == 200
+    assert missing.status_code == 404
+    assert services.llm_admission.in_flight == 0
+
+
+def _final_result(response, path):
+    if path == "/api/chat":
+        return response.get_json()
+    return _sse_events(response.get_data(as_text=True))[-1][1]
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_chat_falls_back_to_the_next_model_route(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, path, services
+):
+    router = ModelRouter([ModelRoute("primary/model"), ModelRoute("backup/model")], hedge_after_seconds=30)
+    monkeypatch.setattr(services, "llm_router", router)
+    original_create = fake_openai._create
+
+    def create(**kwargs):
+        if kwargs["model"] == "primary/model":
+            raise RuntimeError("provider down")
+        return original_create(**kwargs)
+
+    monkeypatch.setattr(fake_openai.chat.completions, "create", create)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    body = {"session_id": "s1", "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    response = client.post(path, headers=auth_header, json=body)
+    result = _final_result(response, path)
+
+    assert response.status_code == 200
+    routing = result["routing"]["agent-1"] if path == "/api/chat/roundtable" else result["routing"]
+    assert routing["model"] == "backup/model"
+    assert routing["attempts"] == 2
+    assert routing["hedged"] is False
+    assert [m["content"] for m in fake_supabase.db["messages"]] == ["hello", "Generated response"]
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream"])
+def test_chat_past_the_model_deadline_is_a_504(client, monkeypatch, fake_supabase, auth_header, path, services):
+    def timed_out(*args, **kwargs):
+        raise DeadlineExceeded("No first token within 120s from primary/model")
+
+    async def timed_out_async(*args, **kwargs):
+        timed_out()
+
+    monkeypatch.setattr(services.llm_router, "open_stream", timed_out)
+    monkeypatch.setattr(services.llm_router, "open_stream_async", timed_out_async)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post(
+        path, headers=auth_header, json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"}
+    )
+
+    assert response.status_code == 504
+    assert response.get_json()["error"] == "The model did not respond in time"
+    assert services.llm_admission.in_flight == 0
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream"])
+def test_single_route_timing_out_is_a_504(client, monkeypatch, fake_supabase, fake_openai, auth_header, path, services):
+    monkeypatch.setattr(services, "llm_router", ModelRouter([ModelRoute("primary/model")], deadline_seconds=0.1))
+
+    def create(**kwargs):
+        # What the SDK raises once its HTTP timeout (the deadline) runs out.
+        raise TimeoutError("Request timed out.")
+
+    monkeypatch.setattr(fake_openai.chat.completions, "create", create)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    response = client.post(
+        path, headers=auth_header, json={"session_id": "s1", "agent_id": "agent-1", "message": "hello"}
+    )
+
+    assert response.status_code == 504
+    assert response.get_json()["error"] == "The model did not respond in time"
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_identical_prompts_are_served_from_the_completion_cache(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, path, services, flask_app
+):
+    flask_app.config["COMPLETION_CACHE_AGENTS"] = {"agent-1"}
+    # Room for two model calls; cache hits give their token back.
+    monkeypatch.setattr(services, "llm_admission", app_module.AdmissionController(user_rate=1 / 60, user_burst=2))
+    calls = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: calls.append(kwargs) or original_create(**kwargs)
+    )
+    fake_supabase.db["sessions"] = [
+        {"id": "s1", "title": "A", "user_id": "user-1"},
+        {"id": "s2", "title": "B", "user_id": "user-1"},
+        {"id": "s3", "title": "C", "user_id": "user-1"},
+    ]
+    body = {"agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "threat model this"}
+
+    first = _final_result(client.post(path, headers=auth_header, json={**body, "session_id": "s1"}), path)
+    second = _final_result(client.post(path, headers=auth_header, json={**body, "session_id": "s2"}), path)
+    third = _final_result(client.post(path, headers=auth_header, json={**body, "session_id": "s3"}), path)
+
+    def routing(result):
+        return result["routing"]["agent-1"] if path == "/api/chat/roundtable" else result["routing"]
+
+    assert len(calls) == 1
+    assert routing(first)["cached"] is False
+    assert routing(second)["cached"] is True
+    assert routing(third)["cached"] is True
+    assert routing(second)["model"] == app_module.OPENROUTER_MODEL
+    replies = [(m["session_id"], m["content"]) for m in fake_supabase.db["messages"] if m["role"] == "assistant"]
+    assert replies == [(session_id, "Generated response") for session_id in ("s1", "s2", "s3")]
+    assert services.llm_admission.in_flight == 0
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_a_locked_completion_cache_still_persists_the_reply(
+    client, monkeypatch, tmp_path, fake_supabase, auth_header, path, services, flask_app
+):
+    class LockedDatabase:
+        in_transaction = False
+
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+    cache = app_module.CompletionCache(max_entries=0, path=str(tmp_path / "cache.db"))
+    cache._db.close()
+    cache._db = LockedDatabase()
+    monkeypatch.setattr(services, "completion_cache", ProcessLocal(lambda: cache, "completion_cache"))
+    flask_app.config["COMPLETION_CACHE_AGENTS"] = {"agent-1"}
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+    body = {"session_id": "s1", "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    response = client.post(path, headers=auth_header, json=body)
+    result = _final_result(response, path)
+
+    assert response.status_code == 200
+    assert "error" not in result
+    assert [m["content"] for m in fake_supabase.db["messages"]] == ["hello", "Generated response"]
+
+
+def test_completion_cache_is_opt_in_per_agent(client, fake_supabase, fake_openai, auth_header, flask_app):
+    flask_app.config["COMPLETION_CACHE_AGENTS"] = {"agent-2"}
+    fake_supabase.db["sessions"] = [
+        {"id": "s1", "title": "A", "user_id": "user-1"},
+        {"id": "s2", "title": "B", "user_id": "user-1"},
+    ]
+    for session_id in ("s1", "s2"):
+        response = client.post(
+            "/api/chat", headers=auth_header,
+            json={"session_id": session_id, "agent_id": "agent-1", "message": "threat model this"},
+        )
+        assert response.get_json()["routing"]["cached"] is False
+    assert len(fake_openai.streams) == 2
+
+
+@pytest.fixture
+def write_behind_gate(monkeypatch, tmp_path, services, flask_app):
+    """Turn write-behind on; its flushes wait until the returned event is set."""
+    from write_behind import Journal, WriteBehindQueue
+
+    gate = threading.Event()
+
+    def apply(writes):
+        assert gate.wait(5)
+        with flask_app.app_context():
+            app_module._apply_chat_writes(writes)
+
+    queue = WriteBehindQueue(Journal(str(tmp_path)), apply, flush_interval=0.01)
+    monkeypatch.setattr(services, "write_behind", queue)
+    yield gate
+    gate.set()
+    queue.close()
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_write_behind_answers_before_the_reply_is_stored(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, write_behind_gate, path, use_rpc, services, flask_app
+):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+    body = {"session_id": "s1", "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    result = _final_result(client.post(path, headers=auth_header, json=body), path)
+    reply = result["messages"][0] if path == "/api/chat/roundtable" else result["message"]
+
+    # Answered from the journal: the reply has its id and timestamp but is not in the database yet.
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user"]
+    assert reply["created_at"] > result["user_message"]["created_at"]
+    assert services.write_behind.has_pending("s1")
+
+    write_behind_gate.set()
+    listed = client.get("/api/sessions/s1/messages", headers=auth_header).get_json()["messages"]
+    assert [m["id"] for m in listed] == [result["user_message"]["id"], reply["id"]]
+    assert fake_supabase.db["sessions"][0]["updated_at"] == reply["created_at"]
+
+    # The next turn's history includes the reply.
+    sent = []
+    original_create = fake_openai._create
+    monkeypatch.setattr(
+        fake_openai.chat.completions, "create", lambda **kwargs: sent.append(kwargs) or original_create(**kwargs)
+    )
+    client.post("/api/chat", headers=auth_header, json={**body, "message": "and then?"})
+    assert "Generated response" in [m["content"] for m in sent[0]["messages"]]
+
+
+def test_write_behind_batches_are_idempotent(fake_supabase, flask_app):
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+    row = {"id": "m1", "session_id": "s1", "agent_id": "agent-1", "role": "assistant", "content": "hi",
+           "created_at": "2026-01-02T00:00:00+00:00"}
+    gone = {**row, "id": "m2", "session_id": "deleted"}
+    writes = [{"session_id": "s1", "user_id": "user-1", "messages": [row], "updated_at": row["created_at"]},
+              {"session_id": "deleted", "user_id": "user-1", "messages": [gone], "updated_at": row["created_at"]}]
+
+    for use_rpc in (True, False):
+        flask_app.config["CHAT_USE_RPC"] = use_rpc
+        with flask_app.app_context():
+            app_module._apply_chat_writes(writes)
+            app_module._apply_chat_writes(writes)
+        assert [m["id"] for m in fake_supabase.db["messages"] if m["session_id"] == "s1"] == ["m1"]
+        assert fake_supabase.db["sessions"][0]["updated_at"] == row["created_at"]
+
+
+def test_identical_reads_are_coalesced_until_a_write(client, monkeypatch, fake_supabase, auth_header, services):
+    monkeypatch.setattr(services, "read_flights", app_module.SingleFlight(reuse_seconds=60))
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+    queried = []
+    original_table = fake_supabase.table
+    monkeypatch.setattr(fake_supabase, "table", lambda name: queried.append(name) or original_table(name))
+
+    sessions = [client.get("/api/sessions", headers=auth_header).get_json() for _ in range(3)]
+    assert sessions[0] == sessions[1] == sessions[2]
+    assert queried == ["sessions"]
+
+    pages = [client.get("/api/sessions/s1/messages", headers=auth_header).get_json() for _ in range(2)]
+    assert pages[0] == pages[1] and pages[0]["messages"] == []
+    assert queried == ["sessions", "sessions", "messages"]
+
+    # A chat turn invalidates both reads, so the next ones see it.
+    client.post("/api/chat", headers=auth_header, json={"session_id": "s1", "agent_id": "agent-1", "message": "hi"})
+    listed = client.get("/api/sessions/s1/messages", headers=auth_header).get_json()["messages"]
+    assert [m["role"] for m in listed] == ["user", "assistant"]
+    assert client.get("/api/sessions", headers=auth_header).get_json()["sessions"][0]["updated_at"] != "2025-12-31"
+
+    created = client.post("/api/sessions", headers=auth_header).get_json()
+    listed = client.get("/api/sessions", headers=auth_header).get_json()["sessions"]
+    assert created["id"] in [s["id"] for s in listed]
+
+
+def test_coalesced_reads_are_per_user(client, monkeypatch, fake_supabase, auth_header, services):
+    monkeypatch.setattr(services, "read_flights", app_module.SingleFlight(reuse_seconds=60))
+    _, other_token = fake_supabase.auth.seed_user("other@example.com")
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1", "updated_at": "2025-12-31"}]
+
+    assert client.get("/api/sessions/s1/messages", headers=auth_header).status_code == 200
+    other = client.get("/api/sessions/s1/messages", headers={"Authorization": f"Bearer {other_token}"})
+    assert other.status_code == 404
+    assert client.get("/api/sessions", headers={"Authorization": f"Bearer {other_token}"}).get_json()["sessions"] == []
+
+
+def test_get_sessions_keyset_pagination(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [
+        {"id": row_id(i), "title": "T", "user_id": "user-1", "updated_at": f"2026-01-0{i // 2 + 1}"}
+        for i in range(5)
+    ] + [{"id": "other", "title": "T", "user_id": "user-2", "updated_at": "2026-02-01"}]
+
+    seen, url = [], "/api/sessions?limit=2"
+    while url:
+        page = client.get(url, headers=auth_header).get_json()
+        assert len(page["sessions"]) <= 2
+        seen += [s["id"] for s in page["sessions"]]
+        url = f"/api/sessions?limit=2&before={page['next_before']}" if page["next_before"] else None
+
+    # Newest first; ties on updated_at fall back to the id.
+    assert seen == [row_id(4), row_id(3), row_id(2), row_id(1), row_id(0)]
+    assert client.get("/api/sessions?limit=0", headers=auth_header).status_code == 400
+    assert client.get("/api/sessions?before=%%%", headers=auth_header).status_code == 400
+
+
+@pytest.mark.parametrize("use_rpc", [True, False])
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/roundtable"])
+def test_session_list_carries_count_and_last_message(client, fake_supabase, auth_header, path, use_rpc, flask_app):
+    flask_app.config["CHAT_USE_RPC"] = use_rpc
+    session_id = client.post("/api/sessions", headers=auth_header).get_json()["id"]
+    body = {"session_id": session_id, "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+
+    _final_result(client.post(path, headers=auth_header, json=body), path)
+    listed = client.get("/api/sessions", headers=auth_header).get_json()["sessions"]
+
+    assert listed == [{
+        "id": session_id,
+        "title": "New Session",
+        "updated_at": listed[0]["updated_at"],
+        "message_count": 2,
+        "last_message_preview": "Generated response",
+        "last_agent_id": "agent-1",
+    }]
+
+
+def test_sessions_are_titled_after_the_first_exchange(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, services, flask_app
+):
+    flask_app.config["SESSION_TITLES"] = True
+    sent = []
+
+    def create(**kwargs):
+        if kwargs.get("stream"):
+            return FakeOpenAIClient()._create(**kwargs)
+        sent.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='"Scaling the ingest pipeline."'))], usage=None
+        )
+
+    monkeypatch.setattr(fake_openai.chat.completions, "create", create)
+    session_id = client.post("/api/sessions", headers=auth_header).get_json()["id"]
+    renamed_id = client.post("/api/sessions", headers=auth_header).get_json()["id"]
+    next(s for s in fake_supabase.db["sessions"] if s["id"] == renamed_id)["title"] = "Mine"
+    body = {"agent_id": "agent-1", "message": "How do we scale ingest?"}
+
+    for target in (session_id, renamed_id):
+        client.post("/api/chat", headers=auth_header, json={**body, "session_id": target})
+        services.title_refresher.wait(timeout=5)
+
+    titles = {s["id"]: s["title"] for s in client.get("/api/sessions", headers=auth_header).get_json()["sessions"]}
+    assert titles == {session_id: "Scaling the ingest pipeline", renamed_id: "Mine"}
+    assert len(sent) == 1
+    transcript = sent[0]["messages"][1]["content"]
+    assert "User: How do we scale ingest?" in transcript and "Senior Architect: Generated response" in transcript
+
+    # Later turns don't ask again.
+    client.post("/api/chat", headers=auth_header, json={**body, "session_id": session_id})
+    services.title_refresher.wait(timeout=5)
+    assert len(sent) == 1
+
+
+def test_search_is_ranked_paginated_and_scoped_to_the_user(client, fake_supabase, auth_header):
+    fake_supabase.db["sessions"] = [
+        {"id": "s1", "title": "Launch", "user_id": "user-1"},
+        {"id": "s2", "title": "Pricing", "user_id": "user-1"},
+        {"id": "other", "title": "Theirs", "user_id": "user-2"},
+    ]
+    fake_supabase.db["messages"] = [
+        {"id": "m1", "session_id": "s1", "role": "user", "agent_id": None, "created_at": "2026-01-01T00:00:01Z",
+         "content": "What are the launch risks?"},
+        {"id": "m2", "session_id": "s1", "role": "assistant", "agent_id": "agent-1",
+         "created_at": "2026-01-01T00:00:02Z", "content": "The main risk is the database migration; risks compound."},
+        {"id": "m3", "session_id": "s2", "role": "user", "agent_id": None, "created_at": "2026-01-01T00:00:03Z",
+         "content": "Low risk."},
+        {"id": "m4", "session_id": "other", "role": "user", "agent_id": None, "created_at": "2026-01-01T00:00:04Z",
+         "content": "Another user's risk"},
+    ]
+
+    page = client.get("/api/search?q=risk&limit=2", headers=auth_header).get_json()
+    # m2 mentions risk twice; m3 is a short message, so it outranks m1.
+    assert [r["id"] for r in page["results"]] == ["m2", "m3"]
+    assert page["results"][0]["session_title"] == "Launch"
+    assert page["results"][0]["snippet"][:2] == [
+        {"text": "The main ", "match": False},
+        {"text": "risk", "match": True},
+    ]
+    assert page["next_offset"] == 2
+
+    rest = client.get("/api/search?q=risk&limit=2&offset=2", headers=auth_header).get_json()
+    assert [r["id"] for r in rest["results"]] == ["m1"]
+    assert rest["next_offset"] is None
+
+    narrowed = client.get('/api/search?q="launch risks" -migration', headers=auth_header).get_json()
+    assert [r["id"] for r in narrowed["results"]] == ["m1"]
+
+
+@pytest.mark.parametrize("query", ["", "q=", "q=%20", f"q={'x' * 257}", "q=a&limit=0", "q=a&offset=-1", "q=a&offset=x"])
+def test_search_rejects_bad_requests(client, auth_header, query):
+    assert client.get(f"/api/search?{query}", headers=auth_header).status_code == 400
+
+
+def test_search_requires_auth_and_reports_failures(client, monkeypatch, fake_supabase, auth_header):
+    assert client.get("/api/search?q=risk").status_code == 401
+
+    def broken(**params):
+        raise RuntimeError("function search_messages does not exist")
+
+    monkeypatch.setattr(fake_supabase, "_rpc_search_messages", broken)
+    response = client.get("/api/search?q=risk", headers=auth_header)
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Search failed"}
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def _seed_archive_sessions(fake_supabase):
+    fake_supabase.db["sessions"] = [
+        {"id": f"s{i}", "title": f"Session {i}", "user_id": "user-1",
+         "created_at": f"2026-01-0{i + 1}T00:00:00Z", "updated_at": f"2026-02-0{i + 1}T00:00:00Z"}
+        for i in range(3)
+    ] + [{"id": "theirs", "title": "Theirs", "user_id": "user-2", "created_at": "2026-01-01T00:00:00Z"}]
+    fake_supabase.db["messages"] = [
+        {"id": f"m{s}-{i}", "session_id": f"s{s}", "role": "user" if i % 2 == 0 else "assistant",
+         "agent_id": None if i % 2 == 0 else "agent-1", "content": f"message {i} of s{s}",
+         "created_at": f"2026-01-0{s + 1}T00:00:0{i}Z"}
+        for s in range(3) for i in range(3)
+    ] + [{"id": "hidden", "session_id": "theirs", "role": "user", "agent_id": None, "content": "no",
+          "created_at": "2026-01-01T00:00:00Z"}]
+
+
+def test_export_streams_the_users_sessions_page_by_page(client, fake_supabase, auth_header, flask_app):
+    flask_app.config["ARCHIVE_EXPORT_PAGE_ROWS"] = 2
+    _seed_archive_sessions(fake_supabase)
+
+    response = client.get("/api/sessions/export", headers=auth_header)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert "attachment" in response.headers["Content-Disposition"]
+    records = _ndjson(response)
+
+    assert records[0]["type"] == "archive"
+    assert records[-1] == {"type": "end", "sessions": 3, "messages": 9}
+    body = [(r["type"], r["id"]) for r in records[1:-1]]
+    assert body == [
+        item for s in range(3) for item in [("session", f"s{s}"), *(("message", f"m{s}-{i}") for i in range(3))]
+    ]
+    assert records[2]["content"] == "message 0 of s0"
+
+    one = _ndjson(client.get("/api/sessions/export?session_id=s1", headers=auth_header))
+    assert [r["id"] for r in one[1:-1]] == ["s1", "m1-0", "m1-1", "m1-2"]
+    assert client.get("/api/sessions/export?session_id=theirs", headers=auth_header).status_code == 404
+
+
+def test_export_failure_ends_without_the_trailer(client, monkeypatch, fake_supabase, auth_header):
+    _seed_archive_sessions(fake_supabase)
+
+    def broken(user_id, session_id):
+        yield "partial\n"
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(app_module, "_export_archive", broken)
+    lines = client.get("/api/sessions/export", headers=auth_header).get_data(as_text=True).splitlines()
+    assert lines[0] == "partial"
+    assert json.loads(lines[-1]) == {"type": "error", "error": "Export failed"}
+
+
+def test_import_restores_an_export_in_batches(client, fake_supabase, auth_header, services, flask_app):
+    flask_app.config["ARCHIVE_IMPORT_BATCH_ROWS"] = 5
+    _seed_archive_sessions(fake_supabase)
+    exported = client.get("/api/sessions/export", headers=auth_header).get_data()
+    fake_supabase.db["agents"] = []
+    services.agent_registry.invalidate()
+    inserts_before = len(fake_supabase.db["messages"])
+
+    response = client.post("/api/sessions/import", headers=auth_header, data=exported)
+    assert response.status_code == 200
+    progress = _ndjson(response)
+
+    # 3 sessions and 9 messages, written 5 rows at a time.
+    assert [p["type"] for p in progress] == ["progress", "progress", "done"]
+    assert progress[-1] == {"type": "done", "sessions": 3, "messages": 9}
+
+    imported = [s for s in fake_supabase.db["sessions"] if s["id"] not in {"s0", "s1", "s2", "theirs"}]
+    assert [(s["title"], s["user_id"], s["updated_at"], s["message_count"]) for s in imported] == [
+        (f"Session {i}", "user-1", f"2026-02-0{i + 1}T00:00:00Z", 3) for i in range(3)
+    ]
+    copies = fake_supabase.db["messages"][inserts_before:]
+    assert [m["content"] for m in copies] == [f"message {i} of s{s}" for s in range(3) for i in range(3)]
+    assert {m["session_id"] for m in copies} == {s["id"] for s in imported}
+    # The agent no longer exists here, so its replies keep their content without it.
+    assert {m["agent_id"] for m in copies} == {None}
+
+    listed = client.get("/api/sessions", headers=auth_header).get_json()["sessions"]
+    assert len(listed) == 6
+
+
+def test_import_stops_at_a_bad_line_keeping_earlier_rows(client, fake_supabase, auth_header):
+    lines = [
+        {"type": "archive", "version": 1},
+        {"type": "session", "id": "old", "title": None, "created_at": "2026-01-01T00:00:00Z"},
+        {"type": "message", "session_id": "old", "id": "x", "role": "user", "agent_id": "agent-1",
+         "content": "kept", "created_at": "2026-01-01T00:00:01Z"},
+        {"type": "message", "session_id": "missing", "id": "y", "role": "user", "agent_id": None,
+         "content": "dropped", "created_at": "2026-01-01T00:00:02Z"},
+    ]
+    body = "".join(json.dumps(line) + "\n" for line in lines)
+
+    progress = _ndjson(client.post("/api/sessions/import", headers=auth_header, data=body))
+    assert progress == [
+        {"type": "error", "sessions": 1, "messages": 1, "error": "message before its session", "line": 4}
+    ]
+    assert fake_supabase.db["sessions"][0]["title"] == "New Session"
+    assert [(m["content"], m["agent_id"]) for m in fake_supabase.db["messages"]] == [("kept", "agent-1")]
+
+
+def test_import_reports_failed_inserts(client, monkeypatch, fake_supabase, auth_header):
+    assert client.post("/api/sessions/import", data="").status_code == 401
+    monkeypatch.setattr(app_module, "_ArchiveImport", type("Broken", (app_module._ArchiveImport,), {
+        "flush": lambda self: (_ for _ in ()).throw(RuntimeError("insert failed")),
+    }))
+    body = json.dumps({"type": "archive", "version": 1}) + "\n"
+    progress = _ndjson(client.post("/api/sessions/import", headers=auth_header, data=body))
+    assert progress == [{"type": "error", "sessions": 0, "messages": 0, "error": "Import failed"}]
+
+
+def _live_events(body: str):
+    """(id, event, data) of each frame of an /api/events body; keep-alives are skipped."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["id"], lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.parametrize("path", ["/api/chat", "/api/chat/stream", "/api/chat/roundtable"])
+def test_event_stream_replays_writes_after_its_cursor(client, fake_supabase, auth_header, path, flask_app):
+    flask_app.config["EVENTS_STREAM_MAX_SECONDS"] = 0
+    assert client.get("/api/events").status_code == 401
+
+    # A fresh stream starts with sync; its id is where the client resumes from.
+    [(cursor, kind, _)] = _live_events(client.get("/api/events", headers=auth_header).get_data(as_text=True))
+    assert kind == "sync"
+
+    session_id = client.post("/api/sessions", headers=auth_header).get_json()["id"]
+    body = {"session_id": session_id, "agent_id": "agent-1", "agent_ids": ["agent-1"], "message": "hello"}
+    result = _final_result(client.post(path, headers=auth_header, json=body), path)
+    reply = result["messages"][0] if path.endswith("roundtable") else result["message"]
+
+    response = client.get("/api/events", headers={**auth_header, "Last-Event-ID": cursor})
+    assert response.mimetype == "text/event-stream"
+    events = _live_events(response.get_data(as_text=True))
+    assert [kind for _, kind, _ in events] == ["session_created", "message_inserted", "message_inserted"]
+    assert events[0][2]["session"]["id"] == session_id
+    inserted = [data for _, _, data in events[1:]]
+    assert [data["message"]["id"] for data in inserted] == [result["user_message"]["id"], reply["id"]]
+    assert all(data["session_id"] == session_id for data in inserted)
+    assert inserted[-1]["next_after"] == result["next_after"]
+
+    # Resuming from the newest id has nothing to replay; a cursor from another worker gets sync.
+    caught_up = client.get(f"/api/events?after={events[-1][0]}", headers=auth_header)
+    assert caught_up.get_data(as_text=True) == ""
+    elsewhere = client.get("/api/events?after=otherworker-3", headers=auth_header).get_data(as_text=True)
+    assert [kind for _, kind, _ in _live_events(elsewhere)] == ["sync"]
+
+
+def test_event_stream_pushes_events_while_open(client, auth_header, services, flask_app):
+    flask_app.config["EVENTS_STREAM_MAX_SECONDS"] = 0.6
+    flask_app.config["EVENTS_HEARTBEAT_SECONDS"] = 0.1
+    cursor = services.event_hub.cursor()
+    services.event_hub.publish("user-2", "sessions_changed", {})
+
+    publisher = threading.Timer(0.3, services.event_hub.publish, ("user-1", "sessions_changed", {}))
+    publisher.start()
+    body = client.get("/api/events", headers={**auth_header, "Last-Event-ID": cursor}).get_data(as_text=True)
+    publisher.join()
+
+    assert app_module.EVENTS_KEEP_ALIVE in body
+    assert [kind for _, kind, _ in _live_events(body)] == ["sessions_changed"]
+
+
+def test_session_titles_and_imports_are_published(
+    client, monkeypatch, fake_supabase, fake_openai, auth_header, services, flask_app
+):
+    flask_app.config["SESSION_TITLES"] = True
+    monkeypatch.setattr(
+        fake_openai.chat.completions,
+        "create",
+        lambda **kwargs: FakeOpenAIClient()._create(**kwargs) if kwargs.get("stream") else SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Ingest"))], usage=None
+        ),
+    )
+    session_id = client.post("/api/sessions", headers=auth_header).get_json()["id"]
+    cursor = services.event_hub.cursor()
+    client.post("/api/chat", headers=auth_header, json={"session_id": session_id, "agent_id": "agent-1", "message": "hi"})
+    services.title_refresher.wait(timeout=5)
+    archive = "\n".join(json.dumps(record) for record in [
+        {"type": "archive", "version": 1},
+        {"type": "session", "id": "old", "title": "Old", "created_at": "2026-01-01T00:00:00+00:00"},
+    ])
+    client.post("/api/sessions/import", headers=auth_header, data=archive.encode())
+
+    events = services.event_hub.since("user-1", cursor)
+    kinds = [event.kind for event in events]
+    assert kinds == ["message_inserted", "message_inserted", "session_updated", "sessions_changed"]
+    assert events[2].data == {"session": {"id": session_id, "title": "Ingest"}}
+
+
+def test_event_stream_is_not_found_while_live_events_are_off(client, auth_header, flask_app):
+    flask_app.config["LIVE_EVENTS"] = False
+    response = client.get("/api/events", headers=auth_header)
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Live events are off"}
+
+
+def test_request_log_line_carries_structured_fields(client, caplog):
+    caplog.set_level(logging.INFO, logger="boardroom")
+    client.get("/metrics")
+
+    [line] = [record for record in caplog.records if getattr(record, "path", None) == "/metrics"]
+    assert line.levelno == logging.INFO
+    assert (line.method, line.status) == ("GET", 200)
+    assert line.duration_ms >= 0
+
+
+def test_logging_config_selects_the_json_pipeline(monkeypatch):
+    assert app_module.logging_config()["handlers"]["stderr"]["class"] == "logging.StreamHandler"
+    monkeypatch.setattr(app_module, "LOG_FORMAT", "json")
+    config = app_module.logging_config()
+    assert config["handlers"]["stderr"]["()"] is app_module.json_queue_handler
+    assert config["handlers"]["stderr"]["filters"] == ["sampled"]
+
+
+def test_create_app_builds_an_app_around_the_routes():
+    flask_app = app_module.create_app()
+    assert flask_app is not app_module.app
+    rules = {rule.rule for rule in flask_app.url_map.iter_rules()}
+    assert {"/api/sessions", "/api/chat/stream", "/api/events", "/metrics"} <= rules
+
+    response = flask_app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert "Server-Timing" in response.headers
+    assert flask_app.test_client().get("/api/sessions").status_code == 401
+
+
+def test_apps_have_their_own_settings_and_services(fake_supabase, auth_header):
+    small = app_module.create_app({"ROUNDTABLE_MAX_AGENTS": 1, "LIVE_EVENTS": False, "SESSION_TITLES": False})
+    default = app_module.create_app({"SESSION_TITLES": False})
+    try:
+        assert small.extensions["boardroom"] is not default.extensions["boardroom"]
+        assert small.extensions["boardroom"].event_hub is not default.extensions["boardroom"].event_hub
+        assert default.config["ROUNDTABLE_MAX_AGENTS"] == app_module.ROUNDTABLE_MAX_AGENTS
+        for flask_app in (small, default):
+            flask_app.extensions["boardroom"].supabase = fake_supabase
+
+        assert small.test_client().get("/api/events", headers=auth_header).status_code == 404
+        fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+        body = {"session_id": "s1", "agent_ids": ["agent-1", "agent-2"], "message": "hi"}
+        response = small.test_client().post("/api/chat/roundtable", headers=auth_header, json=body)
+        assert response.status_code == 400
+    finally:
+        small.extensions["boardroom"].shutdown()
+        default.extensions["boardroom"].shutdown()
+
+
+def test_create_app_rejects_unknown_settings():
+    with pytest.raises(ValueError, match="ROUNDTABLE_MAX_AGENT"):
+        app_module.create_app({"ROUNDTABLE_MAX_AGENT": 2})
+
+
+def test_warm_up_creates_this_processs_clients(monkeypatch, caplog, services, flask_app):
+    clients = {
+        name: ProcessLocal(object, name) for name in ("supabase", "openai_client", "completion_cache", "write_behind")
+    }
+    for name, client in clients.items():
+        monkeypatch.setattr(services, name, client)
+    loaded = []
+    monkeypatch.setattr(app_module, "token_counter", loaded.append)
+
+    app_module.warm_up(flask_app)
+    assert all(client.peek() is not None for client in clients.values())
+    assert loaded == [flask_app.config["OPENROUTER_MODEL"]]
+
+    def unreachable():
+        raise ConnectionError("bad SUPABASE_URL")
+
+    monkeypatch.setattr(services, "supabase", ProcessLocal(unreachable, "supabase"))
+    with pytest.raises(ConnectionError):
+        app_module.warm_up(flask_app)
+    assert "FATAL: failed to initialise supabase" in caplog.text
+
+
+# Generous bounds: a regression to building clients (or importing their SDKs)
+# at import time costs well over a second.
+COLD_IMPORT_BUDGET_SECONDS = 1.5
+COLD_FIRST_REQUEST_BUDGET_SECONDS = 0.5
+
+COLD_START_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+services = app.app.extensions["boardroom"]
+clients = [
+    c.name for c in (services.supabase, services.openai_client, services.completion_cache) if c.peek() is not None
+]
+sdks = [name for name in ("openai", "supabase") if name in sys.modules]
+
+from fakes import FakeSupabase
+services.supabase = FakeSupabase()
+_, token = services.supabase.auth.seed_user()
+client = app.app.test_client()
+before = time.perf_counter()
+status = client.get("/api/sessions", headers={"Authorization": "Bearer " + token}).status_code
+first_request = time.perf_counter() - before
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_request_seconds": first_request,
+    "status": status,
+    "clients": clients,
+    "sdks": sdks,
+}))
+"""
+
+
+def test_cold_start(record_property):
+    """Import the app and serve its first request in a fresh interpreter,
+    without credentials: nothing may be created or connected up front."""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join([backend, os.path.join(backend, "tests")]),
+        "SUPABASE_URL": "",
+        "SUPABASE_KEY": "",
+        "OPENROUTER_API_KEY": "",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT], cwd=backend, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    for key in ("import_seconds", "first_request_seconds"):
+        record_property(key, round(report[key], 4))
+
+    assert report["status"] == 200
+    assert report["clients"] == []
+    assert report["sdks"] == []
+    assert report["import_seconds"] < COLD_IMPORT_BUDGET_SECONDS
+    assert report["first_request_seconds"] < COLD_FIRST_REQUEST_BUDGET_SECONDS
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from archive import ArchiveError, archive_header, ndjson, read_lines, read_records
+
+SESSION = {"type": "session", "id": "s1", "title": "Launch", "created_at": "2026-01-01T00:00:00Z",
+           "updated_at": "2026-01-02T00:00:00Z"}
+MESSAGE = {"type": "message", "session_id": "s1", "id": "m1", "role": "user", "agent_id": None,
+           "content": "hello", "created_at": "2026-01-01T00:00:01Z"}
+
+
+def archive(*records, head=True):
+    lines = ([archive_header()] if head else []) + list(records)
+    return io.BytesIO("".join(ndjson(record) for record in lines).encode())
+
+
+def test_records_round_trip_with_line_numbers():
+    stream = io.BytesIO(archive(SESSION, MESSAGE).getvalue() + b"\n" + ndjson({"type": "end"}).encode())
+    assert list(read_records(stream)) == [(2, SESSION), (3, MESSAGE)]
+
+
+def test_lines_are_read_one_at_a_time_up_to_a_limit():
+    stream = io.BytesIO(b'{"a": 1}\n\n' + b"x" * 20 + b"\n")
+    lines = read_lines(stream, max_bytes=16)
+    assert next(lines) == (1, b'{"a": 1}\n')
+    # Nothing past the line just returned has been read.
+    assert stream.tell() == 9
+    with pytest.raises(ArchiveError) as exc:
+        next(lines)
+    assert exc.value.line == 3
+
+
+@pytest.mark.parametrize(
+    "records, line, message",
+    [
+        ([MESSAGE], 2, "message before its session"),
+        ([SESSION, SESSION], 3, "appears twice"),
+        ([{**SESSION, "created_at": "yesterday"}], 2, "created_at must be an ISO 8601 timestamp"),
+        ([{**SESSION, "id": ""}], 2, "id must be a non-empty string"),
+        ([{**SESSION, "title": 7}], 2, "title must be a string"),
+        ([SESSION, {**MESSAGE, "role": "system"}], 3, "role must be one of"),
+        ([SESSION, {**MESSAGE, "content": None}], 3, "content must be a string"),
+        ([SESSION, {**MESSAGE, "agent_id": 1}], 3, "agent_id must be a string or null"),
+        ([{"type": "attachment"}], 2, "unknown record type"),
+        (["not an object"], 2, "not a JSON object"),
+    ],
+)
+def test_bad_records_are_rejected_with_their_line(records, line, message):
+    with pytest.raises(ArchiveError) as exc:
+        list(read_records(archive(*records)))
+    assert exc.value.line == line
+    assert message in exc.value.message
+
+
+def test_an_archive_needs_a_supported_header():
+    with pytest.raises(ArchiveError, match="starts with its archive line"):
+        list(read_records(archive(SESSION, head=False)))
+    with pytest.raises(ArchiveError, match="unsupported archive version 2"):
+        list(read_records(io.BytesIO(json.dumps({"type": "archive", "version": 2}).encode())))
+    with pytest.raises(ArchiveError, match="not valid JSON"):
+        list(read_records(io.BytesIO(b"{oops\n")))
+    with pytest.raises(ArchiveError, match="empty archive"):
+        list(read_records(io.BytesIO(b"\n\n")))
@@ -0,0 +1,67 @@
+import json
+
+import anyio
+from starlette.testclient import TestClient
+
+import asgi
+from fakes import FakeAsyncOpenAIClient, FakeAsyncSupabase
+
+
+def test_lifespan_creates_pooled_async_clients(flask_app, services):
+    with TestClient(asgi.create_application(flask_app)):
+        assert services.async_supabase is not None
+        assert services.async_openai_client is not None
+        pool = services.async_openai_client._client._transport._pool
+        assert pool._max_connections == asgi.HTTP_POOL_MAX_CONNECTIONS
+
+
+def test_stream_disconnect_closes_upstream_and_skips_persist(
+    flask_app, services, fake_supabase, fake_openai, auth_header
+):
+    services.async_supabase = FakeAsyncSupabase(fake_supabase)
+    services.async_openai_client = FakeAsyncOpenAIClient(fake_openai)
+    application = asgi.create_application(flask_app)
+    fake_supabase.db["sessions"] = [{"id": "s1", "title": "A", "user_id": "user-1"}]
+
+    body = json.dumps({"session_id": "s1", "agent_id": "agent-1", "message": "hello"}).encode()
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/chat/stream",
+        "raw_path": b"/api/chat/stream",
+        "query_string": b"",
+        "root_path": "",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "headers": [
+            (b"authorization", auth_header["Authorization"].encode()),
+            (b"content-type", b"application/json"),
+        ],
+    }
+    sent = []
+
+    async def main():
+        disconnected = anyio.Event()
+        pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+        async def receive():
+            if pending:
+                return pending.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            if message["type"] == "http.response.body" and message.get("body"):
+                disconnected.set()
+                await anyio.sleep(0.01)
+
+        await application(scope, receive, send)
+
+    anyio.run(main)
+
+    bodies = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    assert b"event: delta" in bodies
+    assert b"event: done" not in bodies
+    assert fake_openai.streams[0].closed
+    assert [m["role"] for m in fake_supabase.db["messages"]] == ["user"]
@@ -0,0 +1,66 @@
+import time
+
+import jwt
+import pytest
+
+from auth_tokens import LocalTokenVerifier, TokenCache, TokenVerificationUnavailable, unverified_expiry
+from conftest import JWT_SECRET as SECRET
+
+
+def test_verifier_accepts_valid_hs256_token(make_token):
+    user, exp = LocalTokenVerifier(jwt_secret=SECRET).verify(make_token())
+    assert user == {"id": "user-1", "email": "user@example.com"}
+    assert exp > time.time()
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"exp_in": -3600},
+        {"secret": "some-other-secret-with-enough-bytes-too"},
+        {"aud": "anon"},
+    ],
+)
+def test_verifier_rejects_invalid_tokens(make_token, claims):
+    with pytest.raises(jwt.InvalidTokenError):
+        LocalTokenVerifier(jwt_secret=SECRET).verify(make_token(**claims))
+
+
+def test_verifier_rejects_malformed_token():
+    with pytest.raises(jwt.InvalidTokenError):
+        LocalTokenVerifier(jwt_secret=SECRET).verify("not-a-jwt")
+
+
+def test_verifier_without_matching_key_is_unavailable(make_token):
+    verifier = LocalTokenVerifier(jwks_url="http://localhost/jwks.json")
+    with pytest.raises(TokenVerificationUnavailable):
+        verifier.verify(make_token())
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TokenCache(max_size=2)
+    cache.put("a", {"id": "a"})
+    cache.put("b", {"id": "b"})
+    assert cache.get("a") == {"id": "a"}
+    cache.put("c", {"id": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire_with_token():
+    cache = TokenCache(ttl_seconds=60)
+    cache.put("expired", {"id": "x"}, token_exp=time.time() - 1)
+    cache.put("short", {"id": "y"}, token_exp=time.time() + 0.05)
+
+    assert cache.get("expired") is None
+    assert cache.get("short") == {"id": "y"}
+    time.sleep(0.06)
+    assert cache.get("short") is None
+
+
+def test_unverified_expiry(make_token):
+    token = make_token(exp_in=100)
+    assert unverified_expiry(token) == pytest.approx(time.time() + 100, abs=2)
+    assert unverified_expiry("opaque-token") is None
@@ -0,0 +1,113 @@
+import pytest
+from openai import OpenAI
+
+from benchmarks.compare import compare
+from benchmarks.fake_backends import BENCH_PASSWORD, Latency, LatentSupabase, bench_email, seeded_fake
+from benchmarks.llm_stub import LLMStubServer, StubConfig
+from benchmarks.run import Recorder, parse_mix, percentile, summarize
+
+
+@pytest.fixture
+def llm_stub():
+    server = LLMStubServer(("127.0.0.1", 0), StubConfig(ttft_ms=0, token_ms=0, tokens=5))
+    server.start_in_thread()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_reports_milliseconds_and_throughput():
+    stats = summarize([0.010, 0.020, 0.030, 0.040], errors=1, duration_s=2.0)
+    assert stats["count"] == 4
+    assert stats["errors"] == 1
+    assert stats["rps"] == 2.0
+    assert stats["mean_ms"] == 25.0
+    assert stats["p50_ms"] == 20.0
+    assert stats["max_ms"] == 40.0
+    assert summarize([], 0, 1.0)["p99_ms"] == 0.0
+
+
+def test_parse_mix():
+    assert parse_mix("chat=2,history") == {"chat": 2.0, "history": 1.0}
+    with pytest.raises(ValueError, match="unknown operation"):
+        parse_mix("chat=1,upload=1")
+    with pytest.raises(ValueError, match="positive weight"):
+        parse_mix("chat=0")
+
+
+def test_recorder_discards_samples_outside_the_window():
+    recorder = Recorder(measure_from=10.0, measure_until=20.0)
+    recorder.record("chat", 5.0, 0.1, ok=True)
+    recorder.record("chat", 12.0, 0.2, ok=True)
+    recorder.record("chat", 13.0, 0.3, ok=False)
+    recorder.record("chat", 20.0, 0.4, ok=True)
+    assert recorder.latencies["chat"] == [0.2]
+    assert recorder.errors["chat"] == 1
+
+
+def test_llm_stub_serves_plain_and_streamed_completions(llm_stub):
+    client = OpenAI(api_key="bench", base_url=llm_stub.base_url, max_retries=0)
+    messages = [{"role": "user", "content": "hello"}]
+
+    completion = client.chat.completions.create(model="stub", messages=messages)
+    assert completion.choices[0].message.content.split() == ["the", "board", "should", "weigh", "latency"]
+    assert completion.usage.completion_tokens == 5
+
+    chunks = list(client.chat.completions.create(
+        model="stub", messages=messages, stream=True, stream_options={"include_usage": True}
+    ))
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert text.split() == ["the", "board", "should", "weigh", "latency"]
+    assert chunks[-1].usage.completion_tokens == 5
+    assert llm_stub.requests == 2
+
+
+def test_seeded_fake_has_accounts_and_transcripts():
+    fake = seeded_fake(users=2, sessions_per_user=3, messages_per_session=4)
+    assert len(fake.db["agents"]) == 3
+    assert len(fake.db["sessions"]) == 6
+    assert len(fake.db["messages"]) == 24
+
+    response = fake.auth.sign_in_with_password({"email": bench_email(1), "password": BENCH_PASSWORD})
+    user_id = response.user.id
+    assert {session["user_id"] for session in fake.db["sessions"] if session["id"].startswith("session-1-")} == {
+        user_id
+    }
+
+
+def test_latent_supabase_delegates_through_the_builder_chain(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("benchmarks.fake_backends.time.sleep", sleeps.append)
+    backend = LatentSupabase(seeded_fake(1, 1, 2), Latency(base_ms=5, jitter_ms=0))
+
+    result = backend.table("messages").select("*").eq("session_id", "session-0-0").execute()
+    assert len(result.data) == 2
+    backend.auth.sign_in_with_password({"email": bench_email(0), "password": BENCH_PASSWORD})
+    assert sleeps == [0.005, 0.005]
+
+
+def _report(p99_ms, rps):
+    stats = {"p50_ms": 10.0, "p99_ms": p99_ms, "rps": rps}
+    return {"results": [{"concurrency": 4, "endpoints": {"chat": stats, "chat_stream.ttft": stats}}]}
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    _, regressions = compare(_report(100.0, 50.0), _report(105.0, 48.0), threshold=0.10)
+    assert regressions == []
+
+    lines, regressions = compare(_report(100.0, 50.0), _report(130.0, 40.0), threshold=0.10)
+    assert len(lines) == 3
+    assert regressions == [
+        "chat @ 4: p99 100.0 → 130.0 ms",
+        "chat @ 4: 50.0 → 40.0 req/s",
+        "chat_stream.ttft @ 4: p99 100.0 → 130.0 ms",
+    ]
@@ -0,0 +1,258 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import completion_cache
+from completion_cache import (
+    AsyncCachedStream,
+    AsyncCachingStream,
+    CachedCompletion,
+    CachedStream,
+    CachingStream,
+    CompletionCache,
+    completion_key,
+)
+from metrics import registry
+
+MESSAGES = [{"role": "system", "content": "You are an architect"}, {"role": "user", "content": "review this"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def reply(text="Looks solid", model="m"):
+    return CachedCompletion(text, model)
+
+
+def test_key_covers_model_and_every_message():
+    key = completion_key("m", MESSAGES)
+    assert key == completion_key("m", [dict(message) for message in MESSAGES])
+    assert key != completion_key("other", MESSAGES)
+    assert key != completion_key("m", [MESSAGES[0], {"role": "user", "content": "review this "}])
+    assert key != completion_key("m", MESSAGES[1:])
+
+
+def test_memory_tier_is_a_bounded_lru():
+    cache = CompletionCache(max_entries=2)
+    cache.put("a", reply("A"))
+    cache.put("b", reply("B"))
+    assert cache.get("a").content == "A"
+    cache.put("c", reply("C"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").content == "A"
+    assert cache.get("c").content == "C"
+    assert not cache.on_disk
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = CompletionCache(ttl_seconds=60, clock=clock)
+    cache.put("a", reply())
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 1
+    assert cache.get("a") is None
+
+
+def test_lookups_are_counted_by_result(tmp_path):
+    before = {result: sample("boardroom_completion_cache_lookups_total", result=result)
+              for result in ("memory_hit", "disk_hit", "miss")}
+    CompletionCache(path=str(tmp_path / "cache.db")).put("a", reply())
+
+    cache = CompletionCache(path=str(tmp_path / "cache.db"))
+    cache.get("missing")
+    cache.get("a")
+    cache.get("a")
+
+    assert sample("boardroom_completion_cache_lookups_total", result="miss") == before["miss"] + 1
+    assert sample("boardroom_completion_cache_lookups_total", result="disk_hit") == before["disk_hit"] + 1
+    assert sample("boardroom_completion_cache_lookups_total", result="memory_hit") == before["memory_hit"] + 1
+
+
+def test_disk_tier_outlives_the_process_and_keeps_the_original_age(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    first = CompletionCache(ttl_seconds=60, path=path, clock=clock)
+    first.put("a", reply("stored", "backup/model"))
+    first.close()
+
+    clock.now += 30
+    second = CompletionCache(ttl_seconds=60, path=path, clock=clock)
+    assert second.on_disk
+    assert second.get("a") == reply("stored", "backup/model")
+    # Promoted to memory with its disk age, so it still expires on time.
+    clock.now += 30
+    assert second.get("a") is None
+    second.close()
+
+
+def test_disk_tier_evicts_expired_then_least_recently_used(tmp_path):
+    clock = FakeClock()
+    cache = CompletionCache(max_entries=0, ttl_seconds=100, path=str(tmp_path / "cache.db"),
+                            max_disk_entries=2, clock=clock)
+    cache.put("old", reply())
+    clock.now += 100
+    cache.put("a", reply())
+    assert cache.get("old") is None
+
+    clock.now += 1
+    cache.put("b", reply())
+    clock.now += 1
+    assert cache.get("a") is not None
+    clock.now += 1
+    cache.put("c", reply())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+    cache.clear()
+    assert cache.get("a") is None
+
+
+def test_expired_disk_entries_are_dropped_on_read(tmp_path):
+    clock = FakeClock()
+    cache = CompletionCache(max_entries=0, ttl_seconds=10, path=str(tmp_path / "cache.db"), clock=clock)
+    cache.put("a", reply())
+    clock.now += 10
+    assert cache.get("a") is None
+
+
+class LockedDatabase:
+    in_transaction = False
+
+    def execute(self, *args):
+        raise sqlite3.OperationalError("database is locked")
+
+    executemany = execute
+
+    def close(self):
+        pass
+
+
+def test_a_failing_disk_tier_is_a_miss_and_a_skipped_store(tmp_path, caplog):
+    cache = CompletionCache(max_entries=0, path=str(tmp_path / "cache.db"))
+    cache._db = LockedDatabase()
+
+    cache.put("a", reply())
+    assert cache.get("a") is None
+    cache.close()
+    assert "Completion cache write failed" in caplog.text
+    assert "Completion cache read failed" in caplog.text
+
+
+def test_disk_hits_record_recency_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(completion_cache, "TOUCH_BATCH_SIZE", 2)
+    clock = FakeClock()
+    path = str(tmp_path / "cache.db")
+    cache = CompletionCache(max_entries=0, path=path, clock=clock)
+    for key in ("a", "b", "c"):
+        cache.put(key, reply())
+
+    def used_at(key):
+        with sqlite3.connect(path) as db:
+            return db.execute("SELECT used_at FROM completions WHERE key = ?", (key,)).fetchone()[0]
+
+    clock.now += 1
+    cache.get("a")
+    assert used_at("a") == clock.now - 1
+    cache.get("b")
+    assert used_at("a") == used_at("b") == clock.now
+    cache.get("c")
+    cache.close()
+    assert used_at("c") == clock.now
+
+    # The row count is kept alongside, including for files created before it was.
+    with sqlite3.connect(path) as db:
+        db.execute("DROP TABLE completion_rows")
+    reopened = CompletionCache(max_entries=0, path=path, max_disk_entries=3, clock=clock)
+    reopened.put("d", reply())
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT n FROM completion_rows").fetchone() == (3,)
+    reopened.close()
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+
+class FakeRoutedStream:
+    def __init__(self, pieces):
+        self.route = SimpleNamespace(label="m", model="m")
+        self.pieces = pieces
+        self.closed = False
+
+    def metadata(self):
+        return {"model": "m", "cached": False}
+
+    def __iter__(self):
+        for piece in self.pieces:
+            yield chunk(piece)
+        yield SimpleNamespace(choices=[], usage=None)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAsyncRoutedStream(FakeRoutedStream):
+    async def __aiter__(self):
+        for item in self:
+            yield item
+
+    async def close(self):
+        self.closed = True
+
+
+def test_caching_stream_stores_only_replies_read_to_the_end():
+    stored = []
+    with CachingStream(FakeRoutedStream(["Looks", " solid"]), stored.append) as stream:
+        assert [c.choices[0].delta.content for c in stream if c.choices] == ["Looks", " solid"]
+    assert stored == [CachedCompletion("Looks solid", "m")]
+    assert stream.metadata() == {"model": "m", "cached": False}
+
+    def failing_store(completion):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    # A reply that has been streamed stays streamed if it can't be stored.
+    assert len(list(CachingStream(FakeRoutedStream(["ok"]), failing_store))) == 2
+
+    partial = CachingStream(FakeRoutedStream(["Looks", " solid"]), stored.append)
+    iterator = iter(partial)
+    next(iterator)
+    iterator.close()
+    list(CachingStream(FakeRoutedStream([]), stored.append))
+    assert len(stored) == 1
+
+
+def test_cached_stream_replays_the_reply():
+    with CachedStream(reply("Looks solid", "backup/model@azure")) as stream:
+        assert [c.choices[0].delta.content for c in stream] == ["Looks solid"]
+    assert stream.route.model == "backup/model"
+    assert stream.metadata()["cached"] is True
+    assert stream.metadata()["model"] == "backup/model@azure"
+
+
+def test_async_streams():
+    stored = []
+
+    async def store(completion):
+        stored.append(completion)
+
+    async def scenario():
+        async with AsyncCachingStream(FakeAsyncRoutedStream(["a", "b"]), store) as stream:
+            assert [c.choices[0].delta.content async for c in stream if c.choices] == ["a", "b"]
+        async with AsyncCachedStream(stored[0]) as cached:
+            return [c.choices[0].delta.content async for c in cached]
+
+    assert asyncio.run(scenario()) == ["ab"]
+    assert stored == [CachedCompletion("ab", "m")]
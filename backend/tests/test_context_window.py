@@ -0,0 +1,142 @@
+import pytest
+
+import context_window
+from context_window import MESSAGE_OVERHEAD_TOKENS, TokenCounter, build_context, token_counter
+
+
+class WordEncoding:
+    """One token per whitespace-separated word; stands in for a tiktoken encoding."""
+
+    name = "words"
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture(autouse=True)
+def clear_counter_cache():
+    token_counter.cache_clear()
+    yield
+    token_counter.cache_clear()
+
+
+def history(*contents):
+    # Alternating turns ending with the user message being answered.
+    roles = ["user", "assistant"]
+    n = len(contents)
+    return [{"role": roles[(n - 1 - i) % 2], "content": content} for i, content in enumerate(contents)]
+
+
+def test_estimating_counter_counts_and_truncates():
+    counter = TokenCounter()
+
+    assert not counter.exact
+    assert counter.count("abcdefgh") == 2
+    assert counter.count("abcdefghi") == 3
+    assert counter.truncate("short", 10) == "short"
+
+    cut = counter.truncate("x" * 400, 20)
+    assert cut.endswith(context_window.TRUNCATION_MARKER)
+    assert counter.count(cut) <= 20
+
+
+def test_exact_counter_truncates_on_token_boundaries():
+    counter = TokenCounter(WordEncoding())
+
+    assert counter.exact
+    assert counter.count("one two three") == 3
+    assert counter.truncate("a b c d e f g h", 5).startswith("a b c")
+    assert counter.message_tokens({"role": "user", "content": "one two"}) == 2 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_build_context_packs_newest_history_into_budget():
+    counter = TokenCounter(WordEncoding())
+    turns = history("w " * 10, "w " * 10, "w " * 10, "latest question")
+
+    # system (1+4) + latest (2+4) + one older message (10+4) = 25
+    context = build_context("system", turns, counter, budget=30, max_message_tokens=100)
+
+    assert [m["role"] for m in context.messages] == ["system", "assistant", "user"]
+    assert context.messages[-1]["content"] == "latest question"
+    assert context.history_messages == 2
+    assert context.tokens == 25
+    assert context.metadata() == {"messages": 2, "tokens": 25, "budget": 30, "summary": False}
+
+
+def test_build_context_truncates_oversized_messages():
+    counter = TokenCounter(WordEncoding())
+    turns = history("short", "w " * 500, "latest")
+
+    context = build_context("system", turns, counter, budget=200, max_message_tokens=50)
+
+    assert [m["content"] for m in context.messages[1:]][::2] == ["short", "latest"]
+    assert counter.count(context.messages[2]["content"]) <= 50
+    assert context.truncated_messages == 1
+    assert context.tokens <= 200
+
+
+def test_build_context_always_keeps_system_prompt_and_newest_turn():
+    counter = TokenCounter(WordEncoding())
+    turns = history("older", "w " * 1000)
+
+    context = build_context("be brief", turns, counter, budget=20, max_message_tokens=30)
+
+    assert context.messages[0] == {"role": "system", "content": "be brief"}
+    assert context.messages[-1]["role"] == "user"
+    assert context.messages[-1]["content"].endswith(context_window.TRUNCATION_MARKER)
+    assert context.history_messages == 1
+    assert context.truncated_messages == 1
+
+
+def test_build_context_with_empty_history():
+    context = build_context("system", [], TokenCounter(), budget=100, max_message_tokens=10)
+
+    assert context.messages == [{"role": "system", "content": "system"}]
+    assert context.history_messages == 0
+
+
+def test_token_counter_uses_model_encoding(monkeypatch):
+    requested = []
+    monkeypatch.setattr(
+        context_window.tiktoken, "encoding_for_model", lambda name: requested.append(name) or WordEncoding()
+    )
+
+    counter = token_counter("openai/gpt-4o-mini")
+
+    assert requested == ["gpt-4o-mini"]
+    assert counter.exact
+    assert token_counter("openai/gpt-4o-mini") is counter
+
+
+def test_token_counter_falls_back_for_unknown_models(monkeypatch):
+    def unknown(name):
+        raise KeyError(name)
+
+    monkeypatch.setattr(context_window.tiktoken, "encoding_for_model", unknown)
+    monkeypatch.setattr(context_window.tiktoken, "get_encoding", lambda name: WordEncoding())
+
+    assert token_counter("anthropic/claude-sonnet").exact
+
+
+def test_token_counter_estimates_when_encoding_cannot_load(monkeypatch):
+    def offline(name):
+        raise ConnectionError("no network")
+
+    def unknown(name):
+        raise KeyError(name)
+
+    monkeypatch.setattr(context_window.tiktoken, "encoding_for_model", offline)
+    assert not token_counter("openai/gpt-4o-mini").exact
+
+    monkeypatch.setattr(context_window.tiktoken, "encoding_for_model", unknown)
+    monkeypatch.setattr(context_window.tiktoken, "get_encoding", offline)
+    assert not token_counter("meta/llama").exact
+
+
+def test_token_counter_without_tiktoken(monkeypatch):
+    monkeypatch.setattr(context_window, "tiktoken", None)
+
+    assert not token_counter("openai/gpt-4o-mini").exact
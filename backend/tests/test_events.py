@@ -0,0 +1,66 @@
+from events import EventHub
+
+
+def test_since_replays_a_users_events_after_the_cursor():
+    hub = EventHub(epoch="w1")
+    start = hub.cursor()
+    first = hub.publish("alice", "session_created", {"session": {"id": "s1"}})
+    hub.publish("bob", "session_created", {"session": {"id": "s2"}})
+    second = hub.publish("alice", "message_inserted", {"session_id": "s1"})
+
+    assert start == "w1-0"
+    assert [event.id for event in hub.since("alice", start)] == [first.id, second.id]
+    assert [event.id for event in hub.since("alice", first.id)] == [second.id]
+    assert hub.since("alice", second.id) == []
+    assert hub.since("carol", start) == []
+
+
+def test_cursors_that_cannot_be_resumed():
+    hub = EventHub(epoch="w1")
+    hub.publish("alice", "sessions_changed", {})
+
+    assert hub.since("alice", None) is None
+    assert hub.since("alice", "w2-1") is None
+    assert hub.since("alice", "w1-x") is None
+    # Ahead of this hub: issued by an earlier process with the same epoch name.
+    assert hub.since("alice", "w1-9") is None
+
+
+def test_a_full_buffer_drops_the_oldest_events():
+    hub = EventHub(buffer_size=2, epoch="w1")
+    start = hub.cursor()
+    ids = [hub.publish("alice", "sessions_changed", {"n": n}).id for n in range(3)]
+
+    assert hub.since("alice", start) is None
+    assert [event.data["n"] for event in hub.since("alice", ids[0])] == [1, 2]
+
+
+def test_idle_users_are_evicted_past_max_users():
+    hub = EventHub(max_users=2, epoch="w1")
+    start = hub.cursor()
+    hub.publish("alice", "sessions_changed", {})
+    hub.subscribe("bob", lambda: None)
+    hub.publish("carol", "sessions_changed", {})
+
+    # Alice's buffer is gone, so an old cursor of hers can't be trusted.
+    assert hub.since("alice", start) is None
+    assert hub.since("alice", hub.cursor()) == []
+    # Bob has an open stream and is kept.
+    assert hub.since("bob", start) == []
+
+
+def test_subscribers_are_woken_until_they_unsubscribe():
+    hub = EventHub(epoch="w1")
+    woken = []
+    unsubscribe = hub.subscribe("alice", lambda: woken.append("alice"))
+    hub.subscribe("alice", lambda: 1 / 0)
+    hub.subscribe("bob", lambda: woken.append("bob"))
+
+    # A failing subscriber doesn't stop the event or the others.
+    event = hub.publish("alice", "sessions_changed", {})
+    unsubscribe()
+    hub.publish("alice", "sessions_changed", {})
+    unsubscribe()
+
+    assert woken == ["alice"]
+    assert hub.since("alice", "w1-0")[0] is event
@@ -0,0 +1,93 @@
+from types import SimpleNamespace
+
+import pytest
+
+import metrics
+from metrics import RequestTimer, record_llm_usage, record_stage, registry, span, start_request
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def test_spans_add_up_per_stage_and_feed_server_timing(monkeypatch):
+    clock = iter([0.0, 1.0, 1.25, 2.0, 2.5, 3.0])
+    monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(clock))
+    before = sample("boardroom_stage_duration_seconds_count", route="/api/test", stage="db_history")
+
+    timer = RequestTimer("/api/test")
+    with timer.span("db_history"):
+        pass
+    with timer.span("db_history"):
+        pass
+
+    assert timer.stages == {"db_history": 0.75}
+    assert timer.server_timing() == "db_history;dur=750.0, total;dur=3000.0"
+    assert sample("boardroom_stage_duration_seconds_count", route="/api/test", stage="db_history") == before + 2
+
+
+def test_server_timing_names_are_tokens():
+    timer = RequestTimer("/api/test")
+    timer.record("llm ttft/agent", 0.002)
+    assert timer.server_timing().startswith("llm_ttft_agent;dur=2.0, total;dur=")
+
+
+def test_finish_observes_the_request_once():
+    before = sample("boardroom_request_duration_seconds_count", method="GET", route="/api/once", status="200")
+    timer = RequestTimer("/api/once")
+    timer.finish("GET", 200)
+    timer.finish("GET", 200)
+    assert sample("boardroom_request_duration_seconds_count", method="GET", route="/api/once", status="200") == (
+        before + 1
+    )
+
+
+def test_module_spans_follow_the_current_request():
+    timer = start_request("/api/current")
+    assert metrics.current_request() is timer
+    with span("agent"):
+        pass
+    record_stage("llm", 0.5)
+    assert set(timer.stages) == {"agent", "llm"}
+    metrics._current_timer.set(None)
+
+
+def test_spans_outside_a_request_are_background():
+    metrics._current_timer.set(None)
+    before = sample("boardroom_stage_duration_seconds_sum", route="background", stage="summary_llm")
+    record_stage("summary_llm", 1.5)
+    assert sample("boardroom_stage_duration_seconds_sum", route="background", stage="summary_llm") == before + 1.5
+
+
+def test_record_llm_usage_counts_each_kind():
+    labels = {"agent": "agent-x", "model": "m"}
+    before = {kind: sample("boardroom_llm_tokens_total", kind=kind, **labels) for kind in ("prompt", "completion", "total")}
+
+    record_llm_usage("agent-x", "m", SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15))
+    record_llm_usage("agent-x", "m", None)
+    record_llm_usage("agent-x", "m", SimpleNamespace(total_tokens=3))
+
+    assert sample("boardroom_llm_tokens_total", kind="prompt", **labels) == before["prompt"] + 10
+    assert sample("boardroom_llm_tokens_total", kind="completion", **labels) == before["completion"] + 5
+    assert sample("boardroom_llm_tokens_total", kind="total", **labels) == before["total"] + 18
+
+
+def test_exposition_is_prometheus_text():
+    record_stage("agent", 0.01)
+    body, content_type = metrics.exposition()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE boardroom_stage_duration_seconds histogram" in body
+    assert b"# TYPE boardroom_llm_tokens_total counter" in body
+
+
+@pytest.fixture
+def multiproc_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_exposition_aggregates_worker_files_in_multiprocess_mode(multiproc_dir):
+    # Metrics created in-process before the variable was set don't write files,
+    # so only the (empty) aggregate of the directory is exposed.
+    body, _ = metrics.exposition()
+    assert b"boardroom_stage_duration_seconds" not in body
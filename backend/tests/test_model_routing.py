@@ -0,0 +1,247 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from metrics import registry
+from model_routing import DeadlineExceeded, ModelRoute, ModelRouter, parse_routes
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))], usage=None)
+
+
+class SlowStream:
+    """Yields a role chunk, then waits ``delay`` before its tokens; closing it aborts the wait."""
+
+    def __init__(self, model, delay):
+        self.model = model
+        self.delay = delay
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        yield chunk(None)
+        if self.closed.wait(self.delay):
+            raise RuntimeError("stream closed")
+        yield chunk(f"from {self.model}")
+        yield SimpleNamespace(choices=[], usage=SimpleNamespace(total_tokens=3))
+
+    def close(self):
+        self.closed.set()
+
+
+class AsyncSlowStream(SlowStream):
+    async def __aiter__(self):
+        yield chunk(None)
+        await asyncio.sleep(self.delay)
+        yield chunk(f"from {self.model}")
+
+    async def close(self):
+        self.closed.set()
+
+
+class ScriptedClient:
+    """``behaviour`` maps a model to a first-token delay, or to an exception to raise."""
+
+    def __init__(self, behaviour, stream_class=SlowStream):
+        self.behaviour = behaviour
+        self.stream_class = stream_class
+        self.requests = []
+        self.streams = {}
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _open(self, kwargs):
+        self.requests.append(kwargs)
+        outcome = self.behaviour[kwargs["model"]]
+        if isinstance(outcome, Exception):
+            raise outcome
+        stream = self.stream_class(kwargs["model"], outcome)
+        self.streams[kwargs["model"]] = stream
+        return stream
+
+    def _create(self, **kwargs):
+        return self._open(kwargs)
+
+
+class AsyncScriptedClient(ScriptedClient):
+    def __init__(self, behaviour):
+        super().__init__(behaviour, AsyncSlowStream)
+
+    async def _create(self, **kwargs):
+        return self._open(kwargs)
+
+
+def router(*models, hedge_after=0.05, deadline=2.0):
+    return ModelRouter([ModelRoute.parse(model) for model in models],
+                       hedge_after_seconds=hedge_after, deadline_seconds=deadline, max_workers=4)
+
+
+def text(stream):
+    return "".join(c.choices[0].delta.content or "" for c in stream if c.choices)
+
+
+async def atext(stream):
+    return "".join([c.choices[0].delta.content or "" async for c in stream if c.choices])
+
+
+def test_routes_parse_models_and_pinned_providers():
+    assert parse_routes("a/model", " b/model@azure, ,a/model") == [
+        ModelRoute("a/model"),
+        ModelRoute("b/model", "azure"),
+    ]
+    pinned = ModelRoute.parse("b/model@azure")
+    assert pinned.label == "b/model@azure"
+    assert pinned.request_options() == {
+        "model": "b/model",
+        "extra_body": {"provider": {"order": ["azure"], "allow_fallbacks": False}},
+    }
+    assert ModelRoute("a/model").request_options() == {"model": "a/model"}
+    with pytest.raises(ValueError):
+        ModelRoute.parse("@azure")
+    with pytest.raises(ValueError):
+        ModelRouter([])
+
+
+def test_single_route():
+    client = ScriptedClient({"primary": 0})
+    with router("primary").open_stream(client, messages=[]) as stream:
+        assert text(stream) == "from primary"
+    assert stream.metadata()["model"] == "primary"
+    assert client.requests[0]["stream"] is True
+    assert client.requests[0]["timeout"] == 2.0
+
+
+def test_single_route_is_held_to_the_deadline():
+    client = ScriptedClient({"primary": 5.0})
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="primary"):
+        router("primary", deadline=0.1).open_stream(client, messages=[])
+    assert time.monotonic() - started < 1.0
+    assert client.streams["primary"].closed.is_set()
+
+    # The HTTP timeout firing first counts as the deadline too.
+    timed_out = ScriptedClient({"primary": TimeoutError("read timed out")})
+    with pytest.raises(DeadlineExceeded, match="read timed out"):
+        router("primary").open_stream(timed_out, messages=[])
+
+
+def test_fast_primary_is_not_hedged():
+    client = ScriptedClient({"primary": 0, "backup": 0})
+    served_before = sample("boardroom_llm_attempts_total", model="primary", outcome="served")
+
+    stream = router("primary", "backup", hedge_after=1.0).open_stream(client, messages=[])
+    assert text(stream) == "from primary"
+    assert stream.metadata() == {
+        "model": "primary", "attempts": 1, "hedged": False, "ttft_ms": stream.metadata()["ttft_ms"], "cached": False,
+    }
+    assert [request["model"] for request in client.requests] == ["primary"]
+    assert sample("boardroom_llm_attempts_total", model="primary", outcome="served") == served_before + 1
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    client = ScriptedClient({"primary": 5.0, "backup": 0})
+    cancelled_before = sample("boardroom_llm_attempts_total", model="primary", outcome="cancelled")
+    hedges_before = sample("boardroom_llm_hedges_total", model="backup")
+
+    started = time.monotonic()
+    stream = router("primary", "backup").open_stream(client, messages=[])
+    assert time.monotonic() - started < 1.0
+    assert text(stream) == "from backup"
+    assert stream.route.label == "backup"
+    assert stream.hedged and stream.attempts == 2
+    assert client.streams["primary"].closed.is_set()
+    assert sample("boardroom_llm_attempts_total", model="primary", outcome="cancelled") == cancelled_before + 1
+    assert sample("boardroom_llm_hedges_total", model="backup") == hedges_before + 1
+
+
+def test_failed_route_falls_back_without_waiting_for_the_hedge():
+    client = ScriptedClient({"primary": RuntimeError("502 from provider"), "backup": 0})
+    started = time.monotonic()
+    stream = router("primary", "backup", hedge_after=5.0).open_stream(client, messages=[])
+    assert time.monotonic() - started < 1.0
+    assert stream.metadata()["model"] == "backup"
+    assert not stream.hedged
+
+
+def test_all_routes_failing_raises_the_last_error():
+    client = ScriptedClient({"primary": RuntimeError("first"), "backup": RuntimeError("second")})
+    with pytest.raises(RuntimeError, match="second"):
+        router("primary", "backup").open_stream(client, messages=[])
+
+
+def test_deadline_closes_every_attempt():
+    client = ScriptedClient({"primary": 5.0, "backup": 5.0})
+    deadline_before = sample("boardroom_llm_attempts_total", model="backup", outcome="deadline")
+    with pytest.raises(DeadlineExceeded, match="primary, backup"):
+        router("primary", "backup", hedge_after=0.01, deadline=0.1).open_stream(client, messages=[])
+    assert all(stream.closed.is_set() for stream in client.streams.values())
+    assert sample("boardroom_llm_attempts_total", model="backup", outcome="deadline") == deadline_before + 1
+
+
+def test_async_slow_primary_is_hedged_and_cancelled():
+    client = AsyncScriptedClient({"primary": 5.0, "backup": 0})
+
+    async def scenario():
+        async with await router("primary", "backup").open_stream_async(client, messages=[]) as stream:
+            assert await atext(stream) == "from backup"
+        return stream
+
+    stream = asyncio.run(scenario())
+    assert stream.metadata()["model"] == "backup"
+    assert stream.hedged
+    assert client.streams["primary"].closed.is_set()
+    assert client.streams["backup"].closed.is_set()
+
+
+def test_async_failed_route_falls_back_and_single_route_runs():
+    client = AsyncScriptedClient({"primary": RuntimeError("502"), "backup": 0})
+
+    async def scenario():
+        fallback = await router("primary", "backup", hedge_after=5.0).open_stream_async(client, messages=[])
+        single = await router("backup").open_stream_async(client, messages=[])
+        return fallback, single
+
+    fallback, single = asyncio.run(scenario())
+    assert fallback.route.label == "backup" and not fallback.hedged
+    assert single.attempts == 1 and not single.hedged
+
+
+def test_async_single_route_is_held_to_the_deadline():
+    slow = AsyncScriptedClient({"primary": 5.0})
+    timed_out = AsyncScriptedClient({"primary": TimeoutError("read timed out")})
+
+    async def scenario():
+        with pytest.raises(DeadlineExceeded, match="primary"):
+            await router("primary", deadline=0.1).open_stream_async(slow, messages=[])
+        with pytest.raises(DeadlineExceeded, match="read timed out"):
+            await router("primary").open_stream_async(timed_out, messages=[])
+        await asyncio.sleep(0)
+
+    started = time.monotonic()
+    asyncio.run(scenario())
+    assert time.monotonic() - started < 1.0
+    assert slow.streams["primary"].closed.is_set()
+
+
+def test_async_errors_and_deadline():
+    failing = AsyncScriptedClient({"primary": RuntimeError("first"), "backup": RuntimeError("second")})
+    slow = AsyncScriptedClient({"primary": 5.0, "backup": 5.0})
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="second"):
+            await router("primary", "backup").open_stream_async(failing, messages=[])
+        with pytest.raises(RuntimeError, match="first"):
+            await router("primary").open_stream_async(failing, messages=[])
+        with pytest.raises(DeadlineExceeded):
+            await router("primary", "backup", hedge_after=0.01, deadline=0.1).open_stream_async(slow, messages=[])
+        # Cancelled losers close their streams as they unwind.
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert all(stream.closed.is_set() for stream in slow.streams.values())
@@ -0,0 +1,110 @@
+import os
+import threading
+
+import pytest
+
+import process_local
+from process_local import ProcessLocal
+
+
+class Client:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self):
+        return "pong"
+
+    def close(self):
+        self.closed = True
+
+
+def test_created_once_on_first_use():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Client()
+
+    client = ProcessLocal(factory, "client")
+    assert client.peek() is None
+    assert calls == []
+
+    assert client.ping() == "pong"
+    assert client.get() is client.get()
+    assert calls == [1]
+    assert "created" in repr(client)
+
+
+def test_concurrent_first_use_creates_one_object():
+    started = threading.Barrier(8)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Client()
+
+    client = ProcessLocal(factory, "client")
+
+    def use():
+        started.wait()
+        client.get()
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1]
+
+
+def test_failed_creation_is_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("unreachable")
+        return Client()
+
+    client = ProcessLocal(factory, "client")
+    with pytest.raises(ConnectionError):
+        client.ping()
+    assert client.peek() is None
+    assert client.ping() == "pong"
+
+
+def test_close_only_closes_what_was_created():
+    closed = []
+    client = ProcessLocal(Client, "client", close=lambda c: closed.append(c))
+    client.close()
+    assert closed == []
+
+    created = client.get()
+    process_local._close_all()
+    assert closed == [created]
+    assert client.peek() is None
+
+
+def test_forked_child_creates_its_own():
+    client = ProcessLocal(Client, "client")
+    parent = client.get()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Child: the parent's object is forgotten and a new one created.
+        fresh = client.peek() is None and client.get() is not parent
+        os.write(write_fd, b"1" if fresh else b"0")
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 1) == b"1"
+    os.close(read_fd)
+    assert client.get() is parent
+
+
+def test_missing_attributes_do_not_recurse():
+    client = ProcessLocal.__new__(ProcessLocal)
+    with pytest.raises(AttributeError):
+        client._value
+    with pytest.raises(AttributeError):
+        ProcessLocal(Client, "client").missing
@@ -0,0 +1,66 @@
+from search import HIGHLIGHT_START as START, HIGHLIGHT_STOP as STOP, InvertedIndex, parse_query, snippet_segments
+
+
+def message(message_id, content, session_id="s1", created_at="2026-01-01T00:00:00Z"):
+    return {"id": message_id, "session_id": session_id, "role": "user", "agent_id": None,
+            "created_at": created_at, "content": content}
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_snippet_segments_strip_markers():
+    assert snippet_segments(f"the {START}risk{STOP} and {START}risks{STOP}{START}!{STOP} end") == [
+        {"text": "the ", "match": False},
+        {"text": "risk", "match": True},
+        {"text": " and ", "match": False},
+        {"text": "risks!", "match": True},
+        {"text": " end", "match": False},
+    ]
+    assert snippet_segments("") == []
+
+
+def test_parse_query_follows_web_search_syntax():
+    assert parse_query("launching the databases") == ([{"launch"}, {"databas"}], set())
+    assert parse_query('"cache layer" or queue -redis') == ([{"cach"}, {"layer", "queu"}], {"redi"})
+    assert parse_query("or the") == ([], set())
+
+
+def test_search_matches_every_clause_and_skips_exclusions():
+    index = InvertedIndex()
+    index.add(message("m1", "Caching in front of the database"))
+    index.add(message("m2", "The database needs a queue"))
+    index.add(message("m3", "Queues and caches"))
+
+    assert set(ids(index.search("database", {"s1"}, 10))) == {"m1", "m2"}
+    assert ids(index.search("database cached", {"s1"}, 10)) == ["m1"]
+    assert set(ids(index.search("database or queue", {"s1"}, 10))) == {"m1", "m2", "m3"}
+    assert ids(index.search("queue -database", {"s1"}, 10)) == ["m3"]
+    assert index.search("the", {"s1"}, 10) == []
+    assert index.search("database", {"s2"}, 10) == []
+
+
+def test_search_ranks_then_pages():
+    index = InvertedIndex()
+    index.add(message("m1", "risk " + "filler " * 40, created_at="2026-01-01T00:00:01Z"))
+    index.add(message("m2", "risk risk and more risk", created_at="2026-01-01T00:00:02Z"))
+    index.add(message("m3", "risk", created_at="2026-01-01T00:00:03Z"))
+    index.add(message("m4", "risk", created_at="2026-01-01T00:00:04Z"))
+    # Re-adding a known row changes nothing.
+    index.add(message("m2", "risk risk and more risk"))
+    assert len(index) == 4
+
+    ranked = ids(index.search("risk", {"s1"}, 10))
+    assert ranked == ["m2", "m4", "m3", "m1"]
+    assert ids(index.search("risk", {"s1"}, 2, offset=1)) == ranked[1:3]
+
+
+def test_headline_is_a_window_around_the_first_match():
+    words = [f"w{i}" for i in range(60)]
+    words[10] = "Risky"
+    headline = InvertedIndex.headline(" ".join(words), {"risky"})
+    assert headline.startswith("w7 ")
+    assert f"{START}Risky{STOP}" in headline
+    assert len(headline.split()) == 24
+    assert InvertedIndex.headline("...", {"risk"}) == "..."
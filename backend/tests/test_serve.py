@@ -0,0 +1,35 @@
+import app as app_module
+import serve
+
+
+def test_main_runs_the_asgi_app_with_worker_logging(monkeypatch):
+    runs = []
+    monkeypatch.setattr(serve.uvicorn, "run", lambda target, **options: runs.append((target, options)))
+    monkeypatch.setattr(serve, "configure_logging", lambda: None)
+    monkeypatch.setattr(serve, "worker_count", lambda: 3)
+
+    serve.main()
+
+    [(target, options)] = runs
+    assert target == "asgi:application"
+    assert options["port"] == serve.PORT
+    assert options["workers"] == 3
+    assert options["lifespan"] == "on"
+    # uvicorn applies it in every worker process.
+    assert options["log_config"]["root"]["handlers"] == ["stderr"]
+
+
+def test_per_worker_state_forces_a_single_worker(monkeypatch, caplog):
+    monkeypatch.setattr(serve, "WEB_CONCURRENCY", 4)
+    monkeypatch.setitem(app_module.app.config, "LIVE_EVENTS", False)
+    monkeypatch.setitem(app_module.app.config, "CHAT_WRITE_BEHIND_DIR", "")
+    assert serve.worker_count() == 4
+
+    monkeypatch.setitem(app_module.app.config, "LIVE_EVENTS", True)
+    assert serve.worker_count() == 1
+    assert "live events" in caplog.text
+
+    monkeypatch.setitem(app_module.app.config, "LIVE_EVENTS", False)
+    monkeypatch.setitem(app_module.app.config, "CHAT_WRITE_BEHIND_DIR", "/var/lib/boardroom")
+    assert serve.worker_count() == 1
+    assert "write-behind" in caplog.text
@@ -0,0 +1,75 @@
+import threading
+
+from context_window import TokenCounter
+from session_summaries import SessionSummary, SummaryRefresher, needs_refresh, summary_prompt
+
+
+def test_session_summary_from_row():
+    row = {"summary": "so far", "covered_until": "2026-01-01T00:00:00Z", "covered_message_id": "m1"}
+
+    summary = SessionSummary.from_row(row)
+
+    assert summary.cursor == ("2026-01-01T00:00:00Z", "m1")
+    assert SessionSummary.from_row(None) is None
+    assert SessionSummary.from_row(dict(row, summary="")) is None
+
+
+def test_needs_refresh_waits_for_a_full_batch_beyond_the_kept_tail():
+    assert not needs_refresh(29, keep_recent=10, refresh_every=20)
+    assert needs_refresh(30, keep_recent=10, refresh_every=20)
+
+
+def test_summary_prompt_names_speakers_and_truncates():
+    messages = [
+        {"role": "user", "content": "Should we shard?", "agent_id": None},
+        {"role": "assistant", "content": "x" * 400, "agent_id": "agent-1"},
+        {"role": "assistant", "content": "Maybe", "agent_id": "agent-gone"},
+    ]
+
+    prompt = summary_prompt("Earlier: picked Postgres.", messages, {"agent-1": "Architect"}, TokenCounter(), 10)
+
+    assert prompt[0]["role"] == "system"
+    body = prompt[1]["content"]
+    assert body.startswith("Existing summary:\nEarlier: picked Postgres.")
+    assert "User: Should we shard?" in body
+    assert "Architect: " + "x" * 20 in body and "x" * 100 not in body
+    assert "Assistant: Maybe" in body
+    assert "(none yet)" in summary_prompt("", messages, {}, TokenCounter(), 10)[1]["content"]
+
+
+def test_refresher_runs_once_per_session_at_a_time():
+    release = threading.Event()
+    calls = []
+
+    def refresh(session_id):
+        calls.append(session_id)
+        release.wait(timeout=5)
+
+    refresher = SummaryRefresher(refresh, max_workers=2)
+    try:
+        assert refresher.schedule("s1")
+        assert not refresher.schedule("s1")
+        assert refresher.schedule("s2")
+        release.set()
+        refresher.wait(timeout=5)
+
+        assert sorted(calls) == ["s1", "s2"]
+        assert refresher.schedule("s1")
+        refresher.wait(timeout=5)
+        assert calls.count("s1") == 2
+    finally:
+        refresher.shutdown()
+
+
+def test_refresher_survives_failing_refresh():
+    def refresh(session_id):
+        raise RuntimeError("llm down")
+
+    refresher = SummaryRefresher(refresh, max_workers=1)
+    try:
+        assert refresher.schedule("s1")
+        refresher.wait(timeout=5)
+        assert refresher.schedule("s1")
+        refresher.wait(timeout=5)
+    finally:
+        refresher.shutdown()
@@ -0,0 +1,31 @@
+from context_window import TokenCounter
+from session_titles import TITLE_MAX_CHARS, clean_title, title_prompt
+
+
+def test_title_prompt_names_speakers_and_truncates():
+    messages = [
+        {"role": "user", "content": "Should we shard?", "agent_id": None},
+        {"role": "assistant", "content": "x" * 400, "agent_id": "agent-1"},
+        {"role": "assistant", "content": "Maybe", "agent_id": "agent-gone"},
+    ]
+
+    prompt = title_prompt(messages, {"agent-1": "Architect"}, TokenCounter(), 10)
+
+    assert prompt[0]["role"] == "system"
+    body = prompt[1]["content"]
+    assert body.startswith("User: Should we shard?")
+    assert "Architect: " + "x" * 20 in body and "x" * 100 not in body
+    assert "Assistant: Maybe" in body
+
+
+def test_clean_title_strips_decoration():
+    assert clean_title('"Sharding the Orders Table."') == "Sharding the Orders Table"
+    assert clean_title("Title: **Zero-Downtime  Migrations**\n\nHope this helps!") == "Zero-Downtime Migrations"
+    assert clean_title("  \n ") == ""
+    assert clean_title('""') == ""
+
+
+def test_clean_title_cuts_long_titles_at_a_word():
+    title = clean_title("Evaluating " + "very " * 30 + "long plans")
+    assert len(title) <= TITLE_MAX_CHARS
+    assert title.endswith("very…")
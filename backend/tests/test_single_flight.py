@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from metrics import registry
+from single_flight import SingleFlight
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class BlockingQuery:
+    """Counts calls; each blocks until ``release`` is set."""
+
+    def __init__(self, result="rows"):
+        self.calls = 0
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        assert self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def run_concurrently(flights, query, callers, detail=None):
+    shared_before = sample("boardroom_reads_coalesced_total", resource="test", outcome="shared")
+    results = [None] * callers
+    errors = [None] * callers
+
+    def call(index):
+        try:
+            results[index] = flights.do("scope", detail, query, resource="test")
+        except Exception as exc:
+            errors[index] = exc
+
+    leader = threading.Thread(target=call, args=(0,))
+    leader.start()
+    assert query.started.wait(5)
+    followers = [threading.Thread(target=call, args=(index,)) for index in range(1, callers)]
+    for thread in followers:
+        thread.start()
+    # Let the followers reach the shared flight before it lands.
+    while sample("boardroom_reads_coalesced_total", resource="test", outcome="shared") < shared_before + callers - 1:
+        time.sleep(0.001)
+    query.release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    return results, errors
+
+
+def test_concurrent_identical_calls_share_one_query():
+    query = BlockingQuery()
+    results, errors = run_concurrently(SingleFlight(reuse_seconds=0), query, callers=4)
+    assert query.calls == 1
+    assert results == ["rows"] * 4 and errors == [None] * 4
+
+
+def test_a_failure_is_shared_but_not_reused():
+    flights = SingleFlight(reuse_seconds=60)
+    failing = BlockingQuery(RuntimeError("database down"))
+    results, errors = run_concurrently(flights, failing, callers=3)
+    assert failing.calls == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+    assert flights.do("scope", None, lambda: "recovered") == "recovered"
+
+
+def test_results_are_reused_within_the_window_only():
+    clock = FakeClock()
+    flights = SingleFlight(reuse_seconds=0.1, clock=clock)
+    calls = []
+
+    def query():
+        calls.append(clock.now)
+        return len(calls)
+
+    assert flights.do("scope", "a", query) == 1
+    clock.now += 0.05
+    assert flights.do("scope", "a", query) == 1
+    # A different key is a different read.
+    assert flights.do("scope", "b", query) == 2
+    clock.now += 0.1
+    assert flights.do("scope", "a", query) == 3
+
+
+def test_invalidate_forgets_finished_and_running_calls():
+    flights = SingleFlight(reuse_seconds=60)
+    assert flights.do("s1", None, lambda: "before") == "before"
+    assert flights.do("s2", None, lambda: "other") == "other"
+    flights.invalidate("s1")
+    assert flights.do("s1", None, lambda: "after") == "after"
+    assert flights.do("s2", None, lambda: "unused") == "other"
+
+    running = BlockingQuery("stale")
+    leader = threading.Thread(target=flights.do, args=("s3", None, running))
+    leader.start()
+    assert running.started.wait(5)
+    # A write landed while the query ran: later callers must not join it.
+    flights.invalidate("s3")
+    assert flights.do("s3", None, lambda: "fresh") == "fresh"
+    running.release.set()
+    leader.join(5)
+    assert flights.do("s3", None, lambda: "unused") == "fresh"
+
+
+def test_leader_errors_propagate():
+    with pytest.raises(ValueError):
+        SingleFlight().do("scope", None, lambda: (_ for _ in ()).throw(ValueError("bad")))
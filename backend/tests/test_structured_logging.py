@@ -0,0 +1,130 @@
+import io
+import json
+import logging
+import sys
+import threading
+
+import pytest
+
+import structured_logging
+from metrics import _current_timer, start_request
+from structured_logging import JsonFormatter, QueueingHandler, RequestSampler, json_queue_handler, parse_sample_rates
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("boardroom", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.append(threading.current_thread().name)
+
+
+@pytest.fixture
+def outside_request():
+    # Tests share a thread, and with it the current request timer.
+    token = _current_timer.set(None)
+    yield
+    _current_timer.reset(token)
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("") == {}
+    assert parse_sample_rates("/api/sessions=0.1, *=0.5") == {"/api/sessions": 0.1, "*": 0.5}
+    for bad in ("/api/sessions", "=0.5", "/api/sessions=2", "/api/sessions=often"):
+        with pytest.raises(ValueError, match="invalid log sample rate"):
+            parse_sample_rates(bad)
+
+
+def test_sampler_decides_once_per_request_and_keeps_what_matters(outside_request):
+    draws = iter([0.05, 0.9])
+    sampler = RequestSampler({"/api/sessions": 0.1, "*": 1.0}, slow_ms=500, draw=lambda: next(draws))
+
+    # Outside a request everything is kept.
+    assert sampler.filter(make_record(logging.DEBUG))
+
+    start_request("/api/sessions")
+    assert sampler.filter(make_record(logging.DEBUG))
+    assert sampler.filter(make_record(logging.INFO))
+    kept = make_record(logging.INFO)
+    sampler.filter(kept)
+    assert kept.route == "/api/sessions"
+
+    start_request("/api/sessions")
+    assert not sampler.filter(make_record(logging.DEBUG))
+    assert not sampler.filter(make_record(logging.INFO, duration_ms=120.0))
+    assert sampler.filter(make_record(logging.INFO, duration_ms=750.0))
+    assert sampler.filter(make_record(logging.WARNING))
+    assert sampler.filter(make_record(logging.ERROR))
+
+    # Routes not listed fall back to "*"; without it, to keeping everything.
+    start_request("/api/agents")
+    assert sampler.filter(make_record(logging.DEBUG))
+    assert RequestSampler({"/api/sessions": 0.0}).filter(make_record(logging.DEBUG))
+
+
+def test_json_formatter_includes_extra_fields_and_tracebacks():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        record = make_record(logging.ERROR, route="/api/chat", status=500, duration_ms=12.5)
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "boardroom"
+    assert entry["message"] == "hello world"
+    assert entry["route"] == "/api/chat"
+    assert entry["status"] == 500
+    assert entry["duration_ms"] == 12.5
+    assert "RuntimeError: boom" in entry["exc"]
+    assert entry["ts"].endswith("+00:00")
+    assert "args" not in entry and "msecs" not in entry
+
+
+def test_queueing_handler_formats_and_writes_off_thread():
+    target = Collect()
+    handler = QueueingHandler(target)
+    args = ["first"]
+    handler.handle(make_record(msg="value=%s", args=(args,)))
+    # The message is fixed when logged, not when the listener gets to it.
+    args.append("later")
+    handler.close()
+
+    [record] = target.records
+    assert record.getMessage() == "value=['first']"
+    assert target.threads[0] != threading.current_thread().name
+    # Closing twice is harmless.
+    handler.close()
+
+
+def test_forked_child_gets_its_own_listener():
+    target = Collect()
+    handler = QueueingHandler(target)
+    parent_listener = handler.listener
+    structured_logging._after_fork_in_child()
+    assert handler.listener is not parent_listener
+    handler.handle(make_record())
+    handler.close()
+    parent_listener.stop()
+    assert len(target.records) == 1
+
+
+def test_json_queue_handler_writes_json_lines(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(sys, "stderr", stream)
+    handler = json_queue_handler()
+    handler.handle(make_record(route="/metrics"))
+    handler.close()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "hello world"
+    assert entry["route"] == "/metrics"
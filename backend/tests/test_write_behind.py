@@ -0,0 +1,203 @@
+import json
+import threading
+
+import pytest
+
+import write_behind
+from metrics import registry
+from write_behind import Journal, WriteBehindQueue
+
+
+def sample(name, **labels):
+    return registry.get_sample_value(name, labels) or 0.0
+
+
+def write(session_id, n):
+    return {"session_id": session_id, "n": n}
+
+
+class Recorder:
+    """An ``apply`` that records batches; ``gate`` holds it until set, ``failures`` makes it raise."""
+
+    def __init__(self, failures=0):
+        self.batches = []
+        self.failures = failures
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, writes):
+        self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database unavailable")
+        self.batches.append(writes)
+
+    @property
+    def applied(self):
+        return [w["n"] for batch in self.batches for w in batch]
+
+
+@pytest.fixture
+def queues():
+    opened = []
+    yield opened
+    for queue in opened:
+        queue.close()
+
+
+def open_queue(queues, journal, apply, **kwargs):
+    kwargs.setdefault("flush_interval", 0.01)
+    queue = WriteBehindQueue(journal, apply, **kwargs)
+    queues.append(queue)
+    return queue
+
+
+def test_journal_replays_unacknowledged_writes(tmp_path):
+    journal = Journal(str(tmp_path))
+    for n in range(3):
+        journal.append(write("s1", n))
+    journal.ack(2, drained=False)
+    journal.close()
+
+    reopened = Journal(str(tmp_path))
+    assert reopened.path == journal.path
+    assert [entry["write"]["n"] for entry in reopened.pending] == [2]
+    # Sequence numbers keep counting from where the old journal stopped.
+    assert reopened.append(write("s1", 3))["seq"] == 4
+    reopened.close()
+
+
+def test_journal_skips_a_torn_last_line(tmp_path):
+    journal = Journal(str(tmp_path), fsync=False)
+    journal.append(write("s1", 0))
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as handle:
+        handle.write('{"seq": 2, "wri')
+
+    reopened = Journal(str(tmp_path))
+    assert [entry["write"]["n"] for entry in reopened.pending] == [0]
+    reopened.close()
+
+
+def test_each_live_journal_is_claimed_by_one_process(tmp_path):
+    first = Journal(str(tmp_path))
+    second = Journal(str(tmp_path))
+    assert first.path != second.path
+    first.close()
+
+    # A released journal (its worker died) is picked up by the next one to start.
+    third = Journal(str(tmp_path))
+    assert third.path == first.path
+    second.close()
+    third.close()
+
+
+def test_drained_journal_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(write_behind, "COMPACT_BYTES", 64)
+    journal = Journal(str(tmp_path), fsync=False)
+    for n in range(5):
+        journal.append(write("s1", n))
+    journal.ack(5, drained=True)
+    journal.close()
+
+    with open(journal.path, encoding="utf-8") as handle:
+        assert [json.loads(line) for line in handle] == [{"ack": 5}]
+    assert Journal(str(tmp_path)).pending == []
+
+
+def test_writes_are_applied_in_batches_and_acknowledged(tmp_path, queues):
+    recorder = Recorder()
+    recorder.gate.clear()
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder, batch_size=3)
+    applied_before = sample("boardroom_write_behind_flushes_total", outcome="applied")
+
+    for n in range(5):
+        queue.submit(write("s1", n))
+    assert queue.has_pending("s1")
+    recorder.gate.set()
+    assert queue.barrier("s1")
+
+    assert recorder.applied == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 3 for batch in recorder.batches)
+    assert queue.pending == 0 and not queue.has_pending("s1")
+    assert sample("boardroom_write_behind_flushes_total", outcome="applied") > applied_before
+    queue.close()
+    assert Journal(str(tmp_path)).pending == []
+
+
+def test_barrier_flushes_without_waiting_for_the_interval(tmp_path, queues):
+    recorder = Recorder()
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder, flush_interval=30)
+    queue.submit(write("s1", 0))
+    queue.submit(write("s2", 1))
+
+    assert queue.barrier("s1", timeout=5)
+    assert recorder.applied == [0, 1]
+    # Nothing pending for a session is an immediate pass.
+    assert queue.barrier("s3", timeout=0)
+
+
+def test_barrier_times_out_while_the_database_is_down(tmp_path, queues):
+    recorder = Recorder()
+    recorder.gate.clear()
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder)
+    queue.submit(write("s1", 0))
+
+    assert not queue.barrier("s1", timeout=0.05)
+    recorder.gate.set()
+
+
+def test_failed_batches_are_retried(tmp_path, queues):
+    recorder = Recorder(failures=2)
+    failed_before = sample("boardroom_write_behind_flushes_total", outcome="failed")
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder, retry_seconds=0.01)
+    queue.submit(write("s1", 0))
+
+    assert queue.barrier("s1")
+    assert recorder.applied == [0]
+    assert sample("boardroom_write_behind_flushes_total", outcome="failed") == failed_before + 2
+
+
+def test_a_write_that_always_fails_is_dead_lettered(tmp_path, queues):
+    class RejectsOne(Recorder):
+        def __call__(self, writes):
+            if any(w["n"] == 1 for w in writes):
+                raise RuntimeError("violates a constraint")
+            super().__call__(writes)
+
+    recorder = RejectsOne()
+    dead_before = sample("boardroom_write_behind_flushes_total", outcome="dead_lettered")
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder, retry_seconds=0.001, max_attempts=3)
+    recorder.gate.clear()
+    for n in range(3):
+        queue.submit(write("s1", n))
+    recorder.gate.set()
+
+    assert queue.barrier("s1")
+    # The rest of the batch still lands, and later writes aren't held up.
+    assert recorder.applied == [0, 2]
+    queue.submit(write("s1", 3))
+    assert queue.barrier("s1")
+    assert recorder.applied == [0, 2, 3]
+    assert sample("boardroom_write_behind_flushes_total", outcome="dead_lettered") == dead_before + 1
+
+    with open(queue.journal.dead_letter_path, encoding="utf-8") as handle:
+        assert [json.loads(line)["write"] for line in handle] == [write("s1", 1)]
+    queue.close()
+    assert Journal(str(tmp_path)).pending == []
+
+
+def test_writes_left_by_a_dead_worker_are_replayed(tmp_path, queues):
+    stuck = Recorder(failures=1_000)
+    dead = WriteBehindQueue(Journal(str(tmp_path)), stuck, retry_seconds=30)
+    dead.submit(write("s1", 0))
+    dead.submit(write("s2", 1))
+    # The worker dies with both writes journaled but never applied.
+    dead.close(timeout=0.1)
+    stuck.failures = 0
+    dead.journal.close()
+
+    recorder = Recorder()
+    queue = open_queue(queues, Journal(str(tmp_path)), recorder)
+    assert queue.barrier("s1") and queue.barrier("s2")
+    assert recorder.applied == [0, 1]
@@ -0,0 +1,287 @@
+"""Write-behind persistence for chat writes that can trail the response.
+
+Once the model has answered, the assistant message insert and the session's
+``updated_at`` touch don't need to hold the response open. With write-behind
+on, each write is appended to a local ``Journal`` -- an append-only JSON-lines
+file, fsynced before the response is sent -- and a background worker applies
+the journaled writes in batches. Each write carries its final ids and
+timestamps, so applying one twice changes nothing: a worker that dies between
+applying a batch and acknowledging it simply replays the batch when the
+journal is next opened.
+
+Each worker process claims its own journal file in the directory with an
+exclusive ``flock``; a file left behind by a dead worker is claimed and
+replayed by the next process to start. Readers that need a session's writes
+to have landed (the next turn's history, transcript pages, summaries) call
+``barrier``, which flushes that session's pending writes first. The
+barrier only knows its own process's queue: a read served by another worker
+doesn't wait for this one's writes, so serve.py runs a single worker while
+write-behind is on.
+
+A batch that fails is retried with exponential backoff, up to
+``max_attempts`` times. After that its writes are tried one at a time, and
+those that still fail are set aside in the journal's dead-letter file
+(``dead-letter-*.jsonl``, same line format) and acknowledged, so one write
+the database keeps rejecting doesn't hold up every write behind it.
+"""
+
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, TextIO
+
+from metrics import WRITE_BEHIND_FLUSHES, WRITE_BEHIND_PENDING, record_stage
+
+log = logging.getLogger("boardroom")
+
+# Truncate a fully acknowledged journal once it grows past this size.
+COMPACT_BYTES = 1 << 20
+# Longest wait between retries of a failing batch.
+MAX_RETRY_SECONDS = 30.0
+
+
+class Journal:
+    """Append-only log of writes (``{"seq", "write"}`` lines) and acknowledgements
+    (``{"ack"}`` lines: every write up to that seq has been applied)."""
+
+    def __init__(self, directory: str, fsync: bool = True):
+        os.makedirs(directory, exist_ok=True)
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._file, self.path = self._claim(directory)
+        directory, name = os.path.split(self.path)
+        self.dead_letter_path = os.path.join(directory, name.replace("journal-", "dead-letter-", 1))
+        self.pending, self._next_seq = self._replay()
+        if self.pending:
+            log.warning("Replaying %d journaled writes from %s", len(self.pending), self.path)
+
+    @staticmethod
+    def _claim(directory: str) -> tuple[TextIO, str]:
+        for path in sorted(glob.glob(os.path.join(directory, "journal-*.jsonl"))):
+            handle = open(path, "a+", encoding="utf-8")
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another live worker owns this one.
+                handle.close()
+                continue
+            return handle, path
+        path = os.path.join(directory, f"journal-{uuid.uuid4().hex}.jsonl")
+        handle = open(path, "a+", encoding="utf-8")
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return handle, path
+
+    def _replay(self) -> tuple[list[dict[str, Any]], int]:
+        self._file.seek(0)
+        writes: list[dict[str, Any]] = []
+        acked = 0
+        for line in self._file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line torn by a crash mid-append was never acknowledged to a client.
+                continue
+            if "ack" in entry:
+                acked = max(acked, entry["ack"])
+            else:
+                writes.append(entry)
+        last_seq = max([acked, *(entry["seq"] for entry in writes)])
+        return [entry for entry in writes if entry["seq"] > acked], last_seq + 1
+
+    def _append(self, entry: dict[str, Any], sync: bool) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def append(self, write: dict[str, Any]) -> dict[str, Any]:
+        """Durably record ``write``; returns its journal entry."""
+        with self._lock:
+            entry = {"seq": self._next_seq, "write": write}
+            self._next_seq += 1
+            self._append(entry, self.fsync)
+        return entry
+
+    def ack(self, seq: int, drained: bool) -> None:
+        """Mark every write up to ``seq`` applied; ``drained`` if none are left."""
+        with self._lock:
+            if drained and self._file.tell() > COMPACT_BYTES:
+                self._file.truncate(0)
+            self._append({"ack": seq}, sync=False)
+
+    def dead_letter(self, entries: list[dict[str, Any]]) -> None:
+        """Durably set ``entries`` aside; acknowledging them is up to the caller."""
+        with self._lock, open(self.dead_letter_path, "a", encoding="utf-8") as handle:
+            for entry in entries:
+                handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class WriteBehindQueue:
+    """Applies journaled writes in batches on a background thread.
+
+    ``apply`` receives a list of writes (each a dict with at least a
+    ``session_id``) and must be idempotent; a batch that raises is retried,
+    then dead-lettered (see the module docstring).
+    """
+
+    def __init__(
+        self,
+        journal: Journal,
+        apply: Callable[[list[dict[str, Any]]], None],
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        retry_seconds: float = 1.0,
+        max_attempts: int = 5,
+    ):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self._apply = apply
+        self._cond = threading.Condition()
+        self._entries: deque[dict[str, Any]] = deque()
+        self._sessions: dict[str, int] = {}
+        self._barriers = 0
+        self._closing = False
+        for entry in journal.pending:
+            self._enqueue(entry)
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _enqueue(self, entry: dict[str, Any]) -> None:
+        session_id = entry["write"]["session_id"]
+        self._entries.append(entry)
+        self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+        WRITE_BEHIND_PENDING.inc()
+
+    @property
+    def pending(self) -> int:
+        return len(self._entries)
+
+    def has_pending(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def submit(self, write: dict[str, Any]) -> None:
+        """Journal ``write``; it is applied shortly after, in a batch."""
+        # Journaled under the queue lock, so a compaction never drops a write
+        # that is in the file but not yet queued.
+        with self._cond:
+            self._enqueue(self.journal.append(write))
+            self._cond.notify_all()
+
+    def barrier(self, session_id: str, timeout: float = 5.0) -> bool:
+        """Flush now and wait until ``session_id`` has no pending writes."""
+        with self._cond:
+            if session_id not in self._sessions:
+                return True
+            self._barriers += 1
+            self._cond.notify_all()
+            try:
+                landed = self._cond.wait_for(lambda: session_id not in self._sessions, timeout)
+            finally:
+                self._barriers -= 1
+        if not landed:
+            log.warning("Write-behind barrier timed out  session=%s  pending=%d", session_id, self.pending)
+        return landed
+
+    def _next_batch(self) -> list[dict[str, Any]] | None:
+        with self._cond:
+            while not self._entries:
+                if self._closing:
+                    return None
+                self._cond.wait()
+            # Let the batch fill for up to flush_interval, unless someone is waiting on it.
+            deadline = time.monotonic() + self.flush_interval
+            while len(self._entries) < self.batch_size and not self._barriers and not self._closing:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return list(islice(self._entries, self.batch_size))
+
+    def _set_aside(self, batch: list[dict[str, Any]]) -> None:
+        """Apply the writes of a batch that keeps failing one by one, and
+        dead-letter those that fail on their own."""
+        failed = batch
+        if len(batch) > 1:
+            failed = []
+            for entry in batch:
+                try:
+                    self._apply([entry["write"]])
+                except Exception:
+                    failed.append(entry)
+        if failed:
+            self.journal.dead_letter(failed)
+            WRITE_BEHIND_FLUSHES.labels("dead_lettered").inc()
+            log.error(
+                "Write-behind gave up on %d of %d writes  seqs=%s; set aside in %s",
+                len(failed), len(batch), [entry["seq"] for entry in failed], self.journal.dead_letter_path,
+            )
+
+    def _run(self) -> None:
+        attempts = 0
+        while (batch := self._next_batch()) is not None:
+            started = time.perf_counter()
+            try:
+                self._apply([entry["write"] for entry in batch])
+            except Exception:
+                attempts += 1
+                WRITE_BEHIND_FLUSHES.labels("failed").inc()
+                if attempts < self.max_attempts:
+                    delay = min(self.retry_seconds * 2 ** (attempts - 1), MAX_RETRY_SECONDS)
+                    log.exception("Write-behind flush failed  writes=%d  attempt=%d; retrying in %.1fs",
+                                  len(batch), attempts, delay)
+                    with self._cond:
+                        if self._closing:
+                            return
+                        self._cond.wait(delay)
+                    continue
+                log.exception("Write-behind flush failed  writes=%d  attempt=%d; giving up", len(batch), attempts)
+                try:
+                    self._set_aside(batch)
+                except OSError:
+                    # Not set aside, so not acknowledged either; try again later.
+                    log.exception("Could not write %s", self.journal.dead_letter_path)
+                    with self._cond:
+                        if self._closing:
+                            return
+                        self._cond.wait(MAX_RETRY_SECONDS)
+                    continue
+            else:
+                record_stage("db_write_behind", time.perf_counter() - started)
+                WRITE_BEHIND_FLUSHES.labels("applied").inc()
+            attempts = 0
+
+            with self._cond:
+                for _ in batch:
+                    session_id = self._entries.popleft()["write"]["session_id"]
+                    self._sessions[session_id] -= 1
+                    if not self._sessions[session_id]:
+                        del self._sessions[session_id]
+                WRITE_BEHIND_PENDING.dec(len(batch))
+                self.journal.ack(batch[-1]["seq"], drained=not self._entries)
+                self._cond.notify_all()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Apply what is pending (if the database allows) and stop; the rest
+        stays in the journal for the next process."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.journal.close()
@@ -9,15 +9,21 @@ import {
   clearAuthToken,
   fetchMe,
   getAuthToken,
+  getRememberedUser,
   login,
+  rememberUser,
   setAuthToken,
   signup,
 } from './api'
 import type { AuthUser } from './types'
 
 const App: React.FC = () => {
-  const [authLoading, setAuthLoading] = useState(true)
-  const [authUser, setAuthUser] = useState<AuthUser | null>(null)
+  // A remembered user renders straight away (from the offline cache) while
+  // /auth/me confirms the token.
+  const [authUser, setAuthUser] = useState<AuthUser | null>(() =>
+    getAuthToken() ? getRememberedUser() : null
+  )
+  const [authLoading, setAuthLoading] = useState(authUser === null)
 
   const {
     agents,
@@ -25,13 +31,26 @@ const App: React.FC = () => {
     messages,
     activeSessionId,
     activeAgentId,
+    roundtableAgentIds,
     isTyping,
+    hasOlderMessages,
+    isLoadingOlder,
+    hasMoreSessions,
+    searchQuery,
+    searchResults,
+    hasMoreResults,
+    loadOlderMessages,
+    loadMoreSessions,
+    setSearchQuery,
+    loadMoreResults,
     setActiveSessionId,
     setActiveAgentId,
+    toggleRoundtable,
+    toggleRoundtableAgent,
     startNewSession,
     submitMessage,
     getAgent,
-  } = useBoardroom(Boolean(authUser))
+  } = useBoardroom(authUser?.id ?? null)
 
   useEffect(() => {
     const token = getAuthToken()
@@ -42,9 +61,12 @@ const App: React.FC = () => {
 
     fetchMe()
       .then((user) => {
-        setAuthUser(user)
+        rememberUser(user)
+        setAuthUser((prev) => (prev?.id === user.id ? prev : user))
       })
-      .catch(() => {
+      .catch((err) => {
+        // Offline, keep rendering the remembered user; a rejected token signs out.
+        if (getRememberedUser() && err?.response?.status !== 401) return
         clearAuthToken()
         setAuthUser(null)
       })
@@ -59,6 +81,7 @@ const App: React.FC = () => {
       throw new Error('Login failed: no access token returned')
     }
     setAuthToken(result.access_token)
+    rememberUser(result.user)
     setAuthUser(result.user)
   }
 
@@ -68,6 +91,7 @@ const App: React.FC = () => {
       throw new Error('Signup succeeded, but email confirmation is required before login.')
     }
     setAuthToken(result.access_token)
+    rememberUser(result.user)
     setAuthUser(result.user)
   }
 
@@ -98,6 +122,9 @@ const App: React.FC = () => {
   }
 
   const activeAgent = getAgent(activeAgentId)
+  const roundtableAgents = roundtableAgentIds
+    ? agents.filter((agent) => roundtableAgentIds.includes(agent.id))
+    : undefined
 
   return (
     <div
@@ -117,8 +144,15 @@ const App: React.FC = () => {
       <Dossiers
         sessions={sessions}
         activeSessionId={activeSessionId}
+        hasMoreSessions={hasMoreSessions}
+        searchQuery={searchQuery}
+        searchResults={searchResults}
+        hasMoreResults={hasMoreResults}
         onSelectSession={setActiveSessionId}
         onNewSession={startNewSession}
+        onLoadMore={loadMoreSessions}
+        onSearch={setSearchQuery}
+        onLoadMoreResults={loadMoreResults}
       />
 
       {/* Center pane: Transcript */}
@@ -179,6 +213,9 @@ const App: React.FC = () => {
         <Transcript
           messages={messages}
           isTyping={isTyping}
+          hasOlder={hasOlderMessages}
+          isLoadingOlder={isLoadingOlder}
+          onLoadOlder={loadOlderMessages}
           getAgent={getAgent}
           activeAgentColor={activeAgent?.color_hex}
         />
@@ -186,6 +223,7 @@ const App: React.FC = () => {
         {/* Floating command bar */}
         <CommandBar
           activeAgent={activeAgent}
+          roundtableAgents={roundtableAgents}
           isTyping={isTyping}
           onSubmit={submitMessage}
         />
@@ -195,8 +233,11 @@ const App: React.FC = () => {
       <TheRoster
         agents={agents}
         activeAgentId={activeAgentId}
+        roundtableAgentIds={roundtableAgentIds}
         isTyping={isTyping}
         onSelectAgent={setActiveAgentId}
+        onToggleRoundtable={toggleRoundtable}
+        onToggleRoundtableAgent={toggleRoundtableAgent}
       />
     </div>
   )
@@ -2,16 +2,25 @@ import axios from 'axios'
 import type {
   Agent,
   Session,
-  Message,
+  SessionPage,
+  MessagePage,
+  SearchPage,
   ChatPayload,
   ChatResponse,
+  ChatStreamHandlers,
+  RoundtablePayload,
+  RoundtableResponse,
+  RoundtableStreamHandlers,
   AuthPayload,
   AuthResponse,
   AuthUser,
+  LiveEvent,
 } from './types'
+import { clearCache } from './offlineCache'
 
 const http = axios.create({ baseURL: '/api' })
 const TOKEN_STORAGE_KEY = 'boardroom_access_token'
+const USER_STORAGE_KEY = 'boardroom_user'
 
 http.interceptors.request.use((config) => {
   const token = getAuthToken()
@@ -30,8 +39,48 @@ export function setAuthToken(token: string): void {
   localStorage.setItem(TOKEN_STORAGE_KEY, token)
 }
 
+// Signing out also forgets the remembered user and the offline cache.
 export function clearAuthToken(): void {
   localStorage.removeItem(TOKEN_STORAGE_KEY)
+  localStorage.removeItem(USER_STORAGE_KEY)
+  void clearCache()
+}
+
+// The signed-in user, kept with the token so a reload can render from the
+// offline cache before /auth/me answers.
+export function getRememberedUser(): AuthUser | null {
+  try {
+    return JSON.parse(localStorage.getItem(USER_STORAGE_KEY) ?? 'null') as AuthUser | null
+  } catch {
+    return null
+  }
+}
+
+export function rememberUser(user: AuthUser): void {
+  localStorage.setItem(USER_STORAGE_KEY, JSON.stringify(user))
+}
+
+// A body and the ETag it was served with.
+export interface Revalidated<T> {
+  data: T
+  etag: string | null
+}
+
+// Conditional GET: resolves to null when the server answers 304 Not Modified
+// to `etag`.
+async function getRevalidated<T>(
+  path: string,
+  etag: string | null,
+  params?: Record<string, unknown>
+): Promise<Revalidated<T> | null> {
+  const response = await http.get<T>(path, {
+    params,
+    headers: etag ? { 'If-None-Match': etag } : undefined,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  })
+  if (response.status === 304) return null
+  const served = response.headers['etag']
+  return { data: response.data, etag: typeof served === 'string' ? served : null }
 }
 
 export async function signup(payload: AuthPayload): Promise<AuthResponse> {
@@ -52,11 +101,18 @@ export async function fetchMe(): Promise<AuthUser> {
 // ---------------------------------------------------------------------------
 // Sessions
 // ---------------------------------------------------------------------------
-export async function fetchSessions(): Promise<Session[]> {
-  const { data } = await http.get<Session[]>('/sessions')
+export async function fetchSessions(
+  options: { before?: string; limit?: number } = {}
+): Promise<SessionPage> {
+  const { data } = await http.get<SessionPage>('/sessions', { params: options })
   return data
 }
 
+// The first page, revalidated against the ETag of a cached copy.
+export function revalidateSessions(etag: string | null): Promise<Revalidated<SessionPage> | null> {
+  return getRevalidated<SessionPage>('/sessions', etag)
+}
+
 export async function createSession(): Promise<Session> {
   const { data } = await http.post<Session>('/sessions')
   return data
@@ -65,19 +121,39 @@ export async function createSession(): Promise<Session> {
 // ---------------------------------------------------------------------------
 // Messages
 // ---------------------------------------------------------------------------
-export async function fetchMessages(sessionId: string): Promise<Message[]> {
-  const { data } = await http.get<Message[]>(`/sessions/${sessionId}/messages`)
+// Newest page first; pass the previous page's `next_before` to walk back, or
+// a held `next_after` to fetch only messages persisted since.
+export async function fetchMessages(
+  sessionId: string,
+  options: { before?: string; after?: string; limit?: number } = {}
+): Promise<MessagePage> {
+  const { data } = await http.get<MessagePage>(`/sessions/${sessionId}/messages`, {
+    params: options,
+  })
   return data
 }
 
 // ---------------------------------------------------------------------------
-// Agents
+// Search
 // ---------------------------------------------------------------------------
-export async function fetchAgents(): Promise<Agent[]> {
-  const { data } = await http.get<Agent[]>('/agents')
+// Full-text search over the user's transcripts; `query` takes web-search
+// syntax ("quoted phrases", or, -word).
+export async function searchMessages(
+  query: string,
+  options: { offset?: number; limit?: number } = {}
+): Promise<SearchPage> {
+  const { data } = await http.get<SearchPage>('/search', { params: { q: query, ...options } })
   return data
 }
 
+// ---------------------------------------------------------------------------
+// Agents
+// ---------------------------------------------------------------------------
+// The catalog, revalidated against the ETag of a cached copy.
+export function revalidateAgents(etag: string | null): Promise<Revalidated<Agent[]> | null> {
+  return getRevalidated<Agent[]>('/agents', etag)
+}
+
 // ---------------------------------------------------------------------------
 // Chat
 // ---------------------------------------------------------------------------
@@ -85,3 +161,132 @@ export async function sendMessage(payload: ChatPayload): Promise<ChatResponse> {
   const { data } = await http.post<ChatResponse>('/chat', payload)
   return data
 }
+
+function authHeaders(): Record<string, string> {
+  const token = getAuthToken()
+  return token ? { Authorization: `Bearer ${token}` } : {}
+}
+
+// Hands each Server-Sent Event of `response` to `onEvent` as it arrives, with
+// its `id` if it has one. axios can't expose a response body incrementally
+// in the browser, so event streams go through fetch.
+async function readEventStream(
+  response: Response,
+  onEvent: (event: string, data: Record<string, unknown>, id: string | null) => void,
+  failure = 'Chat request failed'
+): Promise<void> {
+  if (!response.ok || !response.body) {
+    const body = await response.json().catch(() => null)
+    throw new Error(body?.error ?? `${failure} (${response.status})`)
+  }
+
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+  let buffer = ''
+
+  for (;;) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += value
+
+    let boundary = buffer.indexOf('\n\n')
+    while (boundary !== -1) {
+      const block = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      boundary = buffer.indexOf('\n\n')
+
+      let event = 'message'
+      let data = ''
+      let id: string | null = null
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+        else if (line.startsWith('id: ')) id = line.slice(4)
+      }
+      // Comment-only blocks (keep-alives) carry no data.
+      if (!data) continue
+
+      const parsed = JSON.parse(data) as Record<string, unknown>
+      if (event === 'error') throw new Error(String(parsed.error ?? failure))
+      onEvent(event, parsed, id)
+    }
+  }
+}
+
+// POSTs `payload` and hands each Server-Sent Event of the reply to `onEvent`.
+async function postEventStream(
+  path: string,
+  payload: unknown,
+  onEvent: (event: string, data: Record<string, unknown>) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const response = await fetch(`/api${path}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...authHeaders() },
+    body: JSON.stringify(payload),
+    signal,
+  })
+  await readEventStream(response, onEvent)
+}
+
+// Streams the assistant reply as Server-Sent Events.
+export async function streamMessage(
+  payload: ChatPayload,
+  handlers: ChatStreamHandlers,
+  signal?: AbortSignal
+): Promise<void> {
+  await postEventStream(
+    '/chat/stream',
+    payload,
+    (event, data) => {
+      if (event === 'delta') handlers.onDelta(String(data.content))
+      else if (event === 'done') handlers.onDone(data as unknown as ChatResponse)
+    },
+    signal
+  )
+}
+
+// Sends one message to several agents; their deltas arrive interleaved,
+// tagged with the agent they belong to.
+export async function streamRoundtable(
+  payload: RoundtablePayload,
+  handlers: RoundtableStreamHandlers,
+  signal?: AbortSignal
+): Promise<void> {
+  await postEventStream(
+    '/chat/roundtable',
+    payload,
+    (event, data) => {
+      if (event === 'delta') handlers.onDelta(String(data.agent_id), String(data.content))
+      else if (event === 'agent_error') handlers.onAgentError(String(data.agent_id))
+      else if (event === 'done') handlers.onDone(data as unknown as RoundtableResponse)
+    },
+    signal
+  )
+}
+
+// ---------------------------------------------------------------------------
+// Live events
+// ---------------------------------------------------------------------------
+// Follows the user's change events until the server ends the stream (after a
+// few minutes) or `signal` aborts. `after` is the id of the last event seen,
+// so a reconnect is replayed what it missed, or told to `sync`. Resolves to
+// false when the server has live events turned off.
+export async function streamEvents(
+  after: string | null,
+  onEvent: (id: string, event: LiveEvent) => void,
+  signal?: AbortSignal
+): Promise<boolean> {
+  const response = await fetch('/api/events', {
+    headers: { ...authHeaders(), ...(after ? { 'Last-Event-ID': after } : {}) },
+    signal,
+  })
+  if (response.status === 404) return false
+  await readEventStream(
+    response,
+    (kind, data, id) => {
+      if (id) onEvent(id, { kind, ...data } as unknown as LiveEvent)
+    },
+    'Event stream failed'
+  )
+  return true
+}
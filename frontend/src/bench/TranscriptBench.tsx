@@ -0,0 +1,245 @@
+// Frame-time benchmark for the Transcript on a synthetic session.
+//
+// Open /transcript-bench.html on the dev server (`npm run dev`). The page
+// mounts a 2,000-message session, streams a reply into it the way
+// useBoardroom does (one state update per delta, every 12 ms), then scrolls
+// from the bottom to the top. Frame times of each phase are sampled with
+// requestAnimationFrame and shown in a table; the same report is left on
+// `window.__transcriptBench` for scripted runs. `?messages=` and `?deltas=`
+// change the workload.
+import { StrictMode, useCallback, useEffect, useState } from 'react'
+import { createRoot } from 'react-dom/client'
+import '../index.css'
+import Transcript from '../components/Transcript'
+import type { Agent, Message } from '../types'
+
+const params = new URLSearchParams(window.location.search)
+const MESSAGE_COUNT = Number(params.get('messages') ?? 2000)
+const DELTA_COUNT = Number(params.get('deltas') ?? 400)
+const DELTA_INTERVAL_MS = 12
+const SCROLL_STEP_PX = 400
+// A frame slower than this missed a 60 Hz vsync.
+const FRAME_BUDGET_MS = 1000 / 60
+
+const AGENTS: Agent[] = [
+  { id: 'architect', name: 'Senior Architect', role_description: '', color_hex: '#3B82F6' },
+  { id: 'pm', name: 'Product Manager', role_description: '', color_hex: '#8B5CF6' },
+  { id: 'security', name: 'Security Auditor', role_description: '', color_hex: '#EF4444' },
+]
+
+const WORDS = (
+  'latency budget cache queue shard replica rollout migration schema index throughput ' +
+  'risk launch pricing roadmap audit token vendor incident backlog contract metric'
+).split(' ')
+
+// Deterministic, so runs on different commits render the same session.
+function prng(seed: number): () => number {
+  return () => {
+    seed = (seed * 1664525 + 1013904223) >>> 0
+    return seed / 2 ** 32
+  }
+}
+
+function sentence(random: () => number, words: number): string {
+  const picked = Array.from({ length: words }, () => WORDS[Math.floor(random() * WORDS.length)])
+  const text = picked.join(' ')
+  return text[0].toUpperCase() + text.slice(1) + '.'
+}
+
+function markdownReply(random: () => number): string {
+  const parts = [sentence(random, 14), `**${sentence(random, 4)}** ${sentence(random, 18)}`]
+  if (random() < 0.5) {
+    parts.push(Array.from({ length: 4 }, () => `- ${sentence(random, 8)}`).join('\n'))
+  }
+  if (random() < 0.2) {
+    parts.push('```ts\nconst budget = { p95: 250, p99: 800 }\nexport default budget\n```')
+  }
+  return parts.join('\n\n')
+}
+
+function syntheticSession(count: number): Message[] {
+  const random = prng(42)
+  const start = Date.UTC(2026, 0, 1)
+  return Array.from({ length: count }, (_, i): Message => {
+    const isUser = i % 2 === 0
+    return {
+      id: `bench-${i}`,
+      role: isUser ? 'user' : 'assistant',
+      content: isUser ? sentence(random, 12) : markdownReply(random),
+      agent_id: isUser ? null : AGENTS[i % AGENTS.length].id,
+      created_at: new Date(start + i * 30_000).toISOString(),
+    }
+  })
+}
+
+interface PhaseReport {
+  phase: string
+  frames: number
+  mean_ms: number
+  p50_ms: number
+  p95_ms: number
+  p99_ms: number
+  max_ms: number
+  over_budget: number
+}
+
+function summarize(phase: string, frames: number[]): PhaseReport {
+  const sorted = [...frames].sort((a, b) => a - b)
+  const pct = (p: number) => sorted[Math.max(Math.ceil((p / 100) * sorted.length) - 1, 0)] ?? 0
+  const round = (ms: number) => Math.round(ms * 100) / 100
+  return {
+    phase,
+    frames: sorted.length,
+    mean_ms: round(sorted.reduce((sum, ms) => sum + ms, 0) / (sorted.length || 1)),
+    p50_ms: round(pct(50)),
+    p95_ms: round(pct(95)),
+    p99_ms: round(pct(99)),
+    max_ms: round(sorted[sorted.length - 1] ?? 0),
+    over_budget: sorted.filter((ms) => ms > FRAME_BUDGET_MS * 1.5).length,
+  }
+}
+
+// Records the time between consecutive animation frames until stopped.
+function sampleFrames(): () => number[] {
+  const frames: number[] = []
+  let last = performance.now()
+  let handle = requestAnimationFrame(function tick(now) {
+    frames.push(now - last)
+    last = now
+    handle = requestAnimationFrame(tick)
+  })
+  return () => {
+    cancelAnimationFrame(handle)
+    return frames
+  }
+}
+
+const nextFrame = () => new Promise<number>((resolve) => requestAnimationFrame(resolve))
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms))
+
+declare global {
+  interface Window {
+    __transcriptBench?: { messages: number; deltas: number; mount_ms: number; phases: PhaseReport[] }
+  }
+}
+
+function TranscriptBench() {
+  const [messages, setMessages] = useState<Message[]>([])
+  const [report, setReport] = useState<PhaseReport[]>([])
+  const [status, setStatus] = useState('Mounting…')
+  const getAgent = useCallback((id: string | null) => AGENTS.find((a) => a.id === id), [])
+
+  useEffect(() => {
+    let cancelled = false
+
+    async function run() {
+      const session = syntheticSession(MESSAGE_COUNT)
+      await nextFrame()
+      const mountStarted = performance.now()
+      setMessages(session)
+      await nextFrame()
+      await nextFrame()
+      const mountMs = Math.round((performance.now() - mountStarted) * 100) / 100
+      await sleep(500)
+      if (cancelled) return
+
+      // Stream a reply: the same per-delta update useBoardroom makes.
+      setStatus('Streaming…')
+      const streamingId = 'streaming-bench'
+      const reply = markdownReply(prng(7)).repeat(4)
+      const chunk = Math.max(Math.ceil(reply.length / DELTA_COUNT), 1)
+      let stop = sampleFrames()
+      setMessages((prev) => [
+        ...prev,
+        { id: streamingId, role: 'assistant', content: '', agent_id: AGENTS[0].id, created_at: new Date().toISOString() },
+      ])
+      for (let i = 0; i < DELTA_COUNT && !cancelled; i++) {
+        const delta = reply.slice(i * chunk, (i + 1) * chunk)
+        setMessages((prev) =>
+          prev.map((msg) => (msg.id === streamingId ? { ...msg, content: msg.content + delta } : msg))
+        )
+        await sleep(DELTA_INTERVAL_MS)
+      }
+      const streamed = stop()
+      await sleep(500)
+      if (cancelled) return
+
+      setStatus('Scrolling…')
+      const container = document.querySelector<HTMLElement>('[data-transcript]')
+      stop = sampleFrames()
+      while (container && container.scrollTop > 0 && !cancelled) {
+        container.scrollTop -= SCROLL_STEP_PX
+        await nextFrame()
+      }
+      const scrolled = stop()
+
+      const phases = [summarize('stream', streamed), summarize('scroll', scrolled)]
+      window.__transcriptBench = { messages: MESSAGE_COUNT, deltas: DELTA_COUNT, mount_ms: mountMs, phases }
+      setReport(phases)
+      setStatus(`Done: ${MESSAGE_COUNT} messages mounted in ${mountMs} ms`)
+    }
+
+    run()
+    return () => {
+      cancelled = true
+    }
+  }, [])
+
+  return (
+    <div style={{ display: 'flex', height: '100vh' }}>
+      <div style={{ flex: 1, display: 'flex', flexDirection: 'column', minWidth: 0 }}>
+        <Transcript
+          messages={messages}
+          isTyping={false}
+          hasOlder={false}
+          isLoadingOlder={false}
+          onLoadOlder={() => {}}
+          getAgent={getAgent}
+        />
+      </div>
+      <aside
+        style={{
+          width: '360px',
+          padding: '20px 16px',
+          borderLeft: '1px solid var(--color-divider)',
+          fontFamily: 'JetBrains Mono, monospace',
+          fontSize: '11px',
+        }}
+      >
+        <p className="label-meta" style={{ marginBottom: '12px' }}>
+          {status}
+        </p>
+        <table style={{ width: '100%', borderCollapse: 'collapse' }}>
+          <thead>
+            <tr>
+              {['phase', 'frames', 'p50', 'p95', 'p99', 'max', 'slow'].map((h) => (
+                <th key={h} style={{ textAlign: 'left', color: 'var(--color-text-muted)' }}>
+                  {h}
+                </th>
+              ))}
+            </tr>
+          </thead>
+          <tbody>
+            {report.map((r) => (
+              <tr key={r.phase}>
+                <td>{r.phase}</td>
+                <td>{r.frames}</td>
+                <td>{r.p50_ms}</td>
+                <td>{r.p95_ms}</td>
+                <td>{r.p99_ms}</td>
+                <td>{r.max_ms}</td>
+                <td>{r.over_budget}</td>
+              </tr>
+            ))}
+          </tbody>
+        </table>
+      </aside>
+    </div>
+  )
+}
+
+createRoot(document.getElementById('root')!).render(
+  <StrictMode>
+    <TranscriptBench />
+  </StrictMode>
+)
@@ -4,11 +4,13 @@ import type { Agent } from '../types'
 
 interface CommandBarProps {
   activeAgent: Agent | undefined
+  // Set in roundtable mode: the agents every message is sent to.
+  roundtableAgents?: Agent[]
   isTyping: boolean
   onSubmit: (text: string) => void
 }
 
-const CommandBar: React.FC<CommandBarProps> = ({ activeAgent, isTyping, onSubmit }) => {
+const CommandBar: React.FC<CommandBarProps> = ({ activeAgent, roundtableAgents, isTyping, onSubmit }) => {
   const [value, setValue] = useState('')
   const textareaRef = useRef<HTMLTextAreaElement>(null)
 
@@ -58,7 +60,26 @@ const CommandBar: React.FC<CommandBarProps> = ({ activeAgent, isTyping, onSubmit
       }}
     >
       {/* Addressing line */}
-      {activeAgent && (
+      {roundtableAgents ? (
+        <div style={{ marginBottom: '8px', display: 'flex', alignItems: 'center', gap: '6px' }}>
+          {roundtableAgents.map((agent) => (
+            <span
+              key={agent.id}
+              style={{
+                display: 'inline-block',
+                width: '5px',
+                height: '5px',
+                borderRadius: '50%',
+                backgroundColor: agent.color_hex,
+                flexShrink: 0,
+              }}
+            />
+          ))}
+          <span className="label-meta" style={{ color: 'var(--color-text-primary)' }}>
+            Addressing: Roundtable ({roundtableAgents.length})
+          </span>
+        </div>
+      ) : activeAgent && (
         <div style={{ marginBottom: '8px', display: 'flex', alignItems: 'center', gap: '6px' }}>
           <span
             style={{
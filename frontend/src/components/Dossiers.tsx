@@ -1,13 +1,21 @@
 import React from 'react'
 import { motion } from 'framer-motion'
 import { Plus } from 'lucide-react'
-import type { Session } from '../types'
+import type { SearchResult, Session } from '../types'
 
 interface DossiersProps {
   sessions: Session[]
   activeSessionId: string | null
+  hasMoreSessions: boolean
+  searchQuery: string
+  // null while no search is active; the session list shows instead.
+  searchResults: SearchResult[] | null
+  hasMoreResults: boolean
   onSelectSession: (id: string) => void
   onNewSession: () => void
+  onLoadMore: () => void
+  onSearch: (query: string) => void
+  onLoadMoreResults: () => void
 }
 
 function formatDate(iso: string): string {
@@ -15,11 +23,37 @@ function formatDate(iso: string): string {
   return d.toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: '2-digit' })
 }
 
+const emptyListStyle: React.CSSProperties = {
+  padding: '16px',
+  color: 'var(--color-text-muted)',
+  fontSize: '11px',
+  textTransform: 'uppercase',
+  letterSpacing: '0.1em',
+}
+
+const moreButtonStyle: React.CSSProperties = {
+  width: '100%',
+  background: 'none',
+  border: 'none',
+  cursor: 'pointer',
+  padding: '12px 14px',
+  textAlign: 'left',
+  fontSize: '9px',
+  color: 'var(--color-text-muted)',
+}
+
 const Dossiers: React.FC<DossiersProps> = ({
   sessions,
   activeSessionId,
+  hasMoreSessions,
+  searchQuery,
+  searchResults,
+  hasMoreResults,
   onSelectSession,
   onNewSession,
+  onLoadMore,
+  onSearch,
+  onLoadMoreResults,
 }) => {
   return (
     <aside
@@ -70,21 +104,87 @@ const Dossiers: React.FC<DossiersProps> = ({
         </button>
       </div>
 
+      {/* Search */}
+      <div style={{ padding: '10px 14px', borderBottom: '1px solid var(--color-divider)' }}>
+        <input
+          type="search"
+          value={searchQuery}
+          onChange={(e) => onSearch(e.target.value)}
+          placeholder="Search transcripts"
+          aria-label="Search transcripts"
+          maxLength={256}
+          style={{
+            width: '100%',
+            background: 'none',
+            border: '1px solid var(--color-divider)',
+            borderRadius: '2px',
+            padding: '5px 8px',
+            fontSize: '11px',
+            color: 'var(--color-text-primary)',
+            outline: 'none',
+          }}
+        />
+      </div>
+
+      {/* Search results */}
+      {searchResults !== null && (
+        <div style={{ flex: 1, overflowY: 'auto', padding: '8px 0' }}>
+          {searchResults.length === 0 && <p style={emptyListStyle}>No matches.</p>}
+          {searchResults.map((result) => (
+            <button
+              key={result.id}
+              onClick={() => onSelectSession(result.session_id)}
+              style={{
+                width: '100%',
+                background: result.session_id === activeSessionId ? 'rgba(255,255,255,0.04)' : 'none',
+                border: 'none',
+                borderLeft: '2px solid transparent',
+                borderRadius: 0,
+                cursor: 'pointer',
+                padding: '10px 14px',
+                textAlign: 'left',
+                display: 'flex',
+                flexDirection: 'column',
+                gap: '4px',
+              }}
+            >
+              <span className="label-meta" style={{ fontSize: '9px' }}>
+                {result.session_title ?? 'Untitled'} · {formatDate(result.created_at)}
+              </span>
+              <span style={{ fontSize: '11px', color: 'var(--color-text-muted)', lineHeight: 1.5 }}>
+                {result.snippet.map((segment, index) =>
+                  segment.match ? (
+                    <mark
+                      key={index}
+                      style={{ background: 'none', color: 'var(--color-text-primary)', fontWeight: 500 }}
+                    >
+                      {segment.text}
+                    </mark>
+                  ) : (
+                    <React.Fragment key={index}>{segment.text}</React.Fragment>
+                  )
+                )}
+              </span>
+            </button>
+          ))}
+          {hasMoreResults && (
+            <button onClick={onLoadMoreResults} className="label-meta" style={moreButtonStyle}>
+              More results
+            </button>
+          )}
+        </div>
+      )}
+
       {/* Session list */}
-      <div style={{ flex: 1, overflowY: 'auto', padding: '8px 0' }}>
-        {sessions.length === 0 && (
-          <p
-            style={{
-              padding: '16px',
-              color: 'var(--color-text-muted)',
-              fontSize: '11px',
-              textTransform: 'uppercase',
-              letterSpacing: '0.1em',
-            }}
-          >
-            No sessions yet.
-          </p>
-        )}
+      <div
+        style={{
+          flex: 1,
+          overflowY: 'auto',
+          padding: '8px 0',
+          display: searchResults === null ? 'block' : 'none',
+        }}
+      >
+        {sessions.length === 0 && <p style={emptyListStyle}>No sessions yet.</p>}
         {sessions.map((session) => {
           const isActive = session.id === activeSessionId
           return (
@@ -124,15 +224,37 @@ const Dossiers: React.FC<DossiersProps> = ({
               >
                 {session.title}
               </span>
+              {session.last_message_preview && (
+                <span
+                  style={{
+                    fontSize: '11px',
+                    color: 'var(--color-text-muted)',
+                    opacity: 0.7,
+                    overflow: 'hidden',
+                    textOverflow: 'ellipsis',
+                    whiteSpace: 'nowrap',
+                    maxWidth: '100%',
+                    display: 'block',
+                  }}
+                >
+                  {session.last_message_preview}
+                </span>
+              )}
               <span
                 className="label-meta"
                 style={{ fontSize: '9px' }}
               >
                 {formatDate(session.updated_at)}
+                {session.message_count > 0 && ` · ${session.message_count} msg`}
               </span>
             </motion.button>
           )
         })}
+        {hasMoreSessions && (
+          <button onClick={onLoadMore} className="label-meta" style={moreButtonStyle}>
+            Older sessions
+          </button>
+        )}
       </div>
     </aside>
   )
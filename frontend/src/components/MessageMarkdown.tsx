@@ -0,0 +1,29 @@
+import type { ReactElement } from 'react'
+import Markdown from 'react-markdown'
+
+// Parsed markdown trees, one per message id, reused while the content is
+// unchanged. `Markdown` is a plain synchronous function (no hooks), so calling
+// it directly yields the element tree without rendering anything; rows that
+// remount while scrolling then only reconcile DOM nodes instead of re-running
+// remark and rehype, and a streaming reply re-parses nothing but itself.
+const MARKDOWN_CACHE_SIZE = 1000
+
+const cache = new Map<string, { content: string; tree: ReactElement }>()
+
+export function renderMarkdown(id: string, content: string): ReactElement {
+  const hit = cache.get(id)
+  if (hit) {
+    // Re-inserting keeps the Map in least- to most-recently-used order.
+    cache.delete(id)
+    if (hit.content === content) {
+      cache.set(id, hit)
+      return hit.tree
+    }
+  }
+  const tree = Markdown({ children: content })
+  cache.set(id, { content, tree })
+  if (cache.size > MARKDOWN_CACHE_SIZE) {
+    cache.delete(cache.keys().next().value as string)
+  }
+  return tree
+}
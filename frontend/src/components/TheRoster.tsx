@@ -5,15 +5,21 @@ import type { Agent } from '../types'
 interface TheRosterProps {
   agents: Agent[]
   activeAgentId: string | null
+  roundtableAgentIds: string[] | null
   isTyping: boolean
   onSelectAgent: (id: string) => void
+  onToggleRoundtable: () => void
+  onToggleRoundtableAgent: (id: string) => void
 }
 
 const TheRoster: React.FC<TheRosterProps> = ({
   agents,
   activeAgentId,
+  roundtableAgentIds,
   isTyping,
   onSelectAgent,
+  onToggleRoundtable,
+  onToggleRoundtableAgent,
 }) => {
   const activeAgent = agents.find((a) => a.id === activeAgentId)
 
@@ -33,9 +39,29 @@ const TheRoster: React.FC<TheRosterProps> = ({
         style={{
           padding: '20px 16px 12px',
           borderBottom: '1px solid var(--color-divider)',
+          display: 'flex',
+          alignItems: 'center',
+          justifyContent: 'space-between',
         }}
       >
         <span className="label-meta">The Roster</span>
+        <button
+          onClick={onToggleRoundtable}
+          aria-pressed={roundtableAgentIds !== null}
+          style={{
+            border: '1px solid var(--color-divider)',
+            background: roundtableAgentIds ? 'rgba(255,255,255,0.06)' : 'transparent',
+            color: roundtableAgentIds ? 'var(--color-text-primary)' : 'var(--color-text-muted)',
+            borderRadius: '2px',
+            padding: '3px 8px',
+            fontSize: '10px',
+            textTransform: 'uppercase',
+            letterSpacing: '0.1em',
+            cursor: 'pointer',
+          }}
+        >
+          Roundtable
+        </button>
       </div>
 
       {/* Active agent detail */}
@@ -109,14 +135,20 @@ const TheRoster: React.FC<TheRosterProps> = ({
       {/* Agent list */}
       <div style={{ flex: 1, overflowY: 'auto', padding: '8px 0' }}>
         <div style={{ padding: '12px 16px 6px' }}>
-          <span className="label-meta">Select Agent</span>
+          <span className="label-meta">
+            {roundtableAgentIds ? 'Seat Agents' : 'Select Agent'}
+          </span>
         </div>
         {agents.map((agent) => {
-          const isActive = agent.id === activeAgentId
+          const isActive = roundtableAgentIds
+            ? roundtableAgentIds.includes(agent.id)
+            : agent.id === activeAgentId
           return (
             <motion.button
               key={agent.id}
-              onClick={() => onSelectAgent(agent.id)}
+              onClick={() =>
+                roundtableAgentIds ? onToggleRoundtableAgent(agent.id) : onSelectAgent(agent.id)
+              }
               initial={{ opacity: 0 }}
               animate={{ opacity: 1 }}
               transition={{ duration: 0.4, ease: [0.16, 1, 0.3, 1] }}
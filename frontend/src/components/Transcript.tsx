@@ -1,11 +1,14 @@
-import React, { useEffect, useRef } from 'react'
-import { motion, AnimatePresence } from 'framer-motion'
-import ReactMarkdown from 'react-markdown'
+import React, { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from 'react'
+import { motion } from 'framer-motion'
 import type { Message, Agent } from '../types'
+import { renderMarkdown } from './MessageMarkdown'
 
 interface TranscriptProps {
   messages: Message[]
   isTyping: boolean
+  hasOlder: boolean
+  isLoadingOlder: boolean
+  onLoadOlder: () => void
   getAgent: (id: string | null) => Agent | undefined
   activeAgentColor?: string
 }
@@ -24,28 +27,260 @@ const MSG_VARIANTS = {
   visible: { opacity: 1, y: 0, filter: 'blur(0px)' },
 }
 
+// Start fetching the previous page this close to the top of the transcript.
+const LOAD_OLDER_THRESHOLD_PX = 120
+
+// Only the rows within OVERSCAN_PX of the viewport are mounted. Rows are laid
+// out by their measured height; ones never mounted count as ESTIMATED_ROW_PX.
+const OVERSCAN_PX = 800
+const ESTIMATED_ROW_PX = 140
+const ROW_GAP_PX = 32
+
+// Within this distance of the bottom the transcript stays pinned to it while
+// rows are measured and replies grow.
+const PIN_THRESHOLD_PX = 48
+
+// Only live messages (the optimistic user turn and streamed placeholders) animate
+// in; history, whether loaded or scrolled back into view, appears as it is.
+function isLive(message: Message): boolean {
+  return message.id.startsWith('optimistic-') || message.id.startsWith('streaming-')
+}
+
+// Index of the first row whose bottom lies below `y`; offsets[i] is the top of
+// row i and offsets[n] the height of the whole list.
+function rowAt(offsets: number[], y: number): number {
+  let lo = 0
+  let hi = offsets.length - 1
+  while (lo < hi) {
+    const mid = (lo + hi) >> 1
+    if (offsets[mid + 1] > y) hi = mid
+    else lo = mid + 1
+  }
+  return lo
+}
+
+interface TranscriptRowProps {
+  message: Message
+  agent: Agent | undefined
+  observe: (el: HTMLDivElement | null) => (() => void) | undefined
+}
+
+// Memoized so a streamed delta re-renders the streaming row only: every other
+// message object, agent and callback keeps its identity between deltas.
+const TranscriptRow = React.memo(function TranscriptRow({
+  message,
+  agent,
+  observe,
+}: TranscriptRowProps) {
+  const animated = isLive(message)
+  const borderColor =
+    message.role === 'user'
+      ? 'var(--color-accent-user)'
+      : agent?.color_hex ?? 'var(--color-accent-architect)'
+
+  const senderLabel = message.role === 'user' ? 'You' : agent?.name ?? 'Assistant'
+
+  const style: React.CSSProperties = {
+    borderLeft: `${message.role === 'user' ? '1px' : '2px'} solid ${borderColor}`,
+    paddingLeft: '16px',
+    marginLeft: message.role === 'user' ? '48px' : '0',
+  }
+
+  const body = (
+    <>
+      {/* Metadata header */}
+      <div style={{ marginBottom: '8px' }}>
+        <span
+          style={{
+            fontFamily: 'JetBrains Mono, monospace',
+            fontSize: '10px',
+            textTransform: 'uppercase',
+            letterSpacing: '0.1em',
+            color: 'var(--color-text-muted)',
+          }}
+        >
+          {senderLabel} &bull; {formatTime(message.created_at)}
+        </span>
+      </div>
+
+      {/* Content */}
+      <div className="prose-terminal">{renderMarkdown(message.id, message.content)}</div>
+    </>
+  )
+
+  return (
+    <div ref={observe} data-id={message.id} style={{ paddingBottom: `${ROW_GAP_PX}px` }}>
+      {animated ? (
+        <motion.div
+          variants={MSG_VARIANTS}
+          initial="hidden"
+          animate="visible"
+          transition={{ duration: 0.4, ease: [0.16, 1, 0.3, 1] }}
+          style={style}
+        >
+          {body}
+        </motion.div>
+      ) : (
+        <div style={style}>{body}</div>
+      )}
+    </div>
+  )
+})
+
 const Transcript: React.FC<TranscriptProps> = ({
   messages,
   isTyping,
+  hasOlder,
+  isLoadingOlder,
+  onLoadOlder,
   getAgent,
   activeAgentColor,
 }) => {
+  const containerRef = useRef<HTMLDivElement>(null)
+  const listRef = useRef<HTMLDivElement>(null)
   const bottomRef = useRef<HTMLDivElement>(null)
+  const prependAnchorRef = useRef<{ scrollHeight: number; scrollTop: number } | null>(null)
   const typingColor = activeAgentColor ?? 'var(--color-accent-architect)'
+  const lastMessage = messages[messages.length - 1]
+  const firstMessageId = messages[0]?.id
+
+  // Measured row heights by message id: the observer below writes heightsRef
+  // and publishes a snapshot for rendering.
+  const heightsRef = useRef(new Map<string, number>())
+  const [heights, setHeights] = useState<ReadonlyMap<string, number>>(() => new Map())
+  // Scroll window relative to the top of the list.
+  const [viewport, setViewport] = useState({ top: 0, height: 0 })
+  const frameRef = useRef<number | null>(null)
+  const pinnedRef = useRef(true)
+
+  const readViewport = useCallback(() => {
+    frameRef.current = null
+    const el = containerRef.current
+    const list = listRef.current
+    if (!el || !list) return
+    const top = el.scrollTop - list.offsetTop
+    const height = el.clientHeight
+    setViewport((prev) => (prev.top === top && prev.height === height ? prev : { top, height }))
+  }, [])
+
+  const scheduleViewport = useCallback(() => {
+    if (frameRef.current === null) frameRef.current = requestAnimationFrame(readViewport)
+  }, [readViewport])
+
+  useEffect(() => () => {
+    if (frameRef.current !== null) cancelAnimationFrame(frameRef.current)
+  }, [])
+
+  const [rowObserver] = useState(
+    () =>
+      new ResizeObserver((entries) => {
+        const container = containerRef.current
+        let changed = false
+        for (const entry of entries) {
+          const el = entry.target as HTMLElement
+          const id = el.dataset.id
+          if (!id) continue
+          const height = entry.borderBoxSize?.[0]?.blockSize ?? el.getBoundingClientRect().height
+          const previous = heightsRef.current.get(id) ?? ESTIMATED_ROW_PX
+          if (height === previous) continue
+          heightsRef.current.set(id, height)
+          changed = true
+          // A row above the viewport changed size: keep the reader's place.
+          if (container && el.getBoundingClientRect().bottom <= container.getBoundingClientRect().top) {
+            container.scrollTop += height - previous
+          }
+        }
+        if (changed) setHeights(new Map(heightsRef.current))
+      })
+  )
+
+  useEffect(() => () => rowObserver.disconnect(), [rowObserver])
+
+  const observeRow = useCallback(
+    (el: HTMLDivElement | null) => {
+      if (!el) return undefined
+      rowObserver.observe(el)
+      return () => rowObserver.unobserve(el)
+    },
+    [rowObserver]
+  )
+
+  // Re-read the window when the pane itself is resized, and after the list
+  // changes under it (another session, measured rows) without a scroll.
+  useEffect(() => {
+    const el = containerRef.current
+    if (!el) return
+    const observer = new ResizeObserver(scheduleViewport)
+    observer.observe(el)
+    return () => observer.disconnect()
+  }, [scheduleViewport])
+
+  useEffect(scheduleViewport, [messages, heights, scheduleViewport])
+
+  const offsets = useMemo(() => {
+    const tops = new Array<number>(messages.length + 1)
+    tops[0] = 0
+    for (let i = 0; i < messages.length; i++) {
+      tops[i + 1] = tops[i] + (heights.get(messages[i].id) ?? ESTIMATED_ROW_PX)
+    }
+    return tops
+  }, [messages, heights])
 
+  const totalHeight = offsets[messages.length]
+  const start = messages.length ? rowAt(offsets, viewport.top - OVERSCAN_PX) : 0
+  const end = messages.length
+    ? Math.min(rowAt(offsets, viewport.top + viewport.height + OVERSCAN_PX) + 1, messages.length)
+    : 0
+
+  // Follow the conversation only when its tail changes, not when older
+  // pages are prepended above the viewport. Smoothly while the tail is in
+  // view; a jump from far away (a freshly opened session) is instant.
   useEffect(() => {
-    bottomRef.current?.scrollIntoView({ behavior: 'smooth' })
-  }, [messages, isTyping])
+    const el = containerRef.current
+    if (!el) return
+    const distance = el.scrollHeight - el.scrollTop - el.clientHeight
+    bottomRef.current?.scrollIntoView({ behavior: distance < el.clientHeight ? 'smooth' : 'auto' })
+  }, [lastMessage?.id, lastMessage?.content, isTyping])
+
+  // Measured rows replace estimates, so the list height settles over a few
+  // frames; stay at the bottom meanwhile if the reader was there.
+  useLayoutEffect(() => {
+    const el = containerRef.current
+    if (el && pinnedRef.current) el.scrollTop = el.scrollHeight
+  }, [heights])
+
+  // Keep the reader's place after an older page lands above them.
+  useLayoutEffect(() => {
+    const el = containerRef.current
+    const anchor = prependAnchorRef.current
+    if (!el || !anchor) return
+    el.scrollTop = el.scrollHeight - anchor.scrollHeight + anchor.scrollTop
+    prependAnchorRef.current = null
+  }, [firstMessageId])
+
+  function handleScroll(e: React.UIEvent<HTMLDivElement>) {
+    scheduleViewport()
+    const el = e.currentTarget
+    pinnedRef.current = el.scrollHeight - el.scrollTop - el.clientHeight < PIN_THRESHOLD_PX
+    if (el.scrollTop > LOAD_OLDER_THRESHOLD_PX || !hasOlder || isLoadingOlder) return
+    prependAnchorRef.current = { scrollHeight: el.scrollHeight, scrollTop: el.scrollTop }
+    onLoadOlder()
+  }
 
   return (
     <div
+      ref={containerRef}
+      onScroll={handleScroll}
+      data-transcript
       style={{
         flex: 1,
         overflowY: 'auto',
+        // Row heights are corrected by hand in the ResizeObserver above.
+        overflowAnchor: 'none',
+        position: 'relative',
         padding: '32px 40px 160px',
         display: 'flex',
         flexDirection: 'column',
-        gap: '32px',
       }}
     >
       {messages.length === 0 && !isTyping && (
@@ -77,53 +312,25 @@ const Transcript: React.FC<TranscriptProps> = ({
         </div>
       )}
 
-      <AnimatePresence initial={false}>
-        {messages.map((msg) => {
-          const agent = msg.role === 'assistant' ? getAgent(msg.agent_id) : undefined
-          const borderColor =
-            msg.role === 'user'
-              ? 'var(--color-accent-user)'
-              : agent?.color_hex ?? 'var(--color-accent-architect)'
-
-          const senderLabel =
-            msg.role === 'user' ? 'You' : agent?.name ?? 'Assistant'
-
-          return (
-            <motion.div
-              key={msg.id}
-              variants={MSG_VARIANTS}
-              initial="hidden"
-              animate="visible"
-              transition={{ duration: 0.4, ease: [0.16, 1, 0.3, 1] }}
-              style={{
-                borderLeft: `${msg.role === 'user' ? '1px' : '2px'} solid ${borderColor}`,
-                paddingLeft: '16px',
-                marginLeft: msg.role === 'user' ? '48px' : '0',
-              }}
-            >
-              {/* Metadata header */}
-              <div style={{ marginBottom: '8px' }}>
-                <span
-                  style={{
-                    fontFamily: 'JetBrains Mono, monospace',
-                    fontSize: '10px',
-                    textTransform: 'uppercase',
-                    letterSpacing: '0.1em',
-                    color: 'var(--color-text-muted)',
-                  }}
-                >
-                  {senderLabel} &bull; {formatTime(msg.created_at)}
-                </span>
-              </div>
-
-              {/* Content */}
-              <div className="prose-terminal">
-                <ReactMarkdown>{msg.content}</ReactMarkdown>
-              </div>
-            </motion.div>
-          )
-        })}
-      </AnimatePresence>
+      {isLoadingOlder && (
+        <span className="label-meta" style={{ alignSelf: 'center', fontSize: '9px', marginBottom: '32px' }}>
+          Retrieving earlier entries...
+        </span>
+      )}
+
+      {/* Only the window of rows around the viewport is mounted; spacers stand in for the rest. */}
+      <div ref={listRef} style={{ flexShrink: 0 }}>
+        <div style={{ height: `${offsets[start]}px` }} />
+        {messages.slice(start, end).map((msg) => (
+          <TranscriptRow
+            key={msg.id}
+            message={msg}
+            agent={msg.role === 'assistant' ? getAgent(msg.agent_id) : undefined}
+            observe={observeRow}
+          />
+        ))}
+        <div style={{ height: `${totalHeight - offsets[end]}px` }} />
+      </div>
 
       {/* Typing indicator */}
       {isTyping && (
@@ -135,6 +342,7 @@ const Transcript: React.FC<TranscriptProps> = ({
           style={{
             borderLeft: `2px solid ${typingColor}`,
             paddingLeft: '16px',
+            flexShrink: 0,
           }}
         >
           <div style={{ marginBottom: '8px' }}>
@@ -154,7 +362,7 @@ const Transcript: React.FC<TranscriptProps> = ({
         </motion.div>
       )}
 
-      <div ref={bottomRef} />
+      <div ref={bottomRef} style={{ flexShrink: 0 }} />
     </div>
   )
 }
@@ -1,12 +1,26 @@
-import { useState, useEffect, useCallback } from 'react'
-import type { Agent, Session, Message } from '../types'
+import { useState, useEffect, useCallback, useRef } from 'react'
+import type {
+  Agent,
+  Session,
+  Message,
+  MessagePage,
+  LiveEvent,
+  ChatResponse,
+  RoundtableResponse,
+  SearchResult,
+} from '../types'
 import {
-  fetchAgents,
+  revalidateAgents,
   fetchSessions,
+  revalidateSessions,
   createSession,
   fetchMessages,
-  sendMessage,
+  searchMessages,
+  streamEvents,
+  streamMessage,
+  streamRoundtable,
 } from '../api'
+import { readMeta, readTranscript, writeMeta, writeTranscript } from '../offlineCache'
 
 interface BoardroomState {
   agents: Agent[]
@@ -14,76 +28,316 @@ interface BoardroomState {
   messages: Message[]
   activeSessionId: string | null
   activeAgentId: string | null
+  roundtableAgentIds: string[] | null
   isTyping: boolean
+  hasOlderMessages: boolean
+  isLoadingOlder: boolean
+  hasMoreSessions: boolean
+  searchQuery: string
+  searchResults: SearchResult[] | null
+  hasMoreResults: boolean
   error: string | null
+  loadOlderMessages: () => Promise<void>
+  loadMoreSessions: () => Promise<void>
+  setSearchQuery: (query: string) => void
+  loadMoreResults: () => Promise<void>
   setActiveSessionId: (id: string) => void
   setActiveAgentId: (id: string) => void
+  toggleRoundtable: () => void
+  toggleRoundtableAgent: (id: string) => void
   startNewSession: () => Promise<void>
   submitMessage: (text: string) => Promise<void>
   getAgent: (id: string | null) => Agent | undefined
 }
 
-export function useBoardroom(enabled = true): BoardroomState {
+// Page size used when catching up on messages persisted elsewhere.
+const DELTA_SYNC_LIMIT = 200
+
+// Titles are generated in the background after a session's first exchange;
+// the list is re-read this long after a turn in a still-untitled session.
+const DEFAULT_SESSION_TITLE = 'New Session'
+const TITLE_REFRESH_DELAY_MS = 4000
+
+// Search runs once typing has paused this long.
+const SEARCH_DEBOUNCE_MS = 250
+
+// The open transcript is written to the offline cache once it has been
+// unchanged this long, so a streaming reply isn't stored on every delta.
+const CACHE_WRITE_DELAY_MS = 500
+
+// A failed event stream is retried after this long, doubling up to the max.
+const EVENTS_RETRY_MIN_MS = 1000
+const EVENTS_RETRY_MAX_MS = 30_000
+
+// Optimistic and streaming placeholders are never cached.
+function isPlaceholder(message: Message): boolean {
+  return message.id.startsWith('optimistic-') || message.id.startsWith('streaming-')
+}
+
+// `userId` is the signed-in user, or null to stay idle. Agents, the first
+// page of sessions and recently opened transcripts are served from that
+// user's offline cache first, then revalidated against the API.
+export function useBoardroom(userId: string | null): BoardroomState {
+  const enabled = userId !== null
   const [agents, setAgents] = useState<Agent[]>([])
   const [sessions, setSessions] = useState<Session[]>([])
   const [messages, setMessages] = useState<Message[]>([])
   const [activeSessionId, setActiveSessionIdState] = useState<string | null>(null)
   const [activeAgentId, setActiveAgentIdState] = useState<string | null>(null)
+  // null outside roundtable mode; otherwise the agents a message goes to.
+  const [roundtableAgentIds, setRoundtableAgentIds] = useState<string[] | null>(null)
   const [isTyping, setIsTyping] = useState(false)
+  const [olderCursor, setOlderCursor] = useState<string | null>(null)
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false)
+  const [sessionsCursor, setSessionsCursor] = useState<string | null>(null)
+  const [isLoadingSessions, setIsLoadingSessions] = useState(false)
+  const [searchQuery, setSearchQuery] = useState('')
+  // null while no search is active.
+  const [searchResults, setSearchResults] = useState<SearchResult[] | null>(null)
+  const [searchOffset, setSearchOffset] = useState<number | null>(null)
   const [error, setError] = useState<string | null>(null)
+  // Bumped per query so answers to an older one are dropped.
+  const searchSeqRef = useRef(0)
+  const activeSessionRef = useRef<string | null>(null)
+  const latestCursorRef = useRef<string | null>(null)
+  const sessionsRef = useRef<Session[]>([])
+  // Which session `messages` holds, and where its cacheable newest part
+  // starts: `firstId` is the first message of the newest page it was opened
+  // with (null if that page was empty) and `before` the cursor before it.
+  const transcriptRef = useRef<{ sessionId: string; firstId: string | null; before: string | null } | null>(
+    null
+  )
+  const sessionsEtagRef = useRef<string | null>(null)
+  // Messages already added to their session's message_count, whether this tab
+  // wrote them or heard of them on the event stream.
+  const countedIdsRef = useRef(new Set<string>())
 
-  // Bootstrap: load agents and sessions independently so one failure can't
+  useEffect(() => {
+    activeSessionRef.current = activeSessionId
+  }, [activeSessionId])
+
+  useEffect(() => {
+    sessionsRef.current = sessions
+  }, [sessions])
+
+  // Bootstrap: paint from the offline cache, then revalidate agents and
+  // sessions with conditional requests, independently so one failure can't
   // block the other.
   useEffect(() => {
-    if (!enabled) return
+    if (!userId) return
+    let cancelled = false
+
+    const bootstrap = async () => {
+      const cached = await readMeta(userId)
+      if (cancelled) return
+      sessionsEtagRef.current = cached?.sessionsEtag ?? null
+      if (cached) {
+        setAgents(cached.agents)
+        if (cached.agents.length > 0) setActiveAgentIdState(cached.agents[0].id)
+        if (cached.sessions.length > 0) {
+          setSessions(cached.sessions)
+          setSessionsCursor(cached.sessionsCursor)
+          setActiveSessionIdState(cached.activeSessionId ?? cached.sessions[0].id)
+        }
+      }
+
+      revalidateAgents(cached?.agentsEtag ?? null)
+        .then((fresh) => {
+          if (cancelled || !fresh) return
+          const ag = fresh.data
+          setAgents(ag)
+          setActiveAgentIdState((prev) =>
+            prev && ag.some((a) => a.id === prev) ? prev : (ag[0]?.id ?? null)
+          )
+          void writeMeta(userId, { agents: ag, agentsEtag: fresh.etag })
+        })
+        .catch((err) => {
+          const msg = err?.response?.data?.error ?? err?.message ?? 'Failed to fetch agents'
+          console.error('[useBoardroom] fetchAgents failed:', err)
+          setError(msg)
+        })
+
+      revalidateSessions(cached?.sessionsEtag ?? null)
+        .then(async (fresh) => {
+          if (cancelled || !fresh) return
+          const page = fresh.data
+          sessionsEtagRef.current = fresh.etag
+          if (page.sessions.length > 0) {
+            setSessions(page.sessions)
+            setSessionsCursor(page.next_before)
+            setActiveSessionIdState((prev) =>
+              prev && page.sessions.some((s) => s.id === prev) ? prev : page.sessions[0].id
+            )
+            void writeMeta(userId, {
+              sessions: page.sessions,
+              sessionsCursor: page.next_before,
+              sessionsEtag: fresh.etag,
+            })
+            return
+          }
+
+          // If no prior sessions exist, auto-create one for first-time entry.
+          const newSession = await createSession()
+          if (cancelled) return
+          setSessions([newSession])
+          setActiveSessionIdState(newSession.id)
+        })
+        .catch((err) => {
+          console.error('[useBoardroom] fetchSessions failed:', err)
+          // Non-fatal — app still usable with 0 sessions
+        })
+    }
+
+    void bootstrap()
+    return () => {
+      cancelled = true
+    }
+  }, [userId])
+
+  // Remember the open session, to reopen it on the next load.
+  useEffect(() => {
+    if (userId && activeSessionId) void writeMeta(userId, { activeSessionId })
+  }, [userId, activeSessionId])
+
+  // Append messages persisted after the newest one we hold.
+  const mergeDelta = useCallback((page: MessagePage) => {
+    if (page.messages.length === 0) return
+    latestCursorRef.current = page.next_after
+    setMessages((prev) => {
+      const known = new Set(prev.map((m) => m.id))
+      return [...prev, ...page.messages.filter((m) => !known.has(m.id))]
+    })
+  }, [])
+
+  // Open the active session: from the offline cache plus a delta sync when
+  // it holds the transcript, otherwise from its newest page.
+  useEffect(() => {
+    setOlderCursor(null)
+    latestCursorRef.current = null
+    transcriptRef.current = null
+
+    if (!userId || !activeSessionId) {
+      setMessages([])
+      return
+    }
+
+    let cancelled = false
+    const sessionId = activeSessionId
+    const show = (page: MessagePage) => {
+      transcriptRef.current = { sessionId, firstId: page.messages[0]?.id ?? null, before: page.next_before }
+      setMessages(page.messages)
+      setOlderCursor(page.next_before)
+      latestCursorRef.current = page.next_after
+    }
+    const loadNewest = async () => {
+      const page = await fetchMessages(sessionId)
+      if (!cancelled) show(page)
+    }
 
-    fetchAgents()
-      .then((ag) => {
-        setAgents(ag)
-        if (ag.length > 0) setActiveAgentIdState(ag[0].id)
+    readTranscript(userId, sessionId)
+      .then(async (cached) => {
+        if (cancelled) return
+        if (!cached?.nextAfter) {
+          await loadNewest()
+          return
+        }
+        show({ messages: cached.messages, next_before: cached.nextBefore, next_after: cached.nextAfter })
+        const delta = await fetchMessages(sessionId, { after: cached.nextAfter, limit: DELTA_SYNC_LIMIT })
+        if (cancelled) return
+        // Too far behind to catch up in one page: start over from the newest.
+        if (delta.messages.length >= DELTA_SYNC_LIMIT) await loadNewest()
+        else mergeDelta(delta)
       })
       .catch((err) => {
-        const msg = err?.response?.data?.error ?? err?.message ?? 'Failed to fetch agents'
-        console.error('[useBoardroom] fetchAgents failed:', err)
-        setError(msg)
+        console.error('[useBoardroom] fetchMessages failed:', err)
       })
+    return () => {
+      cancelled = true
+    }
+  }, [activeSessionId, userId, mergeDelta])
 
-    fetchSessions()
-      .then(async (sess) => {
-        if (sess.length > 0) {
-          setSessions(sess)
-          setActiveSessionIdState(sess[0].id)
-          return
-        }
+  // Write the open transcript through to the offline cache: its newest part,
+  // from where it was opened, without placeholders.
+  useEffect(() => {
+    const transcript = transcriptRef.current
+    if (!userId || !transcript || transcript.sessionId !== activeSessionId) return
 
-        // If no prior sessions exist, auto-create one for first-time entry.
-        const newSession = await createSession()
-        setSessions([newSession])
-        setActiveSessionIdState(newSession.id)
+    const timer = setTimeout(() => {
+      const start = transcript.firstId ? messages.findIndex((m) => m.id === transcript.firstId) : 0
+      void writeTranscript({
+        userId,
+        sessionId: transcript.sessionId,
+        messages: messages.slice(Math.max(start, 0)).filter((m) => !isPlaceholder(m)),
+        nextBefore: transcript.before,
+        nextAfter: latestCursorRef.current,
+      })
+    }, CACHE_WRITE_DELAY_MS)
+    return () => clearTimeout(timer)
+  }, [messages, activeSessionId, userId])
+
+  // Fetch only what was persisted since the last message we know about (e.g.
+  // from another tab) instead of the whole page.
+  const catchUpTranscript = useCallback(() => {
+    const sessionId = activeSessionRef.current
+    const after = latestCursorRef.current
+    if (!sessionId || !after) return
+
+    fetchMessages(sessionId, { after, limit: DELTA_SYNC_LIMIT })
+      .then((page) => {
+        if (activeSessionRef.current === sessionId) mergeDelta(page)
       })
       .catch((err) => {
-        console.error('[useBoardroom] fetchSessions failed:', err)
-        // Non-fatal — app still usable with 0 sessions
+        console.error('[useBoardroom] delta sync failed:', err)
       })
-  }, [enabled])
+  }, [mergeDelta])
 
-  // Load messages when active session changes
+  // When the tab regains focus, catch up on the open transcript.
   useEffect(() => {
-    if (!enabled) {
-      setMessages([])
-      return
+    if (!enabled) return
+
+    const syncDelta = () => {
+      if (document.visibilityState === 'visible') catchUpTranscript()
     }
 
-    if (!activeSessionId) {
-      setMessages([])
-      return
+    document.addEventListener('visibilitychange', syncDelta)
+    return () => document.removeEventListener('visibilitychange', syncDelta)
+  }, [enabled, catchUpTranscript])
+
+  const loadOlderMessages = useCallback(async () => {
+    const sessionId = activeSessionId
+    if (!sessionId || !olderCursor || isLoadingOlder) return
+
+    setIsLoadingOlder(true)
+    try {
+      const page = await fetchMessages(sessionId, { before: olderCursor })
+      if (activeSessionRef.current !== sessionId) return
+      setMessages((prev) => [...page.messages, ...prev])
+      setOlderCursor(page.next_before)
+    } catch (err) {
+      console.error('[useBoardroom] loading older messages failed:', err)
+    } finally {
+      setIsLoadingOlder(false)
     }
-    fetchMessages(activeSessionId)
-      .then(setMessages)
-      .catch((err) => {
-        console.error('[useBoardroom] fetchMessages failed:', err)
+  }, [activeSessionId, olderCursor, isLoadingOlder])
+
+  const loadMoreSessions = useCallback(async () => {
+    if (!sessionsCursor || isLoadingSessions) return
+
+    setIsLoadingSessions(true)
+    try {
+      const page = await fetchSessions({ before: sessionsCursor })
+      setSessions((prev) => {
+        // A session that became active since the first page may repeat.
+        const known = new Set(prev.map((s) => s.id))
+        return [...prev, ...page.sessions.filter((s) => !known.has(s.id))]
       })
-  }, [activeSessionId, enabled])
+      setSessionsCursor(page.next_before)
+    } catch (err) {
+      console.error('[useBoardroom] loading more sessions failed:', err)
+    } finally {
+      setIsLoadingSessions(false)
+    }
+  }, [sessionsCursor, isLoadingSessions])
 
   const setActiveSessionId = useCallback((id: string) => {
     setActiveSessionIdState(id)
@@ -93,10 +347,184 @@ export function useBoardroom(enabled = true): BoardroomState {
     setActiveAgentIdState(id)
   }, [])
 
+  const toggleRoundtable = useCallback(() => {
+    setRoundtableAgentIds((prev) => (prev ? null : agents.map((a) => a.id)))
+  }, [agents])
+
+  const toggleRoundtableAgent = useCallback((id: string) => {
+    setRoundtableAgentIds((prev) => {
+      if (!prev) return prev
+      return prev.includes(id) ? prev.filter((agentId) => agentId !== id) : [...prev, id]
+    })
+  }, [])
+
+  // Pick up a title generated after the first exchange.
+  const titleRefreshRef = useRef<number | null>(null)
+  useEffect(() => () => window.clearTimeout(titleRefreshRef.current ?? undefined), [])
+  const refreshTitles = useCallback(() => {
+    window.clearTimeout(titleRefreshRef.current ?? undefined)
+    titleRefreshRef.current = window.setTimeout(() => {
+      revalidateSessions(null)
+        .then((fresh) => {
+          if (!fresh) return
+          const page = fresh.data
+          sessionsEtagRef.current = fresh.etag
+          const titles = new Map(page.sessions.map((s) => [s.id, s.title]))
+          setSessions((prev) => prev.map((s) => ({ ...s, title: titles.get(s.id) ?? s.title })))
+          if (userId) {
+            void writeMeta(userId, {
+              sessions: page.sessions,
+              sessionsCursor: page.next_before,
+              sessionsEtag: fresh.etag,
+            })
+          }
+        })
+        .catch((err) => {
+          console.error('[useBoardroom] title refresh failed:', err)
+        })
+    }, TITLE_REFRESH_DELAY_MS)
+  }, [userId])
+
+  // Move the session to the top with the newest persisted message as its
+  // preview, counting each message once.
+  const recordMessages = useCallback((sessionId: string, persisted: Message[]) => {
+    const counted = countedIdsRef.current
+    const added = persisted.filter((m) => !counted.has(m.id))
+    added.forEach((m) => counted.add(m.id))
+    const last = persisted[persisted.length - 1]
+    const timestamp = last?.created_at ?? new Date().toISOString()
+    setSessions((prev) => {
+      const session = prev.find((s) => s.id === sessionId)
+      if (!session) return prev
+      return [
+        {
+          ...session,
+          updated_at: timestamp,
+          message_count: session.message_count + added.length,
+          last_message_preview: last ? last.content.replace(/\s+/g, ' ').slice(0, 160) : session.last_message_preview,
+          last_agent_id: last ? last.agent_id : session.last_agent_id,
+        },
+        ...prev.filter((s) => s.id !== sessionId),
+      ]
+    })
+  }, [])
+
+  const bubbleSession = useCallback(
+    (sessionId: string, persisted: Message[]) => {
+      recordMessages(sessionId, persisted)
+      const session = sessionsRef.current.find((s) => s.id === sessionId)
+      if (session?.title === DEFAULT_SESSION_TITLE) refreshTitles()
+    },
+    [recordMessages, refreshTitles]
+  )
+
+  // Re-read the first page of sessions (a 304 when nothing changed) and put
+  // it in front of any older pages already loaded.
+  const refreshSessions = useCallback(() => {
+    revalidateSessions(sessionsEtagRef.current)
+      .then((fresh) => {
+        if (!fresh) return
+        const page = fresh.data
+        sessionsEtagRef.current = fresh.etag
+        const ids = new Set(page.sessions.map((s) => s.id))
+        setSessions((prev) => [...page.sessions, ...prev.filter((s) => !ids.has(s.id))])
+        if (userId) {
+          void writeMeta(userId, {
+            sessions: page.sessions,
+            sessionsCursor: page.next_before,
+            sessionsEtag: fresh.etag,
+          })
+        }
+      })
+      .catch((err) => {
+        console.error('[useBoardroom] session refresh failed:', err)
+      })
+  }, [userId])
+
+  // Apply a change made in another tab or device (or echoed from this one).
+  const applyEvent = useCallback(
+    (event: LiveEvent) => {
+      switch (event.kind) {
+        case 'sync':
+          refreshSessions()
+          catchUpTranscript()
+          return
+        case 'sessions_changed':
+          refreshSessions()
+          return
+        case 'session_created':
+          setSessions((prev) => (prev.some((s) => s.id === event.session.id) ? prev : [event.session, ...prev]))
+          return
+        case 'session_updated':
+          setSessions((prev) => prev.map((s) => (s.id === event.session.id ? { ...s, ...event.session } : s)))
+          return
+        case 'message_inserted': {
+          recordMessages(event.session_id, [event.message])
+          if (activeSessionRef.current !== event.session_id || transcriptRef.current?.sessionId !== event.session_id) {
+            return
+          }
+          const message = event.message
+          latestCursorRef.current = event.next_after
+          setMessages((prev) => {
+            if (prev.some((m) => m.id === message.id)) return prev
+            // This tab's own turn: the persisted row takes its placeholder's place.
+            const index = prev.findIndex((m) =>
+              message.role === 'user'
+                ? m.id.startsWith('optimistic-') && m.content === message.content
+                : m.id.startsWith('streaming-') && m.agent_id === message.agent_id
+            )
+            if (index === -1) return [...prev, message]
+            return [...prev.slice(0, index), message, ...prev.slice(index + 1)]
+          })
+          return
+        }
+      }
+    },
+    [refreshSessions, catchUpTranscript, recordMessages]
+  )
+
+  // Follow the user's event stream while signed in, resuming from the last
+  // event seen after every reconnect, unless the server has it turned off.
+  const applyEventRef = useRef(applyEvent)
+  useEffect(() => {
+    applyEventRef.current = applyEvent
+  }, [applyEvent])
+  useEffect(() => {
+    if (!userId) return
+    const controller = new AbortController()
+    let cursor: string | null = null
+    let retryMs = EVENTS_RETRY_MIN_MS
+
+    const follow = async () => {
+      while (!controller.signal.aborted) {
+        try {
+          const live = await streamEvents(
+            cursor,
+            (id, event) => {
+              cursor = id
+              retryMs = EVENTS_RETRY_MIN_MS
+              applyEventRef.current(event)
+            },
+            controller.signal
+          )
+          if (!live) return
+        } catch (err) {
+          if (controller.signal.aborted) return
+          console.warn('[useBoardroom] event stream failed, retrying:', err)
+          await new Promise((resolve) => setTimeout(resolve, retryMs))
+          retryMs = Math.min(retryMs * 2, EVENTS_RETRY_MAX_MS)
+        }
+      }
+    }
+
+    void follow()
+    return () => controller.abort()
+  }, [userId])
+
   const startNewSession = useCallback(async () => {
     try {
       const session = await createSession()
-      setSessions((prev) => [session, ...prev])
+      setSessions((prev) => [session, ...prev.filter((s) => s.id !== session.id)])
       setActiveSessionIdState(session.id)
       setMessages([])
     } catch (err) {
@@ -104,50 +532,10 @@ export function useBoardroom(enabled = true): BoardroomState {
     }
   }, [])
 
-  const streamAssistantMessage = useCallback(
-    async (assistantText: string, agentId: string) => {
-      const streamingId = `streaming-${Date.now()}`
-      const startedAt = new Date().toISOString()
-
-      // Seed an empty assistant message in the transcript.
-      setMessages((prev) => [
-        ...prev,
-        {
-          id: streamingId,
-          role: 'assistant',
-          content: '',
-          agent_id: agentId,
-          created_at: startedAt,
-        },
-      ])
-
-      // Fast typewriter reveal.
-      const chunkSize = 3
-      const tickMs = 12
-      let cursor = 0
-
-      await new Promise<void>((resolve) => {
-        const timer = window.setInterval(() => {
-          cursor = Math.min(cursor + chunkSize, assistantText.length)
-          const partial = assistantText.slice(0, cursor)
-
-          setMessages((prev) =>
-            prev.map((msg) =>
-              msg.id === streamingId
-                ? { ...msg, content: partial }
-                : msg
-            )
-          )
-
-          if (cursor >= assistantText.length) {
-            window.clearInterval(timer)
-            resolve()
-          }
-        }, tickMs)
-      })
-    },
-    []
-  )
+  // Abort any in-flight stream when the hook unmounts so the backend can
+  // stop pulling tokens for a reply nobody will see.
+  const streamAbortRef = useRef<AbortController | null>(null)
+  useEffect(() => () => streamAbortRef.current?.abort(), [])
 
   const submitMessage = useCallback(
     async (text: string) => {
@@ -164,46 +552,221 @@ export function useBoardroom(enabled = true): BoardroomState {
       setMessages((prev) => [...prev, optimisticUserMsg])
       setIsTyping(true)
 
+      const streamingId = `streaming-${Date.now()}`
+      let streamStarted = false
+      const controller = new AbortController()
+      streamAbortRef.current = controller
+
       try {
-        const { message: assistantMsg } = await sendMessage({
-          session_id: activeSessionId,
-          agent_id: activeAgentId,
-          message: text.trim(),
-        })
+        const done: { result?: ChatResponse } = {}
 
-        setIsTyping(false)
+        await streamMessage(
+          {
+            session_id: activeSessionId,
+            agent_id: activeAgentId,
+            message: text.trim(),
+          },
+          {
+            onDelta: (content) => {
+              if (!streamStarted) {
+                // First token: swap the typing indicator for the live message.
+                streamStarted = true
+                setIsTyping(false)
+                setMessages((prev) => [
+                  ...prev,
+                  {
+                    id: streamingId,
+                    role: 'assistant',
+                    content,
+                    agent_id: activeAgentId,
+                    created_at: new Date().toISOString(),
+                  },
+                ])
+                return
+              }
+              setMessages((prev) =>
+                prev.map((msg) =>
+                  msg.id === streamingId ? { ...msg, content: msg.content + content } : msg
+                )
+              )
+            },
+            onDone: (chatResult) => {
+              done.result = chatResult
+            },
+          },
+          controller.signal
+        )
 
-        await streamAssistantMessage(assistantMsg.content, activeAgentId)
+        setIsTyping(false)
 
-        // Refresh from server to get correct IDs / timestamps
-        const refreshed = await fetchMessages(activeSessionId)
-        setMessages(refreshed)
+        // Swap the optimistic and streamed placeholders for the persisted rows
+        // so IDs / timestamps are correct without refetching the transcript.
+        const persisted = done.result
+        if (persisted) {
+          latestCursorRef.current = persisted.next_after
+          // The event stream may have delivered the persisted rows already.
+          const rows = new Set([persisted.user_message.id, persisted.message.id])
+          setMessages((prev) => [
+            ...prev.filter((m) => m.id !== optimisticUserMsg.id && m.id !== streamingId && !rows.has(m.id)),
+            persisted.user_message,
+            persisted.message,
+          ])
+        }
 
         // Bubble this session to the top
-        setSessions((prev) => {
-          const timestamp = assistantMsg.created_at ?? new Date().toISOString()
-          const updated = prev.map((s) =>
-            s.id === activeSessionId ? { ...s, updated_at: timestamp } : s
-          )
-          return [
-            updated.find((s) => s.id === activeSessionId)!,
-            ...updated.filter((s) => s.id !== activeSessionId),
-          ]
-        })
+        bubbleSession(activeSessionId, persisted ? [persisted.user_message, persisted.message] : [])
       } catch (err: unknown) {
+        if (controller.signal.aborted) return
         const axiosErr = err as { response?: { data?: { error?: string } }; message?: string }
         const msg = axiosErr?.response?.data?.error ?? axiosErr?.message ?? 'Request failed'
         console.error('[useBoardroom] submitMessage failed:', err)
         setError(msg)
-        // Remove the optimistic message on failure
-        setMessages((prev) => prev.filter((m) => m.id !== optimisticUserMsg.id))
+        // Remove the optimistic and partially streamed messages on failure
+        setMessages((prev) =>
+          prev.filter((m) => m.id !== optimisticUserMsg.id && m.id !== streamingId)
+        )
+      } finally {
+        if (streamAbortRef.current === controller) streamAbortRef.current = null
+        setIsTyping(false)
+      }
+    },
+    [activeSessionId, activeAgentId, bubbleSession]
+  )
+
+  // Roundtable: one message, answered by every selected agent at once. Each
+  // agent's reply streams into its own placeholder in the order they start.
+  const submitRoundtable = useCallback(
+    async (text: string, agentIds: string[]) => {
+      if (!activeSessionId || agentIds.length === 0 || !text.trim()) return
+
+      const stamp = Date.now()
+      const optimisticUserMsg: Message = {
+        id: `optimistic-${stamp}`,
+        role: 'user',
+        content: text.trim(),
+        agent_id: null,
+        created_at: new Date().toISOString(),
+      }
+      setMessages((prev) => [...prev, optimisticUserMsg])
+      setIsTyping(true)
+
+      const streamingId = (agentId: string) => `streaming-${stamp}-${agentId}`
+      const started = new Set<string>()
+      const isPlaceholder = (m: Message) =>
+        m.id === optimisticUserMsg.id || m.id.startsWith(`streaming-${stamp}-`)
+      const controller = new AbortController()
+      streamAbortRef.current = controller
+
+      try {
+        const done: { result?: RoundtableResponse } = {}
+
+        await streamRoundtable(
+          { session_id: activeSessionId, agent_ids: agentIds, message: text.trim() },
+          {
+            onDelta: (agentId, content) => {
+              const id = streamingId(agentId)
+              if (!started.has(agentId)) {
+                // First token from any agent: swap the typing indicator for live replies.
+                if (started.size === 0) setIsTyping(false)
+                started.add(agentId)
+                setMessages((prev) => [
+                  ...prev,
+                  {
+                    id,
+                    role: 'assistant',
+                    content,
+                    agent_id: agentId,
+                    created_at: new Date().toISOString(),
+                  },
+                ])
+                return
+              }
+              setMessages((prev) =>
+                prev.map((msg) => (msg.id === id ? { ...msg, content: msg.content + content } : msg))
+              )
+            },
+            onAgentError: (agentId) => {
+              setMessages((prev) => prev.filter((m) => m.id !== streamingId(agentId)))
+            },
+            onDone: (result) => {
+              done.result = result
+            },
+          },
+          controller.signal
+        )
+
+        const persisted = done.result
+        if (persisted) {
+          latestCursorRef.current = persisted.next_after
+          const rows = new Set([persisted.user_message, ...persisted.messages].map((m) => m.id))
+          setMessages((prev) => [
+            ...prev.filter((m) => !isPlaceholder(m) && !rows.has(m.id)),
+            persisted.user_message,
+            ...persisted.messages,
+          ])
+        }
+        bubbleSession(activeSessionId, persisted ? [persisted.user_message, ...persisted.messages] : [])
+      } catch (err: unknown) {
+        if (controller.signal.aborted) return
+        const msg = (err as { message?: string })?.message ?? 'Request failed'
+        console.error('[useBoardroom] submitRoundtable failed:', err)
+        setError(msg)
+        setMessages((prev) => prev.filter((m) => !isPlaceholder(m)))
       } finally {
+        if (streamAbortRef.current === controller) streamAbortRef.current = null
         setIsTyping(false)
       }
     },
-    [activeSessionId, activeAgentId, streamAssistantMessage]
+    [activeSessionId, bubbleSession]
+  )
+
+  const submit = useCallback(
+    (text: string) =>
+      roundtableAgentIds ? submitRoundtable(text, roundtableAgentIds) : submitMessage(text),
+    [roundtableAgentIds, submitRoundtable, submitMessage]
   )
 
+  useEffect(() => {
+    const query = searchQuery.trim()
+    const seq = ++searchSeqRef.current
+    if (!enabled || !query) {
+      setSearchResults(null)
+      setSearchOffset(null)
+      return
+    }
+    const timer = setTimeout(() => {
+      searchMessages(query)
+        .then((page) => {
+          if (searchSeqRef.current !== seq) return
+          setSearchResults(page.results)
+          setSearchOffset(page.next_offset)
+        })
+        .catch((err) => {
+          if (searchSeqRef.current !== seq) return
+          const msg = err?.response?.data?.error ?? err?.message ?? 'Search failed'
+          console.error('[useBoardroom] searchMessages failed:', err)
+          setError(msg)
+        })
+    }, SEARCH_DEBOUNCE_MS)
+    return () => clearTimeout(timer)
+  }, [enabled, searchQuery])
+
+  const loadMoreResults = useCallback(async () => {
+    const query = searchQuery.trim()
+    if (!query || searchOffset === null) return
+    const seq = searchSeqRef.current
+    try {
+      const page = await searchMessages(query, { offset: searchOffset })
+      if (searchSeqRef.current !== seq) return
+      setSearchResults((prev) => [...(prev ?? []), ...page.results])
+      setSearchOffset(page.next_offset)
+    } catch (err: unknown) {
+      const msg = (err as { message?: string })?.message ?? 'Search failed'
+      console.error('[useBoardroom] loadMoreResults failed:', err)
+      setError(msg)
+    }
+  }, [searchQuery, searchOffset])
+
   const getAgent = useCallback(
     (id: string | null) => {
       if (!id) return undefined
@@ -218,12 +781,25 @@ export function useBoardroom(enabled = true): BoardroomState {
     messages,
     activeSessionId,
     activeAgentId,
+    roundtableAgentIds,
     isTyping,
+    hasOlderMessages: olderCursor !== null,
+    isLoadingOlder,
+    hasMoreSessions: sessionsCursor !== null,
+    searchQuery,
+    searchResults,
+    hasMoreResults: searchOffset !== null,
     error,
+    loadOlderMessages,
+    loadMoreSessions,
+    setSearchQuery,
+    loadMoreResults,
     setActiveSessionId,
     setActiveAgentId,
+    toggleRoundtable,
+    toggleRoundtableAgent,
     startNewSession,
-    submitMessage,
+    submitMessage: submit,
     getAgent,
   }
 }
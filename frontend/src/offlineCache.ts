@@ -0,0 +1,172 @@
+import type { Agent, Message, Session } from './types'
+
+// A per-user snapshot of what the app last showed, kept in IndexedDB so the
+// next load can paint the Roster, Dossiers and last-open Transcript before
+// any request returns. Everything here is best effort: without IndexedDB (or
+// on any storage error) reads resolve to null and writes are dropped, and the
+// app falls back to loading from the API.
+const DB_NAME = 'boardroom-cache'
+const DB_VERSION = 1
+const META_STORE = 'meta'
+const TRANSCRIPT_STORE = 'transcripts'
+
+// Transcripts kept per user; the least recently opened ones are evicted.
+export const CACHE_MAX_TRANSCRIPTS = 20
+// A transcript grown past this many messages is not cached.
+export const CACHE_MAX_MESSAGES = 1000
+
+export interface CachedMeta {
+  userId: string
+  agents: Agent[]
+  agentsEtag: string | null
+  // The first page of GET /api/sessions, as the server sent it.
+  sessions: Session[]
+  sessionsCursor: string | null
+  sessionsEtag: string | null
+  activeSessionId: string | null
+}
+
+// The newest part of a transcript: `nextBefore` is the cursor of the page
+// before its first message and `nextAfter` the delta-sync cursor after its last.
+export interface CachedTranscript {
+  userId: string
+  sessionId: string
+  messages: Message[]
+  nextBefore: string | null
+  nextAfter: string | null
+  accessedAt: number
+}
+
+let dbPromise: Promise<IDBDatabase | null> | null = null
+// Bumped by clearCache so writes queued before a logout are dropped.
+let generation = 0
+
+function request<T>(req: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result)
+    req.onerror = () => reject(req.error)
+  })
+}
+
+function done(tx: IDBTransaction): Promise<void> {
+  return new Promise((resolve, reject) => {
+    tx.oncomplete = () => resolve()
+    tx.onerror = () => reject(tx.error)
+    tx.onabort = () => reject(tx.error)
+  })
+}
+
+function openDb(): Promise<IDBDatabase | null> {
+  if (!dbPromise) {
+    dbPromise = new Promise<IDBDatabase | null>((resolve) => {
+      if (typeof indexedDB === 'undefined') {
+        resolve(null)
+        return
+      }
+      const req = indexedDB.open(DB_NAME, DB_VERSION)
+      req.onupgradeneeded = () => {
+        const db = req.result
+        db.createObjectStore(META_STORE, { keyPath: 'userId' })
+        const transcripts = db.createObjectStore(TRANSCRIPT_STORE, { keyPath: ['userId', 'sessionId'] })
+        transcripts.createIndex('userId', 'userId')
+      }
+      req.onsuccess = () => resolve(req.result)
+      req.onerror = () => {
+        console.warn('[offlineCache] IndexedDB unavailable:', req.error)
+        resolve(null)
+      }
+    })
+  }
+  return dbPromise
+}
+
+async function read<T>(store: string, key: IDBValidKey): Promise<T | null> {
+  try {
+    const db = await openDb()
+    if (!db) return null
+    const value = await request(db.transaction(store).objectStore(store).get(key))
+    return (value as T | undefined) ?? null
+  } catch (err) {
+    console.warn('[offlineCache] read failed:', err)
+    return null
+  }
+}
+
+async function write(stores: string[], apply: (tx: IDBTransaction) => void): Promise<void> {
+  const startedIn = generation
+  try {
+    const db = await openDb()
+    if (!db || startedIn !== generation) return
+    const tx = db.transaction(stores, 'readwrite')
+    apply(tx)
+    await done(tx)
+  } catch (err) {
+    console.warn('[offlineCache] write failed:', err)
+  }
+}
+
+export function readMeta(userId: string): Promise<CachedMeta | null> {
+  return read<CachedMeta>(META_STORE, userId)
+}
+
+// Merges `patch` into the user's meta record.
+export function writeMeta(userId: string, patch: Partial<Omit<CachedMeta, 'userId'>>): Promise<void> {
+  return write([META_STORE], (tx) => {
+    const store = tx.objectStore(META_STORE)
+    const req = store.get(userId)
+    req.onsuccess = () => {
+      const current: CachedMeta = req.result ?? {
+        userId,
+        agents: [],
+        agentsEtag: null,
+        sessions: [],
+        sessionsCursor: null,
+        sessionsEtag: null,
+        activeSessionId: null,
+      }
+      store.put({ ...current, ...patch, userId })
+    }
+  })
+}
+
+export function readTranscript(userId: string, sessionId: string): Promise<CachedTranscript | null> {
+  return read<CachedTranscript>(TRANSCRIPT_STORE, [userId, sessionId])
+}
+
+// Stores a transcript, or drops it once it's over CACHE_MAX_MESSAGES, then
+// evicts the user's least recently opened transcripts beyond
+// CACHE_MAX_TRANSCRIPTS.
+export function writeTranscript(transcript: Omit<CachedTranscript, 'accessedAt'>): Promise<void> {
+  return write([TRANSCRIPT_STORE], (tx) => {
+    const store = tx.objectStore(TRANSCRIPT_STORE)
+    if (transcript.messages.length > CACHE_MAX_MESSAGES) {
+      store.delete([transcript.userId, transcript.sessionId])
+      return
+    }
+    store.put({ ...transcript, accessedAt: Date.now() })
+
+    const all = store.index('userId').getAll(transcript.userId)
+    all.onsuccess = () => {
+      const entries = all.result as CachedTranscript[]
+      entries
+        .sort((a, b) => b.accessedAt - a.accessedAt)
+        .slice(CACHE_MAX_TRANSCRIPTS)
+        .forEach((entry) => store.delete([entry.userId, entry.sessionId]))
+    }
+  })
+}
+
+// Forgets every user's data; called on logout.
+export async function clearCache(): Promise<void> {
+  generation++
+  try {
+    const db = await openDb()
+    if (!db) return
+    const tx = db.transaction([META_STORE, TRANSCRIPT_STORE], 'readwrite')
+    tx.objectStore(META_STORE).clear()
+    tx.objectStore(TRANSCRIPT_STORE).clear()
+    await done(tx)
+  } catch (err) {
+    console.warn('[offlineCache] clear failed:', err)
+  }
+}
@@ -9,10 +9,15 @@ export interface Agent {
   color_hex: string
 }
 
+// message_count and the last message's preview and agent are kept on the
+// session row, so the list needs no per-session queries.
 export interface Session {
   id: string
   title: string
   updated_at: string
+  message_count: number
+  last_message_preview: string | null
+  last_agent_id: string | null
 }
 
 export interface Message {
@@ -23,6 +28,22 @@ export interface Message {
   created_at: string
 }
 
+// A run of search snippet text; `match` marks the words that matched the query.
+export interface SnippetSegment {
+  text: string
+  match: boolean
+}
+
+export interface SearchResult {
+  id: string
+  session_id: string
+  session_title: string | null
+  agent_id: string | null
+  role: 'user' | 'assistant'
+  created_at: string
+  snippet: SnippetSegment[]
+}
+
 export interface AuthUser {
   id: string
   email: string
@@ -32,16 +53,93 @@ export interface AuthUser {
 // API request/response shapes
 // ---------------------------------------------------------------------------
 
+// Most recently active first; pass `next_before` to fetch the next page.
+export interface SessionPage {
+  sessions: Session[]
+  next_before: string | null
+}
+
+// Best match first; pass `next_offset` to fetch the next page.
+export interface SearchPage {
+  results: SearchResult[]
+  next_offset: number | null
+}
+
+export interface MessagePage {
+  messages: Message[]
+  next_before: string | null
+  next_after: string | null
+}
+
 export interface ChatPayload {
   session_id: string
   agent_id: string
   message: string
 }
 
+// Size of the LLM context the backend assembled for a reply.
+export interface ContextUsage {
+  messages: number
+  tokens: number
+  budget: number
+  summary: boolean
+}
+
+// Which model route served a reply, and whether it took a hedge or fallback
+// or was replayed from the completion cache (then attempts is 0).
+export interface ModelRouting {
+  model: string
+  attempts: number
+  hedged: boolean
+  ttft_ms: number
+  cached: boolean
+}
+
+// Persisted rows for both sides of the turn plus the delta-sync cursor
+// positioned after them.
 export interface ChatResponse {
-  message: Omit<Message, 'created_at'> & { created_at?: string }
+  message: Message
+  user_message: Message
+  next_after: string
+  context: ContextUsage
+  routing: ModelRouting
 }
 
+export interface ChatStreamHandlers {
+  onDelta: (content: string) => void
+  onDone: (result: ChatResponse) => void
+}
+
+export interface RoundtablePayload {
+  session_id: string
+  agent_ids: string[]
+  message: string
+}
+
+// Replies are in the order the agents finished; failed agents are omitted.
+export interface RoundtableResponse {
+  user_message: Message
+  messages: Message[]
+  next_after: string
+  context: Record<string, ContextUsage>
+  routing: Record<string, ModelRouting>
+}
+
+export interface RoundtableStreamHandlers {
+  onDelta: (agentId: string, content: string) => void
+  onAgentError: (agentId: string) => void
+  onDone: (result: RoundtableResponse) => void
+}
+
+// A change pushed on GET /api/events by a write in any tab or device. `sync`
+// means events may have been missed: catch up with delta reads.
+export type LiveEvent =
+  | { kind: 'sync' }
+  | { kind: 'session_created'; session: Session }
+  | { kind: 'session_updated'; session: Partial<Session> & { id: string } }
+  | { kind: 'sessions_changed' }
+  | { kind: 'message_inserted'; session_id: string; message: Message; next_after: string }
+
 export interface AuthPayload {
   email: string
   password: string
@@ -0,0 +1,83 @@
+-- Brings a database created before the session list columns up to date:
+-- adds sessions.message_count, last_message_preview and last_agent_id, the
+-- messages triggers that maintain them (as in schema.sql), and backfills them
+-- from messages. Safe to run more than once; a fresh install from schema.sql
+-- doesn't need it.
+
+BEGIN;
+
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS message_count INT NOT NULL DEFAULT 0;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_message_preview TEXT;
+ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_agent_id UUID REFERENCES agents(id) ON DELETE SET NULL;
+
+CREATE OR REPLACE FUNCTION sessions_apply_message_inserts() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE sessions s
+    SET message_count = s.message_count + n.added,
+        last_message_preview = n.preview,
+        last_agent_id = n.agent_id
+    FROM (
+        SELECT DISTINCT ON (session_id)
+               session_id,
+               count(*) OVER (PARTITION BY session_id) AS added,
+               left(regexp_replace(content, '\s+', ' ', 'g'), 160) AS preview,
+               agent_id
+        FROM inserted
+        ORDER BY session_id, created_at DESC, id DESC
+    ) n
+    WHERE s.id = n.session_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION sessions_apply_message_deletes() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE sessions s
+    SET message_count = greatest(s.message_count - d.removed, 0),
+        last_message_preview = latest.preview,
+        last_agent_id = latest.agent_id
+    FROM (SELECT session_id, count(*) AS removed FROM deleted GROUP BY session_id) d
+    LEFT JOIN LATERAL (
+        SELECT left(regexp_replace(m.content, '\s+', ' ', 'g'), 160) AS preview, m.agent_id
+        FROM messages m
+        WHERE m.session_id = d.session_id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1
+    ) latest ON true
+    WHERE s.id = d.session_id;
+    RETURN NULL;
+END;
+$$;
+
+-- Messages written while the backfill runs wait for it, so none is counted
+-- twice or missed.
+LOCK TABLE messages IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS messages_update_session_on_insert ON messages;
+CREATE TRIGGER messages_update_session_on_insert
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE FUNCTION sessions_apply_message_inserts();
+
+DROP TRIGGER IF EXISTS messages_update_session_on_delete ON messages;
+CREATE TRIGGER messages_update_session_on_delete
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION sessions_apply_message_deletes();
+
+-- Recomputed from scratch, so a rerun repairs rather than double counts.
+UPDATE sessions s
+SET message_count = (SELECT count(*) FROM messages m WHERE m.session_id = s.id),
+    (last_message_preview, last_agent_id) = (
+        SELECT left(regexp_replace(m.content, '\s+', ' ', 'g'), 160), m.agent_id
+        FROM messages m
+        WHERE m.session_id = s.id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1
+    );
+
+COMMIT;
@@ -0,0 +1,58 @@
+-- Brings a database created before full-text search up to date: adds the
+-- generated messages.content_tsv column (computed for existing rows as it is
+-- added), its GIN index and search_messages (as in schema.sql). Safe to run
+-- more than once; a fresh install from schema.sql doesn't need it.
+--
+-- Adding the column rewrites messages under an exclusive lock; on a large
+-- table run this in a quiet period.
+
+BEGIN;
+
+ALTER TABLE messages
+    ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_messages_content_tsv ON messages USING GIN (content_tsv);
+
+CREATE OR REPLACE FUNCTION search_messages(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INT DEFAULT 20,
+    p_offset INT DEFAULT 0
+) RETURNS TABLE (
+    id UUID,
+    session_id UUID,
+    session_title VARCHAR,
+    agent_id UUID,
+    role VARCHAR,
+    created_at TIMESTAMPTZ,
+    rank REAL,
+    headline TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ), page AS (
+        SELECT m.id, m.session_id, s.title, m.agent_id, m.role, m.created_at, m.content,
+               ts_rank(m.content_tsv, q.query, 1) AS rank
+        FROM q
+        JOIN messages m ON m.content_tsv @@ q.query
+        JOIN sessions s ON s.id = m.session_id
+        WHERE s.user_id = p_user_id
+        ORDER BY rank DESC, m.created_at DESC, m.id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT page.id, page.session_id, page.title, page.agent_id, page.role, page.created_at, page.rank,
+           ts_headline(
+               'english', page.content, q.query,
+               format('StartSel=%s, StopSel=%s, MaxWords=24, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "',
+                      chr(2), chr(3))
+           )
+    FROM page, q
+    ORDER BY page.rank DESC, page.created_at DESC, page.id DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION search_messages(UUID, TEXT, INT, INT) FROM PUBLIC, anon, authenticated;
+
+COMMIT;
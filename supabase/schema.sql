@@ -15,10 +15,15 @@ CREATE TABLE sessions (
     user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
     title VARCHAR(255) DEFAULT 'New Session',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now()),
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now())
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now()),
+    -- Denormalized for the session list; maintained by the messages triggers below.
+    message_count INT NOT NULL DEFAULT 0,
+    last_message_preview TEXT,
+    last_agent_id UUID REFERENCES agents(id) ON DELETE SET NULL
 );
 
-CREATE INDEX idx_sessions_user_id_updated_at ON sessions(user_id, updated_at DESC);
+-- Serves the keyset-paginated session list over (updated_at, id), newest first.
+CREATE INDEX idx_sessions_user_id_updated_at_id ON sessions(user_id, updated_at DESC, id DESC);
 
 -- Messages Table
 CREATE TABLE messages (
@@ -27,9 +32,92 @@ CREATE TABLE messages (
     agent_id UUID REFERENCES agents(id) ON DELETE SET NULL,
     role VARCHAR(50) NOT NULL CHECK (role IN ('user', 'assistant')),
     content TEXT NOT NULL,
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now())
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now()),
+    -- Full-text search vector for /api/search, kept in step by Postgres.
+    content_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+);
+
+-- Serves transcript keyset pagination over (created_at, id) and the chat
+-- context-window query without a sequential scan.
+CREATE INDEX idx_messages_session_id_created_at_id ON messages(session_id, created_at, id);
+
+-- Serves search_messages below.
+CREATE INDEX idx_messages_content_tsv ON messages USING GIN (content_tsv);
+
+-- Rolling summary of each session's older messages, maintained by the backend.
+-- It covers every message up to and including (covered_until, covered_message_id);
+-- chat turns send it plus the messages after that key.
+CREATE TABLE session_summaries (
+    session_id UUID PRIMARY KEY REFERENCES sessions(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    covered_until TIMESTAMP WITH TIME ZONE NOT NULL,
+    covered_message_id UUID NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc', now())
 );
 
+-- ---------------------------------------------------------------------------
+-- Session list columns
+--
+-- Statement-level triggers keep sessions.message_count, last_message_preview
+-- (the newest message, whitespace-collapsed and cut to 160 characters) and
+-- last_agent_id (that message's agent; NULL for a user message) in step with
+-- messages, so GET /api/sessions reads one index range and never counts or
+-- joins per session. Bulk inserts (roundtables, write-behind batches) update
+-- each session once.
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION sessions_apply_message_inserts() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE sessions s
+    SET message_count = s.message_count + n.added,
+        last_message_preview = n.preview,
+        last_agent_id = n.agent_id
+    FROM (
+        SELECT DISTINCT ON (session_id)
+               session_id,
+               count(*) OVER (PARTITION BY session_id) AS added,
+               left(regexp_replace(content, '\s+', ' ', 'g'), 160) AS preview,
+               agent_id
+        FROM inserted
+        ORDER BY session_id, created_at DESC, id DESC
+    ) n
+    WHERE s.id = n.session_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION sessions_apply_message_deletes() RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE sessions s
+    SET message_count = greatest(s.message_count - d.removed, 0),
+        last_message_preview = latest.preview,
+        last_agent_id = latest.agent_id
+    FROM (SELECT session_id, count(*) AS removed FROM deleted GROUP BY session_id) d
+    LEFT JOIN LATERAL (
+        SELECT left(regexp_replace(m.content, '\s+', ' ', 'g'), 160) AS preview, m.agent_id
+        FROM messages m
+        WHERE m.session_id = d.session_id
+        ORDER BY m.created_at DESC, m.id DESC
+        LIMIT 1
+    ) latest ON true
+    WHERE s.id = d.session_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER messages_update_session_on_insert
+    AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE FUNCTION sessions_apply_message_inserts();
+
+CREATE TRIGGER messages_update_session_on_delete
+    AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION sessions_apply_message_deletes();
+
 -- Seed Agents
 INSERT INTO agents (name, role_description, system_prompt, color_hex) VALUES
 ('Senior Architect',
@@ -46,3 +134,216 @@ INSERT INTO agents (name, role_description, system_prompt, color_hex) VALUES
  'Vulnerability assessment & secure practices.',
  'You are a strict Security Auditor. Hunt for vulnerabilities, auth flaws, and data leaks in the proposed ideas. Be blunt about risks.',
  '#EF4444');
+
+
+-- ---------------------------------------------------------------------------
+-- Chat turn RPCs
+--
+-- /api/chat calls these instead of issuing one PostgREST request per step.
+-- p_user_id is trusted input from the backend, so they must only be callable
+-- with the service role key (see the REVOKEs at the end). Each one still
+-- checks that the session belongs to p_user_id before writing to it.
+-- ---------------------------------------------------------------------------
+
+-- Verify ownership, persist the user message and return the session summary
+-- plus the context window after it (oldest first, including the new message).
+-- Agent prompts are served from the backend's in-process catalog, so they are
+-- not looked up here.
+DROP FUNCTION IF EXISTS chat_begin_turn(UUID, UUID, TEXT, INT);
+CREATE OR REPLACE FUNCTION chat_begin_turn(
+    p_user_id UUID,
+    p_session_id UUID,
+    p_content TEXT,
+    p_history_limit INT DEFAULT 50,
+    p_with_summary BOOLEAN DEFAULT TRUE
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_user_message messages%ROWTYPE;
+    v_summary session_summaries%ROWTYPE;
+    v_history JSONB;
+BEGIN
+    PERFORM 1 FROM sessions WHERE id = p_session_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'session_not_found');
+    END IF;
+
+    INSERT INTO messages (session_id, agent_id, role, content)
+    VALUES (p_session_id, NULL, 'user', p_content)
+    RETURNING * INTO v_user_message;
+
+    IF p_with_summary THEN
+        SELECT * INTO v_summary FROM session_summaries WHERE session_id = p_session_id;
+    END IF;
+
+    SELECT COALESCE(jsonb_agg(jsonb_build_object('role', h.role, 'content', h.content) ORDER BY h.created_at, h.id), '[]'::jsonb)
+    INTO v_history
+    FROM (
+        SELECT id, role, content, created_at
+        FROM messages
+        WHERE session_id = p_session_id
+          AND (v_summary.session_id IS NULL
+               OR (created_at, id) > (v_summary.covered_until, v_summary.covered_message_id))
+        ORDER BY created_at DESC, id DESC
+        LIMIT p_history_limit
+    ) h;
+
+    RETURN jsonb_build_object(
+        'status', 'ok',
+        'user_message', to_jsonb(v_user_message),
+        'history', v_history,
+        'summary', CASE WHEN v_summary.session_id IS NULL THEN NULL ELSE jsonb_build_object(
+            'summary', v_summary.summary,
+            'covered_until', v_summary.covered_until,
+            'covered_message_id', v_summary.covered_message_id
+        ) END
+    );
+END;
+$$;
+
+-- Persist the assistant reply and bump the session's updated_at atomically.
+-- Raises no_data_found if the session is gone or isn't p_user_id's.
+CREATE OR REPLACE FUNCTION chat_finish_turn(
+    p_user_id UUID,
+    p_session_id UUID,
+    p_agent_id UUID,
+    p_content TEXT
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_message messages%ROWTYPE;
+BEGIN
+    UPDATE sessions
+    SET updated_at = timezone('utc', now())
+    WHERE id = p_session_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'session % not found', p_session_id USING ERRCODE = 'no_data_found';
+    END IF;
+
+    INSERT INTO messages (session_id, agent_id, role, content)
+    VALUES (p_session_id, p_agent_id, 'assistant', p_content)
+    RETURNING * INTO v_message;
+
+    RETURN to_jsonb(v_message);
+END;
+$$;
+
+-- Persist every roundtable reply with one insert and bump updated_at. Replies
+-- are stored in the order given (the order they finished streaming), one
+-- microsecond apart so (created_at, id) ordering matches it. Raises
+-- no_data_found if the session is gone or isn't p_user_id's.
+CREATE OR REPLACE FUNCTION chat_finish_roundtable(
+    p_user_id UUID,
+    p_session_id UUID,
+    p_replies JSONB
+) RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_now TIMESTAMP WITH TIME ZONE := now();
+    v_messages JSONB;
+BEGIN
+    UPDATE sessions
+    SET updated_at = v_now
+    WHERE id = p_session_id AND user_id = p_user_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'session % not found', p_session_id USING ERRCODE = 'no_data_found';
+    END IF;
+
+    WITH inserted AS (
+        INSERT INTO messages (session_id, agent_id, role, content, created_at)
+        SELECT p_session_id, r.agent_id, 'assistant', r.content, v_now + (r.ord - 1) * interval '1 microsecond'
+        FROM ROWS FROM (jsonb_to_recordset(p_replies) AS (agent_id UUID, content TEXT))
+             WITH ORDINALITY AS r(agent_id, content, ord)
+        RETURNING *
+    )
+    SELECT COALESCE(jsonb_agg(to_jsonb(inserted) ORDER BY created_at), '[]'::jsonb)
+    INTO v_messages
+    FROM inserted;
+
+    RETURN v_messages;
+END;
+$$;
+
+-- Applies a batch of write-behind writes (backend/write_behind.py). Messages
+-- carry their own ids and timestamps, so replaying a batch inserts nothing
+-- twice; rows for sessions deleted in the meantime are dropped, and a reply
+-- whose agent is gone keeps its content with a NULL agent.
+CREATE OR REPLACE FUNCTION chat_apply_writes(
+    p_messages JSONB,
+    p_sessions JSONB
+) RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO messages (id, session_id, agent_id, role, content, created_at)
+    SELECT m.id, m.session_id, a.id, m.role, m.content, m.created_at
+    FROM jsonb_to_recordset(p_messages)
+         AS m(id UUID, session_id UUID, agent_id UUID, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+    JOIN sessions s ON s.id = m.session_id
+    LEFT JOIN agents a ON a.id = m.agent_id
+    ON CONFLICT (id) DO NOTHING;
+
+    UPDATE sessions
+    SET updated_at = GREATEST(sessions.updated_at, t.updated_at)
+    FROM jsonb_to_recordset(p_sessions) AS t(id UUID, user_id UUID, updated_at TIMESTAMPTZ)
+    WHERE sessions.id = t.id AND sessions.user_id = t.user_id;
+END;
+$$;
+
+-- ---------------------------------------------------------------------------
+-- Search
+--
+-- Ranked full-text search over one user's messages (backend/search.py). The
+-- GIN index finds the matches and the join keeps the caller's sessions; every
+-- match has to be ranked to order them, so pages are addressed by offset, and
+-- ts_headline (the costly part) only runs for the rows of the page returned.
+-- Headlines mark matches with STX/ETX control characters.
+-- ---------------------------------------------------------------------------
+CREATE OR REPLACE FUNCTION search_messages(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INT DEFAULT 20,
+    p_offset INT DEFAULT 0
+) RETURNS TABLE (
+    id UUID,
+    session_id UUID,
+    session_title VARCHAR,
+    agent_id UUID,
+    role VARCHAR,
+    created_at TIMESTAMPTZ,
+    rank REAL,
+    headline TEXT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ), page AS (
+        SELECT m.id, m.session_id, s.title, m.agent_id, m.role, m.created_at, m.content,
+               ts_rank(m.content_tsv, q.query, 1) AS rank
+        FROM q
+        JOIN messages m ON m.content_tsv @@ q.query
+        JOIN sessions s ON s.id = m.session_id
+        WHERE s.user_id = p_user_id
+        ORDER BY rank DESC, m.created_at DESC, m.id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT page.id, page.session_id, page.title, page.agent_id, page.role, page.created_at, page.rank,
+           ts_headline(
+               'english', page.content, q.query,
+               format('StartSel=%s, StopSel=%s, MaxWords=24, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "',
+                      chr(2), chr(3))
+           )
+    FROM page, q
+    ORDER BY page.rank DESC, page.created_at DESC, page.id DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION chat_begin_turn(UUID, UUID, TEXT, INT, BOOLEAN) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chat_finish_turn(UUID, UUID, UUID, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chat_finish_roundtable(UUID, UUID, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chat_apply_writes(JSONB, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION search_messages(UUID, TEXT, INT, INT) FROM PUBLIC, anon, authenticated;